@@ -0,0 +1,178 @@
+"""
+Answer Cache — reuse a chatbot's reply when a visitor asks what it already answered.
+
+Widget visitors ask the same handful of questions ("what are your opening
+hours?") over and over, and each one used to cost a full LLM completion.
+Replies are cached per bot in chatbots.db (``answer_cache``), keyed on
+
+  * the context: the bot's system prompt, model and API type, its
+    knowledge version and the last few messages before the question, and
+  * the question: the last user message, lowercased with punctuation and
+    runs of whitespace collapsed,
+
+so "Opening hours?" and "opening   hours" share an entry, while the same
+words asked mid-conversation do not. Entries expire after ``ttl`` seconds
+and each bot keeps at most ``max_entries``, least recently used first out.
+
+Invalidation happens in the database itself (migration 4 in chatbots_db):
+changing a bot's system prompt, model or API type, or any knowledge file
+insert, update or delete, drops the bot's entries and bumps
+``knowledge_version``.
+
+With ``near_duplicate`` a miss falls back to the most similar cached
+question in the same context (Jaccard similarity of the word sets, at least
+``similarity``), which catches rewordings like "when are you open".
+Hits, near hits and misses are counted per bot in ``answer_cache_stats``.
+"""
+import hashlib
+import re
+import time
+
+MAX_ENTRIES = 200
+TTL_SECONDS = 7 * 86400
+CONTEXT_MESSAGES = 4
+SIMILARITY = 0.85
+NEAR_CANDIDATES = 200
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+_COUNT = """
+INSERT INTO answer_cache_stats (chatbot_id, {col}) VALUES (?, 1)
+ON CONFLICT(chatbot_id) DO UPDATE SET {col} = {col} + 1
+"""
+
+
+def normalize(text):
+    """Lowercase, punctuation stripped, whitespace collapsed."""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", str(text or "").lower())).strip()
+
+
+def similarity(a, b):
+    """Jaccard similarity of the word sets of two normalized questions."""
+    wa, wb = set(a.split()), set(b.split())
+    if not wa or not wb:
+        return 0.0
+    return len(wa & wb) / len(wa | wb)
+
+
+def _digest(*parts):
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def _field(bot, name):
+    try:
+        return bot[name]
+    except (KeyError, IndexError):
+        return None
+
+
+class AnswerCache:
+    """Per-bot reply cache stored in a ``ChatbotsDB``."""
+
+    def __init__(self, store, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, context_messages=CONTEXT_MESSAGES,
+                 near_duplicate=False, similarity=SIMILARITY, clock=time.time):
+        self.store = store
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self.context_messages = max(1, int(context_messages))
+        self.near_duplicate = near_duplicate
+        self.similarity = float(similarity)
+        self.clock = clock
+
+    def keys(self, bot, messages):
+        """``(context_key, question, key)`` for a conversation ending in a user
+        message, or None when there is nothing cacheable to ask."""
+        if not messages or messages[-1].get("role") != "user":
+            return None
+        question = normalize(messages[-1].get("content"))
+        if not question:
+            return None
+        history = messages[:-1][-(self.context_messages - 1):] if self.context_messages > 1 else []
+        context = _digest(_digest(_field(bot, "system_prompt") or ""), _field(bot, "model_id") or "",
+                          _field(bot, "api_type") or "",
+                          _field(bot, "knowledge_version") or 0,
+                          *(f"{m.get('role')}:{normalize(m.get('content'))}" for m in history))
+        return context, question, _digest(context, question)
+
+    def get(self, bot, messages):
+        """Cached reply for this conversation, or None (counted as a miss)."""
+        keys = self.keys(bot, messages)
+        if keys is None:
+            return None
+        context, question, key = keys
+        bot_id = _field(bot, "id")
+        now = self.clock()
+        db = self.store.connect()
+        try:
+            row = db.execute("SELECT key, reply FROM answer_cache WHERE chatbot_id = ? AND key = ? AND created_at >= ?",
+                             (bot_id, key, now - self.ttl)).fetchone()
+            outcome = "hits"
+            if row is None and self.near_duplicate:
+                row = self._nearest(db, bot_id, context, question, now)
+                outcome = "near_hits"
+            if row is None:
+                outcome = "misses"
+            else:
+                db.execute("UPDATE answer_cache SET last_used_at = ?, hits = hits + 1 WHERE chatbot_id = ? AND key = ?",
+                           (now, bot_id, row[0]))
+            db.execute(_COUNT.format(col=outcome), (bot_id,))
+            db.commit()
+            return row[1] if row is not None else None
+        finally:
+            db.close()
+
+    def _nearest(self, db, bot_id, context, question, now):
+        best, best_score = None, self.similarity
+        rows = db.execute(
+            "SELECT key, reply, question FROM answer_cache WHERE chatbot_id = ? AND context_key = ? AND created_at >= ? "
+            "ORDER BY last_used_at DESC LIMIT ?", (bot_id, context, now - self.ttl, NEAR_CANDIDATES))
+        for key, reply, cached_question in rows:
+            score = similarity(question, cached_question)
+            if score >= best_score:
+                best, best_score = (key, reply), score
+        return best
+
+    def put(self, bot, messages, reply):
+        """Cache ``reply`` for this conversation and trim the bot's entries."""
+        keys = self.keys(bot, messages)
+        if keys is None or not reply:
+            return False
+        context, question, key = keys
+        bot_id = _field(bot, "id")
+        now = self.clock()
+        db = self.store.connect()
+        try:
+            db.execute("INSERT OR REPLACE INTO answer_cache VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                       (bot_id, key, context, question, reply, now, now))
+            db.execute("DELETE FROM answer_cache WHERE chatbot_id = ? AND created_at < ?", (bot_id, now - self.ttl))
+            db.execute("DELETE FROM answer_cache WHERE chatbot_id = ? AND key IN ("
+                       "SELECT key FROM answer_cache WHERE chatbot_id = ? ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                       (bot_id, bot_id, self.max_entries))
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+    def clear(self, chatbot_id):
+        db = self.store.connect()
+        try:
+            db.execute("DELETE FROM answer_cache WHERE chatbot_id = ?", (chatbot_id,))
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self, chatbot_id=None):
+        """Hit counters and entry count, for one bot or all of them."""
+        where, params = ("WHERE chatbot_id = ?", (chatbot_id,)) if chatbot_id else ("", ())
+        db = self.store.connect()
+        try:
+            hits, near, misses = db.execute(
+                f"SELECT total(hits), total(near_hits), total(misses) FROM answer_cache_stats {where}", params).fetchone()
+            entries = db.execute(f"SELECT count(*) FROM answer_cache {where}", params).fetchone()[0]
+        finally:
+            db.close()
+        hits, near, misses = int(hits), int(near), int(misses)
+        lookups = hits + near + misses
+        return {"hits": hits, "nearHits": near, "misses": misses, "entries": entries,
+                "hitRate": round((hits + near) / lookups * 100, 1) if lookups else 0.0}
@@ -0,0 +1,312 @@
+"""
+Chat Providers — streaming LLM completions over pooled keep-alive connections.
+
+Widget chat used to make one blocking ``urlopen`` per message: a fresh TCP +
+TLS handshake every time, and nothing for the visitor to see until the whole
+completion had arrived. Here each provider host gets a ``KeepAliveClient``
+that keeps a few idle ``http.client`` connections open, and every provider
+speaks its streaming API and yields text deltas as they arrive:
+
+  * ``anthropic`` — Messages API, ``content_block_delta`` events
+  * ``openai``    — Chat Completions, ``choices[0].delta.content`` chunks
+  * ``gemini``    — ``streamGenerateContent?alt=sse``
+  * ``mock``      — local canned reply with a configurable delay; no network,
+    used by the tests and for trying the widget without API keys
+
+``ChatProviders.stream`` wraps a provider stream and records time to first
+token and total time per provider (``stats``).
+"""
+import http.client
+import json
+import threading
+import time
+from collections import deque
+from urllib.parse import quote, urlsplit
+
+LATENCY_SAMPLES = 512
+
+
+class ProviderError(Exception):
+    """The provider refused the request or the stream broke off."""
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+class KeepAliveClient:
+    """Idle HTTP/1.1 connections to one origin, reused across requests."""
+
+    def __init__(self, base_url, max_idle=4, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        self.opened += 1
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _checkin(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request; returns ``(conn, response)``. Pass both to ``release``
+        once the body has been read to the end (or ``discard`` on error)."""
+        payload = json.dumps(body).encode() if body is not None else None
+        hdrs = {"Content-Type": "application/json", **(headers or {})}
+        conn, reused = self._checkout()
+        try:
+            conn.request(method, path, body=payload, headers=hdrs)
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError, http.client.CannotSendRequest):
+            conn.close()
+            if not reused:
+                raise
+        # The server closed an idle connection; one retry on a fresh one
+        conn = self._connect()
+        conn.request(method, path, body=payload, headers=hdrs)
+        return conn, conn.getresponse()
+
+    def release(self, conn, resp):
+        if resp.isclosed() and not resp.will_close:
+            self._checkin(conn)
+        else:
+            conn.close()
+
+    def discard(self, conn):
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {"idle": len(self._idle), "opened": self.opened, "reused": self.reused}
+
+
+def iter_sse(resp):
+    """``(event, data)`` pairs from a text/event-stream response."""
+    event, data = None, []
+    while True:
+        raw = resp.readline()
+        if not raw:
+            break
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+    if data:
+        yield event, "\n".join(data)
+
+
+class HTTPProvider:
+    """Base for providers that stream SSE over a ``KeepAliveClient``."""
+
+    name = None
+    base_url = None
+
+    def __init__(self, client=None, timeout=30.0):
+        self.client = client or KeepAliveClient(self.base_url, timeout=timeout)
+
+    def _request(self, model, system, messages, max_tokens, api_key):
+        raise NotImplementedError
+
+    def _deltas(self, event, data):
+        raise NotImplementedError
+
+    def stream(self, model, system, messages, max_tokens=1024, api_key=None):
+        """Yield text deltas of one completion."""
+        path, body, headers = self._request(model, system, messages, max_tokens, api_key)
+        conn, resp = self.client.request("POST", path, body, headers)
+        if resp.status >= 400:
+            detail = resp.read().decode("utf-8", errors="replace")[:500]
+            self.client.release(conn, resp)
+            raise ProviderError(f"{self.name} HTTP {resp.status}: {detail}")
+        try:
+            for event, data in iter_sse(resp):
+                if data == "[DONE]":
+                    continue
+                try:
+                    payload = json.loads(data)
+                except ValueError:
+                    continue
+                for delta in self._deltas(event, payload):
+                    if delta:
+                        yield delta
+        except BaseException:
+            # Abandoned mid-stream (client went away) or broken: never reuse
+            self.client.discard(conn)
+            raise
+        self.client.release(conn, resp)
+
+
+class AnthropicProvider(HTTPProvider):
+    name = "anthropic"
+    base_url = "https://api.anthropic.com"
+
+    def _request(self, model, system, messages, max_tokens, api_key):
+        body = {"model": model, "max_tokens": max_tokens, "system": system, "messages": messages, "stream": True}
+        headers = {"x-api-key": api_key or "", "anthropic-version": "2023-06-01"}
+        return "/v1/messages", body, headers
+
+    def _deltas(self, event, payload):
+        kind = payload.get("type")
+        if kind == "content_block_delta":
+            yield (payload.get("delta") or {}).get("text", "")
+        elif kind == "error":
+            raise ProviderError(f"anthropic: {(payload.get('error') or {}).get('message', payload)}")
+
+
+class OpenAIProvider(HTTPProvider):
+    name = "openai"
+    base_url = "https://api.openai.com"
+
+    def _request(self, model, system, messages, max_tokens, api_key):
+        body = {"model": model, "max_tokens": max_tokens, "stream": True,
+                "messages": [{"role": "system", "content": system}] + list(messages)}
+        return "/v1/chat/completions", body, {"Authorization": f"Bearer {api_key or ''}"}
+
+    def _deltas(self, event, payload):
+        if payload.get("error"):
+            raise ProviderError(f"openai: {payload['error']}")
+        for choice in payload.get("choices") or []:
+            yield (choice.get("delta") or {}).get("content") or ""
+
+
+class GeminiProvider(HTTPProvider):
+    name = "gemini"
+    base_url = "https://generativelanguage.googleapis.com"
+
+    def _request(self, model, system, messages, max_tokens, api_key):
+        contents = [{"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+                    for m in messages]
+        # No maxOutputTokens: Gemini widget replies have always used the model's own limit
+        body = {"systemInstruction": {"parts": [{"text": system}]}, "contents": contents}
+        path = f"/v1beta/models/{model}:streamGenerateContent?alt=sse&key={quote(api_key or '', safe='')}"
+        return path, body, {}
+
+    def _deltas(self, event, payload):
+        for cand in payload.get("candidates") or []:
+            for part in (cand.get("content") or {}).get("parts") or []:
+                yield part.get("text", "")
+
+
+class MockProvider:
+    """Offline provider: streams ``reply`` (default: echoes the last user
+    message) word by word, ``delay`` seconds apart."""
+
+    name = "mock"
+
+    def __init__(self, reply=None, delay=0.02, first_token_delay=None):
+        self.reply = reply
+        self.delay = delay
+        self.first_token_delay = delay if first_token_delay is None else first_token_delay
+
+    def stream(self, model, system, messages, max_tokens=1024, api_key=None):
+        text = self.reply
+        if text is None:
+            last = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+            text = f"You said: {last}"
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.first_token_delay if i == 0 else self.delay)
+            yield word if i == 0 else " " + word
+
+
+PROVIDERS = {"anthropic": AnthropicProvider, "openai": OpenAIProvider, "gemini": GeminiProvider}
+
+
+class ChatProviders:
+    """One long-lived provider (and connection pool) per name, plus timing."""
+
+    def __init__(self, timeout=30.0, overrides=None):
+        self.timeout = timeout
+        self._providers = dict(overrides or {})
+        self._lock = threading.Lock()
+        self._timings = {}  # name -> {"ttft": deque, "total": deque, counters}
+
+    def get(self, name):
+        with self._lock:
+            provider = self._providers.get(name)
+            if provider is None:
+                if name == "mock":
+                    provider = MockProvider()
+                elif name in PROVIDERS:
+                    provider = PROVIDERS[name](timeout=self.timeout)
+                else:
+                    raise ProviderError(f"unknown provider: {name}")
+                self._providers[name] = provider
+            return provider
+
+    def _record(self, name, ttft, total, ok):
+        with self._lock:
+            t = self._timings.setdefault(name, {"ttft": deque(maxlen=LATENCY_SAMPLES),
+                                                "total": deque(maxlen=LATENCY_SAMPLES),
+                                                "requests": 0, "errors": 0})
+            t["requests"] += 1
+            t["errors"] += 0 if ok else 1
+            if ttft is not None:
+                t["ttft"].append(ttft)
+            if ok:
+                t["total"].append(total)
+
+    def stream(self, name, model, system, messages, max_tokens=1024, api_key=None):
+        """Yield deltas from provider ``name``; timing is recorded when the
+        stream ends, fails or is abandoned."""
+        started = time.monotonic()
+        ttft, ok = None, False
+        try:
+            for delta in self.get(name).stream(model, system, messages, max_tokens, api_key):
+                if ttft is None:
+                    ttft = (time.monotonic() - started) * 1000
+                yield delta
+            ok = True
+        finally:
+            self._record(name, ttft, (time.monotonic() - started) * 1000, ok)
+
+    def complete(self, name, model, system, messages, max_tokens=1024, api_key=None):
+        """Whole reply as one string (still streamed and pooled underneath)."""
+        return "".join(self.stream(name, model, system, messages, max_tokens, api_key))
+
+    def stats(self):
+        out = {}
+        with self._lock:
+            for name, t in self._timings.items():
+                ttft, total = sorted(t["ttft"]), sorted(t["total"])
+                out[name] = {"requests": t["requests"], "errors": t["errors"],
+                             "ttftMs": {"p50": _percentile(ttft, 50), "p90": _percentile(ttft, 90),
+                                        "p99": _percentile(ttft, 99)},
+                             "totalMs": {"p50": _percentile(total, 50), "p90": _percentile(total, 90)}}
+            clients = {name: p.client.stats() for name, p in self._providers.items() if hasattr(p, "client")}
+        for name, pool in clients.items():
+            out.setdefault(name, {})["connections"] = pool
+        return out
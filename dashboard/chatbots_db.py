@@ -0,0 +1,732 @@
+"""
+Chatbots DB — pooled SQLite connections and versioned schema for chatbots.db.
+
+Both dashboard servers used to open a fresh connection and replay the whole
+``CREATE TABLE IF NOT EXISTS`` script (plus ``ALTER TABLE`` probes) on every
+request. ``ChatbotsDB`` runs the schema migrations once per process, keyed by
+``PRAGMA user_version``, and hands out connections from a pool:
+
+  * WAL journal — readers never block the writer and vice versa
+  * ``synchronous=NORMAL``, a 16 MB page cache, 256 MB mmap, 5 s busy timeout
+  * each pooled connection keeps its compiled-statement cache, so the hot
+    queries are prepared once per connection instead of once per request
+
+``connect()`` returns a connection that is used exactly like a
+``sqlite3.Connection``; ``close()`` rolls back anything uncommitted and puts
+it back in the pool instead of closing it.
+
+Migrations are append-only: to change the schema, add a function to
+``MIGRATIONS``. Migration ``n`` (1-based) runs when ``user_version < n``.
+"""
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+POOL_SIZE = 8
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_BASE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS chatbots (
+        id TEXT PRIMARY KEY, user_id TEXT DEFAULT 'default', name TEXT NOT NULL,
+        system_prompt TEXT, greeting TEXT DEFAULT 'Hi! How can I help you today?',
+        suggested_prompts TEXT DEFAULT '[]', position TEXT DEFAULT 'bottom-right',
+        theme TEXT DEFAULT 'dark', primary_color TEXT DEFAULT '#4ade80',
+        bg_color TEXT DEFAULT '#1a1a1a', text_color TEXT DEFAULT '#e0e0e0',
+        allowed_domains TEXT DEFAULT '', rate_per_minute INTEGER DEFAULT 10,
+        rate_per_hour INTEGER DEFAULT 100, enable_analytics INTEGER DEFAULT 1,
+        show_watermark INTEGER DEFAULT 1, status TEXT DEFAULT 'active',
+        created_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
+        updated_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
+        api_type TEXT DEFAULT 'internal', api_key_encrypted TEXT,
+        model_id TEXT DEFAULT 'claude-sonnet', last_used_at INTEGER,
+        icon_url TEXT DEFAULT '', icon TEXT DEFAULT '💬', icon_type TEXT DEFAULT 'emoji'
+    )""",
+    """CREATE TABLE IF NOT EXISTS chatbot_conversations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, chatbot_id TEXT NOT NULL,
+        session_id TEXT NOT NULL, started_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
+        ended_at INTEGER, message_count INTEGER DEFAULT 0, satisfaction_rating INTEGER,
+        FOREIGN KEY (chatbot_id) REFERENCES chatbots(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS chatbot_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id INTEGER NOT NULL,
+        role TEXT NOT NULL, content TEXT NOT NULL,
+        timestamp INTEGER DEFAULT (strftime('%s', 'now') * 1000),
+        FOREIGN KEY (conversation_id) REFERENCES chatbot_conversations(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS licenses (
+        id TEXT PRIMARY KEY, user_id TEXT NOT NULL, chatbot_id TEXT,
+        tier TEXT DEFAULT 'free', features TEXT DEFAULT '[]',
+        stripe_subscription_id TEXT, stripe_customer_id TEXT, expires_at INTEGER,
+        created_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
+        updated_at INTEGER DEFAULT (strftime('%s', 'now') * 1000)
+    )""",
+    """CREATE TABLE IF NOT EXISTS knowledge_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, chatbot_id TEXT NOT NULL,
+        filename TEXT NOT NULL, content TEXT, file_size INTEGER,
+        uploaded_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
+        FOREIGN KEY (chatbot_id) REFERENCES chatbots(id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_conversations_chatbot ON chatbot_conversations(chatbot_id)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_conversation ON chatbot_messages(conversation_id)",
+    "CREATE INDEX IF NOT EXISTS idx_licenses_user ON licenses(user_id)",
+)
+
+# Columns added to chatbots after the first release; older files lack some
+_CHATBOT_COLUMNS = (
+    ("api_type", "TEXT DEFAULT 'internal'"),
+    ("api_key_encrypted", "TEXT"),
+    ("model_id", "TEXT DEFAULT 'claude-sonnet'"),
+    ("last_used_at", "INTEGER"),
+    ("icon_url", "TEXT DEFAULT ''"),
+    ("icon", "TEXT DEFAULT '💬'"),
+    ("icon_type", "TEXT DEFAULT 'emoji'"),
+)
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _migrate_base(conn):
+    """Tables of both servers; files created before versioning get missing columns."""
+    for stmt in _BASE_SCHEMA:
+        conn.execute(stmt)
+    have = _columns(conn, "chatbots")
+    for name, decl in _CHATBOT_COLUMNS:
+        if name not in have:
+            conn.execute(f"ALTER TABLE chatbots ADD COLUMN {name} {decl}")
+
+
+_SUMMARY_COLUMNS = (
+    ("first_user_message", "TEXT"),
+    ("last_message_at", "INTEGER"),
+    ("user_message_count", "INTEGER DEFAULT 0"),
+)
+
+_SUMMARY_BACKFILL = """
+UPDATE chatbot_conversations SET
+    message_count = (SELECT count(*) FROM chatbot_messages m WHERE m.conversation_id = chatbot_conversations.id),
+    user_message_count = (SELECT count(*) FROM chatbot_messages m
+                          WHERE m.conversation_id = chatbot_conversations.id AND m.role = 'user'),
+    last_message_at = (SELECT max(timestamp) FROM chatbot_messages m WHERE m.conversation_id = chatbot_conversations.id),
+    first_user_message = (SELECT content FROM chatbot_messages m
+                          WHERE m.conversation_id = chatbot_conversations.id AND m.role = 'user'
+                          ORDER BY timestamp, id LIMIT 1)
+"""
+
+_SUMMARY_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS chatbot_messages_summary_ai AFTER INSERT ON chatbot_messages BEGIN
+        UPDATE chatbot_conversations SET
+            message_count = coalesce(message_count, 0) + 1,
+            user_message_count = coalesce(user_message_count, 0) + (new.role = 'user'),
+            last_message_at = max(coalesce(last_message_at, 0), coalesce(new.timestamp, 0)),
+            first_user_message = CASE WHEN first_user_message IS NULL AND new.role = 'user'
+                                      THEN new.content ELSE first_user_message END
+        WHERE id = new.conversation_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS chatbot_messages_summary_ad AFTER DELETE ON chatbot_messages BEGIN
+        UPDATE chatbot_conversations SET
+            message_count = max(0, coalesce(message_count, 0) - 1),
+            user_message_count = max(0, coalesce(user_message_count, 0) - (old.role = 'user')),
+            last_message_at = (SELECT max(timestamp) FROM chatbot_messages WHERE conversation_id = old.conversation_id),
+            first_user_message = (SELECT content FROM chatbot_messages
+                                  WHERE conversation_id = old.conversation_id AND role = 'user'
+                                  ORDER BY timestamp, id LIMIT 1)
+        WHERE id = old.conversation_id;
+    END""",
+    "CREATE INDEX IF NOT EXISTS idx_conversations_started ON chatbot_conversations(started_at)",
+)
+
+# External-content FTS5 index over message text, kept in sync by triggers
+_FTS_SCHEMA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS chatbot_messages_fts USING fts5(
+        content, content='chatbot_messages', content_rowid='id')""",
+    """CREATE TRIGGER IF NOT EXISTS chatbot_messages_fts_ai AFTER INSERT ON chatbot_messages BEGIN
+        INSERT INTO chatbot_messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS chatbot_messages_fts_ad AFTER DELETE ON chatbot_messages BEGIN
+        INSERT INTO chatbot_messages_fts(chatbot_messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS chatbot_messages_fts_au AFTER UPDATE OF content ON chatbot_messages BEGIN
+        INSERT INTO chatbot_messages_fts(chatbot_messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO chatbot_messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    "INSERT INTO chatbot_messages_fts(chatbot_messages_fts) VALUES ('rebuild')",
+)
+
+
+def _migrate_conversation_summary(conn):
+    """Per-conversation first user message, last activity and counts, kept by
+    triggers; FTS5 index over message content (skipped if SQLite lacks FTS5)."""
+    have = _columns(conn, "chatbot_conversations")
+    for name, decl in _SUMMARY_COLUMNS:
+        if name not in have:
+            conn.execute(f"ALTER TABLE chatbot_conversations ADD COLUMN {name} {decl}")
+    conn.execute(_SUMMARY_BACKFILL)
+    for stmt in _SUMMARY_TRIGGERS:
+        conn.execute(stmt)
+    _create_fts(conn, _FTS_SCHEMA, "message search")
+
+
+def _create_fts(conn, statements, what):
+    """Run FTS5 DDL in a savepoint; without FTS5 the feature falls back to LIKE."""
+    try:
+        conn.execute("SAVEPOINT fts")
+        for stmt in statements:
+            conn.execute(stmt)
+        conn.execute("RELEASE fts")
+    except sqlite3.OperationalError as e:
+        conn.execute("ROLLBACK TO fts")
+        conn.execute("RELEASE fts")
+        print(f"[WARN] chatbots.db {what} falls back to LIKE: {e}")
+
+
+KNOWLEDGE_CHUNK_CHARS = 500
+KNOWLEDGE_CHUNK_OVERLAP = 50
+
+_KNOWLEDGE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS knowledge_chunks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, file_id INTEGER NOT NULL,
+        chatbot_id TEXT NOT NULL, idx INTEGER NOT NULL, content TEXT NOT NULL,
+        FOREIGN KEY (file_id) REFERENCES knowledge_files(id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_knowledge_chunks_file ON knowledge_chunks(file_id)",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_files_chunks_ad AFTER DELETE ON knowledge_files BEGIN
+        DELETE FROM knowledge_chunks WHERE file_id = old.id;
+    END""",
+)
+
+# chatbot_id is indexed too, so a bot's chunks are found through the index
+# (column filter) rather than by post-filtering every bot's matches; the
+# exact id is still checked because ids like "a-b" tokenize as phrases
+_KNOWLEDGE_FTS_SCHEMA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_chunks_fts USING fts5(
+        content, chatbot_id, content='knowledge_chunks', content_rowid='id',
+        tokenize='porter unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_chunks_fts_ai AFTER INSERT ON knowledge_chunks BEGIN
+        INSERT INTO knowledge_chunks_fts(rowid, content, chatbot_id) VALUES (new.id, new.content, new.chatbot_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_chunks_fts_ad AFTER DELETE ON knowledge_chunks BEGIN
+        INSERT INTO knowledge_chunks_fts(knowledge_chunks_fts, rowid, content, chatbot_id)
+        VALUES ('delete', old.id, old.content, old.chatbot_id);
+    END""",
+)
+
+
+def _migrate_knowledge_chunks(conn):
+    """Knowledge files chunked once into ``knowledge_chunks`` with a BM25-ranked
+    FTS5 index; existing files are chunked here."""
+    for stmt in _KNOWLEDGE_SCHEMA:
+        conn.execute(stmt)
+    _create_fts(conn, _KNOWLEDGE_FTS_SCHEMA, "knowledge search")
+    for file_id, chatbot_id, content in conn.execute(
+            "SELECT id, chatbot_id, content FROM knowledge_files").fetchall():
+        index_knowledge_file(conn, file_id, chatbot_id, content)
+
+
+_ANSWER_CACHE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS answer_cache (
+        chatbot_id TEXT NOT NULL, key TEXT NOT NULL, context_key TEXT NOT NULL,
+        question TEXT NOT NULL, reply TEXT NOT NULL,
+        created_at INTEGER NOT NULL, last_used_at INTEGER NOT NULL, hits INTEGER DEFAULT 0,
+        PRIMARY KEY (chatbot_id, key)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_answer_cache_lru ON answer_cache(chatbot_id, last_used_at)",
+    "CREATE INDEX IF NOT EXISTS idx_answer_cache_context ON answer_cache(chatbot_id, context_key)",
+    """CREATE TABLE IF NOT EXISTS answer_cache_stats (
+        chatbot_id TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, near_hits INTEGER DEFAULT 0,
+        misses INTEGER DEFAULT 0
+    )""",
+    # A new prompt/model or knowledge set makes every cached answer of the bot stale
+    """CREATE TRIGGER IF NOT EXISTS chatbots_answer_cache_au
+    AFTER UPDATE OF system_prompt, model_id, api_type ON chatbots
+    WHEN old.system_prompt IS NOT new.system_prompt OR old.model_id IS NOT new.model_id
+      OR old.api_type IS NOT new.api_type BEGIN
+        DELETE FROM answer_cache WHERE chatbot_id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS chatbots_answer_cache_ad AFTER DELETE ON chatbots BEGIN
+        DELETE FROM answer_cache WHERE chatbot_id = old.id;
+        DELETE FROM answer_cache_stats WHERE chatbot_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_files_version_ai AFTER INSERT ON knowledge_files BEGIN
+        UPDATE chatbots SET knowledge_version = coalesce(knowledge_version, 0) + 1 WHERE id = new.chatbot_id;
+        DELETE FROM answer_cache WHERE chatbot_id = new.chatbot_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_files_version_au AFTER UPDATE ON knowledge_files BEGIN
+        UPDATE chatbots SET knowledge_version = coalesce(knowledge_version, 0) + 1
+        WHERE id IN (old.chatbot_id, new.chatbot_id);
+        DELETE FROM answer_cache WHERE chatbot_id IN (old.chatbot_id, new.chatbot_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_files_version_ad AFTER DELETE ON knowledge_files BEGIN
+        UPDATE chatbots SET knowledge_version = coalesce(knowledge_version, 0) + 1 WHERE id = old.chatbot_id;
+        DELETE FROM answer_cache WHERE chatbot_id = old.chatbot_id;
+    END""",
+)
+
+
+def _migrate_answer_cache(conn):
+    """Per-bot answer cache (see answer_cache.py) and a knowledge version that
+    changes with every knowledge file insert, update or delete."""
+    if "knowledge_version" not in _columns(conn, "chatbots"):
+        conn.execute("ALTER TABLE chatbots ADD COLUMN knowledge_version INTEGER DEFAULT 0")
+    for stmt in _ANSWER_CACHE_SCHEMA:
+        conn.execute(stmt)
+
+
+# Local calendar day of an epoch-ms timestamp (the analytics page's days)
+_DAY = "date(coalesce({}, 0) / 1000, 'unixepoch', 'localtime')"
+
+DAILY_COUNTERS = ("conversations", "messages", "user_messages", "assistant_messages",
+                  "rated", "rating_sum", "rating1", "rating2", "rating3", "rating4", "rating5")
+
+_DAILY_SCHEMA = (
+    f"""CREATE TABLE IF NOT EXISTS chatbot_daily_stats (
+        chatbot_id TEXT NOT NULL, day TEXT NOT NULL,
+        {", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in DAILY_COUNTERS)},
+        PRIMARY KEY (chatbot_id, day)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_daily_stats_day ON chatbot_daily_stats(day)",
+)
+
+
+def _daily_delta(conv, sign, counts, source=""):
+    """Upsert adding ``sign`` x ``counts`` (counter -> SQL expr) to the day row
+    of conversation alias ``conv`` (``new``/``old`` or a table alias)."""
+    values = ", ".join(f"{sign}({counts[c]})" if c in counts else "0" for c in DAILY_COUNTERS)
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in DAILY_COUNTERS)
+    return (f"INSERT INTO chatbot_daily_stats (chatbot_id, day, {', '.join(DAILY_COUNTERS)}) "
+            f"SELECT {conv}.chatbot_id, {_DAY.format(conv + '.started_at')}, {values} {source or 'WHERE 1'} "
+            f"ON CONFLICT(chatbot_id, day) DO UPDATE SET {updates};")
+
+
+def _daily_prune(conv):
+    """Drop the day row of ``conv`` once its last conversation is gone."""
+    return (f"DELETE FROM chatbot_daily_stats WHERE chatbot_id = {conv}.chatbot_id "
+            f"AND day = {_DAY.format(conv + '.started_at')} AND conversations <= 0 AND messages <= 0;")
+
+
+def _conversation_counts(conv):
+    """Counters one conversation row contributes: itself, its rating and its messages."""
+    rating = f"{conv}.satisfaction_rating"
+    counts = {"conversations": "1", "rated": f"{rating} IS NOT NULL", "rating_sum": f"coalesce({rating}, 0)"}
+    counts.update({f"rating{n}": f"coalesce({rating} = {n}, 0)" for n in range(1, 6)})
+    counts["messages"] = f"(SELECT count(*) FROM chatbot_messages WHERE conversation_id = {conv}.id)"
+    for role in ("user", "assistant"):
+        counts[f"{role}_messages"] = (f"(SELECT count(*) FROM chatbot_messages "
+                                      f"WHERE conversation_id = {conv}.id AND role = '{role}')")
+    return counts
+
+
+def _message_counts(msg):
+    return {"messages": "1", "user_messages": f"{msg}.role = 'user'", "assistant_messages": f"{msg}.role = 'assistant'"}
+
+
+_DAILY_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_conversations_daily_ai AFTER INSERT ON chatbot_conversations BEGIN
+        {_daily_delta("new", "+", _conversation_counts("new"))}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_conversations_daily_ad AFTER DELETE ON chatbot_conversations BEGIN
+        {_daily_delta("old", "-", _conversation_counts("old"))}
+        {_daily_prune("old")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_conversations_daily_au
+    AFTER UPDATE OF chatbot_id, started_at, satisfaction_rating ON chatbot_conversations BEGIN
+        {_daily_delta("old", "-", _conversation_counts("old"))}
+        {_daily_delta("new", "+", _conversation_counts("new"))}
+        {_daily_prune("old")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_messages_daily_ai AFTER INSERT ON chatbot_messages BEGIN
+        {_daily_delta("c", "+", _message_counts("new"), "FROM chatbot_conversations c WHERE c.id = new.conversation_id")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_messages_daily_ad AFTER DELETE ON chatbot_messages BEGIN
+        {_daily_delta("c", "-", _message_counts("old"), "FROM chatbot_conversations c WHERE c.id = old.conversation_id")}
+    END""",
+)
+
+
+def _migrate_daily_stats(conn):
+    """Per (chatbot, day) analytics rollup kept by triggers (see compact_daily_stats)."""
+    for stmt in _DAILY_SCHEMA + _DAILY_TRIGGERS:
+        conn.execute(stmt)
+    compact_daily_stats(conn)
+
+
+# Days of per-question counts kept for "popular questions", so the table and
+# every query over it stay bounded however long the history grows
+QUESTION_DAYS = 90
+_QUESTION_WINDOW = f"date('now', 'localtime', '-{QUESTION_DAYS} days')"
+
+_QUESTION_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS chatbot_daily_questions (
+        id INTEGER PRIMARY KEY, chatbot_id TEXT NOT NULL, day TEXT NOT NULL,
+        question TEXT NOT NULL, count INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (chatbot_id, day, question)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_daily_questions_day ON chatbot_daily_questions(day)",
+    # Newest conversations of one bot without sorting its whole history
+    "CREATE INDEX IF NOT EXISTS idx_conversations_chatbot_started ON chatbot_conversations(chatbot_id, started_at)",
+)
+
+
+def _question_add(conv):
+    """Count the user messages of conversation alias ``conv`` into its day."""
+    day = _DAY.format(conv + ".started_at")
+    return (f"INSERT INTO chatbot_daily_questions (chatbot_id, day, question, count) "
+            f"SELECT {conv}.chatbot_id, {day}, m.content, count(*) FROM chatbot_messages m "
+            f"WHERE m.conversation_id = {conv}.id AND m.role = 'user' AND {day} >= {_QUESTION_WINDOW} "
+            f"GROUP BY m.content "
+            f"ON CONFLICT(chatbot_id, day, question) DO UPDATE SET count = count + excluded.count;")
+
+
+def _question_remove(conv):
+    """Take the user messages of conversation alias ``conv`` back out."""
+    day = _DAY.format(conv + ".started_at")
+    return (f"UPDATE chatbot_daily_questions SET count = count - (SELECT count(*) FROM chatbot_messages m "
+            f"WHERE m.conversation_id = {conv}.id AND m.role = 'user' AND m.content = chatbot_daily_questions.question) "
+            f"WHERE chatbot_id = {conv}.chatbot_id AND day = {day}; "
+            f"DELETE FROM chatbot_daily_questions WHERE chatbot_id = {conv}.chatbot_id AND day = {day} AND count <= 0;")
+
+
+_MESSAGE_DAY = f"(SELECT c.chatbot_id, {_DAY.format('c.started_at')} FROM chatbot_conversations c WHERE c.id = {{}})"
+
+_QUESTION_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_messages_questions_ai AFTER INSERT ON chatbot_messages
+    WHEN new.role = 'user' BEGIN
+        INSERT INTO chatbot_daily_questions (chatbot_id, day, question, count)
+        SELECT c.chatbot_id, {_DAY.format('c.started_at')}, new.content, 1 FROM chatbot_conversations c
+        WHERE c.id = new.conversation_id AND {_DAY.format('c.started_at')} >= {_QUESTION_WINDOW}
+        ON CONFLICT(chatbot_id, day, question) DO UPDATE SET count = count + 1;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_messages_questions_ad AFTER DELETE ON chatbot_messages
+    WHEN old.role = 'user' BEGIN
+        UPDATE chatbot_daily_questions SET count = count - 1
+        WHERE question = old.content AND (chatbot_id, day) = {_MESSAGE_DAY.format('old.conversation_id')};
+        DELETE FROM chatbot_daily_questions
+        WHERE question = old.content AND count <= 0 AND (chatbot_id, day) = {_MESSAGE_DAY.format('old.conversation_id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_conversations_questions_ad AFTER DELETE ON chatbot_conversations BEGIN
+        {_question_remove("old")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS chatbot_conversations_questions_au
+    AFTER UPDATE OF chatbot_id, started_at ON chatbot_conversations BEGIN
+        {_question_remove("old")}
+        {_question_add("new")}
+    END""",
+)
+
+
+def _migrate_daily_questions(conn):
+    """Per (chatbot, day, question) counts of user messages over the last
+    ``QUESTION_DAYS`` days, kept by triggers (see compact_daily_questions)."""
+    for stmt in _QUESTION_SCHEMA + _QUESTION_TRIGGERS:
+        conn.execute(stmt)
+    compact_daily_questions(conn)
+
+
+MIGRATIONS = [
+    _migrate_base,
+    _migrate_conversation_summary,
+    _migrate_knowledge_chunks,
+    _migrate_answer_cache,
+    _migrate_daily_stats,
+    _migrate_daily_questions,
+]
+
+
+def compact_daily_stats(conn, since_day=None):
+    """Recompute rollup rows from ``since_day`` on (all if None) from the base
+    tables and drop empty ones. The triggers keep the rollup exact for
+    inserts, deletes and rating changes; this repairs anything they do not
+    see (e.g. a message moved between conversations). Caller commits."""
+    day = _DAY.format("c.started_at")
+    where = f"WHERE {day} >= ?" if since_day else ""
+    params = (since_day,) if since_day else ()
+    conn.execute(f"DELETE FROM chatbot_daily_stats {'WHERE day >= ?' if since_day else ''}", params)
+    counts = _conversation_counts("c")
+    counts["messages"] = "coalesce(m.messages, 0)"
+    counts["user_messages"] = "coalesce(m.user_messages, 0)"
+    counts["assistant_messages"] = "coalesce(m.assistant_messages, 0)"
+    conn.execute(f"""
+        INSERT INTO chatbot_daily_stats (chatbot_id, day, {", ".join(DAILY_COUNTERS)})
+        SELECT c.chatbot_id, {day}, {", ".join(f"total({counts[k]})" for k in DAILY_COUNTERS)}
+        FROM chatbot_conversations c
+        LEFT JOIN (SELECT conversation_id, count(*) AS messages, total(role = 'user') AS user_messages,
+                          total(role = 'assistant') AS assistant_messages
+                   FROM chatbot_messages GROUP BY conversation_id) m ON m.conversation_id = c.id
+        {where}
+        GROUP BY c.chatbot_id, {day}
+    """, params)
+    conn.execute("DELETE FROM chatbot_daily_stats WHERE conversations <= 0 AND messages <= 0")
+
+
+def daily_stats(conn, since_day=None, chatbot_id=None):
+    """Rollup rows summed over chatbots per day (one bot with ``chatbot_id``)."""
+    filters, params = [], []
+    if since_day:
+        filters.append("day >= ?")
+        params.append(since_day)
+    if chatbot_id:
+        filters.append("chatbot_id = ?")
+        params.append(chatbot_id)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    rows = conn.execute(f"""
+        SELECT day, {", ".join(f"sum({c}) AS {c}" for c in DAILY_COUNTERS)}
+        FROM chatbot_daily_stats {where} GROUP BY day ORDER BY day
+    """, params).fetchall()
+    return [dict(r) for r in rows]
+
+
+def compact_daily_questions(conn, since_day=None):
+    """Recompute question counts from ``since_day`` on (the whole window if
+    None) and drop days that have left the window. Caller commits."""
+    day = _DAY.format("c.started_at")
+    since = f"max(?, {_QUESTION_WINDOW})" if since_day else _QUESTION_WINDOW
+    params = (since_day,) if since_day else ()
+    conn.execute(f"DELETE FROM chatbot_daily_questions WHERE day >= {since} OR day < {_QUESTION_WINDOW}", params)
+    conn.execute(f"""
+        INSERT INTO chatbot_daily_questions (chatbot_id, day, question, count)
+        SELECT c.chatbot_id, {day}, m.content, count(*)
+        FROM chatbot_conversations c JOIN chatbot_messages m ON m.conversation_id = c.id
+        WHERE c.started_at >= (strftime('%s', {since}, 'utc') - 86400) * 1000 AND {day} >= {since}
+          AND m.role = 'user'
+        GROUP BY c.chatbot_id, {day}, m.content
+    """, params * 2)
+
+
+def popular_questions(conn, since_day=None, chatbot_id=None, limit=10):
+    """Most asked user messages since ``since_day`` (clamped to the last
+    ``QUESTION_DAYS`` days), summed over chatbots unless ``chatbot_id``."""
+    since = f"max(?, {_QUESTION_WINDOW})" if since_day else _QUESTION_WINDOW
+    filters, params = [f"day >= {since}"], ([since_day] if since_day else [])
+    if chatbot_id:
+        filters.append("chatbot_id = ?")
+        params.append(chatbot_id)
+    rows = conn.execute(f"""
+        SELECT question, sum(count) AS count FROM chatbot_daily_questions
+        WHERE {" AND ".join(filters)} GROUP BY question ORDER BY count DESC LIMIT ?
+    """, params + [limit]).fetchall()
+    return [{"question": r["question"], "count": r["count"]} for r in rows]
+
+
+def chunk_text(text, chunk_size=1000, overlap=100):
+    """Split text into overlapping chunks for RAG"""
+    if not text:
+        return []
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+
+def index_knowledge_file(conn, file_id, chatbot_id, content):
+    """(Re)chunk one knowledge file; call inside the transaction that stores it."""
+    conn.execute("DELETE FROM knowledge_chunks WHERE file_id = ?", (file_id,))
+    conn.executemany(
+        "INSERT INTO knowledge_chunks (file_id, chatbot_id, idx, content) VALUES (?, ?, ?, ?)",
+        [(file_id, chatbot_id, i, chunk)
+         for i, chunk in enumerate(chunk_text(content, KNOWLEDGE_CHUNK_CHARS, KNOWLEDGE_CHUNK_OVERLAP))])
+
+
+def search_knowledge(conn, chatbot_id, query, limit=5):
+    """Best-matching knowledge chunks of one chatbot, most relevant first.
+
+    Any query word may match; chunks are ranked by BM25. Each row has
+    ``file_id``, ``filename``, ``idx``, ``content`` and ``score`` (higher is
+    better). Without the FTS5 index, chunks containing any word are returned
+    unranked.
+    """
+    words = re.findall(r"\w+", (query or "").lower())
+    if not words:
+        return []
+    if has_table(conn, "knowledge_chunks_fts"):
+        match = 'chatbot_id : "{}" AND content : ({})'.format(
+            chatbot_id.replace('"', '""'), " OR ".join(f'"{w}"' for w in dict.fromkeys(words)))
+        rows = conn.execute(
+            """SELECT k.file_id, f.filename, k.idx, k.content, -bm25(knowledge_chunks_fts, 1.0, 0.0) AS score
+               FROM knowledge_chunks_fts
+               JOIN knowledge_chunks k ON k.id = knowledge_chunks_fts.rowid
+               JOIN knowledge_files f ON f.id = k.file_id
+               WHERE knowledge_chunks_fts MATCH ? AND k.chatbot_id = ?
+               ORDER BY bm25(knowledge_chunks_fts, 1.0, 0.0) LIMIT ?""",
+            (match, chatbot_id, limit)).fetchall()
+    else:
+        like = " OR ".join("k.content LIKE ?" for _ in words)
+        rows = conn.execute(
+            f"""SELECT k.file_id, f.filename, k.idx, k.content, 0.0 AS score
+                FROM knowledge_chunks k JOIN knowledge_files f ON f.id = k.file_id
+                WHERE k.chatbot_id = ? AND ({like}) LIMIT ?""",
+            [chatbot_id] + [f"%{w}%" for w in words] + [limit]).fetchall()
+    return [dict(r) for r in rows]
+
+
+def has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+
+def fts_query(text):
+    """Free text → FTS5 query: every word must match (the last one as a prefix)."""
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words[:-1]) + (" " if len(words) > 1 else "") + f'"{words[-1]}"*'
+
+
+def list_conversations(conn, chatbot_id=None, search=None, start_date=None, end_date=None, limit=50, offset=0):
+    """One page of conversations (newest first) and the filtered total.
+
+    Rows carry every ``chatbot_conversations`` column plus ``chatbot_name``
+    and ``first_message``. ``search`` matches message content through the
+    FTS5 index (LIKE if the index is missing).
+    """
+    where, params = [], []
+    if chatbot_id:
+        where.append("c.chatbot_id = ?")
+        params.append(chatbot_id)
+    if start_date:
+        where.append("c.started_at >= ?")
+        params.append(int(start_date))
+    if end_date:
+        where.append("c.started_at <= ?")
+        params.append(int(end_date))
+    if search:
+        match = fts_query(search)
+        if match and has_table(conn, "chatbot_messages_fts"):
+            where.append("c.id IN (SELECT m.conversation_id FROM chatbot_messages_fts f "
+                         "JOIN chatbot_messages m ON m.id = f.rowid WHERE chatbot_messages_fts MATCH ?)")
+            params.append(match)
+        else:
+            where.append("c.id IN (SELECT conversation_id FROM chatbot_messages WHERE content LIKE ?)")
+            params.append(f"%{search}%")
+    where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+    rows = conn.execute(
+        f"""SELECT c.*, b.name AS chatbot_name, c.first_user_message AS first_message,
+                   count(*) OVER () AS total_count
+            FROM chatbot_conversations c
+            LEFT JOIN chatbots b ON b.id = c.chatbot_id{where_sql}
+            ORDER BY c.started_at DESC LIMIT ? OFFSET ?""",
+        params + [limit, offset],
+    ).fetchall()
+    if rows:
+        total = rows[0]["total_count"]
+    elif offset:
+        total = conn.execute(f"SELECT count(*) FROM chatbot_conversations c{where_sql}", params).fetchone()[0]
+    else:
+        total = 0
+    out = []
+    for row in rows:
+        d = dict(row)
+        d.pop("total_count", None)
+        out.append(d)
+    return out, total
+
+
+class PooledConnection:
+    """A pooled ``sqlite3.Connection``; ``close`` returns it to the pool."""
+
+    __slots__ = ("_conn", "_pool")
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool._release(conn)
+
+
+class ChatbotsDB:
+    """Connection pool over one chatbots.db file; migrates on first use."""
+
+    def __init__(self, path, pool_size=POOL_SIZE, migrations=None):
+        self.path = Path(path)
+        self.pool_size = pool_size
+        self.migrations = MIGRATIONS if migrations is None else migrations
+        self._lock = threading.Lock()
+        self._idle = []
+        self._migrated = False
+        self.opened = 0
+
+    def _open(self):
+        conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        self.opened += 1
+        return conn
+
+    def migrate(self, conn):
+        """Apply pending migrations; returns the resulting ``user_version``."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(self.migrations):
+            return version
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock: another process may have migrated
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for n in range(version, len(self.migrations)):
+                self.migrations[n](conn)
+            conn.execute(f"PRAGMA user_version = {len(self.migrations)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(self.migrations)
+
+    def connect(self):
+        """A connection for one unit of work; ``close()`` it when done."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+                if not self._migrated:
+                    self.migrate(conn)
+                    self._migrated = True
+        return PooledConnection(conn, self)
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {"path": str(self.path), "idle": len(self._idle), "opened": self.opened,
+                    "poolSize": self.pool_size}
@@ -0,0 +1,149 @@
+"""
+Cost Engine — columnar pricing of token usage for what-if scenarios.
+
+Usage rows (day, model, input/output/cache-read/cache-write tokens) are
+loaded once into NumPy arrays and summed into a (day, model, category)
+token cube. A pricing table becomes a (model, category) rate matrix, and
+many tables stack into a (scenario, model, category) tensor, so pricing
+every scenario over every day is a single ``einsum`` instead of a Python
+loop over rows and dict lookups.
+
+A scenario starts from the baseline rates and may
+  * ``priceAllAs`` — bill every model at another model's rates, and/or
+  * ``models``     — override some rate fields of individual models,
+e.g. ``{"name": "Opus at $3", "models": {"anthropic/claude-opus-4-6": {"inputPer1M": 3}}}``.
+"""
+try:
+    import numpy as np
+except ImportError:  # scenario pricing is disabled without NumPy
+    np = None
+
+RATE_FIELDS = ("inputPer1M", "outputPer1M", "cacheReadPer1M", "cacheWritePer1M")
+COST_FIELDS = ("inputCost", "outputCost", "cacheReadCost", "cacheWriteCost")
+
+
+def _rate(rates, field):
+    try:
+        return max(0.0, float(rates.get(field) or 0.0))
+    except (TypeError, ValueError, AttributeError):
+        return 0.0
+
+
+def model_key(provider, model):
+    """Pricing key of a usage row; "" (priced at the fallback) if incomplete."""
+    provider, model = (provider or "").strip(), (model or "").strip()
+    return f"{provider}/{model}" if provider and model else ""
+
+
+class UsageMatrix:
+    """Usage rows as arrays: ``tokens`` (n x 4), ``day_idx`` and ``model_idx``
+    (n) into the sorted ``days`` and ``models`` labels."""
+
+    def __init__(self, days, models, day_idx, model_idx, tokens):
+        self.days = list(days)
+        self.models = list(models)
+        self.day_idx = day_idx
+        self.model_idx = model_idx
+        self.tokens = tokens
+        self._cube = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        """From ``UsageRollup.rows`` tuples (day, provider, model, entries, in, out, cr, cw)."""
+        if np is None:
+            raise RuntimeError("numpy is required for cost scenarios")
+        rows = list(rows)
+        days, day_idx = np.unique(np.array([r[0] for r in rows], dtype=object).astype(str), return_inverse=True)
+        models, model_idx = np.unique(np.array([model_key(r[1], r[2]) for r in rows], dtype=object).astype(str),
+                                      return_inverse=True)
+        tokens = np.array([r[4:8] for r in rows], dtype=np.float64).reshape(len(rows), 4)
+        return cls(days.tolist(), models.tolist(), day_idx, model_idx, tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def cube(self):
+        """Tokens summed to (day, model, category)."""
+        if self._cube is None:
+            cube = np.zeros((len(self.days), len(self.models), 4))
+            np.add.at(cube, (self.day_idx, self.model_idx), self.tokens)
+            self._cube = cube
+        return self._cube
+
+
+def rate_matrix(models, table, fallback):
+    """(model, category) $/1M rates; models missing from ``table`` use ``fallback``."""
+    out = np.empty((len(models), 4))
+    for i, key in enumerate(models):
+        rates = table.get(key) if key else None
+        rates = rates if isinstance(rates, dict) else fallback
+        out[i] = [_rate(rates, f) for f in RATE_FIELDS]
+    return out
+
+
+def price(usage, rates):
+    """Costs (scenario, day, category) for a (scenario, model, category) rate tensor."""
+    return np.einsum("dmk,smk->sdk", usage.cube(), np.asarray(rates)) / 1_000_000
+
+
+def check_scenario(base, scenario):
+    """Raise ``ValueError`` unless ``scenario`` is a dict with an optional
+    ``priceAllAs`` naming a model in ``base`` and an optional ``models``
+    dict of per-model rate dicts."""
+    if not isinstance(scenario, dict):
+        raise ValueError("scenario must be an object")
+    target = scenario.get("priceAllAs")
+    if target is not None:
+        if not isinstance(target, str):
+            raise ValueError("priceAllAs must be a model key string")
+        if target and not isinstance(base.get(target), dict):
+            raise ValueError(f"unknown model for priceAllAs: {target}")
+    models = scenario.get("models")
+    if models is not None:
+        if not isinstance(models, dict):
+            raise ValueError("models must map model keys to rate objects")
+        for key, patch in models.items():
+            if not isinstance(patch, dict):
+                raise ValueError(f"rates for {key} must be an object")
+
+
+def scenario_table(base, fallback, scenario):
+    """(table, fallback) for one scenario dict layered on the baseline rates."""
+    check_scenario(base, scenario)
+    table = dict(base)
+    target = scenario.get("priceAllAs")
+    if target:
+        table = {}
+        fallback = base[target]
+    for key, patch in (scenario.get("models") or {}).items():
+        current = table.get(key) if isinstance(table.get(key), dict) else fallback
+        table[key] = {**current, **patch}
+    return table, fallback
+
+
+def compare(usage, base, fallback, scenarios):
+    """Baseline plus every scenario priced in one pass.
+
+    Returns one dict per scenario (baseline first) with per-category and
+    total cost, the delta against the baseline and the cost per model.
+    """
+    names = ["baseline"]
+    tables = [(base, fallback)]
+    for i, scenario in enumerate(scenarios):
+        tables.append(scenario_table(base, fallback, scenario))
+        names.append(str(scenario.get("name") or f"scenario {i + 1}"))
+    tensor = np.stack([rate_matrix(usage.models, t, fb) for t, fb in tables])
+    by_category = price(usage, tensor).sum(axis=1)  # (scenario, category)
+    by_model = np.einsum("dmk,smk->sm", usage.cube(), tensor) / 1_000_000
+    totals = by_category.sum(axis=1)
+    out = []
+    for s, name in enumerate(names):
+        delta = totals[s] - totals[0]
+        item = {"name": name, "totalCost": float(totals[s]), "delta": float(delta),
+                "deltaPct": float(delta / totals[0] * 100.0) if totals[0] > 0 else None,
+                "byModel": {m or "fallback": float(c) for m, c in zip(usage.models, by_model[s])}}
+        item.update({f: float(c) for f, c in zip(COST_FIELDS, by_category[s])})
+        if s:
+            item["scenario"] = scenarios[s - 1]
+        out.append(item)
+    return out
@@ -0,0 +1,318 @@
+"""
+Docs Search Index — persistent line index for /api/docs/search.
+
+One SQLite FTS5 table holds every line of every indexed markdown file, using
+the trigram tokenizer so a MATCH is a case-insensitive substring match (the
+same semantics as the old ``term in line.lower()`` scan). Lines of a document
+occupy a contiguous rowid range, which makes snippet context and deletes
+cheap rowid lookups.
+
+The index is persisted on disk and synced by mtime/size, so a restart only
+re-reads files that changed while the dashboard was down.
+
+Usage from server_v2.py:
+    idx = DocsIndex(db_path, roots)
+    idx.sync()                     # startup / periodic
+    idx.search("query")            # -> [{path, name, title, matches, matchCount}]
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    first_row INTEGER NOT NULL,
+    line_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_first_row ON docs(first_row);
+CREATE VIRTUAL TABLE IF NOT EXISTS doc_lines USING fts5(text, tokenize='trigram');
+"""
+
+
+class DocsIndexUnavailable(RuntimeError):
+    """SQLite lacks FTS5 or the trigram tokenizer (needs SQLite >= 3.34)."""
+
+
+def extract_title(lines, fallback, max_lines=10):
+    for line in lines[:max_lines]:
+        if line.startswith("# "):
+            return line[2:].strip()
+    return fallback
+
+
+class DocsRoot:
+    """A source directory: ``prefix`` is prepended to relative paths."""
+
+    def __init__(self, root, prefix, recursive=True, exclude=()):
+        self.root = Path(root)
+        self.prefix = prefix
+        self.recursive = recursive
+        self.exclude = set(exclude)
+
+    def rel_path(self, fp):
+        rel = fp.relative_to(self.root).as_posix()
+        return f"{self.prefix}/{rel}" if self.prefix else rel
+
+    def owns(self, fp):
+        try:
+            rel = Path(fp).relative_to(self.root)
+        except ValueError:
+            return False
+        if not self.recursive and len(rel.parts) != 1:
+            return False
+        return Path(fp).suffix == ".md" and Path(fp).name not in self.exclude
+
+    def iter_files(self):
+        if not self.root.exists():
+            return
+        files = self.root.rglob("*.md") if self.recursive else self.root.glob("*.md")
+        for fp in files:
+            if fp.name in self.exclude:
+                continue
+            yield fp
+
+
+class DocsIndex:
+    """Thread-safe persistent search index over a set of DocsRoot sources."""
+
+    def __init__(self, db_path, roots, max_age=30.0):
+        self.db_path = Path(db_path)
+        self.roots = list(roots)
+        self.max_age = max_age
+        self.ready = False
+        self.last_sync = 0.0
+        self.last_sync_stats = {}
+        self._stale = False
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    # -- connections -------------------------------------------------------
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                conn.executescript("DROP TABLE IF EXISTS docs; DROP TABLE IF EXISTS doc_lines;")
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            raise DocsIndexUnavailable(str(e)) from e
+        self.ready = conn.execute("SELECT 1 FROM docs LIMIT 1").fetchone() is not None
+
+    # -- writes ------------------------------------------------------------
+
+    def _root_for(self, fp):
+        for root in self.roots:
+            if root.owns(fp):
+                return root
+        return None
+
+    def _delete_doc(self, conn, path):
+        row = conn.execute("SELECT first_row, line_count FROM docs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return False
+        first, count = row
+        if count:
+            conn.execute("DELETE FROM doc_lines WHERE rowid BETWEEN ? AND ?", (first, first + count - 1))
+        conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+        return True
+
+    def _index_doc(self, conn, fp, rel, st=None):
+        st = st or fp.stat()
+        content = fp.read_text(errors="replace")
+        lines = content.split("\n")
+        self._delete_doc(conn, rel)
+        first = (conn.execute("SELECT max(rowid) FROM doc_lines").fetchone()[0] or 0) + 1
+        conn.executemany(
+            "INSERT INTO doc_lines(rowid, text) VALUES (?, ?)",
+            ((first + i, line) for i, line in enumerate(lines)),
+        )
+        conn.execute(
+            "INSERT INTO docs(path, name, title, mtime, size, first_row, line_count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (rel, fp.name, extract_title(lines, fp.stem), st.st_mtime, st.st_size, first, len(lines)),
+        )
+
+    def update_file(self, fp):
+        """(Re)index or drop a single file; returns True if the index changed."""
+        fp = Path(fp)
+        root = self._root_for(fp)
+        if root is None:
+            return False
+        rel = root.rel_path(fp)
+        with self._write_lock:
+            conn = self._conn()
+            try:
+                if fp.is_file():
+                    self._index_doc(conn, fp, rel)
+                else:
+                    self._delete_doc(conn, rel)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return True
+
+    def remove_file(self, fp):
+        fp = Path(fp)
+        root = self._root_for(fp)
+        if root is None:
+            return False
+        with self._write_lock:
+            conn = self._conn()
+            changed = self._delete_doc(conn, root.rel_path(fp))
+            conn.commit()
+        return changed
+
+    def sync(self):
+        """Bring the index in line with the filesystem (mtime/size check)."""
+        with self._sync_lock:
+            return self._sync()
+
+    def _sync(self):
+        t0 = time.time()
+        self._stale = False
+        seen = {}
+        for root in self.roots:
+            for fp in root.iter_files():
+                rel = root.rel_path(fp)
+                if rel in seen:
+                    continue
+                try:
+                    seen[rel] = (fp, fp.stat())
+                except OSError:
+                    continue
+
+        indexed = added = removed = 0
+        with self._write_lock:
+            conn = self._conn()
+            known = {p: (m, s) for p, m, s in conn.execute("SELECT path, mtime, size FROM docs")}
+            try:
+                for rel in known.keys() - seen.keys():
+                    self._delete_doc(conn, rel)
+                    removed += 1
+                for rel, (fp, st) in seen.items():
+                    if known.get(rel) == (st.st_mtime, st.st_size):
+                        continue
+                    try:
+                        self._index_doc(conn, fp, rel, st)
+                    except OSError:
+                        continue
+                    if rel in known:
+                        indexed += 1
+                    else:
+                        added += 1
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self.ready = True
+        self.last_sync = time.time()
+        self.last_sync_stats = {
+            "files": len(seen), "added": added, "updated": indexed, "removed": removed,
+            "seconds": round(self.last_sync - t0, 3),
+        }
+        return self.last_sync_stats
+
+    def mark_stale(self):
+        """Force a rescan on the next sync_if_stale() (e.g. a directory moved)."""
+        self._stale = True
+
+    def sync_if_stale(self, max_age=None):
+        """Rescan if marked stale or the last sync is older than max_age;
+        never waits on a sync already running in another thread."""
+        max_age = self.max_age if max_age is None else max_age
+        if not self._stale and time.time() - self.last_sync < max_age:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._sync()
+        finally:
+            self._sync_lock.release()
+
+    # -- reads -------------------------------------------------------------
+
+    def _context(self, conn, row, first, count, before=1, after=1):
+        lo = max(first, row - before)
+        hi = min(first + count - 1, row + after)
+        return [t for (t,) in conn.execute(
+            "SELECT text FROM doc_lines WHERE rowid BETWEEN ? AND ? ORDER BY rowid", (lo, hi))]
+
+    def search(self, q, max_files=30, max_matches=5):
+        """Substring search; same payload as the legacy rglob scan."""
+        needle = q.lower()
+        conn = self._conn()
+        if len(needle) >= 3:
+            cur = conn.execute(
+                "SELECT rowid, text FROM doc_lines WHERE doc_lines MATCH ? ORDER BY rowid",
+                ('"' + q.replace('"', '""') + '"',),
+            )
+        else:
+            pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            cur = conn.execute(
+                "SELECT rowid, text FROM doc_lines WHERE text LIKE ? ESCAPE '\\' ORDER BY rowid",
+                (pattern,),
+            )
+
+        results = []
+        doc = None  # (path, name, title, first_row, line_count, matches)
+        for rowid, text in cur:
+            if needle not in text.lower():
+                continue
+            if doc is None or not (doc[3] <= rowid < doc[3] + doc[4]):
+                if doc is not None and doc[5]:
+                    results.append(doc)
+                    if len(results) >= max_files:
+                        doc = None
+                        break
+                meta = conn.execute(
+                    "SELECT path, name, title, first_row, line_count FROM docs "
+                    "WHERE first_row <= ? ORDER BY first_row DESC LIMIT 1", (rowid,)).fetchone()
+                if meta is None:
+                    doc = None
+                    continue
+                doc = (*meta, [])
+            matches = doc[5]
+            if len(matches) >= max_matches:
+                continue
+            context = self._context(conn, rowid, doc[3], doc[4])
+            matches.append({
+                "line": rowid - doc[3] + 1,
+                "text": text.strip()[:200],
+                "snippet": "\n".join(context)[:300],
+            })
+        if doc is not None and doc[5] and len(results) < max_files:
+            results.append(doc)
+
+        out = [{"path": p, "name": n, "title": t, "matches": m, "matchCount": len(m)}
+               for p, n, t, _f, _c, m in results]
+        out.sort(key=lambda x: x["matchCount"], reverse=True)
+        return out
+
+    def stats(self):
+        conn = self._conn()
+        docs, lines = conn.execute("SELECT count(*), coalesce(sum(line_count), 0) FROM docs").fetchone()
+        return {"ready": self.ready, "docs": docs, "lines": lines,
+                "lastSync": self.last_sync, "lastSyncStats": self.last_sync_stats}
@@ -0,0 +1,386 @@
+"""
+Docs Term Index — precomputed vocabulary for /api/docs/search/semantic.
+
+The original scorer read every markdown file per request and ran
+SequenceMatcher for every query word against every unique word of every file.
+This module keeps, per document, the lowercased text and its set of words,
+plus a global vocabulary with postings (word -> documents) and a padded
+trigram index (trigram -> words). A query then:
+
+  * finds the words containing each query word through the trigram index and
+    unions their postings, giving the candidate documents;
+  * finds fuzzy near-matches (0.8 < ratio < 1.0) by running SequenceMatcher
+    only on vocabulary words that share a trigram and have a compatible
+    length, once per query instead of once per document;
+  * scores only the candidates, with the same formula as before: exact
+    phrase bonus, word coverage, path hits, proximity and fuzzy matches.
+
+``legacy_relevance`` is the original per-document scorer, kept as the
+reference implementation for tests and the benchmark.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from docs_index import extract_title
+
+_WORD_RE = re.compile(r"\b\w+\b")
+_PLAIN_WORD_RE = re.compile(r"^\w+$")
+
+MIN_SCORE = 5.0
+FUZZY_MIN_LEN = 4  # only words with len > 3 are fuzzy-matched
+FUZZY_LOW, FUZZY_HIGH = 0.8, 1.0
+
+
+def legacy_relevance(q, content, fpath):
+    """Original scorer from server_v2.api_docs_search_semantic."""
+    query_words = q.lower().split()
+    cl = content.lower()
+    fl = fpath.lower()
+    score = 0.0
+    if q.lower() in cl:
+        score += 50.0
+    wf = sum(1 for w in query_words if w in cl)
+    score += (wf / len(query_words)) * 30.0
+    score += sum(1 for w in query_words if w in fl) * 10.0
+    for word in query_words:
+        if word in cl:
+            for m in re.finditer(re.escape(word), cl):
+                nearby = cl[max(0, m.start() - 100):m.start() + 100]
+                score += sum(1 for w in query_words if w in nearby) * 2.0
+    for word in query_words:
+        for cw in set(re.findall(r"\b\w+\b", cl)):
+            if len(cw) > 3:
+                r = SequenceMatcher(None, word, cw).ratio()
+                if 0.8 < r < 1.0:
+                    score += r * 5.0
+    return score
+
+
+def best_snippet(content, q):
+    """Best-matching line (+ context) for a result, as the endpoint returns it."""
+    query_words = q.lower().split()
+    ql = q.lower()
+    lines = content.split("\n")
+    best_i, best_s = 0, 0
+    for i, line in enumerate(lines):
+        ll = line.lower()
+        s = sum(1 for w in query_words if w in ll)
+        if ql in ll:
+            s += 5
+        if s > best_s:
+            best_s = s
+            best_i = i
+    start, end = max(0, best_i - 1), min(len(lines), best_i + 3)
+    snip = "\n".join(lines[start:end])[:300]
+    return snip, best_i + 1
+
+
+def _trigrams(word, pad=True):
+    s = f"$${word}$$" if pad else word
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _all_starts(text, sub):
+    """Start offsets of every (possibly overlapping) occurrence of sub."""
+    out = []
+    i = text.find(sub)
+    while i != -1:
+        out.append(i)
+        i = text.find(sub, i + 1)
+    return out
+
+
+class _Vocab:
+    """Word postings plus a padded trigram index over the words."""
+
+    def __init__(self):
+        self.postings = {}  # word -> set(doc_id)
+        self.trigrams = {}  # trigram -> set(word)
+        self._similar_cache = {}  # query word -> similar(); cleared when words come or go
+
+    def add(self, word, doc_id):
+        ids = self.postings.get(word)
+        if ids is None:
+            ids = self.postings[word] = set()
+            self._similar_cache.clear()
+            for g in _trigrams(word):
+                self.trigrams.setdefault(g, set()).add(word)
+        ids.add(doc_id)
+
+    def discard(self, word, doc_id):
+        ids = self.postings.get(word)
+        if ids is None:
+            return
+        ids.discard(doc_id)
+        if not ids:
+            del self.postings[word]
+            self._similar_cache.clear()
+            for g in _trigrams(word):
+                words = self.trigrams.get(g)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self.trigrams[g]
+
+    def containing(self, sub):
+        """Vocabulary words that contain ``sub`` as a substring."""
+        if len(sub) < 3:
+            return [w for w in self.postings if sub in w]
+        sets = []
+        for g in _trigrams(sub, pad=False):
+            words = self.trigrams.get(g)
+            if not words:
+                return []
+            sets.append(words)
+        sets.sort(key=len)
+        candidates = set(sets[0]).intersection(*sets[1:])
+        return [w for w in candidates if sub in w]
+
+    def docs_containing(self, sub):
+        out = set()
+        for w in self.containing(sub):
+            out |= self.postings[w]
+        return out
+
+    def cached_similar(self, word):
+        out = self._similar_cache.get(word)
+        if out is None:
+            if len(self._similar_cache) > 512:
+                self._similar_cache.clear()
+            out = self._similar_cache[word] = self.similar(word)
+        return out
+
+    def similar(self, word, low=FUZZY_LOW, high=FUZZY_HIGH, min_len=FUZZY_MIN_LEN):
+        """[(vocab_word, ratio)] with low < SequenceMatcher(word, w).ratio() < high."""
+        seen = set()
+        for g in _trigrams(word):
+            seen |= self.trigrams.get(g, set())
+        out = []
+        n = len(word)
+        chars = {c: word.count(c) for c in set(word)}
+        for cw in seen:
+            m = len(cw)
+            if m < min_len or 2.0 * min(n, m) / (n + m) <= low:
+                continue
+            # Shared-character count bounds the matched length from above.
+            overlap = sum(min(k, cw.count(c)) for c, k in chars.items())
+            if 2.0 * overlap / (n + m) <= low:
+                continue
+            r = SequenceMatcher(None, word, cw).ratio()
+            if low < r < high:
+                out.append((cw, r))
+        return out
+
+
+class _Doc:
+    __slots__ = ("path", "name", "title", "file", "mtime", "size", "text", "words", "path_words")
+
+    def __init__(self, path, file, st, content):
+        self.path = path
+        self.file = file
+        self.name = file.name
+        self.title = extract_title(content.split("\n", 5)[:5], file.stem, max_lines=5)
+        self.mtime = st.st_mtime
+        self.size = st.st_size
+        self.text = content.lower()
+        self.words = set(_WORD_RE.findall(self.text))
+        self.path_words = set(_WORD_RE.findall(path.lower()))
+
+
+class DocsTermIndex:
+    """In-memory term statistics + trigram vocabulary over DocsRoot sources."""
+
+    def __init__(self, roots, max_age=30.0):
+        self.roots = list(roots)
+        self.max_age = max_age
+        self.ready = False
+        self.last_sync = 0.0
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._docs = {}  # doc_id -> _Doc
+        self._ids = {}  # rel path -> doc_id
+        self._next_id = 0
+        self._vocab = _Vocab()
+        self._path_vocab = _Vocab()
+        self._stale = False
+
+    # -- maintenance -------------------------------------------------------
+
+    def _root_for(self, fp):
+        for root in self.roots:
+            if root.owns(fp):
+                return root
+        return None
+
+    def _remove(self, rel):
+        doc_id = self._ids.pop(rel, None)
+        if doc_id is None:
+            return False
+        doc = self._docs.pop(doc_id)
+        for w in doc.words:
+            self._vocab.discard(w, doc_id)
+        for w in doc.path_words:
+            self._path_vocab.discard(w, doc_id)
+        return True
+
+    def _add(self, rel, fp, st):
+        content = fp.read_text(errors="replace")
+        doc = _Doc(rel, fp, st, content)
+        with self._lock:
+            self._remove(rel)
+            doc_id = self._next_id
+            self._next_id += 1
+            self._docs[doc_id] = doc
+            self._ids[rel] = doc_id
+            for w in doc.words:
+                self._vocab.add(w, doc_id)
+            for w in doc.path_words:
+                self._path_vocab.add(w, doc_id)
+
+    def update_file(self, fp):
+        fp = Path(fp)
+        root = self._root_for(fp)
+        if root is None:
+            return False
+        rel = root.rel_path(fp)
+        try:
+            self._add(rel, fp, fp.stat())
+        except OSError:
+            with self._lock:
+                self._remove(rel)
+        return True
+
+    def mark_stale(self):
+        self._stale = True
+
+    def sync(self):
+        """Reindex files whose mtime/size changed; drop deleted ones."""
+        with self._sync_lock:
+            return self._sync()
+
+    def sync_if_stale(self, max_age=None):
+        """Same contract as DocsIndex.sync_if_stale()."""
+        max_age = self.max_age if max_age is None else max_age
+        if not self._stale and time.time() - self.last_sync < max_age:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._sync()
+        finally:
+            self._sync_lock.release()
+
+    def _sync(self):
+        self._stale = False
+        seen = {}
+        for root in self.roots:
+            for fp in root.iter_files():
+                rel = root.rel_path(fp)
+                if rel not in seen:
+                    try:
+                        seen[rel] = (fp, fp.stat())
+                    except OSError:
+                        continue
+        with self._lock:
+            for rel in set(self._ids) - set(seen):
+                self._remove(rel)
+            known = {rel: self._docs[i] for rel, i in self._ids.items()}
+        changed = 0
+        for rel, (fp, st) in seen.items():
+            doc = known.get(rel)
+            if doc is not None and (doc.mtime, doc.size) == (st.st_mtime, st.st_size):
+                continue
+            try:
+                self._add(rel, fp, st)
+                changed += 1
+            except OSError:
+                continue
+        self.ready = True
+        self.last_sync = time.time()
+        return {"files": len(seen), "changed": changed}
+
+    # -- queries -----------------------------------------------------------
+
+    def _docs_with(self, vocab, word, text_of):
+        """Doc ids whose text contains ``word`` (substring semantics)."""
+        if _PLAIN_WORD_RE.match(word):
+            return vocab.docs_containing(word)
+        pieces = _WORD_RE.findall(word)
+        if any(len(p) >= 3 for p in pieces):
+            pieces = [p for p in pieces if len(p) >= 3]  # short pieces barely narrow the set
+        if pieces:
+            sets = sorted((vocab.docs_containing(p) for p in pieces), key=len)
+            candidates = sets[0].intersection(*sets[1:])
+        else:
+            candidates = self._docs.keys()
+        return {i for i in candidates if word in text_of(self._docs[i])}
+
+    def _score(self, doc, ql, query_words, present, in_path, fuzzy):
+        cl = doc.text
+        score = 0.0
+        if ql in cl:
+            score += 50.0
+        score += (sum(present) / len(query_words)) * 30.0
+        score += sum(in_path) * 10.0
+
+        # Proximity: every (non-overlapping) occurrence of a present word
+        # counts the query words found within +-100 chars of it.
+        starts = {}
+        for word, here in zip(query_words, present):
+            if here and word not in starts:
+                starts[word] = _all_starts(cl, word)
+        for word, here in zip(query_words, present):
+            if not here:
+                continue
+            for m in re.finditer(re.escape(word), cl):
+                s = m.start()
+                lo, hi = max(0, s - 100), s + 100
+                hits = 0
+                for w2, here2 in zip(query_words, present):
+                    if not here2:
+                        continue
+                    positions = starts[w2]
+                    k = bisect_left(positions, lo)
+                    if k < len(positions) and positions[k] + len(w2) <= hi:
+                        hits += 1
+                score += hits * 2.0
+
+        words = doc.words
+        for matches in fuzzy:
+            score += sum(r for cw, r in matches if cw in words) * 5.0
+        return score
+
+    def search(self, q, min_score=MIN_SCORE):
+        """[(score, doc)] for docs scoring >= min_score, best first."""
+        ql = q.lower()
+        query_words = ql.split()
+        if not query_words:
+            return []
+        with self._lock:
+            contains = [self._docs_with(self._vocab, w, lambda d: d.text) for w in query_words]
+            in_path = [self._docs_with(self._path_vocab, w, lambda d: d.path.lower()) for w in query_words]
+            fuzzy = [self._vocab.cached_similar(w) for w in query_words]
+            candidates = set().union(*contains, *in_path)
+            for matches in fuzzy:
+                for cw, _ in matches:
+                    candidates |= self._vocab.postings.get(cw, set())
+
+            scored = []
+            for doc_id in sorted(candidates):
+                doc = self._docs[doc_id]
+                present = [doc_id in c for c in contains]
+                path_hits = [doc_id in p for p in in_path]
+                score = self._score(doc, ql, query_words, present, path_hits, fuzzy)
+                if score >= min_score:
+                    scored.append((score, doc))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return scored
+
+    def stats(self):
+        with self._lock:
+            return {"ready": self.ready, "docs": len(self._docs),
+                    "vocabulary": len(self._vocab.postings), "trigrams": len(self._vocab.trigrams)}
@@ -0,0 +1,458 @@
+"""
+Docs Vector Index — chunked embedding search for /api/docs/search/semantic.
+
+Markdown files are split into line-aligned chunks. Every chunk is embedded
+once: vectors are cached in SQLite keyed by sha256(embedder id + chunk text),
+so editing a document only re-embeds the chunks whose text changed, and a
+restart re-reads files but re-embeds nothing. Live vectors sit in one
+float32 NumPy matrix (rows are L2-normalised) and a query is a single
+matrix-vector product plus ``argpartition`` for the top-k.
+
+Embedders are pluggable (``make_embedder``):
+  * ``ollama``  — local Ollama ``/api/embed`` (default nomic-embed-text)
+  * ``hashing`` — deterministic feature-hashing embedder; offline, for tests
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # vector search is disabled without NumPy
+    np = None
+
+from docs_index import extract_title
+
+CHUNK_CHARS = 800
+EMBED_BATCH = 32
+
+_TOKEN_RE = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    hash TEXT PRIMARY KEY,
+    dim INTEGER NOT NULL,
+    vec BLOB NOT NULL
+);
+"""
+
+
+# ---------------------------------------------------------------------------
+# Embedders
+# ---------------------------------------------------------------------------
+
+class EmbedderError(RuntimeError):
+    """The embedder could not produce vectors (e.g. Ollama is not running)."""
+
+
+class _NotCached(Exception):
+    """A chunk has no cached vector and this sync may not embed it."""
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words and character trigrams. Deterministic,
+    dependency-free apart from NumPy; good enough to test ranking offline."""
+
+    def __init__(self, dim=256):
+        self.dim = int(dim)
+        self.name = f"hashing-{self.dim}"
+
+    def _features(self, text):
+        words = _TOKEN_RE.findall(text.lower())
+        for w in words:
+            yield w, 1.0
+            padded = f"#{w}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feat, weight in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feat.encode(), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += weight if (h >> 63) else -weight
+        return out
+
+
+class OllamaEmbedder:
+    """Batch embeddings from a local Ollama server."""
+
+    def __init__(self, model="nomic-embed-text", url="http://127.0.0.1:11434", timeout=60):
+        self.model = model
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.name = f"ollama-{model}"
+        self.dim = None  # learned from the first response
+
+    def embed(self, texts):
+        body = json.dumps({"model": self.model, "input": list(texts)}).encode()
+        req = urllib.request.Request(f"{self.url}/api/embed", data=body,
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            payload = json.loads(resp.read())
+        vecs = np.asarray(payload.get("embeddings") or [], dtype=np.float32)
+        if vecs.ndim != 2 or len(vecs) != len(texts):
+            raise RuntimeError(f"unexpected Ollama embed response for {len(texts)} inputs")
+        self.dim = vecs.shape[1]
+        return vecs
+
+
+def make_embedder(cfg=None):
+    """Build an embedder from the ``docsSearch.embedder`` config section."""
+    cfg = cfg or {}
+    kind = cfg.get("type", "ollama")
+    if kind == "hashing":
+        return HashingEmbedder(cfg.get("dim", 256))
+    if kind == "ollama":
+        return OllamaEmbedder(cfg.get("model", "nomic-embed-text"),
+                              cfg.get("url", "http://127.0.0.1:11434"))
+    raise ValueError(f"unknown embedder type: {kind}")
+
+
+# ---------------------------------------------------------------------------
+# Chunking
+# ---------------------------------------------------------------------------
+
+def chunk_markdown(content, max_chars=CHUNK_CHARS):
+    """[(start_line, text)] — line-aligned chunks, new chunk at each heading."""
+    chunks = []
+    buf, start, size = [], 1, 0
+    for i, line in enumerate(content.split("\n"), 1):
+        if buf and (size + len(line) > max_chars or line.startswith("#")):
+            text = "\n".join(buf).strip()
+            if text:
+                chunks.append((start, text))
+            buf, start, size = [], i, 0
+        buf.append(line)
+        size += len(line) + 1
+    text = "\n".join(buf).strip()
+    if text:
+        chunks.append((start, text))
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class _Chunk:
+    __slots__ = ("path", "name", "title", "line", "text", "hash")
+
+    def __init__(self, path, name, title, line, text, hash_):
+        self.hash = hash_
+        self.path = path
+        self.name = name
+        self.title = title
+        self.line = line
+        self.text = text
+
+
+class DocsVectorIndex:
+    """Chunk embeddings for DocsRoot sources with an SQLite embedding cache."""
+
+    def __init__(self, db_path, roots, embedder, max_age=60.0):
+        if np is None:
+            raise RuntimeError("numpy is required for vector search")
+        self.db_path = Path(db_path)
+        self.roots = list(roots)
+        self.embedder = embedder
+        self.max_age = max_age
+        self.ready = False
+        self.error = None
+        self.last_sync = 0.0
+        self.embedded = 0  # chunks sent to the embedder (cache misses)
+        self.reused = 0  # chunks served from the cache
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._local = threading.local()
+        self._stale = False
+        self._pending = set()
+        self._pending_cv = threading.Condition()
+        # Row store: matrix rows, chunk metadata, live mask, path -> rows
+        self._matrix = None
+        self._meta = []
+        self._live = None
+        self._free = []
+        self._rows_by_path = {}
+        self._files = {}  # path -> (mtime, size)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -- embedding cache ---------------------------------------------------
+
+    def _chunk_hash(self, text):
+        return hashlib.sha256(f"{self.embedder.name}\0{text}".encode()).hexdigest()
+
+    def _embed(self, texts):
+        """Raw embedder call. Any failure marks the index not ready (queries
+        fall back to lexical search) and is raised as ``EmbedderError`` so
+        callers never mistake it for an unreadable file."""
+        try:
+            return self.embedder.embed(texts).astype(np.float32)
+        except Exception as e:
+            self.ready = False
+            self.error = f"embedder {self.embedder.name} failed: {e}"
+            raise EmbedderError(self.error) from e
+
+    def _embed_cached(self, texts, embed_missing=True):
+        """Vectors for ``texts`` (normalised), embedding only cache misses.
+        Without ``embed_missing`` a miss raises ``_NotCached`` instead."""
+        conn = self._conn()
+        hashes = [self._chunk_hash(t) for t in texts]
+        found = {}
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            q = f"SELECT hash, dim, vec FROM embeddings WHERE hash IN ({','.join('?' * len(part))})"
+            for h, dim, blob in conn.execute(q, part):
+                found[h] = np.frombuffer(blob, dtype=np.float32, count=dim)
+        missing = [i for i, h in enumerate(hashes) if h not in found]
+        if missing and not embed_missing:
+            raise _NotCached()
+        self.reused += len(texts) - len(missing)
+        for i in range(0, len(missing), EMBED_BATCH):
+            batch = missing[i:i + EMBED_BATCH]
+            vecs = self._embed([texts[j] for j in batch])
+            norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+            vecs = vecs / np.where(norms == 0, 1, norms)
+            rows = []
+            for j, vec in zip(batch, vecs):
+                found[hashes[j]] = vec
+                rows.append((hashes[j], len(vec), vec.tobytes()))
+            conn.executemany("INSERT OR REPLACE INTO embeddings(hash, dim, vec) VALUES (?, ?, ?)", rows)
+            conn.commit()
+            self.embedded += len(batch)
+        return hashes, [found[h] for h in hashes]
+
+    # -- row store ---------------------------------------------------------
+
+    def _alloc(self, dim):
+        if self._matrix is None:
+            self._matrix = np.zeros((1024, dim), dtype=np.float32)
+            self._live = np.zeros(1024, dtype=bool)
+        if self._free:
+            return self._free.pop()
+        row = len(self._meta)
+        if row >= len(self._matrix):
+            grow = len(self._matrix)
+            self._matrix = np.vstack([self._matrix, np.zeros((grow, self._matrix.shape[1]), dtype=np.float32)])
+            self._live = np.concatenate([self._live, np.zeros(grow, dtype=bool)])
+        self._meta.append(None)
+        return row
+
+    def _drop_path(self, path):
+        for row in self._rows_by_path.pop(path, []):
+            self._live[row] = False
+            self._meta[row] = None
+            self._free.append(row)
+        self._files.pop(path, None)
+
+    def _put_path(self, path, fp, st, title, chunks, hashes, vecs):
+        with self._lock:
+            self._drop_path(path)
+            rows = []
+            for (line, text), h, vec in zip(chunks, hashes, vecs):
+                if self._matrix is not None and len(vec) != self._matrix.shape[1]:
+                    raise RuntimeError("embedding dimension changed; delete the vector cache")
+                row = self._alloc(len(vec))
+                self._matrix[row] = vec
+                self._live[row] = True
+                self._meta[row] = _Chunk(path, fp.name, title, line, text, h)
+                rows.append(row)
+            self._rows_by_path[path] = rows
+            self._files[path] = (st.st_mtime, st.st_size)
+
+    # -- maintenance -------------------------------------------------------
+
+    def _root_for(self, fp):
+        for root in self.roots:
+            if root.owns(fp):
+                return root
+        return None
+
+    def _index_file(self, fp, rel, st, embed_missing=True):
+        """Raises ``OSError`` if the file can't be read, ``EmbedderError`` if
+        its chunks can't be embedded."""
+        content = fp.read_text(errors="replace")
+        chunks = chunk_markdown(content)
+        hashes, vecs = self._embed_cached([t for _, t in chunks], embed_missing) if chunks else ([], [])
+        title = extract_title(content.split("\n", 5)[:5], fp.stem, max_lines=5)
+        self._put_path(rel, fp, st, title, chunks, hashes, vecs)
+
+    def update_file(self, fp):
+        fp = Path(fp)
+        root = self._root_for(fp)
+        if root is None:
+            return False
+        rel = root.rel_path(fp)
+        try:
+            self._index_file(fp, rel, fp.stat())
+        except OSError:
+            with self._lock:
+                self._drop_path(rel)
+        return True
+
+    def enqueue(self, path):
+        """Queue a file for re-embedding by ``run_worker`` (keeps the fs
+        watcher thread free of slow embedder calls)."""
+        with self._pending_cv:
+            self._pending.add(str(path))
+            self._pending_cv.notify()
+
+    def mark_stale(self):
+        self._stale = True
+        with self._pending_cv:
+            self._pending_cv.notify()
+
+    def run_worker(self, max_backoff=300.0, on_update=None):
+        """Blocking loop: initial sync, then queued updates and stale rescans.
+        Failed rounds (typically the embedder being down) keep their queued
+        paths and retry with exponential backoff, 5 s up to ``max_backoff``.
+        ``on_update()`` runs after every successful round."""
+        backoff = 0.0
+        self._stale = True
+        while True:
+            with self._pending_cv:
+                while not self._pending and not self._stale:
+                    self._pending_cv.wait(timeout=self.max_age)
+                    if not self._pending and not self._stale:
+                        break
+                pending, self._pending = self._pending, set()
+            try:
+                if self._stale or not pending:
+                    self.sync()
+                for path in pending:
+                    self.update_file(path)
+                self.error = None
+                backoff = 0.0
+                if on_update is not None:
+                    on_update()
+            except Exception as e:
+                self.error = str(e)
+                with self._pending_cv:
+                    self._pending |= pending
+                self._stale = True
+                backoff = min(max_backoff, backoff * 2 or 5.0)
+                time.sleep(backoff)
+
+    def run_follower(self, active=lambda: True):
+        """Blocking loop for processes that serve queries but leave embedding
+        to another process: rescans (``mark_stale`` or every ``max_age``)
+        load vectors from the shared cache and never call the embedder for
+        chunks. Returns once ``active()`` is false."""
+        while active():
+            with self._pending_cv:
+                if not self._stale:
+                    self._pending_cv.wait(timeout=self.max_age)
+                self._pending.clear()
+            if not active():
+                return
+            try:
+                self.sync(embed_missing=False)
+            except Exception as e:
+                self.error = str(e)
+                time.sleep(5)
+
+    def sync(self, embed_missing=True):
+        """Embed new/changed files (mtime/size check) and drop deleted ones.
+        Without ``embed_missing`` files with uncached chunks are left for a
+        later sync."""
+        with self._sync_lock:
+            self._stale = False
+            seen = {}
+            for root in self.roots:
+                for fp in root.iter_files():
+                    rel = root.rel_path(fp)
+                    if rel not in seen:
+                        try:
+                            seen[rel] = (fp, fp.stat())
+                        except OSError:
+                            continue
+            with self._lock:
+                for rel in set(self._files) - set(seen):
+                    self._drop_path(rel)
+            if not self.ready and self._files:
+                # Recovering from an embedder failure: unchanged files embed
+                # nothing, so probe before declaring queries servable again.
+                self._embed(["ready check"])
+            for rel, (fp, st) in seen.items():
+                if self._files.get(rel) == (st.st_mtime, st.st_size):
+                    continue
+                try:
+                    self._index_file(fp, rel, st, embed_missing)
+                except (OSError, _NotCached):  # unreadable or not embedded yet; EmbedderError aborts the sync
+                    continue
+            self._prune_cache()
+            self.ready = True
+            self.error = None
+            self.last_sync = time.time()
+
+    def _prune_cache(self):
+        """Drop cached vectors no live chunk uses once they outnumber the live ones."""
+        conn = self._conn()
+        with self._lock:
+            live = {m.hash for m in self._meta if m is not None}
+        total = conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        if total <= 2 * len(live) + 1000:
+            return
+        dead = [(h,) for (h,) in conn.execute("SELECT hash FROM embeddings") if h not in live]
+        conn.executemany("DELETE FROM embeddings WHERE hash = ?", dead)
+        conn.commit()
+
+    # -- queries -----------------------------------------------------------
+
+    def search(self, q, k=20, per_doc=True):
+        """[(score, chunk)] by cosine similarity, best first. With ``per_doc``
+        only the best chunk of each document is kept. Raises
+        ``EmbedderError`` (and clears ``ready``) if the query can't be embedded."""
+        qv = self._embed([q])[0]
+        norm = np.linalg.norm(qv)
+        if norm == 0:
+            return []
+        qv /= norm
+        with self._lock:
+            if self._matrix is None:
+                return []
+            n = len(self._meta)
+            scores = self._matrix[:n] @ qv
+            scores[~self._live[:n]] = -np.inf
+            live = int(self._live[:n].sum())
+            # Over-fetch so collapsing chunks to documents still yields k docs.
+            want = min(live, k * 4 if per_doc else k)
+            if want <= 0:
+                return []
+            top = np.argpartition(-scores, want - 1)[:want]
+            top = top[np.argsort(-scores[top])]
+            out, seen = [], set()
+            for row in top:
+                chunk = self._meta[row]
+                if per_doc:
+                    if chunk.path in seen:
+                        continue
+                    seen.add(chunk.path)
+                out.append((float(scores[row]), chunk))
+                if len(out) >= k:
+                    break
+        return out
+
+    def stats(self):
+        with self._lock:
+            live = int(self._live.sum()) if self._live is not None else 0
+        return {"ready": self.ready, "error": self.error, "embedder": self.embedder.name,
+                "files": len(self._files), "chunks": live,
+                "embedded": self.embedded, "reused": self.reused}
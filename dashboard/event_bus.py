@@ -0,0 +1,253 @@
+"""
+Event Bus — in-process pub/sub feeding the ``/api/events`` SSE stream.
+
+Producers (the gateway reader thread, the R-Memory log tail, the Shield alert
+watcher) ``publish`` dotted topics such as ``gateway.health``. Each
+subscriber gets its own bounded queue: a slow browser never blocks a
+producer; once its queue is full the oldest event is dropped and counted.
+Subscriptions filter by topic prefix (``gateway`` matches ``gateway.tick``).
+
+A short replay ring lets a reconnecting ``EventSource`` resume from its
+``Last-Event-ID`` instead of missing whatever happened while it was away.
+
+``EventRelay`` joins the buses of several worker processes on one host
+through an SQLite log, so one process can own the producers while every
+worker's subscribers still see their events.
+"""
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+
+_RELAY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS latest (
+    topic TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def topic_matches(topic, patterns):
+    """True if ``topic`` equals or sits under one of ``patterns`` (None = all)."""
+    if not patterns:
+        return True
+    return any(topic == p or topic.startswith(p + ".") for p in patterns)
+
+
+def format_sse(event):
+    """One event in text/event-stream framing. The topic travels inside the
+    JSON body so a single ``EventSource.onmessage`` sees every topic."""
+    data = json.dumps({"topic": event["topic"], "ts": event["ts"], "data": event["data"]},
+                      separators=(",", ":"), default=str)
+    return f"id: {event['id']}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """A subscriber's bounded queue. Iterate with ``get``; always ``close``."""
+
+    def __init__(self, bus, topics, max_queue):
+        self.bus = bus
+        self.topics = tuple(t for t in (topics or ()) if t)
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+        self._queue = deque(maxlen=max_queue)
+        self._cv = threading.Condition()
+
+    def _offer(self, event):
+        with self._cv:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1  # deque(maxlen) drops the oldest on append
+            self._queue.append(event)
+            self._cv.notify()
+
+    def get(self, timeout=None):
+        """Queued events (oldest first); ``[]`` after ``timeout`` or once closed."""
+        with self._cv:
+            if not self._queue and not self.closed:
+                self._cv.wait(timeout=timeout)
+            events = list(self._queue)
+            self._queue.clear()
+        self.delivered += len(events)
+        return events
+
+    def close(self):
+        with self._cv:
+            self.closed = True
+            self._cv.notify_all()
+        self.bus._unsubscribe(self)
+
+
+class EventBus:
+    """Topic-filtered fan-out to bounded per-subscriber queues."""
+
+    def __init__(self, max_queue=256, replay=512):
+        self.max_queue = int(max_queue)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subs = set()
+        self._listeners = []  # (topics, callback(topic, data)) run in the publisher's thread
+        self._recent = deque(maxlen=replay)
+        self.published = 0
+        self._by_topic = {}
+
+    def publish(self, topic, data=None):
+        with self._lock:
+            event = {"id": next(self._ids), "topic": topic, "ts": time.time(), "data": data}
+            self._recent.append(event)
+            self.published += 1
+            self._by_topic[topic] = self._by_topic.get(topic, 0) + 1
+            # Offered under the lock so every subscriber sees one global order
+            for sub in self._subs:
+                if topic_matches(topic, sub.topics):
+                    sub._offer(event)
+            listeners = [cb for topics, cb in self._listeners if topic_matches(topic, topics)]
+        for callback in listeners:
+            try:
+                callback(topic, data)
+            except Exception as e:
+                print(f"[WARN] event listener failed for {topic}: {e}")
+        return event
+
+    def add_listener(self, topics, callback):
+        """Call ``callback(topic, data)`` synchronously for matching events;
+        for cheap in-process reactions such as cache invalidation."""
+        with self._lock:
+            self._listeners.append((tuple(topics or ()), callback))
+
+    def subscribe(self, topics=None, last_event_id=None, max_queue=None):
+        """New subscription; with ``last_event_id`` it starts with the
+        buffered events published after that id."""
+        sub = Subscription(self, topics, max_queue or self.max_queue)
+        with self._lock:
+            self._subs.add(sub)
+            if last_event_id is not None:
+                for event in self._recent:
+                    if event["id"] > last_event_id and topic_matches(event["topic"], sub.topics):
+                        sub._offer(event)
+        return sub
+
+    def _unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def subscribers(self):
+        with self._lock:
+            return len(self._subs)
+
+    def stats(self):
+        with self._lock:
+            subs = list(self._subs)
+            out = {"published": self.published, "topics": dict(self._by_topic), "subscribers": len(subs)}
+        out["dropped"] = sum(s.dropped for s in subs)
+        return out
+
+
+class EventRelay:
+    """Mirrors an ``EventBus`` across the processes sharing ``db_path``.
+
+    Events published on the local bus are appended to the log (and the
+    newest one per topic kept in ``latest``); a poller republishes the
+    other processes' events on the local bus, marked so they are not
+    appended again. Delivery lags by up to ``poll`` seconds.
+    """
+
+    def __init__(self, bus, db_path, poll=0.5, keep=2000):
+        self.bus = bus
+        self.db_path = Path(db_path)
+        self.poll = poll
+        self.keep = keep
+        self.origin = None
+        self.appended = 0
+        self.relayed = 0
+        self._conn = None
+        self._lock = threading.Lock()
+        self._tls = threading.local()
+        self._last_id = 0
+        self._started_pid = None
+
+    def start(self):
+        """Open the log and start the poller; once per process (call after fork)."""
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_RELAY_SCHEMA)
+            self._conn = conn
+            self._last_id = conn.execute("SELECT coalesce(max(id), 0) FROM events").fetchone()[0]
+        self.bus.add_listener(None, self._append)
+        threading.Thread(target=self._run, daemon=True, name="event-relay").start()
+
+    def latest(self, topic):
+        """Data of the newest event on ``topic`` from any process, or None."""
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM latest WHERE topic = ?", (topic,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _append(self, topic, data):
+        if getattr(self._tls, "relaying", False):
+            return
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    cur = self._conn.execute("INSERT INTO events(origin, topic, data) VALUES (?, ?, ?)",
+                                             (self.origin, topic, payload))
+                    self._conn.execute("INSERT OR REPLACE INTO latest VALUES (?, ?)", (topic, payload))
+                    self.appended += 1
+                    if cur.lastrowid % 500 == 0:
+                        self._conn.execute("DELETE FROM events WHERE id <= ?", (cur.lastrowid - self.keep,))
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            print(f"[WARN] event relay append failed for {topic}: {e}")
+
+    def pump(self):
+        """Republish events other processes appended since the last call."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, origin, topic, data FROM events WHERE id > ? ORDER BY id",
+                                      (self._last_id,)).fetchall()
+        for event_id, origin, topic, data in rows:
+            self._last_id = event_id
+            if origin == self.origin:
+                continue
+            self._tls.relaying = True
+            try:
+                self.bus.publish(topic, json.loads(data))
+                self.relayed += 1
+            finally:
+                self._tls.relaying = False
+        return len(rows)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll)
+            try:
+                self.pump()
+            except Exception as e:
+                print(f"[WARN] event relay poll failed: {e}")
+                time.sleep(5)
+
+    def stats(self):
+        return {"origin": self.origin, "appended": self.appended, "relayed": self.relayed}
@@ -0,0 +1,76 @@
+"""
+Export Stream — CSV / JSONL exports streamed from a SQLite cursor.
+
+The conversation and analytics exports used to build the whole file in a
+``StringIO`` before responding, so a large chatbot's history was held in
+memory several times over. Here rows are fetched ``CHUNK_ROWS`` at a time
+from one server-side cursor, each batch is encoded and yielded, and gzip
+(if asked for) compresses the byte stream as it passes through. Peak
+memory is one batch plus the compressor's window, whatever the export size.
+
+Exports are ordered by row id when a ``since`` cursor is given, so a client
+can export incrementally: pass the largest id it has already received and
+get only the rows after it.
+"""
+import csv
+import io
+import json
+import zlib
+
+CHUNK_ROWS = 500
+GZIP_LEVEL = 6
+
+
+def iter_batches(conn, sql, params=(), chunk_rows=CHUNK_ROWS):
+    """Lists of at most ``chunk_rows`` rows from one cursor over ``sql``."""
+    cur = conn.execute(sql, params)
+    try:
+        while True:
+            batch = cur.fetchmany(chunk_rows)
+            if not batch:
+                return
+            yield batch
+    finally:
+        cur.close()
+
+
+def csv_chunks(header, batches, row_fn=tuple):
+    """Encoded CSV: the header, then one chunk per batch of rows."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    yield buf.getvalue().encode("utf-8")
+    for batch in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(row_fn(row) for row in batch)
+        yield buf.getvalue().encode("utf-8")
+
+
+def jsonl_chunks(batches, row_fn=dict):
+    """Encoded JSON Lines: one object per row, one chunk per batch."""
+    for batch in batches:
+        yield "".join(json.dumps(row_fn(row), default=str) + "\n" for row in batch).encode("utf-8")
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """gzip-compress a stream of byte chunks on the fly."""
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 16+15: gzip container
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def json_object_chunks(fields, key, batches, row_fn=dict):
+    """Encoded JSON object: ``fields`` plus ``key`` holding every row as an
+    array that is written one batch at a time."""
+    fields = {k: v for k, v in fields.items() if k != key}
+    head = json.dumps({**fields, key: []}, default=str)
+    yield head[:-2].encode("utf-8")  # everything up to and including "["
+    sep = ""
+    for batch in batches:
+        yield (sep + ", ".join(json.dumps(row_fn(row), default=str) for row in batch)).encode("utf-8")
+        sep = ", "
+    yield b"]}"
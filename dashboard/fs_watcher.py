@@ -0,0 +1,244 @@
+"""
+Filesystem Watcher — keeps dashboard read models in memory.
+
+A single watchdog Observer (inotify on Linux, FSEvents on macOS) watches the
+docs/SSoT directories. Each ``WatchedView`` caches the output of a builder
+function for a set of directories and is invalidated by create/modify/delete
+events under them, so read endpoints serve from memory until something
+changes. Listeners receive raw file events for incremental consumers such as
+the docs search index.
+
+When watchdog is missing or the observer dies, views fall back to an
+mtime-checked rescan: after ``fallback_ttl`` seconds a cheap stat walk is
+fingerprinted and the builder only re-runs if the fingerprint moved.
+"""
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# Directory names never worth watching or fingerprinting
+SKIP_DIRS = {"node_modules", "target", "dist", "build", "__pycache__", "venv", ".venv", ".git", "media"}
+
+
+def _ignored(rel_parts):
+    return any(p in SKIP_DIRS or p.startswith(".") for p in rel_parts)
+
+
+class WatchedDir:
+    """A directory a view depends on; ``recursive=False`` covers direct children only."""
+
+    def __init__(self, path, recursive=True):
+        self.path = Path(path)
+        self.recursive = recursive
+
+    def covers(self, path):
+        try:
+            rel = Path(path).relative_to(self.path)
+        except ValueError:
+            return False
+        if not rel.parts:
+            return True
+        if not self.recursive and len(rel.parts) > 1:
+            return False
+        return not _ignored(rel.parts)
+
+    def fingerprint(self, h):
+        """Feed (path, mtime, size) of every entry into hash ``h``."""
+        if not self.path.is_dir():
+            h.update(b"missing:" + str(self.path).encode())
+            return
+        stack = [str(self.path)]
+        while stack:
+            d = stack.pop()
+            try:
+                with os.scandir(d) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            for e in entries:
+                if e.name.startswith(".") or e.name in SKIP_DIRS:
+                    continue
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        if self.recursive:
+                            stack.append(e.path)
+                        continue
+                    st = e.stat()
+                except OSError:
+                    continue
+                h.update(f"{e.path}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+
+
+class WatchedView:
+    """Cached ``build()`` result, valid until an event touches one of ``dirs``."""
+
+    def __init__(self, name, dirs, build, fallback_ttl=10.0):
+        self.name = name
+        self.dirs = list(dirs)
+        self.build = build
+        self.fallback_ttl = fallback_ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._valid = False
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self.builds = 0
+
+    def covers(self, path):
+        return any(d.covers(path) for d in self.dirs)
+
+    def invalidate(self):
+        self._valid = False
+
+    def _compute_fingerprint(self):
+        h = hashlib.blake2b(digest_size=16)
+        for d in self.dirs:
+            d.fingerprint(h)
+        return h.digest()
+
+    def get(self, watching):
+        """Return the cached value, rebuilding if stale.
+
+        ``watching`` says whether live events are flowing for this view; if
+        not, validity is re-checked against a stat fingerprint.
+        """
+        with self._lock:
+            now = time.time()
+            if self._valid and not watching and now - self._checked_at >= self.fallback_ttl:
+                self._checked_at = now
+                if self._compute_fingerprint() != self._fingerprint:
+                    self._valid = False
+            if not self._valid:
+                # Clear before building so events that land mid-build re-invalidate.
+                self._valid = True
+                self._fingerprint = None if watching else self._compute_fingerprint()
+                self._checked_at = now
+                try:
+                    self._value = self.build()
+                except Exception:
+                    self._valid = False
+                    raise
+                self.builds += 1
+            return self._value
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed", "closed_no_write"):
+            return
+        self.watcher.dispatch(event.src_path, event.is_directory)
+        dest = getattr(event, "dest_path", None)
+        if dest:
+            self.watcher.dispatch(dest, event.is_directory)
+
+
+class FsWatcher:
+    """One observer feeding many views and listeners."""
+
+    def __init__(self):
+        self.views = {}
+        self._listeners = []  # (WatchedDir list, callback(path, is_directory))
+        self._observer = None
+        self._watched = []  # WatchedDirs actually scheduled
+        self.error = None if Observer is not None else "watchdog not installed"
+        self.events = 0
+
+    def add_view(self, view):
+        self.views[view.name] = view
+        return view
+
+    def add_listener(self, dirs, callback):
+        self._listeners.append((list(dirs), callback))
+
+    @property
+    def running(self):
+        return self._observer is not None and self._observer.is_alive()
+
+    def watching(self, view):
+        """True if every directory of ``view`` is covered by a live watch."""
+        if not self.running:
+            return False
+        return all(any(w.path == d.path or (w.recursive and d.path.is_relative_to(w.path))
+                       for w in self._watched) for d in view.dirs)
+
+    def get(self, name):
+        view = self.views[name]
+        return view.get(self.watching(view))
+
+    def dispatch(self, path, is_directory):
+        self.events += 1
+        for view in self.views.values():
+            if view.covers(path):
+                view.invalidate()
+        for dirs, callback in self._listeners:
+            if any(d.covers(path) for d in dirs):
+                try:
+                    callback(path, is_directory)
+                except Exception as e:
+                    print(f"[WARN] fs watcher listener failed for {path}: {e}")
+
+    def _plan(self):
+        """Merge the view/listener dirs into a minimal set of watches."""
+        wanted = {}
+        for d in [d for v in self.views.values() for d in v.dirs] + [d for ds, _ in self._listeners for d in ds]:
+            wanted[d.path] = wanted.get(d.path, False) or d.recursive
+        plan = []
+        for path, recursive in sorted(wanted.items(), key=lambda kv: len(kv[0].parts)):
+            if any(r and path.is_relative_to(p) for p, r in plan):
+                continue
+            plan.append((path, recursive))
+        return plan
+
+    def start(self):
+        if Observer is None or self.running:
+            return self.running
+        observer = Observer()
+        handler = _EventHandler(self)
+        watched = []
+        for path, recursive in self._plan():
+            if not path.is_dir():
+                continue
+            try:
+                observer.schedule(handler, str(path), recursive=recursive)
+                watched.append(WatchedDir(path, recursive))
+            except Exception as e:
+                self.error = f"cannot watch {path}: {e}"
+        try:
+            observer.daemon = True
+            observer.start()
+        except Exception as e:
+            self.error = str(e)
+            return False
+        self._observer = observer
+        self._watched = watched
+        # Anything built before the watches existed may have missed events.
+        for view in self.views.values():
+            view.invalidate()
+        return True
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+            self._watched = []
+
+    def status(self):
+        return {
+            "running": self.running,
+            "error": self.error,
+            "events": self.events,
+            "watched": [str(w.path) for w in self._watched],
+            "views": {name: {"builds": v.builds, "live": self.watching(v)} for name, v in self.views.items()},
+        }
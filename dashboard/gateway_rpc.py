@@ -0,0 +1,187 @@
+"""
+Gateway RPC — multiplexed request/response bookkeeping for the gateway WebSocket.
+
+Many Flask threads share one WebSocket to the OpenClaw gateway. Each request
+gets an id from an atomic counter and a ``concurrent.futures.Future`` that the
+reader thread resolves when the matching ``res`` frame arrives, so any number
+of requests can be in flight at once and callers are free to block on the
+future, poll it, cancel it, or ``await asyncio.wrap_future(fut)``.
+
+``RequestTable`` owns the bookkeeping:
+  * a cap on in-flight requests — ``open`` waits for a free slot (backpressure)
+    and raises ``GatewayBusy`` if none frees up in time; ``wait=0`` never blocks
+  * per-request deadlines, enforced by ``run_reaper`` from one thread
+  * cancellation and teardown (``fail_all`` on disconnect) that always release
+    the slot and the pending entry
+  * counters and round-trip latency percentiles for ``stats``
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+LATENCY_SAMPLES = 2048
+
+
+class GatewayError(Exception):
+    """A gateway request failed without a response frame."""
+
+
+class GatewayTimeout(GatewayError):
+    pass
+
+
+class GatewayBusy(GatewayError):
+    pass
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 2)
+
+
+class RequestTable:
+    """Pending gateway requests keyed by message id."""
+
+    def __init__(self, max_in_flight=64, default_timeout=10.0, prefix="r"):
+        self.max_in_flight = int(max_in_flight)
+        self.default_timeout = float(default_timeout)
+        self.prefix = prefix
+        self._ids = itertools.count(1)
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._pending = {}  # id -> (future, started)
+        self._deadlines = []  # heap of (deadline, id)
+        self._deadline_cv = threading.Condition(self._lock)
+        self._latency = deque(maxlen=LATENCY_SAMPLES)
+        self._counters = {"sent": 0, "completed": 0, "errors": 0, "timeouts": 0,
+                          "cancelled": 0, "rejected": 0, "peakInFlight": 0}
+
+    # -- lifecycle of one request -------------------------------------------
+
+    def open(self, timeout=None, wait=None):
+        """Reserve a slot and register a request: returns ``(id, future)``.
+
+        Waits up to ``wait`` (default ``timeout``) for a slot when
+        ``max_in_flight`` requests are outstanding; ``wait=0`` fails at once.
+        The deadline covers both the wait and the round trip.
+        """
+        timeout = self.default_timeout if timeout is None else float(timeout)
+        wait = timeout if wait is None else min(float(wait), timeout)
+        started = time.monotonic()
+        acquired = self._slots.acquire(timeout=wait) if wait > 0 else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise GatewayBusy(f"{self.max_in_flight} gateway requests already in flight")
+        fut = Future()
+        with self._lock:
+            mid = f"{self.prefix}{next(self._ids)}"
+            self._pending[mid] = (fut, started)
+            self._counters["sent"] += 1
+            self._counters["peakInFlight"] = max(self._counters["peakInFlight"], len(self._pending))
+            heapq.heappush(self._deadlines, (started + timeout, mid))
+            self._deadline_cv.notify()
+        fut.add_done_callback(lambda f: self._finish(mid, f))
+        return mid, fut
+
+    def resolve(self, mid, msg):
+        """Complete request ``mid`` with a response frame. False if unknown
+        (already timed out, cancelled, or not ours)."""
+        with self._lock:
+            entry = self._pending.get(mid)
+        if entry is None:
+            return False
+        return _settle(entry[0], result=msg)
+
+    def fail(self, mid, exc):
+        with self._lock:
+            entry = self._pending.get(mid)
+        return entry is not None and _settle(entry[0], exc=exc)
+
+    def fail_all(self, exc):
+        """Fail every outstanding request, e.g. when the socket drops."""
+        with self._lock:
+            futures = [fut for fut, _ in self._pending.values()]
+        for fut in futures:
+            _settle(fut, exc=exc)
+        return len(futures)
+
+    def _finish(self, mid, fut):
+        with self._lock:
+            entry = self._pending.pop(mid, None)
+            if entry is None:
+                return
+            if fut.cancelled():
+                self._counters["cancelled"] += 1
+            elif isinstance(fut.exception(), GatewayTimeout):
+                self._counters["timeouts"] += 1
+            elif fut.exception() is not None:
+                self._counters["errors"] += 1
+            else:
+                self._counters["completed"] += 1
+                self._latency.append((time.monotonic() - entry[1]) * 1000)
+        self._slots.release()
+
+    # -- deadlines ----------------------------------------------------------
+
+    def expire(self, now=None):
+        """Time out requests past their deadline. Returns seconds until the
+        next deadline (None if nothing is pending)."""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._lock:
+            while self._deadlines:
+                deadline, mid = self._deadlines[0]
+                if mid not in self._pending:
+                    heapq.heappop(self._deadlines)  # finished early
+                elif deadline <= now:
+                    heapq.heappop(self._deadlines)
+                    expired.append(self._pending[mid][0])
+                else:
+                    break
+            wait = self._deadlines[0][0] - now if self._deadlines else None
+        for fut in expired:
+            _settle(fut, exc=GatewayTimeout("timeout"))
+        return wait
+
+    def run_reaper(self):
+        """Blocking loop enforcing deadlines; run it on a daemon thread."""
+        while True:
+            self.expire()
+            with self._deadline_cv:
+                # Re-checked under the lock so a request opened meanwhile still wakes us
+                wait = self._deadlines[0][0] - time.monotonic() if self._deadlines else None
+                if wait is None or wait > 0:
+                    self._deadline_cv.wait(timeout=wait)
+
+    # -- introspection ------------------------------------------------------
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self._latency)
+            out = {**self._counters, "inFlight": len(self._pending), "maxInFlight": self.max_in_flight}
+        out["latencyMs"] = {"samples": len(ordered), "p50": _percentile(ordered, 50),
+                            "p90": _percentile(ordered, 90), "p99": _percentile(ordered, 99),
+                            "max": round(ordered[-1], 2) if ordered else None}
+        return out
+
+
+def _settle(fut, result=None, exc=None):
+    """Set a future's outcome unless it is already done or cancelled."""
+    try:
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+        return True
+    except Exception:  # InvalidStateError: lost the race to cancel/timeout
+        return False
+
@@ -0,0 +1,202 @@
+"""
+Rate Limit — per-minute / per-hour token buckets for chatbot traffic.
+
+Every chatbot carries ``rate_per_minute`` and ``rate_per_hour``. Each
+(chatbot, client) key gets two token buckets: one holding up to
+``per_minute`` tokens and refilling at ``per_minute / 60`` tokens a second,
+one holding ``per_hour`` and refilling at ``per_hour / 3600``. A message
+takes one token from both. Refill is continuous, so the hour limit is a
+sliding window rather than a reset on the hour, and a check is O(1): the
+bucket state is two floats and a timestamp.
+
+The client key is usually a session id the caller picks, so a check may
+also name the caller's IP address: the IP then gets its own pair of buckets
+(limits scaled by ``ip_multiplier``, 10 by default so several visitors
+behind one NAT still fit) and both must allow the message, so minting a
+fresh session id per request does not reset the limit. Both keys are
+checked before either is debited: a message refused by one bucket costs
+nothing in the other. Behind a reverse proxy the IP must be the client's
+(X-Forwarded-For resolved by the server, see ``trustedProxies``), not the
+proxy's.
+
+A refused check reports ``retry_after`` — the seconds until both buckets
+hold a token again — for the ``Retry-After`` header of the 429.
+
+Backends hold the bucket state:
+  * ``MemoryBackend`` — per process, LRU-bounded to ``max_keys``; keys idle
+    long enough to have refilled completely are dropped first
+  * ``SQLiteBackend`` — one table shared by every worker process on the
+    host, updated inside ``BEGIN IMMEDIATE`` so concurrent checks serialize
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+MAX_KEYS = 50_000
+IDLE_SECONDS = 3600
+PRUNE_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    minute REAL NOT NULL,
+    hour REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rate_buckets_updated ON rate_buckets(updated_at);
+"""
+
+
+def take(state, per_minute, per_hour, now):
+    """One check against bucket ``state`` (minute tokens, hour tokens, updated
+    at) or None for a new key. Returns ``(allowed, retry_after, new_state)``;
+    a limit of 0/None is unlimited."""
+    caps = (max(0, per_minute or 0), max(0, per_hour or 0))
+    rates = (caps[0] / 60.0, caps[1] / 3600.0)
+    if state is None:
+        tokens = list(caps)
+    else:
+        elapsed = max(0.0, now - state[2])
+        tokens = [min(cap, level + elapsed * rate) for cap, level, rate in zip(caps, state[:2], rates)]
+    short = [(1.0 - level) / rate for cap, level, rate in zip(caps, tokens, rates) if cap and level < 1.0]
+    if short:
+        return False, max(short), (tokens[0], tokens[1], now)
+    tokens = [level - 1.0 if cap else level for cap, level in zip(caps, tokens)]
+    return True, 0.0, (tokens[0], tokens[1], now)
+
+
+def _combine(results):
+    """``(allowed, retry_after)`` over several ``take`` results."""
+    refused = [retry_after for allowed, retry_after, _ in results if not allowed]
+    return (False, max(refused)) if refused else (True, 0.0)
+
+
+class MemoryBackend:
+    """Bucket state in this process, bounded to ``max_keys``."""
+
+    def __init__(self, max_keys=MAX_KEYS, idle_seconds=IDLE_SECONDS):
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def take(self, key, per_minute, per_hour, now):
+        return self.take_all([(key, per_minute, per_hour)], now)
+
+    def take_all(self, checks, now):
+        """Debit every ``(key, per_minute, per_hour)`` in ``checks`` if all of
+        them allow it, else none; returns ``(allowed, retry_after)``."""
+        with self._lock:
+            results = [(key, take(self._buckets.get(key), pm, ph, now)) for key, pm, ph in checks]
+            allowed, retry_after = _combine(r for _, r in results)
+            if allowed:
+                for key, (_, _, state) in results:
+                    self._buckets[key] = state
+                    self._buckets.move_to_end(key)
+            self._evict(now)
+        return allowed, retry_after
+
+    def _evict(self, now):
+        # Oldest first: drop idle keys, then anything over the bound
+        buckets = self._buckets
+        while buckets:
+            key, state = next(iter(buckets.items()))
+            if len(buckets) <= self.max_keys and now - state[2] < self.idle_seconds:
+                break
+            del buckets[key]
+            self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "keys": len(self._buckets), "maxKeys": self.max_keys, "evicted": self.evicted}
+
+
+class SQLiteBackend:
+    """Bucket state in a SQLite file shared by all workers."""
+
+    def __init__(self, db_path, idle_seconds=IDLE_SECONDS):
+        self.db_path = Path(db_path)
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._checks = 0
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, per_minute, per_hour, now):
+        return self.take_all([(key, per_minute, per_hour)], now)
+
+    def take_all(self, checks, now):
+        """All-or-nothing debit of several keys, in one transaction."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            results = []
+            for key, per_minute, per_hour in checks:
+                state = conn.execute("SELECT minute, hour, updated_at FROM rate_buckets WHERE key = ?",
+                                     (key,)).fetchone()
+                results.append((key, take(state, per_minute, per_hour, now)))
+            allowed, retry_after = _combine(r for _, r in results)
+            if allowed:
+                conn.executemany("INSERT OR REPLACE INTO rate_buckets VALUES (?, ?, ?, ?)",
+                                 [(key, *state) for key, (_, _, state) in results])
+            self._checks += 1
+            if self._checks % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - self.idle_seconds,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def stats(self):
+        keys = self._conn().execute("SELECT count(*) FROM rate_buckets").fetchone()[0]
+        return {"backend": "sqlite", "path": str(self.db_path), "keys": keys}
+
+
+class RateLimiter:
+    """Checks (chatbot, client) keys against a chatbot's limits."""
+
+    def __init__(self, backend=None, clock=time.time, ip_multiplier=10):
+        self.backend = backend or MemoryBackend()
+        self.clock = clock
+        self.ip_multiplier = max(1, ip_multiplier)
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, chatbot_id, client, per_minute, per_hour, ip=None):
+        """``(allowed, retry_after_seconds)``; ``retry_after`` is a whole number
+        of seconds (at least 1) when refused. With ``ip`` the address's own
+        bucket must allow the message too."""
+        if not per_minute and not per_hour:
+            return True, 0
+        checks = [(f"{chatbot_id}\x1f{client}", per_minute, per_hour)]
+        if ip and ip != client:
+            m = self.ip_multiplier
+            checks.append((f"{chatbot_id}\x1fip:{ip}", (per_minute or 0) * m, (per_hour or 0) * m))
+        allowed, retry_after = self.backend.take_all(checks, self.clock())
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+        return allowed, 0 if allowed else max(1, math.ceil(retry_after))
+
+    def stats(self):
+        with self._lock:
+            counts = {"allowed": self.allowed, "limited": self.limited}
+        return {**counts, **self.backend.stats()}
@@ -0,0 +1,182 @@
+"""
+R-Memory Block Index — SQLite index of compressed blocks for the stats endpoints.
+
+R-Memory writes one ``history-<sessionId>.json`` per session (a list of
+blocks) plus a lifetime ``block-cache.json`` (hash -> block). Instead of
+globbing and parsing all of them per request, each file's blocks are kept as
+rows keyed by (file, position) and a file is re-read only when its
+(mtime_ns, size) changes. Token totals are then one aggregate query.
+
+Cache entries count towards lifetime totals unless a history block with the
+same hash exists, and only if they carry a non-zero token count — the same
+rules the dashboard used when it merged the files in memory.
+"""
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+CACHE_FILE = "block-cache.json"
+
+_HISTORY_RE = re.compile(r'history-([a-f0-9]+)\.json$')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    file TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    session TEXT
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    file TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    session TEXT,
+    source TEXT NOT NULL,
+    hash TEXT,
+    tokens_raw INTEGER NOT NULL,
+    tokens_compressed INTEGER NOT NULL,
+    PRIMARY KEY (file, idx)
+);
+CREATE INDEX IF NOT EXISTS blocks_session ON blocks(session);
+CREATE INDEX IF NOT EXISTS blocks_hash ON blocks(hash) WHERE source = 'history';
+"""
+
+# Every block that counts: history blocks plus cache entries no history block covers
+_LIVE = """
+SELECT session, tokens_raw AS r, tokens_compressed AS c FROM blocks WHERE source = 'history'
+UNION ALL
+SELECT NULL, tokens_raw, tokens_compressed FROM blocks b
+WHERE source = 'cache'
+  AND NOT EXISTS (SELECT 1 FROM blocks h WHERE h.source = 'history' AND h.hash = b.hash)
+"""
+
+_AGGREGATES = f"""
+WITH live AS ({_LIVE})
+SELECT count(*), total(r), total(c),
+       total(r > 50 AND r > c),
+       total(CASE WHEN r > 50 AND r > c THEN r END),
+       total(CASE WHEN r > 50 AND r > c THEN c END),
+       total(session = :sid),
+       total(CASE WHEN session = :sid THEN r END),
+       total(CASE WHEN session = :sid THEN c END),
+       total(CASE WHEN session = :sid AND r > c THEN r - c END)
+FROM live
+"""
+
+
+def _int(v):
+    try:
+        return int(v or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _history_rows(name, session, data):
+    if not isinstance(data, list):
+        return []
+    return [(name, i, session, "history", str(b["hash"]) if b.get("hash") is not None else None,
+             _int(b.get("tokensRaw")), _int(b.get("tokensCompressed")))
+            for i, b in enumerate(data) if isinstance(b, dict)]
+
+
+def _cache_rows(data):
+    if not isinstance(data, dict):
+        return []
+    rows = []
+    for i, (h, entry) in enumerate(data.items()):
+        if not isinstance(entry, dict):
+            continue
+        raw, comp = _int(entry.get("tokensRaw")), _int(entry.get("tokensCompressed"))
+        if raw > 0 or comp > 0:
+            rows.append((CACHE_FILE, i, None, "cache", str(h), raw, comp))
+    return rows
+
+
+class RMemoryBlockIndex:
+    """Block rows for one R-Memory directory, refreshed by (mtime, size)."""
+
+    def __init__(self, rmemory_dir, db_path):
+        self.rmemory_dir = Path(rmemory_dir)
+        self.db_path = Path(db_path)
+        self.parses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _scan(self):
+        """{file name: (mtime_ns, size, session)} for history files and the cache."""
+        found = {}
+        candidates = list(self.rmemory_dir.glob("history-*.json")) + [self.rmemory_dir / CACHE_FILE]
+        for fp in candidates:
+            try:
+                st = fp.stat()
+            except OSError:
+                continue
+            m = _HISTORY_RE.search(fp.name)
+            found[fp.name] = (st.st_mtime_ns, st.st_size, m.group(1) if m else None)
+        return found
+
+    def sync(self):
+        """Re-index files whose (mtime, size) moved and drop deleted ones."""
+        with self._lock:
+            conn = self._conn()
+            known = {f: (m, s) for f, m, s in conn.execute("SELECT file, mtime_ns, size FROM sources")}
+            found = self._scan()
+            changed = [f for f, st in found.items() if known.get(f) != st[:2]]
+            gone = [f for f in known if f not in found]
+            if not changed and not gone:
+                return 0
+            with conn:
+                for name in gone:
+                    conn.execute("DELETE FROM blocks WHERE file = ?", (name,))
+                    conn.execute("DELETE FROM sources WHERE file = ?", (name,))
+                for name in changed:
+                    mtime_ns, size, session = found[name]
+                    try:
+                        data = json.loads((self.rmemory_dir / name).read_text())
+                    except (OSError, ValueError):
+                        continue  # mid-write; picked up on the next change
+                    rows = _cache_rows(data) if name == CACHE_FILE else _history_rows(name, session, data)
+                    conn.execute("DELETE FROM blocks WHERE file = ?", (name,))
+                    conn.executemany("INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                    conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                                 (name, mtime_ns, size, session))
+                    self.parses += 1
+            return len(changed) + len(gone)
+
+    def current_session(self):
+        """Session id of the most recently modified history file."""
+        row = self._conn().execute(
+            "SELECT session FROM sources WHERE file != ? ORDER BY mtime_ns DESC LIMIT 1", (CACHE_FILE,)).fetchone()
+        return row[0] if row else None
+
+    def aggregates(self, session_id=None):
+        """Token totals in one query: ``all`` (lifetime), ``meaningful`` (blocks
+        with raw > 50 that actually shrank) and ``session`` (history blocks of
+        ``session_id``; ``saved`` sums per-block raw - compressed where positive)."""
+        row = self._conn().execute(_AGGREGATES, {"sid": session_id}).fetchone()
+        n = [int(v or 0) for v in row]
+        return {
+            "all": {"blocks": n[0], "raw": n[1], "compressed": n[2]},
+            "meaningful": {"blocks": n[3], "raw": n[4], "compressed": n[5]},
+            "session": {"blocks": n[6], "raw": n[7], "compressed": n[8], "saved": n[9]},
+        }
+
+    def stats(self):
+        conn = self._conn()
+        return {"files": conn.execute("SELECT count(*) FROM sources").fetchone()[0],
+                "blocks": conn.execute("SELECT count(*) FROM blocks").fetchone()[0],
+                "parses": self.parses}
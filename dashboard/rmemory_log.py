@@ -0,0 +1,247 @@
+"""
+R-Memory Log Tail — incremental parser for ``r-memory.log``.
+
+The log only ever grows, but readers just need a handful of aggregates (last
+init/session/compaction, compaction and cache counters, FIFO evictions) and
+the most recent events. ``RMemoryLogTail`` remembers the file identity
+(device, inode) and the byte offset of the last complete line, parses only
+the bytes appended since, and folds each event into running aggregates plus
+a ring buffer of recent events.
+
+Rotation:
+  * rename/recreate (new inode) — the old file is drained to EOF through the
+    descriptor still held open, then the new file is read from offset 0
+  * truncation (same inode, smaller size) — reading restarts at offset 0
+Aggregates span rotations; they describe everything the tail has seen.
+
+With ``checkpoint_path`` the position, aggregates and ring buffer are saved
+as JSON, so a restart resumes where it stopped instead of re-reading the
+whole log.
+"""
+import json
+import os
+import re
+import threading
+from collections import deque
+from pathlib import Path
+
+READ_CHUNK = 8 << 20
+CHECKPOINT_VERSION = 1
+
+_LINE_RE = re.compile(r'^\[(\d{4}-\d{2}-\d{2}T[\d:.]+Z)\]\s+\[(\w+)\]\s+(.*)')
+_JSON_RE = re.compile(r'\{.*\}')
+
+# (marker, event) in precedence order; the payload is only decoded for these
+_MARKERS = (
+    ("=== COMPACTION ===", "compaction_start"),
+    ("=== DONE ===", "compaction_done"),
+    ("Swap plan", "swap_plan"),
+    ("Block compressed", "block_compressed"),
+    ("FIFO evicted", "fifo_evicted"),
+    ("FIFO done", "fifo_done"),
+)
+
+
+def _classify(body):
+    for marker, event in _MARKERS:
+        if marker in body:
+            return event
+    if body.startswith("Session "):
+        return "session"
+    if "init" in body and ("R-Memory" in body or "r-memory" in body.lower()):
+        return "init"
+    if "Config loaded" in body:
+        return "config_loaded"
+    return "info"
+
+
+def parse_line(line):
+    """One log line (``[ISO_TS] [LEVEL] message {json}``) → event dict, or None."""
+    m = _LINE_RE.match(line)
+    if not m:
+        return None
+    ts, level, body = m.group(1), m.group(2), m.group(3)
+    evt = {"ts": ts, "level": level, "raw": body}
+    event = _classify(body)
+    if event != "info":
+        json_match = _JSON_RE.search(body)
+        if json_match:
+            try:
+                payload = json.loads(json_match.group())
+                if isinstance(payload, dict):
+                    evt.update(payload)
+            except ValueError:
+                pass
+    evt["event"] = event
+    return evt
+
+
+def _empty_aggregates():
+    return {"events": 0, "compactionCount": 0, "cacheHits": 0, "cacheMisses": 0, "fifoCount": 0,
+            "lastInit": None, "lastSession": None, "lastCompaction": None, "lastFifo": None, "lastEvent": None}
+
+
+def _as_int(v):
+    try:
+        return int(v or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class RMemoryLogTail:
+    """Running view of r-memory.log; call ``refresh`` before reading."""
+
+    def __init__(self, path, checkpoint_path=None, recent=200, recent_fifo=50):
+        self.path = Path(path)
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.listener = None  # callback(new_events) after each refresh that found some
+        self.bytes_read = 0
+        self.rotations = 0
+        self._lock = threading.Lock()
+        self._fh = None
+        self._ident = None  # (st_dev, st_ino) of the file behind _fh / offset
+        self._offset = 0
+        self._agg = _empty_aggregates()
+        self._recent = deque(maxlen=recent)
+        self._fifo = deque(maxlen=recent_fifo)
+        self._load_checkpoint()
+
+    # -- aggregates ---------------------------------------------------------
+
+    def _fold(self, evt):
+        agg = self._agg
+        agg["events"] += 1
+        agg["lastEvent"] = evt
+        etype = evt["event"]
+        if etype == "init":
+            agg["lastInit"] = evt
+        elif etype == "session":
+            agg["lastSession"] = evt
+        elif etype == "compaction_done":
+            agg["lastCompaction"] = evt
+            agg["compactionCount"] += 1
+            agg["cacheHits"] += _as_int(evt.get("cacheHits"))
+            agg["cacheMisses"] += _as_int(evt.get("cacheMisses"))
+        elif etype == "fifo_evicted":
+            agg["lastFifo"] = evt
+            agg["fifoCount"] += 1
+            self._fifo.append(evt)
+        self._recent.append(evt)
+
+    def _consume(self, fh, new_events):
+        """Parse complete lines from ``fh`` at the current offset to EOF."""
+        fh.seek(self._offset)
+        carry = b""
+        while True:
+            chunk = fh.read(READ_CHUNK)
+            if not chunk:
+                break
+            self.bytes_read += len(chunk)
+            data = carry + chunk
+            end = data.rfind(b"\n")
+            if end < 0:
+                carry = data
+                continue
+            carry = data[end + 1:]
+            self._offset += end + 1
+            for line in data[:end].decode("utf-8", errors="ignore").split("\n"):
+                evt = parse_line(line)
+                if evt is not None:
+                    self._fold(evt)
+                    new_events.append(evt)
+        # A trailing partial line stays unread until its newline arrives
+
+    # -- reading ------------------------------------------------------------
+
+    def _open(self):
+        fh = open(self.path, "rb")
+        st = os.fstat(fh.fileno())
+        return fh, (st.st_dev, st.st_ino), st.st_size
+
+    def refresh(self):
+        """Parse whatever was appended since the last call; returns the new
+        events (at most the last ``recent`` of them, e.g. after a catch-up)."""
+        new_events = deque(maxlen=self._recent.maxlen)
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                st = None
+            ident = (st.st_dev, st.st_ino) if st else None
+            if self._fh is not None and ident != self._ident:
+                # Rotated away: finish the old file through the open descriptor
+                self._consume(self._fh, new_events)
+                self._fh.close()
+                self._fh, self._offset = None, 0
+                self.rotations += 1
+            if st is None:
+                self._ident = None
+            else:
+                if self._fh is None:
+                    try:
+                        self._fh, opened_ident, _ = self._open()
+                    except OSError:
+                        return []
+                    if opened_ident != self._ident:
+                        self._offset = 0  # not the file the checkpoint refers to
+                    self._ident = opened_ident
+                if st.st_size < self._offset:
+                    self._offset = 0  # truncated in place
+                    self.rotations += 1
+                if st.st_size > self._offset:
+                    self._consume(self._fh, new_events)
+            if new_events:
+                self._save_checkpoint()
+        new_events = list(new_events)
+        if new_events and self.listener is not None:
+            self.listener(new_events)
+        return new_events
+
+    def snapshot(self):
+        """Aggregates plus ``recent`` and ``fifoRecent`` event lists (copies)."""
+        with self._lock:
+            out = dict(self._agg)
+            out["recent"] = list(self._recent)
+            out["fifoRecent"] = list(self._fifo)
+            out["offset"] = self._offset
+        return out
+
+    def recent(self, n=30):
+        with self._lock:
+            return list(self._recent)[-n:] if n else []
+
+    def stats(self):
+        with self._lock:
+            return {"offset": self._offset, "events": self._agg["events"], "bytesRead": self.bytes_read,
+                    "rotations": self.rotations, "checkpoint": str(self.checkpoint_path) if self.checkpoint_path else None}
+
+    # -- checkpoint ---------------------------------------------------------
+
+    def _load_checkpoint(self):
+        if self.checkpoint_path is None:
+            return
+        try:
+            data = json.loads(self.checkpoint_path.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CHECKPOINT_VERSION or data.get("path") != str(self.path):
+            return
+        self._ident = tuple(data["ident"]) if data.get("ident") else None
+        self._offset = int(data.get("offset", 0))
+        self._agg.update(data.get("aggregates") or {})
+        self._recent.extend(data.get("recent") or [])
+        self._fifo.extend(data.get("fifoRecent") or [])
+
+    def _save_checkpoint(self):
+        if self.checkpoint_path is None:
+            return
+        data = {"version": CHECKPOINT_VERSION, "path": str(self.path), "ident": self._ident,
+                "offset": self._offset, "aggregates": self._agg,
+                "recent": list(self._recent), "fifoRecent": list(self._fifo)}
+        try:
+            self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.checkpoint_path.with_suffix(self.checkpoint_path.suffix + ".tmp")
+            tmp.write_text(json.dumps(data, default=str))
+            os.replace(tmp, self.checkpoint_path)
+        except OSError as e:
+            print(f"[WARN] r-memory log checkpoint not saved: {e}")
@@ -13,12 +13,20 @@ import sqlite3
 import subprocess
 import hashlib
 import time
+import threading
 import psutil
 from datetime import datetime, timedelta
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, Response, render_template, jsonify, request, send_from_directory
 from flask_cors import CORS
 
+from answer_cache import AnswerCache
+from chat_providers import ChatProviders
+from chatbots_db import (DAILY_COUNTERS, QUESTION_DAYS, ChatbotsDB, compact_daily_questions, compact_daily_stats,
+                         daily_stats, index_knowledge_file, list_conversations, popular_questions, search_knowledge)
+from export_stream import csv_chunks, gzip_chunks, iter_batches, json_object_chunks, jsonl_chunks
+from rate_limit import RateLimiter
+
 # Add shield module to path
 sys.path.insert(0, str(Path.home() / 'clawd' / 'security'))
 try:
@@ -1780,114 +1788,12 @@ def api_metrics():
 
 CHATBOTS_DB = CLAWD_DIR / 'projects' / 'resonantos-v3' / 'dashboard' / 'chatbots.db'
 
+_chatbots_db = ChatbotsDB(CHATBOTS_DB)
+
+
 def get_chatbots_db():
-    """Get chatbots database connection, create tables if needed"""
-    db = sqlite3.connect(str(CHATBOTS_DB), check_same_thread=False)
-    db.row_factory = sqlite3.Row
-    db.execute("PRAGMA busy_timeout=5000")
-    
-    # Create tables if they don't exist
-    db.executescript("""
-        CREATE TABLE IF NOT EXISTS chatbots (
-            id TEXT PRIMARY KEY,
-            user_id TEXT DEFAULT 'default',
-            name TEXT NOT NULL,
-            system_prompt TEXT,
-            greeting TEXT DEFAULT 'Hi! How can I help you today?',
-            suggested_prompts TEXT DEFAULT '[]',
-            position TEXT DEFAULT 'bottom-right',
-            theme TEXT DEFAULT 'dark',
-            primary_color TEXT DEFAULT '#4ade80',
-            bg_color TEXT DEFAULT '#1a1a1a',
-            text_color TEXT DEFAULT '#e0e0e0',
-            allowed_domains TEXT DEFAULT '',
-            rate_per_minute INTEGER DEFAULT 10,
-            rate_per_hour INTEGER DEFAULT 100,
-            enable_analytics INTEGER DEFAULT 1,
-            show_watermark INTEGER DEFAULT 1,
-            status TEXT DEFAULT 'active',
-            api_type TEXT DEFAULT 'internal',
-            api_key_encrypted TEXT,
-            model_id TEXT DEFAULT 'claude-sonnet',
-            icon_url TEXT DEFAULT '',
-            last_used_at INTEGER,
-            created_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            updated_at INTEGER DEFAULT (strftime('%s', 'now') * 1000)
-        );
-        
-        CREATE TABLE IF NOT EXISTS chatbot_conversations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            chatbot_id TEXT NOT NULL,
-            session_id TEXT NOT NULL,
-            started_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            ended_at INTEGER,
-            message_count INTEGER DEFAULT 0,
-            satisfaction_rating INTEGER,
-            FOREIGN KEY (chatbot_id) REFERENCES chatbots(id)
-        );
-        
-        CREATE TABLE IF NOT EXISTS chatbot_messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            conversation_id INTEGER NOT NULL,
-            role TEXT NOT NULL,
-            content TEXT NOT NULL,
-            timestamp INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            FOREIGN KEY (conversation_id) REFERENCES chatbot_conversations(id)
-        );
-        
-        CREATE TABLE IF NOT EXISTS licenses (
-            id TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            chatbot_id TEXT,
-            tier TEXT DEFAULT 'free',
-            features TEXT DEFAULT '[]',
-            stripe_subscription_id TEXT,
-            stripe_customer_id TEXT,
-            expires_at INTEGER,
-            created_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            updated_at INTEGER DEFAULT (strftime('%s', 'now') * 1000)
-        );
-        
-        CREATE TABLE IF NOT EXISTS knowledge_files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            chatbot_id TEXT NOT NULL,
-            filename TEXT NOT NULL,
-            content TEXT,
-            file_size INTEGER,
-            uploaded_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            FOREIGN KEY (chatbot_id) REFERENCES chatbots(id)
-        );
-        
-        CREATE INDEX IF NOT EXISTS idx_conversations_chatbot ON chatbot_conversations(chatbot_id);
-        CREATE INDEX IF NOT EXISTS idx_messages_conversation ON chatbot_messages(conversation_id);
-        CREATE INDEX IF NOT EXISTS idx_licenses_user ON licenses(user_id);
-    """)
-    db.commit()
-    
-    # Migration: Add new columns if they don't exist (for existing databases)
-    try:
-        db.execute("ALTER TABLE chatbots ADD COLUMN api_type TEXT DEFAULT 'internal'")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
-        db.execute("ALTER TABLE chatbots ADD COLUMN api_key_encrypted TEXT")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        db.execute("ALTER TABLE chatbots ADD COLUMN model_id TEXT DEFAULT 'claude-sonnet'")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        db.execute("ALTER TABLE chatbots ADD COLUMN last_used_at INTEGER")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        db.execute("ALTER TABLE chatbots ADD COLUMN icon_url TEXT DEFAULT ''")
-    except sqlite3.OperationalError:
-        pass
-    db.commit()
-    
-    return db
+    """Get a pooled chatbots database connection (tables migrated on first use)"""
+    return _chatbots_db.connect()
 
 
 @app.route('/api/chatbots')
@@ -2187,42 +2093,6 @@ def extract_text_from_file(filepath, filename):
     return ""
 
 
-def chunk_text(text, chunk_size=1000, overlap=100):
-    """Split text into overlapping chunks for RAG"""
-    if not text:
-        return []
-    
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap
-    
-    return chunks
-
-
-def simple_search(query, content, max_results=3):
-    """Simple keyword search in content - returns relevant snippets"""
-    if not query or not content:
-        return []
-    
-    query_lower = query.lower()
-    query_words = query_lower.split()
-    chunks = chunk_text(content, chunk_size=500, overlap=50)
-    
-    scored_chunks = []
-    for chunk in chunks:
-        chunk_lower = chunk.lower()
-        score = sum(1 for word in query_words if word in chunk_lower)
-        if score > 0:
-            scored_chunks.append((score, chunk))
-    
-    scored_chunks.sort(key=lambda x: -x[0])
-    return [chunk for _, chunk in scored_chunks[:max_results]]
-
-
 @app.route('/api/chatbots/<chatbot_id>/knowledge', methods=['GET'])
 def api_list_knowledge(chatbot_id):
     """List knowledge base files for a chatbot"""
@@ -2284,15 +2154,14 @@ def api_upload_knowledge(chatbot_id):
         # Extract text content
         content = extract_text_from_file(str(filepath), filename)
         
-        # Store in database
-        db.execute("""
+        # Store in database, chunked and indexed for retrieval
+        file_id = db.execute("""
             INSERT INTO knowledge_files (chatbot_id, filename, content, file_size)
             VALUES (?, ?, ?, ?)
-        """, (chatbot_id, filename, content, size))
+        """, (chatbot_id, filename, content, size)).lastrowid
+        index_knowledge_file(db, file_id, chatbot_id, content)
         db.commit()
         
-        file_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
-        
         return jsonify({
             'success': True,
             'file': {
@@ -2344,30 +2213,33 @@ def api_search_knowledge(chatbot_id):
     if not query:
         return jsonify({'error': 'Query required'}), 400
     
+    limit = data.get('limit')
+    try:
+        limit = max(1, min(int(10 if limit is None else limit), 50))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
     db = get_chatbots_db()
     try:
-        # Get all knowledge files for this chatbot
-        files = db.execute("""
-            SELECT id, filename, content
-            FROM knowledge_files
-            WHERE chatbot_id = ?
-        """, (chatbot_id,)).fetchall()
+        # Group the best-ranked chunks by file, keeping file order by best match
+        results = {}
+        for chunk in search_knowledge(db, chatbot_id, query, limit=limit):
+            entry = results.setdefault(chunk['file_id'], {
+                'file_id': chunk['file_id'],
+                'filename': chunk['filename'],
+                'snippets': [],
+                'score': chunk['score']
+            })
+            entry['snippets'].append(chunk['content'])
         
-        results = []
-        for file in files:
-            if file['content']:
-                snippets = simple_search(query, file['content'])
-                if snippets:
-                    results.append({
-                        'file_id': file['id'],
-                        'filename': file['filename'],
-                        'snippets': snippets
-                    })
+        total_files = db.execute(
+            "SELECT COUNT(*) FROM knowledge_files WHERE chatbot_id = ?", (chatbot_id,)
+        ).fetchone()[0]
         
         return jsonify({
             'query': query,
-            'results': results,
-            'total_files_searched': len(files)
+            'results': list(results.values()),
+            'total_files_searched': total_files
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -2391,63 +2263,10 @@ def api_list_conversations():
     
     db = get_chatbots_db()
     try:
-        # Build query with filters
-        query = """
-            SELECT 
-                c.id,
-                c.chatbot_id,
-                c.session_id,
-                c.started_at,
-                c.ended_at,
-                c.message_count,
-                c.satisfaction_rating,
-                b.name as chatbot_name,
-                (SELECT content FROM chatbot_messages WHERE conversation_id = c.id AND role = 'user' ORDER BY timestamp ASC LIMIT 1) as first_message
-            FROM chatbot_conversations c
-            LEFT JOIN chatbots b ON c.chatbot_id = b.id
-            WHERE 1=1
-        """
-        params = []
-        
-        if chatbot_id:
-            query += " AND c.chatbot_id = ?"
-            params.append(chatbot_id)
-        
-        if start_date:
-            query += " AND c.started_at >= ?"
-            params.append(int(start_date))
-        
-        if end_date:
-            query += " AND c.started_at <= ?"
-            params.append(int(end_date))
-        
-        if search:
-            query += """ AND c.id IN (
-                SELECT DISTINCT conversation_id FROM chatbot_messages 
-                WHERE content LIKE ?
-            )"""
-            params.append(f'%{search}%')
-        
-        # Count total
-        count_query = query.replace(
-            "SELECT \n                c.id,", 
-            "SELECT COUNT(*) as total FROM (SELECT c.id,"
-        ) + ") sub"
-        # Simplified count
-        count_result = db.execute(f"""
-            SELECT COUNT(*) FROM chatbot_conversations c WHERE 1=1
-            {' AND c.chatbot_id = ?' if chatbot_id else ''}
-        """, [chatbot_id] if chatbot_id else []).fetchone()
-        total = count_result[0] if count_result else 0
-        
-        query += " ORDER BY c.started_at DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        
-        conversations = db.execute(query, params).fetchall()
+        conversations, total = list_conversations(db, chatbot_id, search, start_date, end_date, limit, offset)
         
         result = []
-        for conv in conversations:
-            conv_dict = dict(conv)
+        for conv_dict in conversations:
             # Calculate duration
             if conv_dict['ended_at'] and conv_dict['started_at']:
                 duration_ms = conv_dict['ended_at'] - conv_dict['started_at']
@@ -2514,12 +2333,29 @@ def api_get_conversation(conversation_id):
         db.close()
 
 
+def _export_response(chunks, filename, mimetype):
+    """Streamed export download; gzipped on the fly as a .gz file with
+    ?gzip=1, or transparently when the client accepts gzip"""
+    headers = {'Content-Disposition': f'attachment; filename={filename}'}
+    if request.args.get('gzip') in ('1', 'true'):
+        chunks, mimetype = gzip_chunks(chunks), 'application/gzip'
+        headers['Content-Disposition'] = f'attachment; filename={filename}.gz'
+    elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+
 @app.route('/api/conversations/<int:conversation_id>/export')
 def api_export_conversation(conversation_id):
-    """Export conversation as CSV or JSON"""
+    """Export conversation as CSV, JSON or JSONL (streamed; ?since=<message id>
+    exports only messages after that id)"""
     format_type = request.args.get('format', 'json')
+    since = request.args.get('since', type=int)
     
     db = get_chatbots_db()
+    streaming = False
     try:
         # Get conversation
         conv = db.execute("""
@@ -2532,42 +2368,39 @@ def api_export_conversation(conversation_id):
         if not conv:
             return jsonify({'error': 'Conversation not found'}), 404
         
-        # Get messages
-        messages = db.execute("""
-            SELECT role, content, timestamp
-            FROM chatbot_messages
-            WHERE conversation_id = ?
-            ORDER BY timestamp ASC
-        """, (conversation_id,)).fetchall()
+        # Messages are read batch by batch while the response is sent
+        sql = "SELECT id, role, content, timestamp FROM chatbot_messages WHERE conversation_id = ?"
+        params = [conversation_id]
+        if since is not None:
+            sql += " AND id > ? ORDER BY id"
+            params.append(since)
+        else:
+            sql += " ORDER BY timestamp ASC, id"
+        batches = iter_batches(db, sql, params)
         
         if format_type == 'csv':
-            import io
-            import csv
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(['Timestamp', 'Role', 'Content'])
-            for msg in messages:
-                from datetime import datetime
+            def csv_row(msg):
                 ts = datetime.fromtimestamp(msg['timestamp'] / 1000).isoformat() if msg['timestamp'] else ''
-                writer.writerow([ts, msg['role'], msg['content']])
-            
-            response = make_response(output.getvalue())
-            response.headers['Content-Type'] = 'text/csv'
-            response.headers['Content-Disposition'] = f'attachment; filename=conversation_{conversation_id}.csv'
-            return response
+                return [ts, msg['role'], msg['content'], msg['id']]
+            chunks = csv_chunks(['Timestamp', 'Role', 'Content', 'Message ID'], batches, csv_row)
+            filename, mimetype = f'conversation_{conversation_id}.csv', 'text/csv'
+        elif format_type == 'jsonl':
+            chunks = jsonl_chunks(batches, lambda msg: {'conversation_id': conversation_id, **dict(msg)})
+            filename, mimetype = f'conversation_{conversation_id}.jsonl', 'application/x-ndjson'
         else:
-            # JSON export
-            conv_dict = dict(conv)
-            conv_dict['messages'] = [dict(m) for m in messages]
-            
-            response = make_response(json.dumps(conv_dict, indent=2))
-            response.headers['Content-Type'] = 'application/json'
-            response.headers['Content-Disposition'] = f'attachment; filename=conversation_{conversation_id}.json'
-            return response
+            # JSON export: the conversation with its messages array
+            chunks = json_object_chunks(dict(conv), 'messages', batches)
+            filename, mimetype = f'conversation_{conversation_id}.json', 'application/json'
+        
+        response = _export_response(chunks, filename, mimetype)
+        response.call_on_close(db.close)
+        streaming = True
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
-        db.close()
+        if not streaming:
+            db.close()
 
 
 @app.route('/api/chatbots/<chatbot_id>/ai-config', methods=['GET'])
@@ -2817,23 +2650,19 @@ def api_available_models():
 
 @app.route('/api/analytics')
 def api_analytics():
-    """Get analytics data for chatbots"""
+    """Get analytics data for chatbots (totals and chart from the daily rollup)"""
     range_param = request.args.get('range', '7d')
     chatbot_id = request.args.get('chatbot_id', '')
     
     db = get_chatbots_db()
     try:
-        now_ms = int(time.time() * 1000)
-        
-        # Calculate date range
-        range_ms = {
-            '7d': 7 * 24 * 60 * 60 * 1000,
-            '30d': 30 * 24 * 60 * 60 * 1000,
-            '90d': 90 * 24 * 60 * 60 * 1000,
-            'all': now_ms  # All time
-        }.get(range_param, 7 * 24 * 60 * 60 * 1000)
+        now = datetime.now()
+        now_ms = int(now.timestamp() * 1000)
         
-        start_time = now_ms - range_ms
+        # Calculate date range ('all' has no lower bound)
+        range_days = {'7d': 7, '30d': 30, '90d': 90, 'all': None}.get(range_param, 7)
+        start_time = now_ms - range_days * 24 * 60 * 60 * 1000 if range_days else 0
+        since_day = (now - timedelta(days=range_days)).strftime('%Y-%m-%d') if range_days else None
         
         # Build query filters
         filters = ["started_at >= ?"]
@@ -2845,90 +2674,42 @@ def api_analytics():
         
         where_clause = " AND ".join(filters)
         
-        # Get total conversations
-        total_conv = db.execute(f"""
-            SELECT COUNT(*) as count FROM chatbot_conversations
-            WHERE {where_clause}
-        """, params).fetchone()['count']
-        
-        # Get total messages
-        total_msg = db.execute(f"""
-            SELECT COUNT(*) as count FROM chatbot_messages m
-            JOIN chatbot_conversations c ON m.conversation_id = c.id
-            WHERE {where_clause}
-        """, params).fetchone()['count']
-        
-        # Get user messages and bot responses
-        user_messages = db.execute(f"""
-            SELECT COUNT(*) as count FROM chatbot_messages m
-            JOIN chatbot_conversations c ON m.conversation_id = c.id
-            WHERE {where_clause} AND m.role = 'user'
-        """, params).fetchone()['count']
-        
-        bot_responses = db.execute(f"""
-            SELECT COUNT(*) as count FROM chatbot_messages m
-            JOIN chatbot_conversations c ON m.conversation_id = c.id
-            WHERE {where_clause} AND m.role = 'assistant'
-        """, params).fetchone()['count']
-        
-        # Get average conversation length
-        avg_conv_length = db.execute(f"""
-            SELECT AVG(message_count) as avg FROM chatbot_conversations
-            WHERE {where_clause}
-        """, params).fetchone()['avg'] or 0
+        # Per-day counters maintained by chatbots_db triggers: one row per day
+        # however many conversations and messages the range holds
+        days = daily_stats(db, since_day, chatbot_id or None)
+        totals = {c: sum(d[c] for d in days) for c in DAILY_COUNTERS}
         
-        # Get satisfaction data
-        satisfaction = db.execute(f"""
-            SELECT 
-                COUNT(*) as total,
-                AVG(satisfaction_rating) as avg,
-                SUM(CASE WHEN satisfaction_rating = 5 THEN 1 ELSE 0 END) as rating5,
-                SUM(CASE WHEN satisfaction_rating = 4 THEN 1 ELSE 0 END) as rating4,
-                SUM(CASE WHEN satisfaction_rating = 3 THEN 1 ELSE 0 END) as rating3,
-                SUM(CASE WHEN satisfaction_rating = 2 THEN 1 ELSE 0 END) as rating2,
-                SUM(CASE WHEN satisfaction_rating = 1 THEN 1 ELSE 0 END) as rating1,
-                COUNT(satisfaction_rating) as rated_count
-            FROM chatbot_conversations
-            WHERE {where_clause}
-        """, params).fetchone()
+        total_conv = totals['conversations']
+        total_msg = totals['messages']
+        user_messages = totals['user_messages']
+        bot_responses = totals['assistant_messages']
+        avg_conv_length = (total_msg / total_conv) if total_conv > 0 else 0
         
-        rated_count = satisfaction['rated_count'] or 0
+        rated_count = totals['rated']
         feedback_rate = (rated_count / total_conv * 100) if total_conv > 0 else 0
         
-        # Get chart data (conversations per day)
-        chart_data = []
-        if range_param == '7d':
-            interval_days = 1
-        elif range_param == '30d':
+        # Get chart data (conversations per interval)
+        if range_param in ('7d', '30d'):
             interval_days = 1
         elif range_param == '90d':
             interval_days = 3
         else:
             interval_days = 7
         
-        current_time = start_time
-        while current_time < now_ms:
-            end_time = current_time + (interval_days * 24 * 60 * 60 * 1000)
-            
-            interval_filters = ["started_at >= ? AND started_at < ?"]
-            interval_params = [current_time, end_time]
-            if chatbot_id:
-                interval_filters.append("chatbot_id = ?")
-                interval_params.append(chatbot_id)
-            
-            count = db.execute(f"""
-                SELECT COUNT(*) as count FROM chatbot_conversations
-                WHERE {" AND ".join(interval_filters)}
-            """, interval_params).fetchone()['count']
-            
+        per_day = {d['day']: d['conversations'] for d in days}
+        first_day = since_day or (days[0]['day'] if days else now.strftime('%Y-%m-%d'))
+        current = datetime.strptime(first_day, '%Y-%m-%d')
+        chart_data = []
+        while current <= now:
+            bucket = [(current + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(interval_days)]
             chart_data.append({
-                'date': datetime.fromtimestamp(current_time / 1000).strftime('%Y-%m-%d'),
-                'conversations': count
+                'date': bucket[0],
+                'conversations': sum(per_day.get(day, 0) for day in bucket)
             })
-            
-            current_time = end_time
+            current += timedelta(days=interval_days)
         
-        # Get recent conversations
+        # Get recent conversations (newest first off the started_at indexes,
+        # so only the returned rows are read)
         recent_params = params.copy()
         recent_params.append(10)  # limit
         
@@ -2952,25 +2733,13 @@ def api_analytics():
             conv_dict['rating'] = conv_dict.get('satisfaction_rating')
             recent_conversations.append(conv_dict)
         
-        # Get popular questions (top user messages)
-        popular_questions = []
-        try:
-            popular = db.execute(f"""
-                SELECT m.content as question, COUNT(*) as count
-                FROM chatbot_messages m
-                JOIN chatbot_conversations c ON m.conversation_id = c.id
-                WHERE {where_clause} AND m.role = 'user'
-                GROUP BY m.content
-                ORDER BY count DESC
-                LIMIT 10
-            """, params).fetchall()
-            
-            popular_questions = [{'question': q['question'], 'count': q['count']} for q in popular]
-        except Exception:
-            pass
+        # Popular questions come from the per-day question counts, which
+        # cover at most the last QUESTION_DAYS days
+        top_questions = popular_questions(db, since_day, chatbot_id or None)
         
         # Calculate satisfaction rate
-        satisfaction_rate = (satisfaction['avg'] / 5 * 100) if satisfaction['avg'] else None
+        satisfaction_avg = (totals['rating_sum'] / rated_count) if rated_count else None
+        satisfaction_rate = (satisfaction_avg / 5 * 100) if satisfaction_avg else None
         
         return jsonify({
             'totalConversations': total_conv,
@@ -2983,16 +2752,18 @@ def api_analytics():
             'satisfactionRate': satisfaction_rate,
             'satisfaction': {
                 'total': rated_count,
-                'rating5': satisfaction['rating5'] or 0,
-                'rating4': satisfaction['rating4'] or 0,
-                'rating3': satisfaction['rating3'] or 0,
-                'rating2': satisfaction['rating2'] or 0,
-                'rating1': satisfaction['rating1'] or 0,
+                'rating5': totals['rating5'],
+                'rating4': totals['rating4'],
+                'rating3': totals['rating3'],
+                'rating2': totals['rating2'],
+                'rating1': totals['rating1'],
                 'feedbackRate': feedback_rate
             },
             'chartData': chart_data,
-            'popularQuestions': popular_questions,
-            'recentConversations': recent_conversations
+            'popularQuestions': top_questions,
+            'popularQuestionsDays': min(range_days or QUESTION_DAYS, QUESTION_DAYS),
+            'recentConversations': recent_conversations,
+            'answerCache': _answer_cache.stats(chatbot_id)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -3002,26 +2773,44 @@ def api_analytics():
 
 @app.route('/api/analytics/export')
 def api_analytics_export():
-    """Export analytics data as CSV"""
-    from io import StringIO
-    import csv
-    from flask import Response
-    
+    """Export analytics data as CSV or JSONL (streamed): one row per
+    conversation (?since=<conversation id> for only newer ones), or one row
+    per day from the daily rollup with ?view=daily. Per-conversation rows
+    cover at most the last ANALYTICS_DETAIL_DAYS days; the daily view covers
+    the whole history."""
     range_param = request.args.get('range', '7d')
     chatbot_id = request.args.get('chatbot_id', '')
+    format_type = request.args.get('format', 'csv')
+    since = request.args.get('since', type=int)
+    ext, mimetype = ('jsonl', 'application/x-ndjson') if format_type == 'jsonl' else ('csv', 'text/csv')
+    today = datetime.now().strftime("%Y-%m-%d")
     
     db = get_chatbots_db()
+    streaming = False
     try:
-        now_ms = int(time.time() * 1000)
+        if request.args.get('view') == 'daily':
+            range_days = {'7d': 7, '30d': 30, '90d': 90, 'all': None}.get(range_param, 7)
+            since_day = (datetime.now() - timedelta(days=range_days)).strftime('%Y-%m-%d') if range_days else None
+            batches = [daily_stats(db, since_day, chatbot_id or None)]
+            if format_type == 'jsonl':
+                chunks = jsonl_chunks(batches)
+            else:
+                chunks = csv_chunks(
+                    ['Date', 'Conversations', 'Messages', 'User Messages', 'Bot Responses',
+                     'Avg Conversation Length', 'Ratings', 'Avg Rating'],
+                    batches,
+                    lambda d: [
+                        d['day'], d['conversations'], d['messages'], d['user_messages'], d['assistant_messages'],
+                        round(d['messages'] / d['conversations'], 2) if d['conversations'] else '',
+                        d['rated'], round(d['rating_sum'] / d['rated'], 2) if d['rated'] else ''
+                    ])
+            return _export_response(chunks, f'analytics-daily-{range_param}-{today}.{ext}', mimetype)
         
-        range_ms = {
-            '7d': 7 * 24 * 60 * 60 * 1000,
-            '30d': 30 * 24 * 60 * 60 * 1000,
-            '90d': 90 * 24 * 60 * 60 * 1000,
-            'all': now_ms
-        }.get(range_param, 7 * 24 * 60 * 60 * 1000)
+        now_ms = int(time.time() * 1000)
         
-        start_time = now_ms - range_ms
+        range_days = {'7d': 7, '30d': 30, '90d': 90, 'all': ANALYTICS_DETAIL_DAYS}.get(range_param, 7)
+        range_days = min(range_days, ANALYTICS_DETAIL_DAYS)
+        start_time = now_ms - range_days * 24 * 60 * 60 * 1000
         
         filters = ["c.started_at >= ?"]
         params = [start_time]
@@ -3030,53 +2819,85 @@ def api_analytics_export():
             filters.append("c.chatbot_id = ?")
             params.append(chatbot_id)
         
+        if since is not None:
+            filters.append("c.id > ?")
+            params.append(since)
+        
         where_clause = " AND ".join(filters)
         
-        # Get all conversations with details
-        conversations = db.execute(f"""
+        # Conversations are read batch by batch while the response is sent
+        batches = iter_batches(db, f"""
             SELECT c.id, c.chatbot_id, b.name as chatbot_name, c.session_id,
                    c.started_at, c.ended_at, c.message_count, c.satisfaction_rating
             FROM chatbot_conversations c
             LEFT JOIN chatbots b ON c.chatbot_id = b.id
             WHERE {where_clause}
-            ORDER BY c.started_at DESC
-        """, params).fetchall()
-        
-        # Create CSV
-        output = StringIO()
-        writer = csv.writer(output)
+            ORDER BY {"c.id" if since is not None else "c.started_at DESC"}
+        """, params)
         
-        # Header
-        writer.writerow(['Conversation ID', 'Chatbot', 'Session ID', 'Started At', 
-                        'Ended At', 'Message Count', 'Satisfaction Rating'])
+        if format_type == 'jsonl':
+            chunks = jsonl_chunks(batches)
+        else:
+            def csv_row(conv):
+                started_at = datetime.fromtimestamp(conv['started_at'] / 1000).isoformat() if conv['started_at'] else ''
+                ended_at = datetime.fromtimestamp(conv['ended_at'] / 1000).isoformat() if conv['ended_at'] else ''
+                return [
+                    conv['id'],
+                    conv['chatbot_name'] or conv['chatbot_id'],
+                    conv['session_id'],
+                    started_at,
+                    ended_at,
+                    conv['message_count'],
+                    conv['satisfaction_rating'] or ''
+                ]
+            chunks = csv_chunks(['Conversation ID', 'Chatbot', 'Session ID', 'Started At',
+                                 'Ended At', 'Message Count', 'Satisfaction Rating'], batches, csv_row)
         
-        for conv in conversations:
-            started_at = datetime.fromtimestamp(conv['started_at'] / 1000).isoformat() if conv['started_at'] else ''
-            ended_at = datetime.fromtimestamp(conv['ended_at'] / 1000).isoformat() if conv['ended_at'] else ''
-            
-            writer.writerow([
-                conv['id'],
-                conv['chatbot_name'] or conv['chatbot_id'],
-                conv['session_id'],
-                started_at,
-                ended_at,
-                conv['message_count'],
-                conv['satisfaction_rating'] or ''
-            ])
-        
-        output.seek(0)
-        
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename=analytics-{range_param}-{datetime.now().strftime("%Y-%m-%d")}.csv'
-            }
-        )
+        response = _export_response(chunks, f'analytics-{range_param}-{today}.{ext}', mimetype)
+        response.call_on_close(db.close)
+        streaming = True
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
-        db.close()
+        if not streaming:
+            db.close()
+
+
+# Days of the analytics rollup recomputed from the raw tables each night
+ANALYTICS_COMPACT_DAYS = 30
+# Per-conversation export window; older history is exported per day
+ANALYTICS_DETAIL_DAYS = 90
+_analytics_compaction_started = False
+
+
+def _analytics_compaction_loop():
+    """Nightly (03:00 local) compaction of the chatbot_daily_stats and
+    chatbot_daily_questions rollups"""
+    while True:
+        now = datetime.now()
+        next_run = now.replace(hour=3, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        time.sleep((next_run - now).total_seconds())
+        since_day = (datetime.now() - timedelta(days=ANALYTICS_COMPACT_DAYS)).strftime('%Y-%m-%d')
+        db = get_chatbots_db()
+        try:
+            compact_daily_stats(db, since_day)
+            compact_daily_questions(db, since_day)  # also drops days past QUESTION_DAYS
+            db.commit()
+        except Exception as e:
+            print(f"[WARN] Analytics rollup compaction failed: {e}")
+        finally:
+            db.close()
+
+
+def start_analytics_compaction():
+    global _analytics_compaction_started
+    if _analytics_compaction_started:
+        return
+    _analytics_compaction_started = True
+    threading.Thread(target=_analytics_compaction_loop, daemon=True, name="analytics-compaction").start()
 
 
 # ============================================================================
@@ -3599,104 +3420,52 @@ def get_system_api_keys():
     return {}
 
 
+# One provider client per API host, keeping connections alive between chats
+_chat_providers = ChatProviders(timeout=30)
+# Replies to questions a bot already answered (see answer_cache.py)
+_answer_cache = AnswerCache(_chatbots_db)
+# Enforces each chatbot's rate_per_minute / rate_per_hour per session and per IP
+_rate_limiter = RateLimiter()
+
+
 def call_ai_api(model_id, api_key, system_prompt, user_message, context=""):
     """Call the appropriate AI API based on model"""
     full_system = system_prompt or "You are a helpful assistant."
     if context:
         full_system += f"\n\nRelevant context from knowledge base:\n{context}"
     
+    if model_id.startswith('claude'):
+        # Map model IDs to actual Anthropic model names
+        model_map = {
+            'claude-sonnet': 'claude-sonnet-4-20250514',
+            'claude-opus': 'claude-opus-4-20250514',
+            'claude-haiku': 'claude-haiku-4-20250514',
+        }
+        provider, actual_model = 'anthropic', model_map.get(model_id, 'claude-sonnet-4-20250514')
+    elif model_id.startswith('gpt'):
+        model_map = {
+            'gpt-4o': 'gpt-4o',
+            'gpt-4o-mini': 'gpt-4o-mini',
+        }
+        provider, actual_model = 'openai', model_map.get(model_id, 'gpt-4o-mini')
+    elif model_id.startswith('gemini'):
+        # Google Gemini API - updated model names (2026)
+        model_map = {
+            'gemini-pro': 'gemini-2.5-pro',
+            'gemini-flash': 'gemini-2.0-flash',
+        }
+        provider, actual_model = 'gemini', model_map.get(model_id, 'gemini-2.0-flash')
+    else:
+        return None
+    
     try:
-        if model_id.startswith('claude'):
-            # Map model IDs to actual Anthropic model names
-            model_map = {
-                'claude-sonnet': 'claude-sonnet-4-20250514',
-                'claude-opus': 'claude-opus-4-20250514',
-                'claude-haiku': 'claude-haiku-4-20250514',
-            }
-            actual_model = model_map.get(model_id, 'claude-sonnet-4-20250514')
-            
-            response = requests.post(
-                'https://api.anthropic.com/v1/messages',
-                headers={
-                    'x-api-key': api_key,
-                    'anthropic-version': '2023-06-01',
-                    'content-type': 'application/json'
-                },
-                json={
-                    'model': actual_model,
-                    'max_tokens': 1024,
-                    'system': full_system,
-                    'messages': [{'role': 'user', 'content': user_message}]
-                },
-                timeout=30
-            )
-            
-            if response.ok:
-                data = response.json()
-                return data['content'][0]['text']
-            else:
-                print(f"Anthropic API error: {response.status_code} {response.text}")
-                return None
-                
-        elif model_id.startswith('gpt'):
-            # OpenAI API
-            model_map = {
-                'gpt-4o': 'gpt-4o',
-                'gpt-4o-mini': 'gpt-4o-mini',
-            }
-            actual_model = model_map.get(model_id, 'gpt-4o-mini')
-            
-            response = requests.post(
-                'https://api.openai.com/v1/chat/completions',
-                headers={
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json'
-                },
-                json={
-                    'model': actual_model,
-                    'max_tokens': 1024,
-                    'messages': [
-                        {'role': 'system', 'content': full_system},
-                        {'role': 'user', 'content': user_message}
-                    ]
-                },
-                timeout=30
-            )
-            
-            if response.ok:
-                data = response.json()
-                return data['choices'][0]['message']['content']
-            else:
-                print(f"OpenAI API error: {response.status_code} {response.text}")
-                return None
-                
-        elif model_id.startswith('gemini'):
-            # Google Gemini API - updated model names (2026)
-            model_map = {
-                'gemini-pro': 'gemini-2.5-pro',
-                'gemini-flash': 'gemini-2.0-flash',
-            }
-            actual_model = model_map.get(model_id, 'gemini-2.0-flash')
-            
-            response = requests.post(
-                f'https://generativelanguage.googleapis.com/v1beta/models/{actual_model}:generateContent',
-                params={'key': api_key},
-                headers={'Content-Type': 'application/json'},
-                json={
-                    'systemInstruction': {'parts': [{'text': full_system}]},
-                    'contents': [{'parts': [{'text': user_message}]}]
-                },
-                timeout=30
-            )
-            
-            if response.ok:
-                data = response.json()
-                return data['candidates'][0]['content']['parts'][0]['text']
-            else:
-                print(f"Gemini API error: {response.status_code} {response.text}")
-                return None
+        return _chat_providers.complete(
+            provider, actual_model, full_system,
+            [{'role': 'user', 'content': user_message}],
+            max_tokens=1024, api_key=api_key
+        ) or None
     except Exception as e:
-        print(f"AI API call error: {e}")
+        print(f"AI API call error ({provider}): {e}")
     
     return None
 
@@ -3717,6 +3486,13 @@ def api_chat(chatbot_id):
         
         chatbot = dict(chatbot)
         
+        allowed, retry_after = _rate_limiter.check(chatbot_id, session_id, chatbot.get('rate_per_minute'),
+                                                   chatbot.get('rate_per_hour'), ip=request.remote_addr)
+        if not allowed:
+            resp = jsonify({'error': 'Rate limit exceeded', 'retryAfter': retry_after})
+            resp.headers['Retry-After'] = str(retry_after)
+            return resp, 429
+        
         # Get AI configuration
         api_type = chatbot.get('api_type', 'internal')
         model_id = chatbot.get('model_id', 'claude-sonnet')
@@ -3736,25 +3512,26 @@ def api_chat(chatbot_id):
             elif model_id.startswith('gemini'):
                 api_key = system_keys.get('google')
         
+        # Same question already answered with this prompt and knowledge?
+        cache_messages = [{'role': 'user', 'content': message}]
+        response = _answer_cache.get(chatbot, cache_messages)
+        cached = response is not None
+        
         # Search knowledge base for context
         knowledge_context = ""
-        try:
-            files = db.execute("""
-                SELECT content FROM knowledge_files WHERE chatbot_id = ?
-            """, (chatbot_id,)).fetchall()
-            
-            for file in files:
-                if file['content']:
-                    snippets = simple_search(message, file['content'], max_results=2)
-                    if snippets:
-                        knowledge_context += "\n".join(snippets) + "\n"
-        except Exception as e:
-            print(f"Knowledge search error: {e}")
+        if not cached:
+            try:
+                snippets = [c['content'] for c in search_knowledge(db, chatbot_id, message, limit=4)]
+                if snippets:
+                    knowledge_context = "\n".join(snippets) + "\n"
+            except Exception as e:
+                print(f"Knowledge search error: {e}")
         
-        # Call AI API to generate response
-        response = None
-        if api_key:
+        # Call AI API to generate response (only real AI replies are cached)
+        if not cached and api_key:
             response = call_ai_api(model_id, api_key, system_prompt, message, knowledge_context)
+            if response:
+                _answer_cache.put(chatbot, cache_messages, response)
         
         # Fallback if AI call failed or no API key
         if not response:
@@ -3798,9 +3575,7 @@ def api_chat(chatbot_id):
                 VALUES (?, 'assistant', ?)
             """, (conv_id, response))
             
-            db.execute("""
-                UPDATE chatbot_conversations SET message_count = message_count + 2 WHERE id = ?
-            """, (conv_id,))
+            # message_count / first_user_message are maintained by chatbots_db triggers
             
             # Update last_used_at on chatbot
             db.execute("""
@@ -3814,7 +3589,8 @@ def api_chat(chatbot_id):
         return jsonify({
             'response': response,
             'widgetId': chatbot_id,
-            'model': model_id
+            'model': model_id,
+            'cached': cached
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -5163,7 +4939,13 @@ if __name__ == '__main__':
     parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind to')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
     parser.add_argument('--dist', action='store_true', help='Use production build (obfuscated)')
+    parser.add_argument('--trusted-proxies', type=int, default=0,
+                        help='Reverse proxies in front of the server; X-Forwarded-For then gives the client IP')
     args = parser.parse_args()
+
+    if args.trusted_proxies > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=args.trusted_proxies)
     
     # Switch to production build if --dist flag
     if args.dist:
@@ -5190,4 +4972,5 @@ if __name__ == '__main__':
 ╚══════════════════════════════════════════════════════════════╝
 """)
     
+    start_analytics_compaction()
     app.run(host=args.host, port=args.port, debug=args.debug)
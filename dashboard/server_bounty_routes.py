@@ -13,6 +13,7 @@ ctx dict should provide:
   - RCT_MINT: str
   - RES_MINT: str
   - RCT_DECIMALS: int
+  - note_tokens_minted(network, *addresses) (optional; refreshes caches/leaderboard)
 """
 import json
 import time
@@ -625,6 +626,7 @@ def register_bounty_routes(app, ctx=None):
         rct_mint = ctx.get("RCT_MINT")
         res_mint = ctx.get("RES_MINT")
         rct_decimals = ctx.get("RCT_DECIMALS", 9)
+        note_tokens_minted = ctx.get("note_tokens_minted")
 
         on_chain = bool(TokenManager and SolanaWallet and rct_mint and res_mint)
         tx_log = []
@@ -661,6 +663,8 @@ def register_bounty_routes(app, ctx=None):
 
                         if record_mint:
                             record_mint(w, per_rct)
+                        if note_tokens_minted:
+                            note_tokens_minted(network, w, pda, rct_mint, res_mint)
                     except Exception as e:
                         mint_errors.append({"wallet": w, "error": str(e)})
             except Exception as e:
@@ -6,6 +6,7 @@ No legacy Clawdbot/Watchtower dependencies.
 """
 
 import ast
+import asyncio
 import json
 import os
 import re
@@ -14,15 +15,23 @@ import subprocess
 import threading
 import time
 import hashlib
+import tempfile
 import traceback
 import urllib.request
 import urllib.error
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
-from flask import Flask, jsonify, redirect, render_template, request, send_from_directory
+from flask import Flask, Response, has_request_context, jsonify, redirect, render_template, request, send_from_directory
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 # Solana wallet integration imports — resolve toolkit path dynamically
 _dashboard_dir = Path(__file__).resolve().parent
@@ -51,6 +60,32 @@ except ImportError:
     ProtocolNFTMinter = None
     PROTOCOL_NFTS = {}
 
+try:
+    import solana_rpc
+except ImportError:
+    solana_rpc = None
+
+try:
+    import pda_cache
+except ImportError:
+    pda_cache = None
+
+from docs_index import DocsIndex, DocsRoot, extract_title
+from docs_terms import DocsTermIndex, best_snippet, legacy_relevance
+from docs_vectors import DocsVectorIndex, make_embedder
+from event_bus import EventBus, EventRelay, format_sse, topic_matches
+from fs_watcher import FsWatcher, WatchedDir, WatchedView
+from rmemory_blocks import RMemoryBlockIndex
+from rmemory_log import RMemoryLogTail
+from session_store import SessionStore, valid_agent_id
+from usage_rollup import UsageRollup
+import cost_engine
+from answer_cache import AnswerCache
+from chat_providers import ChatProviders
+from chatbots_db import ChatbotsDB, index_knowledge_file, list_conversations
+from rate_limit import MemoryBackend, RateLimiter, SQLiteBackend
+from gateway_rpc import GatewayBusy, GatewayError, GatewayTimeout, RequestTable
+
 # ---------------------------------------------------------------------------
 # Paths & Config
 # ---------------------------------------------------------------------------
@@ -215,13 +250,45 @@ def _get_dao_details():
     except Exception:
         return {}
 
-def _solana_rpc(network, method, params=None):
+# Shared keep-alive RPC clients (solana-toolkit/solana_rpc.py), one pool per network URL
+_SOLANA_RPC_OPTIONS = {
+    "timeout": "timeout", "retries": "retries", "backoff": "backoff",
+    "maxBackoff": "max_backoff", "poolSize": "pool_size", "maxBatch": "max_batch",
+}
+if solana_rpc is not None:
+    _rpc_cfg = _CFG.get("solana", {}).get("rpc", {})
+    solana_rpc.configure(**{opt: _rpc_cfg[key] for key, opt in _SOLANA_RPC_OPTIONS.items() if key in _rpc_cfg})
+    solana_rpc.configure_cache(ttls=_rpc_cfg.get("cacheTtl"), max_entries=_rpc_cfg.get("cacheSize"))
+
+# Cache lifetime for results that never change (mint metadata, token account owners)
+_RPC_FOREVER = float("inf")
+
+
+def _solana_rpc(network, method, params=None, ttl=None):
+    """JSON-RPC envelope; read-only methods are cached per solana.rpc.cacheTtl
+    unless ``ttl`` overrides it (0 = always fetch, _RPC_FOREVER = immutable)."""
     url = _SOLANA_RPCS.get(network, _SOLANA_RPCS["devnet"])
+    if solana_rpc is not None:
+        return solana_rpc.get_client(url).call(method, params, ttl=ttl)
     body = json.dumps({"jsonrpc":"2.0","id":1,"method":method,"params":params or []}).encode()
     req = urllib.request.Request(url, data=body, headers={"Content-Type":"application/json"})
     with urllib.request.urlopen(req, timeout=10) as resp:
         return json.loads(resp.read())
 
+
+def _solana_rpc_batch(network, calls, ttl=None):
+    """Independent (method, params) calls in one HTTP request; envelopes in order."""
+    url = _SOLANA_RPCS.get(network, _SOLANA_RPCS["devnet"])
+    if solana_rpc is not None:
+        return solana_rpc.get_client(url).batch(calls, ttl=ttl)
+    return [_solana_rpc(network, method, params) for method, params in calls]
+
+
+def _invalidate_rpc_cache(*addresses):
+    """Forget cached RPC reads mentioning these wallets/PDAs/mints after a write."""
+    if solana_rpc is not None:
+        solana_rpc.invalidate(*addresses)
+
 def _get_fee_payer(network, recipient_address=None):
     """Determine who pays gas. Returns (keypair_path, label)."""
     # Check if user has enough SOL
@@ -421,8 +488,71 @@ try:
 except ImportError:
     websocket = None
 
+_GATEWAY_CFG = {"maxInFlight": 64, "requestTimeout": 10, **_CFG.get("gateway", {})}
+
+# Gateway events, R-Memory log appends and Shield alerts fan out to /api/events
+_EVENTS_CFG = {"queueSize": 256, "heartbeatSeconds": 15, "maxClients": None, **_CFG.get("events", {})}
+_events = EventBus(max_queue=_EVENTS_CFG["queueSize"])
+# Shares events between the worker processes of one install (see start_background_services)
+_event_relay = EventRelay(_events, _DASHBOARD_DIR / "data" / "events.db")
+
+# SSE streams and widget completions hold a WSGI worker thread for their whole
+# lifetime. On a fixed-size thread pool (waitress, gunicorn gthread) both draw
+# from a per-process slot budget sized from the pool so ordinary requests
+# always have threads left. The dev server starts a thread per request and
+# has nothing to starve, so there they are only counted.
+_stream_slots_lock = threading.Lock()
+_stream_slots = {"events": 0, "widget": 0}
+_WSGI_POOL_THREADS = None  # set by the production launchers
+
+
+def _bounded_pool_threads():
+    """Threads in this process's request pool, or None if it isn't bounded."""
+    if _WSGI_POOL_THREADS:
+        return _WSGI_POOL_THREADS
+    # Launched by an external server via create_app()
+    software = request.environ.get("SERVER_SOFTWARE", "").lower() if has_request_context() else ""
+    if software.startswith(("waitress", "gunicorn")):
+        return _server_config(_SERVER_OVERRIDES)["threads"]
+    return None
+
+
+def _stream_slot_limits():
+    """(event stream cap, cap on all long-held requests) for this process;
+    ``events.maxClients`` applies always, the thread-derived caps only on a
+    bounded pool (None means no cap)."""
+    max_clients = _ts_int(_EVENTS_CFG["maxClients"], 0) if _EVENTS_CFG.get("maxClients") else None
+    threads = _bounded_pool_threads()
+    if threads is None:
+        return (max(1, max_clients) if max_clients else None), None
+    total = max(1, threads - 2)
+    events = max(1, threads // 4)
+    if max_clients:
+        events = max(1, min(events, max_clients))
+    return min(events, total), total
+
+
+def _acquire_stream_slot(kind):
+    events_cap, total_cap = _stream_slot_limits()
+    with _stream_slots_lock:
+        if total_cap is not None and sum(_stream_slots.values()) >= total_cap:
+            return False
+        if kind == "events" and events_cap is not None and _stream_slots["events"] >= events_cap:
+            return False
+        _stream_slots[kind] += 1
+        return True
+
+
+def _release_stream_slot(kind):
+    with _stream_slots_lock:
+        _stream_slots[kind] = max(0, _stream_slots[kind] - 1)
+
 class GatewayClient:
-    """Persistent WS connection to OpenClaw gateway. Caches latest state."""
+    """Persistent WS connection to OpenClaw gateway. Caches latest state.
+
+    Only the host's background leader holds the connection (``start``).
+    Other workers ``follow``: their state mirrors the leader's relayed
+    gateway events and requests go over short-lived connections."""
 
     def __init__(self):
         self.connected = False
@@ -436,26 +566,126 @@ class GatewayClient:
         self.error = None
         self._ws = None
         self._lock = threading.Lock()
-        self._msg_id = 0
-        self._pending = {}  # id -> threading.Event + result
-
-    def _next_id(self):
-        self._msg_id += 1
-        return f"r{self._msg_id}"
+        self._send_lock = threading.Lock()  # websocket-client frames must not interleave
+        self._requests = RequestTable(max_in_flight=_GATEWAY_CFG["maxInFlight"],
+                                      default_timeout=_GATEWAY_CFG["requestTimeout"])
+        self._started_pid = None
+        self._follower = False
+        self._oneshot_pool = None
 
     def start(self):
-        t = threading.Thread(target=self._run, daemon=True)
+        """Start the reader thread. Idempotent within a process; a forked
+        worker gets its own thread because threads don't survive fork()."""
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            self._follower = False
+        t = threading.Thread(target=self._run, daemon=True, name="gateway-client")
         t.start()
+        threading.Thread(target=self._requests.run_reaper, daemon=True, name="gateway-deadlines").start()
+
+    def follow(self, latest=None):
+        """Follower mode: seed state from the leader's last ``gateway.status``
+        and ``gateway.health`` (``latest(topic)``), then track relayed events."""
+        with self._lock:
+            self._follower = True
+            if self._oneshot_pool is None:
+                self._oneshot_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gateway-oneshot")
+        for topic in ("gateway.status", "gateway.health"):
+            data = latest(topic) if latest else None
+            if data is not None:
+                self._on_bus_event(topic, data)
+
+    def _on_bus_event(self, topic, data):
+        """Bus listener; in follower mode it applies the leader's gateway events."""
+        if not self._follower or not isinstance(data, dict):
+            return
+        if topic == "gateway.status":
+            self.connected = bool(data.get("connected"))
+            self.conn_id = data.get("connId")
+            self.last_tick = data.get("lastTick") or self.last_tick
+            self.last_health_ts = data.get("lastHealthTs") or self.last_health_ts
+            self.error = data.get("error")
+        elif topic == "gateway.health":
+            with self._lock:
+                self.health = data
+                self.last_health_ts = data.get("ts", 0)
+        elif topic == "gateway.tick":
+            self.last_tick = data.get("ts", 0)
+
+    def _oneshot(self, method, params, timeout):
+        """One request over its own connection (follower mode)."""
+        if websocket is None:
+            raise GatewayError("websocket-client not installed")
+        deadline = time.monotonic() + float(timeout)
+        try:
+            ws = websocket.create_connection(GW_WS_URL, timeout=min(10, timeout))
+        except Exception as e:
+            raise GatewayError(f"connect failed: {e}") from e
+        try:
+            nonce = None
+            ws.settimeout(min(5, timeout))
+            try:
+                msg = json.loads(ws.recv() or "{}")
+                if msg.get("event") == "connect.challenge":
+                    nonce = msg.get("payload", {}).get("nonce")
+            except websocket.WebSocketTimeoutException:
+                pass  # older protocol: no challenge
+            self._send_connect(ws, nonce)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise GatewayTimeout("timeout")
+                ws.settimeout(remaining)
+                msg = json.loads(ws.recv() or "{}")
+                if msg.get("type") != "res":
+                    continue
+                if msg.get("id") == "c0":
+                    if not msg.get("ok"):
+                        raise GatewayError(msg.get("error", {}).get("message", "connect failed"))
+                    req = {"type": "req", "id": "q1", "method": method}
+                    if params:
+                        req["params"] = params
+                    ws.send(json.dumps(req))
+                elif msg.get("id") == "q1":
+                    return msg
+        except GatewayError:
+            raise
+        except websocket.WebSocketTimeoutException as e:
+            raise GatewayTimeout("timeout") from e
+        except Exception as e:
+            raise GatewayError(str(e)) from e
+        finally:
+            try:
+                ws.close()
+            except Exception:
+                pass
 
     def _run(self):
         while True:
             try:
                 self._connect()
             except Exception as e:
-                self.connected = False
                 self.error = str(e)
+                self._set_connected(False)
             time.sleep(3)  # reconnect delay
 
+    def status(self):
+        return {
+            "connected": self.connected,
+            "connId": self.conn_id,
+            "lastTick": self.last_tick,
+            "lastHealthTs": self.last_health_ts,
+            "error": self.error,
+        }
+
+    def _set_connected(self, connected):
+        changed = connected != self.connected
+        self.connected = connected
+        if changed:
+            _events.publish("gateway.status", self.status())
+
     def _send_connect(self, ws, nonce=None):
         connect_msg = {
             "type": "req", "id": "c0", "method": "connect",
@@ -473,7 +703,8 @@ class GatewayClient:
                 }
             }
         }
-        ws.send(json.dumps(connect_msg))
+        with self._send_lock:
+            ws.send(json.dumps(connect_msg))
 
     def _connect(self):
         if websocket is None:
@@ -523,7 +754,8 @@ class GatewayClient:
             except Exception:
                 break
 
-        self.connected = False
+        self._set_connected(False)
+        self._requests.fail_all(GatewayError("disconnected"))
         try:
             ws.close()
         except Exception:
@@ -537,11 +769,11 @@ class GatewayClient:
             # Handle connect response
             if mid == "c0":
                 if msg.get("ok"):
-                    self.connected = True
                     self.error = None
                     payload = msg.get("payload", {})
                     self.conn_id = payload.get("server", {}).get("connId")
                     self.features = payload.get("features", {})
+                    self._set_connected(True)
                     # Extract agents from snapshot
                     snap = payload.get("snapshot", {})
                     # Health data is in the snapshot too
@@ -549,10 +781,7 @@ class GatewayClient:
                     self.error = msg.get("error", {}).get("message", "connect failed")
 
             # Handle pending request responses
-            if mid in self._pending:
-                evt, _ = self._pending[mid]
-                self._pending[mid] = (evt, msg)
-                evt.set()
+            self._requests.resolve(mid, msg)
 
         elif mtype == "event":
             event = msg.get("event")
@@ -567,40 +796,74 @@ class GatewayClient:
                     self.last_health_ts = payload.get("ts", 0)
 
             elif event == "connect.challenge":
-                pass  # Handled by protocol
+                return  # Handled by protocol
+
+            if event:
+                _events.publish(f"gateway.{event}", payload)
+
+    def submit(self, method, params=None, timeout=None, wait=0):
+        """Send a request without blocking: a Future resolving to the response
+        frame. It fails with GatewayTimeout past ``timeout``, GatewayBusy when
+        too many requests are in flight, and can be cancelled. ``wait`` is
+        how long to block for an in-flight slot (0: fail the Future at once)."""
+        fut = Future()
+        if self._follower:
+            if not self.connected:
+                fut.set_exception(GatewayError("not connected"))
+                return fut
+            return self._oneshot_pool.submit(self._oneshot, method, params,
+                                             _GATEWAY_CFG["requestTimeout"] if timeout is None else timeout)
+        if not self.connected or not self._ws:
+            fut.set_exception(GatewayError("not connected"))
+            return fut
+        try:
+            mid, fut = self._requests.open(timeout, wait=wait)
+        except GatewayBusy as e:
+            fut.set_exception(e)
+            return fut
+        msg = {"type": "req", "id": mid, "method": method}
+        if params:
+            msg["params"] = params
+        try:
+            with self._send_lock:
+                self._ws.send(json.dumps(msg))
+        except Exception as e:
+            self._requests.fail(mid, GatewayError(str(e)))
+        return fut
 
     def request(self, method, params=None, timeout=10):
         """Send a request and wait for response."""
-        if not self.connected or not self._ws:
-            return {"ok": False, "error": "not connected"}
-
-        mid = self._next_id()
-        evt = threading.Event()
-        self._pending[mid] = (evt, None)
-
         try:
-            msg = {"type": "req", "id": mid, "method": method}
-            if params:
-                msg["params"] = params
-            self._ws.send(json.dumps(msg))
-            evt.wait(timeout=timeout)
-            _, result = self._pending.pop(mid, (None, None))
-            if result is None:
-                return {"ok": False, "error": "timeout"}
-            return result
+            # Blocking callers queue for an in-flight slot (backpressure)
+            fut = self.submit(method, params, timeout, wait=None)
+            # The deadline reaper settles the future; the margin only guards against a stalled reaper
+            return fut.result(timeout=timeout + 1)
+        except (GatewayError, FutureTimeout) as e:
+            return {"ok": False, "error": str(e) or "timeout"}
         except Exception as e:
-            self._pending.pop(mid, None)
             return {"ok": False, "error": str(e)}
 
+    async def call(self, method, params=None, timeout=10):
+        """``await gw.call(method, params)`` — the response frame. Raises
+        GatewayError on timeout/disconnect and GatewayBusy when no in-flight
+        slot is free (never blocks the event loop); cancelling the task
+        cancels the request."""
+        return await asyncio.wrap_future(self.submit(method, params, timeout))
+
+    def request_stats(self):
+        return self._requests.stats()
+
 
 # Singleton
 gw = GatewayClient()
+_events.add_listener(["gateway"], gw._on_bus_event)
 
 # ---------------------------------------------------------------------------
 # Flask App
 # ---------------------------------------------------------------------------
 
 app = Flask(__name__)
+# Dev default; create_app(production=True) turns template reloading off.
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.jinja_env.auto_reload = True
 CORS(app)
@@ -634,9 +897,6 @@ def inject_version():
 # R-Memory Data Helpers
 # ---------------------------------------------------------------------------
 
-import re as _re
-import glob as _glob
-
 def _rmem_config():
     """Read r-memory/config.json."""
     try:
@@ -683,160 +943,48 @@ def _rmem_effective_models():
         result["warning"] = warning
     return result
 
-def _rmem_history_blocks(session_id=None):
-    """Read compressed blocks from history-{sessionId}.json files AND block-cache.json.
-    If session_id given, only that history file. Otherwise aggregate all.
-    block-cache.json contains lifetime compression data (all blocks ever compressed).
-    Returns list of block dicts with compressed, tokensRaw, tokensCompressed, timestamp."""
-    all_blocks = []
-    history_hashes = set()
-
-    # 1. Read current/recent session blocks from history files
-    pattern = str(RMEMORY_DIR / "history-*.json")
-    files = _glob.glob(pattern)
-    for f in files:
-        if session_id and session_id not in f:
-            continue
-        try:
-            data = json.loads(Path(f).read_text())
-            if isinstance(data, list):
-                for b in data:
-                    b["_file"] = Path(f).name
-                    b["_source"] = "history"
-                    all_blocks.append(b)
-                    if "hash" in b:
-                        history_hashes.add(b["hash"])
-        except Exception:
-            pass
+_rmem_blocks = RMemoryBlockIndex(RMEMORY_DIR, _DASHBOARD_DIR / "data" / "rmemory_blocks.db")
 
-    # 2. Read lifetime compression stats from block-cache.json
-    if not session_id:
-        cache_file = RMEMORY_DIR / "block-cache.json"
-        if cache_file.exists():
-            try:
-                cache_data = json.loads(cache_file.read_text())
-                if isinstance(cache_data, dict):
-                    for cache_hash, entry in cache_data.items():
-                        if str(cache_hash) in history_hashes:
-                            continue
-                        if not isinstance(entry, dict):
-                            continue
-                        raw_tokens = int(entry.get("tokensRaw", 0) or 0)
-                        comp_tokens = int(entry.get("tokensCompressed", 0) or 0)
-                        if raw_tokens <= 0 and comp_tokens <= 0:
-                            continue
-                        cache_block = {
-                            "tokensRaw": raw_tokens,
-                            "tokensCompressed": comp_tokens,
-                            "compressed": entry.get("compressed", ""),
-                            "hash": str(cache_hash),
-                            "_file": "block-cache.json",
-                            "_source": "cache",
-                        }
-                        all_blocks.append(cache_block)
-            except Exception:
-                pass
 
-    return all_blocks
+def _rmem_block_totals():
+    """(current session id, token aggregates) from the block index, re-reading
+    only history/cache files whose mtime changed."""
+    try:
+        _rmem_blocks.sync()
+    except Exception as e:
+        print(f"[WARN] r-memory block index sync failed: {e}")
+    cur_sid = _rmem_blocks.current_session()
+    return cur_sid, _rmem_blocks.aggregates(cur_sid)
 
-def _rmem_current_session_id():
-    """Get the current main session ID (short hash) from the most recently modified history file."""
-    pattern = str(RMEMORY_DIR / "history-*.json")
-    files = _glob.glob(pattern)
-    if not files:
-        return None
-    newest = max(files, key=lambda f: Path(f).stat().st_mtime)
-    m = _re.search(r'history-([a-f0-9]+)\.json', newest)
-    return m.group(1) if m else None
-
-def _rmem_parse_log():
-    """Parse r-memory.log (text format) into structured events.
-    Log lines: [ISO_TS] [LEVEL] message {json}
-    Key patterns: init, Session, === COMPACTION ===, Swap plan, Block compressed, === DONE ===, FIFO evicted, FIFO done
-    """
-    events = []
-    if not RMEMORY_LOG.exists():
-        return events
+_rmem_log = RMemoryLogTail(RMEMORY_LOG, checkpoint_path=_DASHBOARD_DIR / "data" / "rmemory_log.json")
+
+
+def _rmem_log_snapshot():
+    """Aggregates and recent events of r-memory.log, parsing only appended bytes."""
     try:
-        text = RMEMORY_LOG.read_text(errors="ignore")
-    except Exception:
-        return events
+        _rmem_log.refresh()
+    except Exception as e:
+        print(f"[WARN] r-memory log refresh failed: {e}")
+    return _rmem_log.snapshot()
 
-    line_re = _re.compile(
-        r'^\[(\d{4}-\d{2}-\d{2}T[\d:.]+Z)\]\s+\[(\w+)\]\s+(.*)', _re.MULTILINE
-    )
-    for m in line_re.finditer(text):
-        ts, level, body = m.group(1), m.group(2), m.group(3)
-        evt = {"ts": ts, "level": level, "raw": body}
-
-        # Try to extract inline JSON
-        json_match = _re.search(r'\{.*\}', body)
-        payload = {}
-        if json_match:
-            try:
-                payload = json.loads(json_match.group())
-            except Exception:
-                pass
+_sessions = SessionStore(OPENCLAW_HOME / "agents")
+_events.add_listener(["gateway"], _sessions.note_gateway_event)
 
-        if "=== COMPACTION ===" in body:
-            evt["event"] = "compaction_start"
-            evt.update(payload)
-        elif "=== DONE ===" in body:
-            evt["event"] = "compaction_done"
-            evt.update(payload)
-        elif "Swap plan" in body:
-            evt["event"] = "swap_plan"
-            evt.update(payload)
-        elif "Block compressed" in body:
-            evt["event"] = "block_compressed"
-            evt.update(payload)
-        elif "FIFO evicted" in body:
-            evt["event"] = "fifo_evicted"
-            evt.update(payload)
-        elif "FIFO done" in body:
-            evt["event"] = "fifo_done"
-            evt.update(payload)
-        elif body.startswith("Session "):
-            evt["event"] = "session"
-            evt.update(payload)
-        elif "init" in body and ("R-Memory" in body or "r-memory" in body.lower()):
-            evt["event"] = "init"
-            evt.update(payload)
-        elif "Config loaded" in body:
-            evt["event"] = "config_loaded"
-            evt.update(payload)
-        else:
-            evt["event"] = "info"
 
-        events.append(evt)
-    return events
+def _gateway_sessions(agent_id):
+    """sessions.list from the gateway, for agents without a local sessions.json."""
+    result = gw.request("sessions.list", {"agentId": agent_id}, timeout=5)
+    if result.get("ok") and result.get("payload"):
+        return result["payload"].get("sessions", [])
+    return None
+
 
 def _rmem_gateway_session():
-    """Get main session data from sessions.json file directly."""
-    sessions_path = Path.home() / ".openclaw" / "agents" / "main" / "sessions" / "sessions.json"
-    try:
-        data = json.loads(sessions_path.read_text())
-        # sessions.json is a dict keyed by session key
-        if isinstance(data, dict) and "agent:main:main" in data:
-            return data["agent:main:main"]
-        # Fallback: list format
-        if isinstance(data, list):
-            for s in data:
-                if s.get("key") == "agent:main:main":
-                    return s
-    except Exception:
-        pass
-    # Fallback: try WS
-    try:
-        sess_result = gw.request("sessions.list", timeout=5)
-        if sess_result.get("ok") and sess_result.get("payload"):
-            sessions = sess_result["payload"].get("sessions", [])
-            for s in sessions:
-                if s.get("key") == "agent:main:main":
-                    return s
+    """Main session data from the cached sessions.json snapshot (gateway as fallback)."""
+    try:
+        return _sessions.get("agent:main:main", fetch=_gateway_sessions)
     except Exception:
-        pass
-    return None
+        return None
 
 
 # ---------------------------------------------------------------------------
@@ -940,57 +1088,47 @@ def _docs_build_folder_tree(root, prefix=""):
     return items
 
 
-def _docs_build_tree():
-    """Build full docs tree from workspace sources."""
-    tree = []
+# Top-level sources of the docs tree: (name, dir, icon, path prefix, recursive)
+_DOCS_TREE_SOURCES = [
+    ("docs", REPO_DIR / "docs", "📖", "resonantos-augmentor/docs", True),
+    ("ssot", REPO_DIR / "ssot", "🗂️", "resonantos-augmentor/ssot", True),
+    ("dashboard", REPO_DIR / "dashboard", "📊", "resonantos-augmentor/dashboard", True),
+    ("reference", REPO_DIR / "reference", "📚", "resonantos-augmentor/reference", True),
+    ("workspace", DOCS_WORKSPACE, "📄", "", False),
+    ("memory", DOCS_WORKSPACE / "memory", "🧠", "memory", True),
+]
 
-    # 1. Repo docs/
-    docs_dir = REPO_DIR / "docs"
-    if docs_dir.exists():
-        items = _docs_build_folder_tree(docs_dir, "resonantos-augmentor/docs")
-        if items:
-            tree.append({"name": "docs", "type": "folder", "path": "resonantos-augmentor/docs", "icon": "📖", "children": items, "fileCount": sum(i.get("fileCount", 0) if i["type"] == "folder" else 1 for i in items)})
-
-    # 2. SSoT
-    ssot_dir = REPO_DIR / "ssot"
-    if ssot_dir.exists():
-        items = _docs_build_folder_tree(ssot_dir, "resonantos-augmentor/ssot")
-        if items:
-            tree.append({"name": "ssot", "type": "folder", "path": "resonantos-augmentor/ssot", "icon": "🗂️", "children": items, "fileCount": sum(i.get("fileCount", 0) if i["type"] == "folder" else 1 for i in items)})
-
-    # 3. Dashboard source
-    dash_dir = REPO_DIR / "dashboard"
-    if dash_dir.exists():
-        items = _docs_build_folder_tree(dash_dir, "resonantos-augmentor/dashboard")
-        if items:
-            tree.append({"name": "dashboard", "type": "folder", "path": "resonantos-augmentor/dashboard", "icon": "📊", "children": items, "fileCount": sum(i.get("fileCount", 0) if i["type"] == "folder" else 1 for i in items)})
-
-    # 4. Reference
-    ref_dir = REPO_DIR / "reference"
-    if ref_dir.exists():
-        items = _docs_build_folder_tree(ref_dir, "resonantos-augmentor/reference")
-        if items:
-            tree.append({"name": "reference", "type": "folder", "path": "resonantos-augmentor/reference", "icon": "📚", "children": items, "fileCount": sum(i.get("fileCount", 0) if i["type"] == "folder" else 1 for i in items)})
-
-    # 5. Workspace root .md files (excluding system files)
-    root_docs = []
-    for f in sorted(DOCS_WORKSPACE.glob("*.md")):
-        if f.name not in WORKSPACE_SYSTEM_FILES:
-            try:
-                st = f.stat()
-                root_docs.append({"name": f.name, "type": "file", "path": f.name, "size": st.st_size, "modified": int(st.st_mtime * 1000)})
-            except Exception:
-                pass
-    if root_docs:
-        tree.append({"name": "workspace", "type": "folder", "path": "", "icon": "📄", "children": root_docs, "fileCount": len(root_docs)})
 
-    # 6. Memory folder
-    mem_dir = DOCS_WORKSPACE / "memory"
-    if mem_dir.exists():
-        items = _docs_build_folder_tree(mem_dir, "memory")
-        if items:
-            tree.append({"name": "memory", "type": "folder", "path": "memory", "icon": "🧠", "children": items, "fileCount": sum(i.get("fileCount", 0) if i["type"] == "folder" else 1 for i in items)})
+def _docs_build_source(name, root, icon, prefix, recursive):
+    """Build the tree node for one docs source, or None if it is empty."""
+    if not recursive:
+        # Workspace root .md files (excluding system files)
+        root_docs = []
+        for f in sorted(root.glob("*.md")):
+            if f.name not in WORKSPACE_SYSTEM_FILES:
+                try:
+                    st = f.stat()
+                    root_docs.append({"name": f.name, "type": "file", "path": f.name, "size": st.st_size, "modified": int(st.st_mtime * 1000)})
+                except Exception:
+                    pass
+        if not root_docs:
+            return None
+        return {"name": name, "type": "folder", "path": prefix, "icon": icon, "children": root_docs, "fileCount": len(root_docs)}
+    if not root.exists():
+        return None
+    items = _docs_build_folder_tree(root, prefix)
+    if not items:
+        return None
+    return {"name": name, "type": "folder", "path": prefix, "icon": icon, "children": items, "fileCount": sum(i.get("fileCount", 0) if i["type"] == "folder" else 1 for i in items)}
+
 
+def _docs_build_tree():
+    """Build full docs tree from workspace sources (served from the watcher cache)."""
+    tree = []
+    for source in _DOCS_TREE_SOURCES:
+        node = _fs_watcher.get(f"docs-tree:{source[0]}")
+        if node:
+            tree.append(node)
     return tree
 
 
@@ -1068,11 +1206,92 @@ def api_docs_open_editor():
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/api/docs/search")
-def api_docs_search():
-    q = request.args.get("q", "")
-    if len(q) < 2:
-        return jsonify({"results": [], "query": q, "count": 0})
+# Sources covered by docs search (REPO_DIR is ~/resonantos-augmentor, not inside workspace)
+_DOCS_SEARCH_ROOTS = [
+    DocsRoot(REPO_DIR / "docs", "resonantos-augmentor/docs"),
+    DocsRoot(REPO_DIR / "ssot", "resonantos-augmentor/ssot"),
+    DocsRoot(REPO_DIR / "reference", "resonantos-augmentor/reference"),
+    DocsRoot(DOCS_WORKSPACE / "memory", "memory"),
+    DocsRoot(DOCS_WORKSPACE, "", recursive=False, exclude=WORKSPACE_SYSTEM_FILES),
+]
+_DOCS_INDEX_DB = _DASHBOARD_DIR / "data" / "docs_index.db"
+_DOCS_SEMANTIC_ROOTS = _DOCS_SEARCH_ROOTS[:4]  # docs, ssot, reference, memory
+_docs_terms = DocsTermIndex(_DOCS_SEMANTIC_ROOTS)
+_docs_index = None
+_docs_index_lock = threading.Lock()
+
+
+def _get_docs_index():
+    """Lazily open the persistent docs index; None if SQLite can't host it."""
+    global _docs_index
+    if _docs_index is None:
+        with _docs_index_lock:
+            if _docs_index is None:
+                try:
+                    _docs_index = DocsIndex(_DOCS_INDEX_DB, _DOCS_SEARCH_ROOTS)
+                except Exception as e:
+                    print(f"[WARN] Docs search index unavailable: {e}")
+                    _docs_index = False
+    return _docs_index or None
+
+
+def _build_docs_index():
+    idx = _get_docs_index()
+    if idx is None:
+        return
+    try:
+        stats = idx.sync()
+        print(f"[OK] Docs index: {stats['files']} files in {stats['seconds']}s")
+    except Exception as e:
+        print(f"[WARN] Docs index build failed: {e}")
+
+
+def start_docs_index_builder(shared=True):
+    """Build the search indexes in the background. The SQLite line index is
+    shared by every worker, so only the leader (``shared``) builds it; the
+    term index lives in memory and each process builds its own."""
+    def _build_all():
+        if shared:
+            _build_docs_index()
+        _build_docs_terms()
+    threading.Thread(target=_build_all, daemon=True, name="docs-index").start()
+
+
+# ── Filesystem watcher: docs tree, SSoT layers and search index ──
+_fs_watcher = FsWatcher()
+for _src in _DOCS_TREE_SOURCES:
+    _fs_watcher.add_view(WatchedView(
+        f"docs-tree:{_src[0]}", [WatchedDir(_src[1], recursive=_src[4])],
+        lambda _src=_src: _docs_build_source(*_src),
+    ))
+
+
+def _on_docs_fs_event(path, is_directory):
+    if _docs_vectors is not None:
+        # Embedding can be slow; the vector worker thread picks these up.
+        if is_directory:
+            _docs_vectors.mark_stale()
+        elif path.endswith(".md"):
+            _docs_vectors.enqueue(path)
+    for idx in (_get_docs_index(), _docs_terms):
+        if idx is None:
+            continue
+        if is_directory:
+            idx.mark_stale()  # a moved/deleted folder takes its files with it
+        elif path.endswith(".md"):
+            idx.update_file(path)
+
+
+_fs_watcher.add_listener([WatchedDir(r.root, r.recursive) for r in _DOCS_SEARCH_ROOTS], _on_docs_fs_event)
+
+
+def start_fs_watcher():
+    if not _fs_watcher.start():
+        print(f"[WARN] Filesystem watcher not running ({_fs_watcher.error}); using mtime rescans")
+
+
+def _docs_search_scan(q):
+    """Legacy search: read every file. Used until the index is ready."""
     results = []
     search_term = q.lower()
 
@@ -1088,115 +1307,136 @@ def api_docs_search():
                     if len(matches) >= 5:
                         break
             if matches:
-                title = fp.stem
-                for line in content.split("\n")[:10]:
-                    if line.startswith("# "):
-                        title = line[2:].strip()
-                        break
+                title = extract_title(lines, fp.stem)
                 results.append({"path": rel_path, "name": fp.name, "title": title, "matches": matches, "matchCount": len(matches)})
         except Exception:
             pass
 
-    # Search all browsable sources (REPO_DIR is ~/resonantos-augmentor, not inside workspace)
-    search_roots = [
-        (REPO_DIR / "docs", "resonantos-augmentor/docs"),
-        (REPO_DIR / "ssot", "resonantos-augmentor/ssot"),
-        (REPO_DIR / "reference", "resonantos-augmentor/reference"),
-        (DOCS_WORKSPACE / "memory", "memory"),
-    ]
-    for root, prefix in search_roots:
-        if root.exists():
-            for fp in root.rglob("*.md"):
-                if len(results) >= 30:
-                    break
-                _search_file(fp, f"{prefix}/{fp.relative_to(root)}")
-
-    # Root workspace docs
-    for fp in DOCS_WORKSPACE.glob("*.md"):
-        if len(results) >= 30:
-            break
-        if fp.name not in WORKSPACE_SYSTEM_FILES:
-            _search_file(fp, fp.name)
+    for root in _DOCS_SEARCH_ROOTS:
+        for fp in root.iter_files():
+            if len(results) >= 30:
+                break
+            _search_file(fp, root.rel_path(fp))
 
     results.sort(key=lambda x: x["matchCount"], reverse=True)
-    return jsonify({"results": results, "query": q, "count": len(results)})
-
+    return results
 
-@app.route("/api/docs/search/semantic")
-def api_docs_search_semantic():
-    import re
-    from difflib import SequenceMatcher
 
+@app.route("/api/docs/search")
+def api_docs_search():
     q = request.args.get("q", "")
     if len(q) < 2:
         return jsonify({"results": [], "query": q, "count": 0})
+    idx = _get_docs_index()
+    if idx is not None and idx.ready:
+        try:
+            # Live events keep the index current; otherwise rescan by mtime.
+            idx.sync_if_stale(float("inf") if _fs_watcher.running else None)
+            results = idx.search(q)
+            return jsonify({"results": results, "query": q, "count": len(results), "indexed": True})
+        except Exception as e:
+            print(f"[WARN] Docs index search failed, scanning: {e}")
+    results = _docs_search_scan(q)
+    return jsonify({"results": results, "query": q, "count": len(results)})
+
+
+def _build_docs_terms():
+    try:
+        stats = _docs_terms.sync()
+        print(f"[OK] Docs term index: {stats['files']} files")
+    except Exception as e:
+        print(f"[WARN] Docs term index build failed: {e}")
+
+
+def _docs_semantic_scan(q):
+    """Legacy semantic search: score every file. Used until the term index is ready."""
     results = []
-    query_words = q.lower().split()
-
-    def _relevance(content, fpath):
-        cl = content.lower()
-        fl = fpath.lower()
-        score = 0.0
-        if q.lower() in cl:
-            score += 50.0
-        wf = sum(1 for w in query_words if w in cl)
-        score += (wf / len(query_words)) * 30.0
-        score += sum(1 for w in query_words if w in fl) * 10.0
-        for word in query_words:
-            if word in cl:
-                for m in re.finditer(re.escape(word), cl):
-                    nearby = cl[max(0, m.start() - 100):m.start() + 100]
-                    score += sum(1 for w in query_words if w in nearby) * 2.0
-        for word in query_words:
-            for cw in set(re.findall(r"\b\w+\b", cl)):
-                if len(cw) > 3:
-                    r = SequenceMatcher(None, word, cw).ratio()
-                    if 0.8 < r < 1.0:
-                        score += r * 5.0
-        return score
-
-    def _snippet(content):
-        lines = content.split("\n")
-        best_i, best_s = 0, 0
-        for i, line in enumerate(lines):
-            ll = line.lower()
-            s = sum(1 for w in query_words if w in ll)
-            if q.lower() in ll:
-                s += 5
-            if s > best_s:
-                best_s = s
-                best_i = i
-        start, end = max(0, best_i - 1), min(len(lines), best_i + 3)
-        snip = "\n".join(lines[start:end])[:300]
-        return snip, best_i + 1
-
-    search_roots = [
-        ("resonantos-augmentor/docs", REPO_DIR / "docs"),
-        ("resonantos-augmentor/ssot", REPO_DIR / "ssot"),
-        ("resonantos-augmentor/reference", REPO_DIR / "reference"),
-        ("memory", DOCS_WORKSPACE / "memory"),
-    ]
-    for prefix, root in search_roots:
-        if not root.exists():
-            continue
-        for fp in root.rglob("*.md"):
+    for root in _DOCS_SEMANTIC_ROOTS:
+        for fp in root.iter_files():
             try:
                 content = fp.read_text(errors="replace")
-                rel = f"{prefix}/{fp.relative_to(root)}"
-                score = _relevance(content, rel)
+                rel = root.rel_path(fp)
+                score = legacy_relevance(q, content, rel)
                 if score < 5.0:
                     continue
-                snip, ln = _snippet(content)
-                title = fp.stem
-                for line in content.split("\n")[:5]:
-                    if line.startswith("# "):
-                        title = line[2:].strip()
-                        break
+                snip, ln = best_snippet(content, q)
+                title = extract_title(content.split("\n"), fp.stem, max_lines=5)
                 results.append({"path": rel, "name": fp.name, "title": title, "matches": [{"line": ln, "text": snip[:200], "snippet": snip}], "matchCount": 1, "score": round(score, 2)})
             except Exception:
                 continue
     results.sort(key=lambda x: x["score"], reverse=True)
-    return jsonify({"query": q, "mode": "semantic", "results": results[:20], "count": len(results)})
+    return results[:20], len(results)
+
+
+# Vector search: chunk embeddings with an on-disk cache (docs_vectors.py).
+# config.json "docsSearch": {"vector": true, "embedder": {"type": "ollama", "model": "nomic-embed-text"}}
+_DOCS_SEARCH_CFG = _CFG.get("docsSearch", {}) if isinstance(_CFG.get("docsSearch"), dict) else {}
+_DOCS_VECTORS_DB = _DASHBOARD_DIR / "data" / "docs_vectors.db"
+_docs_vectors = None
+if _DOCS_SEARCH_CFG.get("vector", True):
+    try:
+        _docs_vectors = DocsVectorIndex(_DOCS_VECTORS_DB, _DOCS_SEMANTIC_ROOTS,
+                                        make_embedder(_DOCS_SEARCH_CFG.get("embedder")))
+    except Exception as e:
+        print(f"[WARN] Docs vector search disabled: {e}")
+
+
+def start_docs_vector_worker(leader=True):
+    """The leader embeds; other workers load its vectors from the shared
+    cache after each ``docs.vectors`` event (see ``DocsVectorIndex.run_follower``)."""
+    if _docs_vectors is None:
+        return
+    if leader:
+        target = lambda: _docs_vectors.run_worker(on_update=lambda: _events.publish("docs.vectors", None))
+    else:
+        target = lambda: _docs_vectors.run_follower(lambda: _BACKGROUND_ROLE == "follower")
+    threading.Thread(target=target, daemon=True, name="docs-vectors").start()
+
+
+def _on_docs_vectors_event(topic, data):
+    if _docs_vectors is not None and _BACKGROUND_ROLE == "follower":
+        _docs_vectors.mark_stale()
+
+
+_events.add_listener(["docs.vectors"], _on_docs_vectors_event)
+
+
+def _docs_vector_results(q):
+    results = []
+    for score, chunk in _docs_vectors.search(q, k=20):
+        if score <= 0:
+            break
+        snip, ln = best_snippet(chunk.text, q)
+        results.append({"path": chunk.path, "name": chunk.name, "title": chunk.title, "matches": [{"line": chunk.line + ln - 1, "text": snip[:200], "snippet": snip}], "matchCount": 1, "score": round(score, 4)})
+    return results
+
+
+@app.route("/api/docs/search/semantic")
+def api_docs_search_semantic():
+    q = request.args.get("q", "")
+    if len(q) < 2 or not q.split():
+        return jsonify({"results": [], "query": q, "count": 0})
+    if request.args.get("mode") != "lexical" and _docs_vectors is not None and _docs_vectors.ready:
+        try:
+            results = _docs_vector_results(q)
+            return jsonify({"query": q, "mode": "vector", "embedder": _docs_vectors.embedder.name, "results": results, "count": len(results)})
+        except Exception as e:
+            print(f"[WARN] Vector search failed, using lexical scorer: {e}")
+    if not _docs_terms.ready:
+        results, count = _docs_semantic_scan(q)
+        return jsonify({"query": q, "mode": "semantic", "results": results, "count": count})
+
+    _docs_terms.sync_if_stale(float("inf") if _fs_watcher.running else None)
+    scored = _docs_terms.search(q)
+    results = []
+    for score, doc in scored[:20]:
+        try:
+            content = doc.file.read_text(errors="replace")
+        except Exception:
+            content = doc.text
+        snip, ln = best_snippet(content, q)
+        results.append({"path": doc.path, "name": doc.name, "title": doc.title, "matches": [{"line": ln, "text": snip[:200], "snippet": snip}], "matchCount": 1, "score": round(score, 2)})
+    return jsonify({"query": q, "mode": "semantic", "results": results, "count": len(scored)})
 
 
 # ---------------------------------------------------------------------------
@@ -1225,24 +1465,27 @@ def api_wallet():
         
         balances = {}
         
-        # Get SOL balance
+        # SOL balance + token accounts for both programs in one batch request
+        programs = [spl_program, token22_program]
+        try:
+            sol_result, *program_results = _solana_rpc_batch(network, [
+                ("getBalance", [address]),
+                *(("getTokenAccountsByOwner", [address, {"programId": program}, {"encoding": "jsonParsed"}])
+                  for program in programs),
+            ])
+        except Exception as e:
+            print(f"Error querying wallet balances: {e}")
+            sol_result, program_results = {}, [{} for _ in programs]
+
         try:
-            sol_result = _solana_rpc(network, "getBalance", [address])
             sol_balance = sol_result.get("result", {}).get("value", 0) / 1e9
             balances["SOL"] = {"balance": sol_balance, "decimals": 9}
         except Exception as e:
             print(f"Error getting SOL balance: {e}")
             balances["SOL"] = {"balance": 0, "decimals": 9}
         
-        # Query token accounts for both programs
-        for program in [spl_program, token22_program]:
+        for program, result in zip(programs, program_results):
             try:
-                result = _solana_rpc(network, "getTokenAccountsByOwner", [
-                    address,
-                    {"programId": program},
-                    {"encoding": "jsonParsed"}
-                ])
-                
                 for account in result.get("result", {}).get("value", []):
                     parsed = account.get("account", {}).get("data", {}).get("parsed", {}).get("info", {})
                     mint = parsed.get("mint")
@@ -1392,10 +1635,11 @@ def api_wallet_mint_nft():
         
         # Record RCT mint for cap tracking
         _record_rct_mint(recipient, reward["rct"])
+        _note_tokens_minted(network, recipient, pda_address, _RCT_MINT, _RES_MINT)
         
         # Update NFT registry for display name resolution
         try:
-            reg_path = str(_DASHBOARD_DIR / "data" / "nft_registry.json")
+            reg_path = str(_NFT_REGISTRY_FILE)
             registry = {}
             if os.path.exists(reg_path):
                 with open(reg_path) as rf:
@@ -1500,12 +1744,11 @@ def api_wallet_build_transfer_tx():
         mint = _Pubkey.from_string(mint_str)
         token_prog = _Pubkey.from_string(token_prog_str)
 
-        pda, bump = _Pubkey.find_program_address(
-            [b"symbiotic", bytes(human), bytes([0])], program_id
-        )
+        pda_str, bump = _find_pda([b"symbiotic", bytes(human), bytes([0])], program_id)
+        pda = _Pubkey.from_string(pda_str)
 
         # Verify symbiotic pair exists on-chain and is active
-        pair_info = _solana_rpc(network, "getAccountInfo", [str(pda), {"encoding": "base64"}])
+        pair_info = _solana_rpc(network, "getAccountInfo", [str(pda), {"encoding": "base64"}], ttl=0)
         pair_val = pair_info.get("result", {}).get("value") if isinstance(pair_info, dict) else None
         if not pair_val:
             return jsonify({"error": "Symbiotic wallet not initialized. Create Symbiotic Wallet first."}), 400
@@ -1525,9 +1768,8 @@ def api_wallet_build_transfer_tx():
             pass
 
         # Derive ATAs
-        from spl.token.instructions import get_associated_token_address
-        from_ata = get_associated_token_address(pda, mint, token_prog)
-        to_ata = get_associated_token_address(recipient_pk, mint, token_prog)
+        from_ata = _Pubkey.from_string(_find_ata(pda, mint, token_prog))
+        to_ata = _Pubkey.from_string(_find_ata(recipient_pk, mint, token_prog))
 
         # Build transfer_out instruction
         disc = _hl.sha256(b"global:transfer_out").digest()[:8]
@@ -1738,6 +1980,7 @@ def api_wallet_daily_claim():
         }
         _save_daily_claims(claims)
         _record_rct_mint(recipient, 1)
+        _note_tokens_minted(network, recipient, pda_address, _RCT_MINT, _RES_MINT)
         
         return jsonify({
             "success": True,
@@ -1769,7 +2012,7 @@ def api_wallet_onboarding_status():
         pda_address = _derive_symbiotic_pda(address)
         pair_exists = False
         try:
-            pair_info = _solana_rpc(network, "getAccountInfo", [pda_address, {"encoding": "base64"}])
+            pair_info = _solana_rpc(network, "getAccountInfo", [pda_address, {"encoding": "base64"}], ttl=0)
             pair_exists = pair_info.get("result", {}).get("value") is not None
         except Exception:
             pair_exists = False
@@ -1901,6 +2144,7 @@ def api_wallet_sign_license():
         if nft_result.get("mint"):
             onboarding[address]["licenseNft"] = nft_result["mint"]
             _save_onboarding(onboarding)
+        _invalidate_rpc_cache(address, pda_address)
         
         return jsonify({
             "success": True,
@@ -1971,6 +2215,7 @@ def api_wallet_sign_manifesto():
         if nft_result.get("mint"):
             onboarding[address]["manifestoNft"] = nft_result["mint"]
             _save_onboarding(onboarding)
+        _invalidate_rpc_cache(address, pda_address)
         
         return jsonify({
             "success": True,
@@ -1996,15 +2241,21 @@ def api_wallet_reputation():
         
         reputation = {"address": address, "network": network, "categories": {}}
         
-        # Query REX token balances
-        for category, mint in _REX_MINTS.items():
+        # Query all REX token balances in one batch request
+        try:
+            results = _solana_rpc_batch(network, [
+                ("getTokenAccountsByOwner", [address, {"mint": mint}, {"encoding": "jsonParsed"}])
+                for mint in _REX_MINTS.values()
+            ])
+        except Exception as e:
+            print(f"Error querying REX balances: {e}")
+            results = [None] * len(_REX_MINTS)
+
+        for (category, mint), result in zip(_REX_MINTS.items(), results):
             try:
-                result = _solana_rpc(network, "getTokenAccountsByOwner", [
-                    address,
-                    {"mint": mint},
-                    {"encoding": "jsonParsed"}
-                ])
-                
+                if result is None or "error" in result:
+                    raise RuntimeError((result or {}).get("error", "RPC unavailable"))
+
                 balance = 0
                 for account in result.get("result", {}).get("value", []):
                     parsed = account.get("account", {}).get("data", {}).get("parsed", {}).get("info", {})
@@ -2098,6 +2349,7 @@ def api_wallet_grant_xp():
         
         # Record RCT mint
         _record_rct_mint(recipient, 10)
+        _note_tokens_minted(network, recipient, pda_address, _REX_MINTS[category], _RCT_MINT)
         
         return jsonify({
             "success": True,
@@ -2116,106 +2368,239 @@ def api_wallet_grant_xp():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/wallet/leaderboard")
-def api_wallet_leaderboard():
-    """Rankings by RCT and REX categories — only Identity NFT holders."""
+# ── Leaderboard: materialized in the background, served from memory ──
+# Rankings need getTokenLargestAccounts per mint, the owner of every ranked
+# token account and the PDA of every identity holder; far too much to do per
+# page view. A builder thread refreshes a per-network snapshot on an interval
+# and whenever tokens are minted, persisting it so restarts serve instantly.
+_LEADERBOARD_CFG = {"refreshSeconds": 300, "networks": ["devnet"], **_CFG.get("leaderboard", {})}
+_LEADERBOARD_FILE = _DASHBOARD_DIR / "data" / "leaderboard.json"
+_LEADERBOARD_SIZES = {"overall": 10, "category": 5}
+_leaderboards = {}  # network -> snapshot
+_leaderboard_ata_owners = {}  # network -> {token account: owner}; owners never change
+_leaderboard_lock = threading.Lock()
+_leaderboard_wake = threading.Event()
+_leaderboard_pending = set()  # networks to rebuild on the next wake-up
+_LEADERBOARD_STARTED = False
+
+
+def _load_leaderboard_snapshots():
+    try:
+        data = json.loads(_LEADERBOARD_FILE.read_text())
+    except Exception:
+        return
+    with _leaderboard_lock:
+        _leaderboards.update(data.get("snapshots", {}))
+        for network, owners in data.get("ataOwners", {}).items():
+            _leaderboard_ata_owners.setdefault(network, {}).update(owners)
+
+
+def _save_leaderboard_snapshots():
+    with _leaderboard_lock:
+        data = {"snapshots": dict(_leaderboards), "ataOwners": {n: dict(o) for n, o in _leaderboard_ata_owners.items()}}
+    try:
+        _LEADERBOARD_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _LEADERBOARD_FILE.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, _LEADERBOARD_FILE)
+    except OSError as e:
+        print(f"[WARN] Could not persist leaderboard: {e}")
+
+
+def _resolve_token_account_owners(network, accounts):
+    """Owner of each token account via getMultipleAccounts (100 keys per call, one batch)."""
+    known = _leaderboard_ata_owners.setdefault(network, {})
+    missing = sorted({a for a in accounts if a not in known})
+    chunks = [missing[i:i + 100] for i in range(0, len(missing), 100)]
+    if chunks:
+        results = _solana_rpc_batch(network, [
+            ("getMultipleAccounts", [chunk, {"encoding": "jsonParsed"}]) for chunk in chunks
+        ], ttl=0)
+        for chunk, result in zip(chunks, results):
+            if "error" in result:
+                print(f"[WARN] getMultipleAccounts failed: {result['error']}")
+                continue
+            for ata, value in zip(chunk, (result.get("result") or {}).get("value") or []):
+                data = (value or {}).get("data")
+                owner = data.get("parsed", {}).get("info", {}).get("owner") if isinstance(data, dict) else None
+                if owner:
+                    known[ata] = owner
+    return {a: known.get(a, a) for a in accounts}
+
+
+def _level_for(balance):
+    level = 0
+    for i, threshold in enumerate(_LEVEL_THRESHOLDS):
+        if balance >= threshold:
+            level = i
+        else:
+            break
+    return level
+
+
+def _build_leaderboard(network, previous=None):
+    """Query chain state and rank identity holders; returns the snapshot.
+
+    A board whose mint query fails keeps its rankings from ``previous``;
+    if every query fails the refresh is abandoned (RuntimeError)."""
+    onboarding = _load_onboarding()
+    identity_holders = {addr for addr, data in onboarding.items() if data.get("identityNftMinted")}
+
+    # Tokens live on PDAs; map each back to its human wallet
+    pda_to_human = {pda: human for human, pda in _derive_symbiotic_pdas(identity_holders).items()}
+
+    boards = [("overall", _RCT_MINT, _RCT_DECIMALS, _LEADERBOARD_SIZES["overall"])] + [
+        (category, mint, 9, _LEADERBOARD_SIZES["category"]) for category, mint in _REX_MINTS.items()
+    ]
+    largest = {}
+    failed = set()
+    if identity_holders:
+        results = _solana_rpc_batch(network, [("getTokenLargestAccounts", [mint]) for _, mint, _, _ in boards], ttl=0)
+        for (_, mint, _, _), result in zip(boards, results):
+            if "error" in result:
+                print(f"Error getting largest accounts for {mint}: {result['error']}")
+                failed.add(mint)
+                continue
+            largest[mint] = (result.get("result") or {}).get("value", [])
+        if len(failed) == len(boards):
+            raise RuntimeError("every getTokenLargestAccounts query failed")
+
+    previous = previous or {}
+    kept = {"overall": previous.get("overall", [])}
+    for category in _REX_MINTS:
+        kept[category] = ((previous.get("categories") or {}).get(category) or {}).get("rankings", [])
+
+    ranked = {}
+    for name, mint, decimals, max_entries in boards:
+        ranked[name] = []
+        for account in largest.get(mint, []):
+            amount = account.get("amount")
+            dec = account.get("decimals", decimals)
+            balance = int(amount) / (10 ** dec) if amount else 0
+            if balance > 0:
+                ranked[name].append((account.get("address"), balance))
+    owners = _resolve_token_account_owners(network, [ata for accounts in ranked.values() for ata, _ in accounts])
+
+    def _board(name, mint, max_entries):
+        if mint in failed:
+            return kept[name]
+        board = []
+        for ata, balance in ranked[name]:
+            if len(board) >= max_entries:
+                break
+            owner = owners.get(ata, ata)
+            # Owner could be a PDA that maps to an identity holder, or the
+            # holder's own wallet; anyone else is left off the board
+            display_addr = pda_to_human.get(owner) or (owner if owner in identity_holders else None)
+            if display_addr is None:
+                continue
+            board.append({"rank": len(board) + 1, "address": display_addr,
+                          "balance": balance, "level": _level_for(balance)})
+        return board
+
+    return {
+        "network": network,
+        "overall": _board("overall", _RCT_MINT, _LEADERBOARD_SIZES["overall"]),
+        "categories": {
+            category: {"display": _REX_DISPLAY[category],
+                       "rankings": _board(category, mint, _LEADERBOARD_SIZES["category"])}
+            for category, mint in _REX_MINTS.items()
+        },
+        "identityHolders": len(identity_holders),
+        "generatedAt": _utc_now_iso(),
+    }
+
+
+def _refresh_leaderboard(network):
+    with _leaderboard_lock:
+        previous = _leaderboards.get(network)
     try:
-        network = request.args.get("network", "devnet")
-        
-        leaderboard = {"network": network, "overall": [], "categories": {}}
-        
-        # Load onboarding data — only include users with Identity NFT
-        onboarding = _load_onboarding()
-        identity_holders = {
-            addr for addr, data in onboarding.items()
-            if data.get("identityNftMinted")
-        }
+        snapshot = _build_leaderboard(network, previous)
+    except Exception as e:
+        print(f"[WARN] Leaderboard refresh failed for {network}: {e}")
+        return None
+    with _leaderboard_lock:
+        _leaderboards[network] = snapshot
+    _save_leaderboard_snapshots()
+    _events.publish("wallet.leaderboard", {"network": network, "generatedAt": snapshot["generatedAt"]})
+    return snapshot
 
-        # Build PDA→human mapping for all identity holders
-        pda_to_human = {}
-        for human_addr in identity_holders:
-            try:
-                pda = _derive_symbiotic_pda(human_addr)
-                pda_to_human[pda] = human_addr
-            except Exception:
-                pass
 
-        # Helper: resolve token account (ATA) → owner address
-        def _resolve_owner(network, ata_address):
-            try:
-                info = _solana_rpc(network, "getAccountInfo", [
-                    ata_address, {"encoding": "jsonParsed"}
-                ])
-                parsed = (info.get("result", {}).get("value", {})
-                          .get("data", {}).get("parsed", {})
-                          .get("info", {}))
-                return parsed.get("owner", ata_address)
-            except Exception:
-                return ata_address
+def _request_leaderboard_refresh(network="devnet"):
+    """Rebuild soon (debounced by the builder thread), e.g. after a mint."""
+    with _leaderboard_lock:
+        _leaderboard_pending.add(network)
+    _leaderboard_wake.set()
 
-        # Helper: build ranked list — tokens live on PDAs now
-        def _build_board(mint, decimals, max_entries):
-            if not identity_holders:
-                return []
-            try:
-                result = _solana_rpc(network, "getTokenLargestAccounts", [mint])
-                accounts = result.get("result", {}).get("value", [])
-            except Exception as e:
-                print(f"Error getting largest accounts for {mint}: {e}")
-                return []
 
-            board = []
-            for account in accounts:
-                if len(board) >= max_entries:
-                    break
+def _note_tokens_minted(network, *addresses):
+    """After an on-chain write: drop cached reads and re-rank the leaderboard,
+    in every worker (``wallet.minted`` goes out over the event relay)."""
+    _events.publish("wallet.minted", {"network": network, "addresses": list(addresses)})
 
-                ata = account.get("address")
-                amount = account.get("amount")
-                dec = account.get("decimals", decimals)
-                balance = int(amount) / (10 ** dec) if amount else 0
-                if balance <= 0:
-                    continue
 
-                owner = _resolve_owner(network, ata)
+def _on_tokens_minted(topic, data):
+    if not isinstance(data, dict):
+        return
+    _invalidate_rpc_cache(*data.get("addresses", []))
+    # Only the builder's process has a worker to wake
+    if _LEADERBOARD_STARTED:
+        _request_leaderboard_refresh(data.get("network", "devnet"))
 
-                # Owner could be a PDA or a human wallet
-                # Accept if owner IS an identity holder (human wallet)
-                # OR if owner is a PDA that maps to an identity holder
-                human_addr = pda_to_human.get(owner)
-                if human_addr:
-                    display_addr = human_addr  # show human wallet, not PDA
-                elif owner in identity_holders:
-                    display_addr = owner
-                else:
-                    continue  # skip non-identity-holder wallets
 
-                level = 0
-                for j, threshold in enumerate(_LEVEL_THRESHOLDS):
-                    if balance >= threshold:
-                        level = j
-                    else:
-                        break
+def _leaderboard_worker():
+    interval = max(10, float(_LEADERBOARD_CFG["refreshSeconds"]))
+    next_full = 0.0
+    while True:
+        _leaderboard_wake.wait(timeout=max(0.0, next_full - time.time()))
+        _leaderboard_wake.clear()
+        time.sleep(2)  # coalesce bursts of mint events
+        with _leaderboard_lock:
+            networks = set(_leaderboard_pending)
+            _leaderboard_pending.clear()
+        if time.time() >= next_full:
+            networks |= set(_LEADERBOARD_CFG["networks"]) | set(_leaderboards)
+            next_full = time.time() + interval
+        for network in sorted(networks):
+            _refresh_leaderboard(network)
+
+
+def start_leaderboard_builder():
+    global _LEADERBOARD_STARTED
+    if _LEADERBOARD_STARTED:
+        return
+    _LEADERBOARD_STARTED = True
+    _load_leaderboard_snapshots()
+    threading.Thread(target=_leaderboard_worker, daemon=True, name="leaderboard").start()
+
+
+def _on_leaderboard_event(topic, data):
+    # Workers without the builder pick up the snapshot it just persisted
+    if not _LEADERBOARD_STARTED:
+        _load_leaderboard_snapshots()
+
+
+_events.add_listener(["wallet.leaderboard"], _on_leaderboard_event)
+_events.add_listener(["wallet.minted"], _on_tokens_minted)
+
+
+@app.route("/api/wallet/leaderboard")
+def api_wallet_leaderboard():
+    """Rankings by RCT and REX categories — only Identity NFT holders."""
+    try:
+        network = request.args.get("network", "devnet")
+        if network not in _SOLANA_RPCS:
+            return jsonify({"error": f"Unknown network: {network}"}), 400
+        with _leaderboard_lock:
+            snapshot = _leaderboards.get(network)
+        if snapshot is None:
+            # First request for this network: build once inline, then the
+            # background thread keeps it fresh.
+            snapshot = _refresh_leaderboard(network)
+            if snapshot is None:
+                return jsonify({"error": "Leaderboard unavailable"}), 503
+        return jsonify(snapshot)
 
-                board.append({
-                    "rank": len(board) + 1,
-                    "address": display_addr,
-                    "balance": balance,
-                    "level": level
-                })
-            return board
-        
-        # Overall RCT leaderboard
-        leaderboard["overall"] = _build_board(_RCT_MINT, _RCT_DECIMALS, 10)
-        
-        # REX category leaderboards
-        for category, mint in _REX_MINTS.items():
-            leaderboard["categories"][category] = {
-                "display": _REX_DISPLAY[category],
-                "rankings": _build_board(mint, 9, 5)
-            }
-        
-        return jsonify(leaderboard)
-        
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
@@ -2861,15 +3246,8 @@ def api_protocol_store_purchase():
         if price_res > 0:
             from solders.pubkey import Pubkey as _Pk
             from solana.rpc.api import Client as _Cl
-            program_id = _Pk.from_string(_SYMBIOTIC_PROGRAM_ID)
-            human_pk = _Pk.from_string(wallet_address)
-            pda, _ = _Pk.find_program_address(
-                [b"symbiotic", bytes(human_pk), bytes([0])], program_id
-            )
-            res_mint = _Pk.from_string(_RES_MINT)
-            res_prog = _Pk.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
-            from spl.token.instructions import get_associated_token_address
-            pda_ata = get_associated_token_address(pda, res_mint, res_prog)
+            pda = _derive_symbiotic_pda(wallet_address)
+            pda_ata = _Pk.from_string(_find_ata(pda, _RES_MINT, "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"))
             rpcs = {"devnet": "https://api.devnet.solana.com"}
             cl = _Cl(rpcs.get(network, network))
             ata_info = cl.get_account_info_json_parsed(pda_ata)
@@ -2912,6 +3290,7 @@ def api_protocol_store_purchase():
             mints[wallet_address] = {}
         mints[wallet_address][protocol_id] = result["mint"]
         _save_protocol_mints(mints)
+        _invalidate_rpc_cache(wallet_address)
 
         return jsonify({
             "success": True,
@@ -3142,6 +3521,122 @@ The philosophy of symbiotic human-AI collaboration.
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+# ── Owned NFTs: mint → NFT type index ──
+# Built once from onboarding records and nft_registry.json, rebuilt when
+# either file changes (stat check per request); mints neither file knows are
+# identified from on-chain Token-2022 metadata, fetched in bulk and cached.
+_NFT_REGISTRY_FILE = _DASHBOARD_DIR / "data" / "nft_registry.json"
+_NFT_DISPLAY = {
+    "identity": {"name": "Augmentor Identity", "tag": "AI Agent NFT", "img": "/static/img/nfts/ai-identity.png"},
+    "alpha": {"name": "AI Artisan Alpha Tester", "tag": "Early Adopter", "img": "/static/img/nfts/alpha-tester.png"},
+    "license": {"name": "Symbiotic License", "tag": "Co-signed Agreement", "img": "/static/img/nfts/symbiotic-license.png"},
+    "manifesto": {"name": "Augmentatism Manifesto", "tag": "Co-signed Commitment", "img": "/static/img/nfts/manifesto.png"},
+    "founder": {"name": "ResonantOS Founder", "tag": "Founder", "img": "/static/img/nfts/founder.png"},
+    "dao_genesis": {"name": "DAO Genesis", "tag": "Genesis", "img": "/static/img/nfts/dao-genesis.png"},
+}
+# Onboarding record fields holding a mint, in match priority order
+_NFT_ONBOARDING_FIELDS = [
+    ("licenseNft", "license"), ("manifestoNft", "manifesto"),
+    ("identityNft", "identity"), ("identityNftMint", "identity"),
+    ("alphaNft", "alpha"), ("alphaNftMint", "alpha"),
+]
+# Known on-chain metadata names → display info
+_NFT_ONCHAIN_NAMES = {
+    "Augmentor Identity": _NFT_DISPLAY["identity"],
+    "AI Artisan — Alpha Tester": _NFT_DISPLAY["alpha"],
+    "AI Artisan — Alpha": _NFT_DISPLAY["alpha"],
+    "Symbiotic License Agreement": _NFT_DISPLAY["license"],
+    "Augmentatism Manifesto": _NFT_DISPLAY["manifesto"],
+    "ResonantOS Founder": _NFT_DISPLAY["founder"],
+    "Resonant Economy DAO Genesis": _NFT_DISPLAY["dao_genesis"],
+}
+_NFT_UNKNOWN_TTL = 300  # mints without metadata yet (metadata is set after the mint is created)
+_nft_index_lock = threading.Lock()
+_nft_index = {"stamp": None, "mints": {}}  # mint -> display info
+_nft_onchain = {}  # (network, mint) -> (display info | None, expires)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _nft_type_index():
+    """mint → display info from onboarding records + nft_registry.json."""
+    stamp = (_file_stamp(_ONBOARDING_FILE), _file_stamp(_NFT_REGISTRY_FILE))
+    with _nft_index_lock:
+        if _nft_index["stamp"] == stamp:
+            return _nft_index["mints"]
+    mints = {}
+    try:
+        registry = json.loads(_NFT_REGISTRY_FILE.read_text()) if stamp[1] else {}
+    except Exception as e:
+        print(f"Error reading nft_registry: {e}")
+        registry = {}
+    for mint, type_key in registry.items():
+        if type_key in _NFT_DISPLAY:
+            mints[mint] = _NFT_DISPLAY[type_key]
+    # Onboarding records take precedence over the registry
+    for record in _load_onboarding().values():
+        for field, type_key in _NFT_ONBOARDING_FIELDS:
+            mint = record.get(field) if isinstance(record, dict) else None
+            if isinstance(mint, str) and mint:
+                mints[mint] = _NFT_DISPLAY[type_key]
+    with _nft_index_lock:
+        _nft_index.update(stamp=stamp, mints=mints)
+    return mints
+
+
+def _nft_display_from_metadata(account):
+    """Display info from a Token-2022 mint account's tokenMetadata extension."""
+    data = (account or {}).get("data")
+    if not isinstance(data, dict):
+        return None
+    for ext in data.get("parsed", {}).get("info", {}).get("extensions", []):
+        if ext.get("extension") != "tokenMetadata":
+            continue
+        onchain_name = ext.get("state", {}).get("name", "").strip().rstrip("\x00")
+        if not onchain_name:
+            return None
+        for known_name, info in _NFT_ONCHAIN_NAMES.items():
+            if known_name.lower() in onchain_name.lower() or onchain_name.lower() in known_name.lower():
+                return info
+        return {"name": onchain_name}
+    return None
+
+
+def _nft_onchain_displays(network, mints):
+    """Resolve mints from on-chain metadata; misses go out as one getMultipleAccounts batch."""
+    now = time.time()
+    out, missing = {}, []
+    for mint in mints:
+        cached = _nft_onchain.get((network, mint))
+        if cached is not None and cached[1] > now:
+            out[mint] = cached[0]
+        else:
+            missing.append(mint)
+    chunks = [missing[i:i + 100] for i in range(0, len(missing), 100)]
+    if chunks:
+        results = _solana_rpc_batch(network, [
+            ("getMultipleAccounts", [chunk, {"encoding": "jsonParsed"}]) for chunk in chunks
+        ], ttl=0)
+        if len(_nft_onchain) > 10000:
+            _nft_onchain.clear()
+        for chunk, result in zip(chunks, results):
+            if "error" in result:
+                print(f"Error reading mint metadata: {result['error']}")
+                continue
+            for mint, account in zip(chunk, (result.get("result") or {}).get("value") or []):
+                info = _nft_display_from_metadata(account)
+                # Metadata never changes once set, so found names are kept for good
+                _nft_onchain[(network, mint)] = (info, float("inf") if info else now + _NFT_UNKNOWN_TTL)
+                out[mint] = info
+    return out
+
+
 @app.route("/api/wallet/owned-nfts")
 def api_wallet_owned_nfts():
     """Return NFTs owned by address."""
@@ -3162,108 +3657,35 @@ def api_wallet_owned_nfts():
                 {"encoding": "jsonParsed"}
             ])
             
+            owned = []
             for account in result.get("result", {}).get("value", []):
                 parsed = account.get("account", {}).get("data", {}).get("parsed", {}).get("info", {})
-                mint = parsed.get("mint")
                 token_amount = parsed.get("tokenAmount", {})
                 amount = float(token_amount.get("amount", 0))
-                
-                if amount > 0 and int(token_amount.get("decimals", 0)) == 0:
-                    # Check onboarding records to identify NFT type by mint
-                    onboarding = _load_onboarding()
-                    nft_data = {
-                        "mint": mint,
-                        "name": f"NFT {mint[:8]}...",
-                        "tag": "Soulbound",
-                        "img": None,
-                        "soulbound": True
-                    }
-                    
-                    # Match mint against known NFT mints from onboarding records
-                    matched = False
-                    for addr, record in onboarding.items():
-                        if record.get("licenseNft") == mint:
-                            nft_data.update({"name": "Symbiotic License", "tag": "Co-signed Agreement", "img": "/static/img/nfts/symbiotic-license.png"})
-                            matched = True; break
-                        elif record.get("manifestoNft") == mint:
-                            nft_data.update({"name": "Augmentatism Manifesto", "tag": "Co-signed Commitment", "img": "/static/img/nfts/manifesto.png"})
-                            matched = True; break
-                        elif record.get("identityNft") == mint or record.get("identityNftMint") == mint:
-                            nft_data.update({"name": "Augmentor Identity", "tag": "AI Agent NFT", "img": "/static/img/nfts/ai-identity.png"})
-                            matched = True; break
-                        elif record.get("alphaNft") == mint or record.get("alphaNftMint") == mint:
-                            nft_data.update({"name": "AI Artisan Alpha Tester", "tag": "Early Adopter", "img": "/static/img/nfts/alpha-tester.png"})
-                            matched = True; break
-                    
-                    # Fallback 0: check nft_registry.json
-                    if not matched:
-                        try:
-                            reg_path = str(_DASHBOARD_DIR / "data" / "nft_registry.json")
-                            if os.path.exists(reg_path):
-                                with open(reg_path) as rf:
-                                    registry = json.load(rf)
-                                nft_type_key = registry.get(mint)
-                                if nft_type_key:
-                                    _type_display = {
-                                        "identity": {"name": "Augmentor Identity", "tag": "AI Agent NFT", "img": "/static/img/nfts/ai-identity.png"},
-                                        "alpha": {"name": "AI Artisan Alpha Tester", "tag": "Early Adopter", "img": "/static/img/nfts/alpha-tester.png"},
-                                        "license": {"name": "Symbiotic License", "tag": "Co-signed Agreement", "img": "/static/img/nfts/symbiotic-license.png"},
-                                        "manifesto": {"name": "Augmentatism Manifesto", "tag": "Co-signed Commitment", "img": "/static/img/nfts/manifesto.png"},
-                                        "founder": {"name": "ResonantOS Founder", "tag": "Founder", "img": "/static/img/nfts/founder.png"},
-                                        "dao_genesis": {"name": "DAO Genesis", "tag": "Genesis", "img": "/static/img/nfts/dao-genesis.png"},
-                                    }
-                                    if nft_type_key in _type_display:
-                                        nft_data.update(_type_display[nft_type_key])
-                                        matched = True
-                        except Exception as e:
-                            print(f"Error reading nft_registry: {e}")
-
-                    # Fallback 1: try on-chain metadata
-                    if not matched:
-                        # Map known names to display info
-                        _name_map = {
-                            "Augmentor Identity": {"name": "Augmentor Identity", "tag": "AI Agent NFT", "img": "/static/img/nfts/ai-identity.png"},
-                            "AI Artisan — Alpha Tester": {"name": "AI Artisan Alpha Tester", "tag": "Early Adopter", "img": "/static/img/nfts/alpha-tester.png"},
-                            "AI Artisan — Alpha": {"name": "AI Artisan Alpha Tester", "tag": "Early Adopter", "img": "/static/img/nfts/alpha-tester.png"},
-                            "Symbiotic License Agreement": {"name": "Symbiotic License", "tag": "Co-signed Agreement", "img": "/static/img/nfts/symbiotic-license.png"},
-                            "Augmentatism Manifesto": {"name": "Augmentatism Manifesto", "tag": "Co-signed Commitment", "img": "/static/img/nfts/manifesto.png"},
-                            "ResonantOS Founder": {"name": "ResonantOS Founder", "tag": "Founder", "img": "/static/img/nfts/founder.png"},
-                            "Resonant Economy DAO Genesis": {"name": "DAO Genesis", "tag": "Genesis", "img": "/static/img/nfts/dao-genesis.png"},
-                        }
-                        # Try reading on-chain metadata from mint account
-                        try:
-                            mint_info = _solana_rpc(network, "getAccountInfo", [
-                                mint, {"encoding": "jsonParsed"}
-                            ])
-                            mint_data = mint_info.get("result", {}).get("value", {}).get("data", {})
-                            # Token-2022 parsed data may include extensions with metadata
-                            extensions = []
-                            if isinstance(mint_data, dict):
-                                parsed_info = mint_data.get("parsed", {}).get("info", {})
-                                extensions = parsed_info.get("extensions", [])
-                            for ext in extensions:
-                                if ext.get("extension") == "tokenMetadata":
-                                    state = ext.get("state", {})
-                                    onchain_name = state.get("name", "").strip().rstrip("\x00")
-                                    if onchain_name:
-                                        # Try matching against known names
-                                        for known_name, info in _name_map.items():
-                                            if known_name.lower() in onchain_name.lower() or onchain_name.lower() in known_name.lower():
-                                                nft_data.update(info)
-                                                matched = True
-                                                break
-                                        if not matched:
-                                            nft_data["name"] = onchain_name
-                                            matched = True
-                                    break
-                        except Exception as e:
-                            print(f"Error reading mint metadata for {mint}: {e}")
-                        
-                    if not matched:
-                        # Skip unidentified NFTs — only show recognized ones
-                        continue
-                    
-                    nfts.append(nft_data)
+                if amount > 0 and int(token_amount.get("decimals", 0)) == 0 and parsed.get("mint"):
+                    owned.append(parsed["mint"])
+
+            known = _nft_type_index()
+            unknown = [mint for mint in owned if mint not in known]
+            try:
+                onchain = _nft_onchain_displays(network, unknown) if unknown else {}
+            except Exception as e:
+                print(f"Error reading mint metadata: {e}")
+                onchain = {}
+
+            for mint in owned:
+                info = known.get(mint) or onchain.get(mint)
+                if not info:
+                    # Skip unidentified NFTs — only show recognized ones
+                    continue
+                nfts.append({
+                    "mint": mint,
+                    "name": f"NFT {mint[:8]}...",
+                    "tag": "Soulbound",
+                    "img": None,
+                    "soulbound": True,
+                    **info,
+                })
         except Exception as e:
             print(f"Error querying NFTs: {e}")
         
@@ -3294,14 +3716,60 @@ def _get_ai_pubkey_str():
     return _AI_WALLET_PUBKEY
 
 
+def _find_pda(seeds, program_id):
+    """(address, bump) for a PDA; memoized and persisted by pda_cache when available."""
+    if pda_cache is not None:
+        return pda_cache.find_program_address(seeds, program_id)
+    from solders.pubkey import Pubkey as _Pubkey
+    pda, bump = _Pubkey.find_program_address(seeds, _Pubkey.from_string(str(program_id)))
+    return str(pda), bump
+
+
+def _find_ata(owner, mint, token_program):
+    """Associated token account address (a PDA of the ATA program)."""
+    from solders.pubkey import Pubkey as _Pubkey
+    seeds = [bytes(_Pubkey.from_string(str(a))) for a in (owner, token_program, mint)]
+    return _find_pda(seeds, "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL")[0]
+
+
+def _symbiotic_seeds(human_pubkey_str):
+    from solders.pubkey import Pubkey as _Pubkey
+    return [b"symbiotic", bytes(_Pubkey.from_string(human_pubkey_str)), bytes([0])]
+
+
 def _derive_symbiotic_pda(human_pubkey_str):
     """Derive the Symbiotic PDA address for a human wallet."""
-    from solders.pubkey import Pubkey as _Pubkey
-    program_id = _Pubkey.from_string(_SYMBIOTIC_PROGRAM_ID)
-    human = _Pubkey.from_string(human_pubkey_str)
-    seeds = [b"symbiotic", bytes(human), bytes([0])]
-    pda, _bump = _Pubkey.find_program_address(seeds, program_id)
-    return str(pda)
+    return _find_pda(_symbiotic_seeds(human_pubkey_str), _SYMBIOTIC_PROGRAM_ID)[0]
+
+
+def _derive_symbiotic_pdas(human_pubkey_strs):
+    """{human: pda} in one pass; invalid addresses are skipped."""
+    humans, seeds = [], []
+    for human in human_pubkey_strs:
+        try:
+            seeds.append(_symbiotic_seeds(human))
+            humans.append(human)
+        except Exception:
+            continue
+    if pda_cache is not None:
+        found = pda_cache.find_many([(s, _SYMBIOTIC_PROGRAM_ID) for s in seeds])
+    else:
+        found = [_find_pda(s, _SYMBIOTIC_PROGRAM_ID) for s in seeds]
+    return {human: pda for human, (pda, _bump) in zip(humans, found)}
+
+
+def start_pda_warmup(warm=True):
+    """Persist derivations in data/ and (``warm``, leader only) pre-derive
+    every onboarded wallet's PDA into that shared cache."""
+    if pda_cache is None:
+        return
+    try:
+        pda_cache.configure(str(_DASHBOARD_DIR / "data" / "pda_cache.db"))
+    except Exception as e:
+        print(f"[WARN] PDA cache not persisted: {e}")
+    if warm:
+        threading.Thread(target=lambda: _derive_symbiotic_pdas(list(_load_onboarding())),
+                         daemon=True, name="pda-warmup").start()
 
 
 @app.route("/api/symbiotic/build-init-tx", methods=["POST"])
@@ -3339,7 +3807,8 @@ def symbiotic_build_init_tx():
 
         # Derive PDA
         seeds = [b"symbiotic", bytes(human), bytes([pair_nonce])]
-        pda, bump = _Pubkey.find_program_address(seeds, program_id)
+        pda_str, bump = _find_pda(seeds, program_id)
+        pda = _Pubkey.from_string(pda_str)
 
         # Build instruction data: discriminator + pair_nonce (u8)
         disc = hashlib.sha256(b"global:initialize_pair").digest()[:8]
@@ -3400,21 +3869,9 @@ def symbiotic_pair_info():
         human = _Pubkey.from_string(human_str)
 
         seeds = [b"symbiotic", bytes(human), bytes([0])]
-        pda, bump = _Pubkey.find_program_address(seeds, program_id)
+        pda, bump = _find_pda(seeds, program_id)
 
-        rpc_url = _SOLANA_RPCS.get(network, _SOLANA_RPCS["devnet"])
-        rpc_data = json.loads(urllib.request.urlopen(
-            urllib.request.Request(
-                rpc_url,
-                data=json.dumps({
-                    "jsonrpc": "2.0", "id": 1,
-                    "method": "getAccountInfo",
-                    "params": [str(pda), {"encoding": "base64"}]
-                }).encode(),
-                headers={"Content-Type": "application/json"},
-            ),
-            timeout=10,
-        ).read())
+        rpc_data = _solana_rpc(network, "getAccountInfo", [str(pda), {"encoding": "base64"}], ttl=0)
 
         account = rpc_data.get("result", {}).get("value")
         if account is None:
@@ -3445,6 +3902,14 @@ def symbiotic_pair_info():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/wallet/rpc-stats")
+def api_wallet_rpc_stats():
+    """Per-endpoint connection counters, per-method RPC latency and cache hit/miss stats."""
+    if solana_rpc is None:
+        return jsonify({"available": False, "clients": [], "cache": None})
+    return jsonify({"available": True, "clients": solana_rpc.all_stats(), "cache": solana_rpc.cache.stats()})
+
+
 # ---------------------------------------------------------------------------
 # End Wallet API
 # ---------------------------------------------------------------------------
@@ -3960,6 +4425,8 @@ _ALPHA_REPO_DIR = os.path.expanduser("~/resonantos-alpha")
 DASHBOARD_REPO_DIR = _ALPHA_REPO_DIR if os.path.isdir(os.path.join(_ALPHA_REPO_DIR, ".git")) else _SELF_DIR
 _UPDATE_CONFIG_LOCK = threading.Lock()
 _UPDATE_CHECKER_STARTED = False
+_UPDATE_CHECKER_LOCK_FILE = os.path.join(tempfile.gettempdir(), "resonantos-dashboard-update.lock")
+_UPDATE_CHECKER_LOCK_FD = None
 _UPDATE_DEFAULTS = {
     "autoCheck": True,
     "autoCheckIntervalHours": 6,
@@ -4153,10 +4620,41 @@ def _auto_update_checker_loop():
             time.sleep(60)
 
 
+def _try_host_lock(path):
+    """Non-blocking exclusive ``flock`` on ``path``: the open fd (keep it
+    open to hold the lock for the life of the process), True where locking
+    is unavailable, or None if another process holds it."""
+    if fcntl is None:
+        return True
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+    except OSError:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _acquire_update_checker_lock():
+    """Only one process per host runs the update checker (git pull must not
+    race between WSGI workers). Returns False if another process holds it."""
+    global _UPDATE_CHECKER_LOCK_FD
+    fd = _try_host_lock(_UPDATE_CHECKER_LOCK_FILE)
+    if fd is None:
+        return False
+    _UPDATE_CHECKER_LOCK_FD = fd  # held for the lifetime of the process
+    return True
+
+
 def start_auto_update_checker():
     global _UPDATE_CHECKER_STARTED
     if _UPDATE_CHECKER_STARTED:
         return
+    if not _acquire_update_checker_lock():
+        return
     thread = threading.Thread(target=_auto_update_checker_loop, daemon=True, name="auto-update-checker")
     thread.start()
     _UPDATE_CHECKER_STARTED = True
@@ -4909,13 +5407,7 @@ def api_apply_update():
 @app.route("/api/gateway/status")
 def api_gateway_status():
     """Overall gateway connection status."""
-    return jsonify({
-        "connected": gw.connected,
-        "connId": gw.conn_id,
-        "lastTick": gw.last_tick,
-        "lastHealthTs": gw.last_health_ts,
-        "error": gw.error,
-    })
+    return jsonify({**gw.status(), "requests": gw.request_stats()})
 
 @app.route("/api/gateway/health")
 def api_gateway_health():
@@ -4950,6 +5442,172 @@ def api_gateway_restart():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+# ---------------------------------------------------------------------------
+# API: Live Events (SSE)
+# ---------------------------------------------------------------------------
+
+SHIELD_ALERTS_DIR = Path.home() / "clawd" / "security" / "alerts"  # written by shield/daemon.py
+USAGE_TRACKER_LOG = WORKSPACE / "usage-tracker" / "usage.jsonl"
+_EVENT_SOURCE_DIRS = [
+    WatchedDir(RMEMORY_DIR, recursive=False),
+    WatchedDir(SHIELD_ALERTS_DIR, recursive=False),
+    WatchedDir(USAGE_TRACKER_LOG.parent, recursive=False),
+]
+_EVENT_SOURCE_VIEW = WatchedView("event-sources", _EVENT_SOURCE_DIRS, lambda: None)  # only for watching()
+_shield_alerts_seen = set()
+_shield_alerts_lock = threading.Lock()
+_usage_log_size = None
+
+
+def _publish_rmemory_events(events):
+    _events.publish("rmemory.log", {"count": len(events), "events": events[-100:]})
+
+
+def _publish_rmemory_appends():
+    """Parse lines appended to r-memory.log; the tail's listener publishes them."""
+    try:
+        _rmem_log.refresh()
+    except Exception as e:
+        print(f"[WARN] r-memory log refresh failed: {e}")
+
+
+def _publish_shield_alert(path):
+    fp = Path(path)
+    if fp.suffix != ".json" or fp.parent != SHIELD_ALERTS_DIR:
+        return
+    with _shield_alerts_lock:
+        if fp.name in _shield_alerts_seen:
+            return
+        try:
+            alert = json.loads(fp.read_text())
+        except (OSError, ValueError):
+            return  # deleted or half-written; the next modify event retries
+        if len(_shield_alerts_seen) > 4096:
+            _shield_alerts_seen.clear()
+        _shield_alerts_seen.add(fp.name)
+    _events.publish("shield.alert", {"file": fp.name, **(alert if isinstance(alert, dict) else {"alert": alert})})
+
+
+def _publish_usage_appends():
+    """Publish ``usage.appended`` when the usage tracker's log changes size."""
+    global _usage_log_size
+    try:
+        size = USAGE_TRACKER_LOG.stat().st_size
+    except OSError:
+        size = None
+    with _shield_alerts_lock:
+        if size == _usage_log_size:
+            return
+        _usage_log_size = size
+    if size is not None:
+        _events.publish("usage.appended", {"size": size})
+
+
+def _on_event_source_fs_event(path, is_directory):
+    if path == str(RMEMORY_LOG):
+        _publish_rmemory_appends()
+    elif path == str(USAGE_TRACKER_LOG):
+        _publish_usage_appends()
+    elif not is_directory:
+        _publish_shield_alert(path)
+
+
+_fs_watcher.add_listener(_EVENT_SOURCE_DIRS, _on_event_source_fs_event)
+
+
+def _event_sources_worker():
+    """Safety net for the fs listener: a cheap stat pass, every 2 s while the
+    directories aren't watched and every 30 s while they are."""
+    while True:
+        time.sleep(30 if _fs_watcher.watching(_EVENT_SOURCE_VIEW) else 2)
+        try:
+            _publish_rmemory_appends()
+            _publish_usage_appends()
+            if SHIELD_ALERTS_DIR.is_dir():
+                for fp in SHIELD_ALERTS_DIR.glob("*.json"):
+                    if fp.name not in _shield_alerts_seen:
+                        _publish_shield_alert(fp)
+        except Exception as e:
+            print(f"[WARN] event sources poll failed: {e}")
+
+
+def start_event_sources():
+    global _usage_log_size
+    try:
+        _usage_log_size = USAGE_TRACKER_LOG.stat().st_size
+    except OSError:
+        pass
+
+    def _run():
+        _publish_rmemory_appends()  # catch up (from the checkpoint) without publishing history
+        _rmem_log.listener = _publish_rmemory_events
+        _event_sources_worker()
+
+    if SHIELD_ALERTS_DIR.is_dir():
+        with _shield_alerts_lock:
+            _shield_alerts_seen.update(fp.name for fp in SHIELD_ALERTS_DIR.glob("*.json"))
+    threading.Thread(target=_run, daemon=True, name="event-sources").start()
+
+
+@app.route("/api/events")
+def api_events():
+    """Server-Sent Events stream.
+
+    Query: ``topics`` — comma-separated topic prefixes (``gateway``,
+    ``gateway.health``, ``rmemory``, ``shield.alert``); all topics if omitted.
+    Reconnects resume after ``Last-Event-ID``. Each stream holds a server
+    thread, so on a fixed-size thread pool concurrent streams are capped at
+    a quarter of its threads; ``events.maxClients`` lowers the cap (and is
+    the only cap under the dev server). Past the cap clients get a 503 and
+    fall back to polling.
+    """
+    if not _acquire_stream_slot("events"):
+        return jsonify({"error": "too many event streams"}), 503
+    topics = [t.strip() for t in request.args.get("topics", "").split(",") if t.strip()]
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or request.args.get("lastEventId") or 0) or None
+    except ValueError:
+        last_id = None
+    try:
+        sub = _events.subscribe(topics, last_event_id=last_id)
+    except Exception:
+        _release_stream_slot("events")
+        raise
+    heartbeat = _EVENTS_CFG["heartbeatSeconds"]
+    hello = {"id": 0, "topic": "gateway.status", "ts": time.time(), "data": gw.status()}
+
+    def stream():
+        yield "retry: 3000\n\n"
+        if last_id is None and topic_matches(hello["topic"], topics):
+            yield format_sse(hello)  # current state, so clients skip an initial fetch
+        while True:
+            events = sub.get(timeout=heartbeat)
+            if events:
+                yield "".join(format_sse(e) for e in events)
+            else:
+                yield ": keepalive\n\n"
+
+    def close():
+        sub.close()
+        _release_stream_slot("events")
+
+    resp = Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Runs when the server closes the response, even if the stream never started
+    resp.call_on_close(close)
+    return resp
+
+
+@app.route("/api/events/stats")
+def api_events_stats():
+    stats = _events.stats()
+    stats["relay"] = {**_event_relay.stats(), "role": _BACKGROUND_ROLE}
+    events_cap, total_cap = _stream_slot_limits()
+    with _stream_slots_lock:
+        stats["streamSlots"] = {**_stream_slots, "eventsCap": events_cap, "totalCap": total_cap}
+    return jsonify(stats)
+
+
 # ---------------------------------------------------------------------------
 # API: Agents
 # ---------------------------------------------------------------------------
@@ -5308,9 +5966,13 @@ def api_system_agents():
 
 @app.route("/api/agents/<agent_id>/sessions")
 def api_agent_sessions(agent_id):
-    """Get sessions for an agent via gateway."""
-    result = gw.request("sessions.list", {"agentId": agent_id})
-    return jsonify(result)
+    """Sessions for an agent from the session snapshot (sessions.list shape)."""
+    if not valid_agent_id(agent_id):
+        return jsonify({"ok": False, "error": "invalid agent id"}), 400
+    sessions, source = _sessions.sessions(agent_id, fetch=_gateway_sessions)
+    if source is None:
+        return jsonify({"ok": False, "error": gw.error or "sessions unavailable"})
+    return jsonify({"ok": True, "source": source, "payload": {"sessions": sessions}})
 
 @app.route("/api/agents/<agent_id>/model", methods=["PUT"])
 def api_agent_model(agent_id):
@@ -5398,14 +6060,26 @@ def _scan_ssot_layer(layer_dir, layer_name):
 
     return docs
 
+_SSOT_LAYERS = ["L0", "L1", "L2", "L3", "L4"]
+for _layer in _SSOT_LAYERS:
+    _fs_watcher.add_view(WatchedView(
+        f"ssot:{_layer}", [WatchedDir(SSOT_ROOT / _layer)],
+        lambda _layer=_layer: _scan_ssot_layer(SSOT_ROOT / _layer, _layer),
+    ))
+
+
+def _ssot_documents():
+    """All SSoT documents across layers, served from the watcher cache."""
+    all_docs = []
+    for layer in _SSOT_LAYERS:
+        all_docs.extend(_fs_watcher.get(f"ssot:{layer}"))
+    return all_docs
+
+
 @app.route("/api/r-memory/documents")
 def api_rmemory_documents():
     """List all SSoT documents across layers."""
-    all_docs = []
-    for layer in ["L0", "L1", "L2", "L3", "L4"]:
-        layer_dir = SSOT_ROOT / layer
-        all_docs.extend(_scan_ssot_layer(layer_dir, layer))
-    return jsonify(all_docs)
+    return jsonify(_ssot_documents())
 
 @app.route("/api/r-memory/document", methods=["GET"])
 def api_rmemory_document():
@@ -5535,25 +6209,16 @@ def api_rmemory_open_log():
 @app.route("/api/r-memory/stats")
 def api_rmemory_stats():
     """R-Memory runtime stats: blocks from history files, log events."""
-    # Get all history blocks (all sessions)
-    all_blocks = _rmem_history_blocks()
-    total_raw = sum(b.get("tokensRaw", 0) for b in all_blocks)
-    total_comp = sum(b.get("tokensCompressed", 0) for b in all_blocks)
-
-    # Current session blocks (stored in history file)
-    cur_sid = _rmem_current_session_id()
-    cur_blocks = [b for b in all_blocks if cur_sid and cur_sid in b.get("_file", "")]
+    # Block totals for all sessions and the current one (stored in history files)
+    cur_sid, totals = _rmem_block_totals()
+    cur = totals["session"]
 
     # Parse log to determine what's actually in context RIGHT NOW.
     # After a gateway restart (init), context is empty until first compaction.
     # Compressed blocks persist in conversation across gateway restarts.
     # Always show last compaction data if available.
-    log_events = _rmem_parse_log()
-
-    last_compaction = None
-    for ev in log_events:
-        if ev.get("event") == "compaction_done":
-            last_compaction = ev
+    log = _rmem_log_snapshot()
+    last_compaction = log["lastCompaction"]
 
     in_context_blocks = last_compaction.get("historyBlocks", 0) if last_compaction else 0
     in_context_tokens = last_compaction.get("contentTokens", 0) if last_compaction else 0
@@ -5561,13 +6226,13 @@ def api_rmemory_stats():
     stats = {
         "blockCount": in_context_blocks,
         "contentTokens": in_context_tokens,
-        "totalRawTokens": sum(b.get("tokensRaw", 0) for b in cur_blocks),
-        "totalCompressedTokens": sum(b.get("tokensCompressed", 0) for b in cur_blocks),
+        "totalRawTokens": cur["raw"],
+        "totalCompressedTokens": cur["compressed"],
         "compressionRatio": None,
-        "storedBlockCount": len(cur_blocks),
-        "allSessionsBlockCount": len(all_blocks),
-        "allSessionsRawTokens": total_raw,
-        "allSessionsCompressedTokens": total_comp,
+        "storedBlockCount": cur["blocks"],
+        "allSessionsBlockCount": totals["all"]["blocks"],
+        "allSessionsRawTokens": totals["all"]["raw"],
+        "allSessionsCompressedTokens": totals["all"]["compressed"],
         "currentSessionId": cur_sid,
         "logsExist": RMEMORY_LOG.exists(),
         "recentEvents": [],
@@ -5579,7 +6244,7 @@ def api_rmemory_stats():
         )
 
     # Recent log events (last 30)
-    stats["recentEvents"] = log_events[-30:]
+    stats["recentEvents"] = log["recent"][-30:]
 
     return jsonify(stats)
 
@@ -5874,45 +6539,56 @@ def _ts_run_gateway_usage_cost(days):
         return None, "invalid JSON from gateway usage-cost", {"cmd": cmd}
 
 
-def _ts_parse_tracker_timestamp(value):
-    if value is None:
-        return None
-    if isinstance(value, datetime):
-        dt = value
-    elif isinstance(value, (int, float)):
-        num = float(value)
-        # Accept both epoch seconds and epoch milliseconds.
-        seconds = num / 1000.0 if num > 10_000_000_000 else num
-        try:
-            dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
-        except Exception:
-            return None
-    elif isinstance(value, str):
-        raw = value.strip()
-        if not raw:
-            return None
-        if re.match(r"^-?\d+(?:\.\d+)?$", raw):
-            try:
-                num = float(raw)
-                seconds = num / 1000.0 if num > 10_000_000_000 else num
-                dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
-            except Exception:
-                return None
-        else:
-            try:
-                dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
-            except Exception:
-                return None
-    else:
-        return None
+_usage_rollup = UsageRollup(USAGE_TRACKER_LOG, _DASHBOARD_DIR / "data" / "usage_rollup.db")
+
+
+def _ts_tracker_since(days):
+    """First UTC day (ISO) of a ``days`` window over the rollup."""
+    return (datetime.now(timezone.utc) - timedelta(days=max(1, _ts_int(days, 7)))).date().isoformat()
 
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
+
+def _ts_tracker_fallback_rates(pricing):
+    """Rates for tracker rows whose model has no known pricing."""
+    models = pricing.get("models", {}) if isinstance(pricing, dict) else {}
+    default_model = pricing.get("defaultModel", "gateway/blended") if isinstance(pricing, dict) else "gateway/blended"
+    fallback_rates = models.get(default_model) if isinstance(models, dict) else None
+    if not isinstance(fallback_rates, dict):
+        fallback_rates = _TOKEN_SAVINGS_DEFAULT_PRICING["models"]["gateway/blended"]
+    return fallback_rates
+
+
+def _ts_cost_scenarios(days, pricing, extra=None):
+    """What-if pricing of tracker usage: the baseline, "everything priced as
+    model X" for each known model, configured ``pricing.scenarios`` and
+    ``extra`` (request) scenarios, all priced in one pass by the cost engine."""
+    if cost_engine.np is None:
+        return {"available": False, "reason": "numpy is required for cost scenarios"}
+    scenarios = [{"name": f"All as {r.get('label') or key}", "priceAllAs": key}
+                 for key, r in _KNOWN_MODEL_PRICING.items()]
+    configured = pricing.get("scenarios") if isinstance(pricing.get("scenarios"), list) else []
+    rejected = []
+    for custom in configured + list(extra or []):
+        # A malformed config entry or query scenario is reported, not fatal
+        try:
+            cost_engine.check_scenario(_KNOWN_MODEL_PRICING, custom)
+        except ValueError as e:
+            rejected.append({"scenario": custom, "error": str(e)})
+            continue
+        scenarios.append(custom)
+    try:
+        _usage_rollup.refresh()
+        usage = cost_engine.UsageMatrix.from_rows(_usage_rollup.rows(_ts_tracker_since(days)))
+        results = cost_engine.compare(usage, _KNOWN_MODEL_PRICING, _ts_tracker_fallback_rates(pricing), scenarios)
+    except ValueError as e:
+        return {"available": False, "reason": str(e), "rejected": rejected}
+    return {"available": len(usage) > 0, "rows": len(usage), "days": usage.days, "models": usage.models,
+            "scenarios": results, "rejected": rejected}
 
 
 def _ts_load_tracker_usage(days):
-    tracker_file = WORKSPACE / "usage-tracker" / "usage.jsonl"
+    """Daily tracker usage for the last ``days`` (whole UTC days) from the
+    rollup store; only lines appended since the last call are read."""
+    tracker_file = _usage_rollup.source_path
     meta = {
         "path": str(tracker_file),
         "days": int(days),
@@ -5921,7 +6597,7 @@ def _ts_load_tracker_usage(days):
         "keptEntries": 0,
         "invalidLines": 0,
     }
-    empty_totals = {
+    totals = {
         "input": 0,
         "output": 0,
         "cacheRead": 0,
@@ -5933,112 +6609,29 @@ def _ts_load_tracker_usage(days):
         "cacheWriteCost": 0.0,
         "totalCost": 0.0,
     }
-    empty_data = {"daily": [], "totals": dict(empty_totals)}
 
-    if not tracker_file.exists():
-        return empty_data, None, meta
+    if not meta["exists"]:
+        return {"daily": [], "totals": totals}, None, meta
 
     try:
         pricing, _cfg = _ts_load_pricing()
     except Exception:
         pricing = _TOKEN_SAVINGS_DEFAULT_PRICING
 
-    models = pricing.get("models", {}) if isinstance(pricing, dict) else {}
-    default_model = pricing.get("defaultModel", "gateway/blended") if isinstance(pricing, dict) else "gateway/blended"
-    fallback_rates = models.get(default_model) if isinstance(models, dict) else None
-    if not isinstance(fallback_rates, dict):
-        fallback_rates = _TOKEN_SAVINGS_DEFAULT_PRICING["models"]["gateway/blended"]
-
-    def _new_day_bucket(date_key):
-        return {
-            "date": date_key,
-            "input": 0,
-            "output": 0,
-            "cacheRead": 0,
-            "cacheWrite": 0,
-            "totalTokens": 0,
-            "inputCost": 0.0,
-            "outputCost": 0.0,
-            "cacheReadCost": 0.0,
-            "cacheWriteCost": 0.0,
-            "totalCost": 0.0,
-        }
-
-    cutoff = datetime.now(timezone.utc) - timedelta(days=max(1, _ts_int(days, 7)))
-    daily = {}
-    totals = dict(empty_totals)
-
     try:
-        with tracker_file.open("r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                row = line.strip()
-                if not row:
-                    continue
-                meta["entries"] += 1
-                try:
-                    payload = json.loads(row)
-                except Exception:
-                    meta["invalidLines"] += 1
-                    continue
-
-                ts = _ts_parse_tracker_timestamp(payload.get("ts"))
-                if ts is None or ts < cutoff:
-                    continue
-
-                input_tokens = max(0, _ts_int(payload.get("input"), 0))
-                output_tokens = max(0, _ts_int(payload.get("output"), 0))
-                cache_read_tokens = max(0, _ts_int(payload.get("cacheRead"), 0))
-                cache_write_tokens = max(0, _ts_int(payload.get("cacheWrite"), 0))
-                if (input_tokens + output_tokens + cache_read_tokens + cache_write_tokens) <= 0:
-                    continue
-
-                provider = str(payload.get("provider") or "").strip()
-                model = str(payload.get("model") or "").strip()
-                model_key = f"{provider}/{model}" if (provider and model) else None
-                rates = _KNOWN_MODEL_PRICING.get(model_key) if model_key else None
-                if not isinstance(rates, dict):
-                    rates = fallback_rates
-
-                ip = _ts_float(rates.get("inputPer1M"), 0.0)
-                op = _ts_float(rates.get("outputPer1M"), 0.0)
-                cr = _ts_float(rates.get("cacheReadPer1M"), 0.0)
-                cw = _ts_float(rates.get("cacheWritePer1M"), 0.0)
-
-                input_cost = input_tokens * ip / 1_000_000
-                output_cost = output_tokens * op / 1_000_000
-                cache_read_cost = cache_read_tokens * cr / 1_000_000
-                cache_write_cost = cache_write_tokens * cw / 1_000_000
-                total_tokens = input_tokens + output_tokens + cache_read_tokens + cache_write_tokens
-                total_cost = input_cost + output_cost + cache_read_cost + cache_write_cost
-
-                date_key = ts.date().isoformat()
-                bucket = daily.setdefault(date_key, _new_day_bucket(date_key))
-                bucket["input"] += input_tokens
-                bucket["output"] += output_tokens
-                bucket["cacheRead"] += cache_read_tokens
-                bucket["cacheWrite"] += cache_write_tokens
-                bucket["totalTokens"] += total_tokens
-                bucket["inputCost"] += input_cost
-                bucket["outputCost"] += output_cost
-                bucket["cacheReadCost"] += cache_read_cost
-                bucket["cacheWriteCost"] += cache_write_cost
-                bucket["totalCost"] += total_cost
-
-                totals["input"] += input_tokens
-                totals["output"] += output_tokens
-                totals["cacheRead"] += cache_read_tokens
-                totals["cacheWrite"] += cache_write_tokens
-                totals["totalTokens"] += total_tokens
-                totals["inputCost"] += input_cost
-                totals["outputCost"] += output_cost
-                totals["cacheReadCost"] += cache_read_cost
-                totals["cacheWriteCost"] += cache_write_cost
-                totals["totalCost"] += total_cost
-                meta["keptEntries"] += 1
+        _usage_rollup.refresh()
+        daily = _usage_rollup.daily(_ts_tracker_since(days), _KNOWN_MODEL_PRICING, _ts_tracker_fallback_rates(pricing))
+        rollup = _usage_rollup.stats()
     except Exception as e:
         return None, f"failed to read tracker usage file: {e}", meta
 
-    return {"daily": [daily[d] for d in sorted(daily.keys())], "totals": totals}, None, meta
+    meta["entries"] = rollup["lines"]
+    meta["invalidLines"] = rollup["invalidLines"]
+    for bucket in daily:
+        meta["keptEntries"] += bucket.pop("entries")
+        for k in totals:
+            totals[k] += bucket[k]
+    return {"daily": daily, "totals": totals}, None, meta
 
 
 @app.route("/api/token-savings/pricing", methods=["PUT"])
@@ -6072,36 +6665,34 @@ def api_token_savings():
         except Exception:
             usage_stats = {}
 
-    all_blocks = _rmem_history_blocks()
-    cur_sid = _rmem_current_session_id()
-    cur_blocks = [b for b in all_blocks if cur_sid and cur_sid in b.get("_file", "")]
+    cur_sid, totals = _rmem_block_totals()
+    context_blocks = totals["session"]["blocks"]
+    all_blocks = totals["all"]["blocks"]
 
     # Use ALL blocks for total counts
-    all_raw = sum(_ts_int(b.get("tokensRaw"), 0) for b in all_blocks)
-    all_comp = sum(_ts_int(b.get("tokensCompressed"), 0) for b in all_blocks)
+    all_raw = totals["all"]["raw"]
+    all_comp = totals["all"]["compressed"]
 
-    # Filter to meaningful blocks (raw > 50 tokens AND actual savings) for compression ratio
-    meaningful_blocks = [b for b in all_blocks
-                         if _ts_int(b.get("tokensRaw"), 0) > 50
-                         and _ts_int(b.get("tokensRaw"), 0) > _ts_int(b.get("tokensCompressed"), 0)]
-    meaningful_raw = sum(_ts_int(b.get("tokensRaw"), 0) for b in meaningful_blocks)
-    meaningful_comp = sum(_ts_int(b.get("tokensCompressed"), 0) for b in meaningful_blocks)
+    # Meaningful blocks (raw > 50 tokens AND actual savings) for compression ratio
+    meaningful_blocks = totals["meaningful"]["blocks"]
+    meaningful_raw = totals["meaningful"]["raw"]
+    meaningful_comp = totals["meaningful"]["compressed"]
 
     # Average tokens saved per API call = avg compressed blocks in context x savings per block
-    context_raw = sum(_ts_int(b.get("tokensRaw"), 0) for b in cur_blocks)
-    context_comp = sum(_ts_int(b.get("tokensCompressed"), 0) for b in cur_blocks)
-    cur_saved = sum(max(0, _ts_int(b.get("tokensRaw"), 0) - _ts_int(b.get("tokensCompressed"), 0)) for b in cur_blocks)
+    context_raw = totals["session"]["raw"]
+    context_comp = totals["session"]["compressed"]
+    cur_saved = totals["session"]["saved"]
     # If current session has meaningful savings, use it; otherwise estimate from lifetime meaningful blocks
     if cur_saved > 1000:
         context_saved_per_call = cur_saved
-    elif len(meaningful_blocks) > 0:
+    elif meaningful_blocks > 0:
         # Use meaningful blocks only (excludes tiny/negative blocks that dilute the ratio)
-        avg_saving_per_block = (meaningful_raw - meaningful_comp) / len(meaningful_blocks)
-        avg_context_blocks = max(len(cur_blocks), 25)  # typical context holds ~25 compressed blocks
+        avg_saving_per_block = (meaningful_raw - meaningful_comp) / meaningful_blocks
+        avg_context_blocks = max(context_blocks, 25)  # typical context holds ~25 compressed blocks
         context_saved_per_call = int(avg_saving_per_block * avg_context_blocks)
     else:
         context_saved_per_call = 0
-    archived_blocks = max(0, len(all_blocks) - len(cur_blocks))
+    archived_blocks = max(0, all_blocks - context_blocks)
     archived_raw = max(0, all_raw - context_raw)
     archived_comp = max(0, all_comp - context_comp)
 
@@ -6116,6 +6707,16 @@ def api_token_savings():
     )
 
     source = "usage-tracker" if tracker_has_entries else "gateway"
+    if tracker_has_entries:
+        try:
+            extra_scenarios = json.loads(request.args.get("scenarios") or "[]")
+        except ValueError:
+            extra_scenarios = []
+        if not isinstance(extra_scenarios, list):
+            extra_scenarios = [extra_scenarios]
+        scenario_comparison = _ts_cost_scenarios(days, pricing, extra_scenarios)
+    else:
+        scenario_comparison = {"available": False, "reason": "scenarios need per-model usage from the usage tracker"}
     if tracker_has_entries:
         gateway_data, gateway_error, gateway_meta = tracker_data, tracker_error, tracker_meta
     else:
@@ -6406,7 +7007,7 @@ def api_token_savings():
         "compoundSavings": {
             "estimated": True,
             "method": "sum(tokensRaw - tokensCompressed in current context blocks) × estimated API calls",
-            "contextBlocks": len(cur_blocks),
+            "contextBlocks": context_blocks,
             "tokensSavedPerCall": context_saved_per_call,
             "estimatedApiCalls": explicit_calls,
             "compoundSavedTokens": compound_saved_tokens,
@@ -6414,8 +7015,8 @@ def api_token_savings():
             "costSavedEstimate": round(compound_saved_cost, 4),
         },
         "compressionStats": {
-            "blocksInContext": len(cur_blocks),
-            "blocksCompressed": len(all_blocks),
+            "blocksInContext": context_blocks,
+            "blocksCompressed": all_blocks,
             "blocksArchived": archived_blocks,
             "contextRawTokens": context_raw,
             "contextCompressedTokens": context_comp,
@@ -6435,6 +7036,7 @@ def api_token_savings():
         },
         "componentBreakdown": components,
         "dailyCostBreakdown": daily_breakdown,
+        "scenarioComparison": scenario_comparison,
         "pricingReference": pricing,
     }
     return jsonify(payload)
@@ -6457,6 +7059,7 @@ def api_rmemory_lock(doc_path):
             capture_output=True, timeout=10
         )
         if proc.returncode == 0:
+            _fs_watcher.dispatch(str(full_path), False)  # flag changes aren't always reported
             return jsonify({"ok": True, "locked": True})
         else:
             return jsonify({"ok": False, "error": "lock failed (wrong password?)"}), 403
@@ -6482,6 +7085,7 @@ def api_rmemory_unlock(doc_path):
             capture_output=True, timeout=10
         )
         if proc.returncode == 0:
+            _fs_watcher.dispatch(str(full_path), False)  # flag changes aren't always reported
             return jsonify({"ok": True, "locked": False})
         else:
             return jsonify({"ok": False, "error": "unlock failed (wrong password?)"}), 403
@@ -6607,6 +7211,8 @@ def api_rmemory_lock_layer(layer):
                 errors.append(f"{f.name}: lock failed")
         except Exception as e:
             errors.append(f"{f.name}: {e}")
+    if count:
+        _fs_watcher.dispatch(str(layer_dir), True)
     if errors and count == 0:
         return jsonify({"ok": False, "error": "lock failed (wrong password?)", "errors": errors}), 403
     return jsonify({"ok": True, "count": count, "errors": errors})
@@ -6639,6 +7245,8 @@ def api_rmemory_unlock_layer(layer):
                 errors.append(f"{f.name}: unlock failed")
         except Exception as e:
             errors.append(f"{f.name}: {e}")
+    if count:
+        _fs_watcher.dispatch(str(layer_dir), True)
     if errors and count == 0:
         return jsonify({"ok": False, "error": "unlock failed (wrong password?)", "errors": errors}), 403
     return jsonify({"ok": True, "count": count, "errors": errors})
@@ -6662,40 +7270,19 @@ def api_memory_health():
     compress_trigger = config.get("compressTrigger", 36000)
     evict_trigger = config.get("evictTrigger", 80000)
 
-    # --- Get current session blocks from history files ---
-    cur_sid = _rmem_current_session_id()
-    cur_blocks = _rmem_history_blocks(cur_sid) if cur_sid else []
-    all_blocks = _rmem_history_blocks()
-
-    stored_blocks_raw = sum(b.get("tokensRaw", 0) for b in cur_blocks)
-    stored_blocks_comp = sum(b.get("tokensCompressed", 0) for b in cur_blocks)
-    stored_blocks_count = len(cur_blocks)
+    # --- Current session blocks (history files, via the block index) ---
+    cur_sid, totals = _rmem_block_totals()
+    stored_blocks_raw = totals["session"]["raw"]
+    stored_blocks_comp = totals["session"]["compressed"]
+    stored_blocks_count = totals["session"]["blocks"]
 
     # --- Parse log events ---
-    log_events = _rmem_parse_log()
-
-    # Find last session start, compaction done events
-    last_init = None
-    last_compaction_done = None
-    last_session = None
-    compaction_count = 0
-    fifo_events = []
-    cache_hits = 0
-    cache_misses = 0
-
-    for ev in log_events:
-        etype = ev.get("event", "")
-        if etype == "init":
-            last_init = ev
-        elif etype == "session":
-            last_session = ev
-        elif etype == "compaction_done":
-            last_compaction_done = ev
-            compaction_count += 1
-            cache_hits += ev.get("cacheHits", 0)
-            cache_misses += ev.get("cacheMisses", 0)
-        elif etype == "fifo_evicted":
-            fifo_events.append(ev)
+    log = _rmem_log_snapshot()
+    last_init = log["lastInit"]
+    last_compaction_done = log["lastCompaction"]
+    last_session = log["lastSession"]
+    cache_hits = log["cacheHits"]
+    cache_misses = log["cacheMisses"]
 
     # --- Determine actual in-context blocks ---
     # Compressed blocks persist in the conversation as <summary> across gateway
@@ -6779,9 +7366,7 @@ def api_memory_health():
     # Fallback: scan all docs if no log data
     if ssot_count == 0:
         try:
-            docs = []
-            for layer in ["L0", "L1", "L2", "L3", "L4"]:
-                docs.extend(_scan_ssot_layer(SSOT_ROOT / layer, layer))
+            docs = _ssot_documents()
             ssot_count = len(docs)
             ssot_tokens = sum(d.get("tokens", 0) for d in docs)
         except Exception:
@@ -6975,12 +7560,12 @@ def api_memory_health():
         }
 
     # --- Subsystem: FIFO Eviction ---
-    if fifo_events:
-        last_fifo = fifo_events[-1]
+    if log["fifoCount"]:
+        last_fifo = log["lastFifo"]
         result["subsystems"]["eviction"] = {
             "label": "FIFO Eviction",
             "status": "ok",
-            "detail": f"Last evicted block, {len(fifo_events)} total evictions",
+            "detail": f"Last evicted block, {log['fifoCount']} total evictions",
             "lastSeen": last_fifo.get("ts"),
         }
     else:
@@ -7003,8 +7588,8 @@ def api_memory_health():
         }
 
     # --- Last event ---
-    if log_events:
-        result["lastEventTs"] = log_events[-1].get("ts")
+    if log["lastEvent"]:
+        result["lastEventTs"] = log["lastEvent"].get("ts")
 
     return jsonify(result)
 
@@ -7126,56 +7711,12 @@ import sqlite3
 
 CHATBOTS_DB = Path(__file__).parent / "chatbots.db"
 
+_chatbots_db = ChatbotsDB(CHATBOTS_DB)
+
+
 def _get_db():
-    db = sqlite3.connect(str(CHATBOTS_DB))
-    db.row_factory = sqlite3.Row
-    # Auto-create tables if missing (first run on new install)
-    db.executescript("""
-        CREATE TABLE IF NOT EXISTS chatbots (
-            id TEXT PRIMARY KEY, user_id TEXT DEFAULT 'default', name TEXT NOT NULL,
-            system_prompt TEXT, greeting TEXT DEFAULT 'Hi! How can I help you today?',
-            suggested_prompts TEXT DEFAULT '[]', position TEXT DEFAULT 'bottom-right',
-            theme TEXT DEFAULT 'dark', primary_color TEXT DEFAULT '#4ade80',
-            bg_color TEXT DEFAULT '#1a1a1a', text_color TEXT DEFAULT '#e0e0e0',
-            allowed_domains TEXT DEFAULT '', rate_per_minute INTEGER DEFAULT 10,
-            rate_per_hour INTEGER DEFAULT 100, enable_analytics INTEGER DEFAULT 1,
-            show_watermark INTEGER DEFAULT 1, status TEXT DEFAULT 'active',
-            created_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            updated_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            api_type TEXT DEFAULT 'internal', api_key_encrypted TEXT,
-            model_id TEXT DEFAULT 'claude-sonnet', last_used_at INTEGER,
-            icon_url TEXT DEFAULT '', icon TEXT DEFAULT '💬', icon_type TEXT DEFAULT 'emoji'
-        );
-        CREATE TABLE IF NOT EXISTS chatbot_conversations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, chatbot_id TEXT NOT NULL,
-            session_id TEXT NOT NULL, started_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            ended_at INTEGER, message_count INTEGER DEFAULT 0, satisfaction_rating INTEGER,
-            FOREIGN KEY (chatbot_id) REFERENCES chatbots(id)
-        );
-        CREATE TABLE IF NOT EXISTS chatbot_messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id INTEGER NOT NULL,
-            role TEXT NOT NULL, content TEXT NOT NULL,
-            timestamp INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            FOREIGN KEY (conversation_id) REFERENCES chatbot_conversations(id)
-        );
-        CREATE TABLE IF NOT EXISTS licenses (
-            id TEXT PRIMARY KEY, user_id TEXT NOT NULL, chatbot_id TEXT,
-            tier TEXT DEFAULT 'free', features TEXT DEFAULT '[]',
-            stripe_subscription_id TEXT, stripe_customer_id TEXT, expires_at INTEGER,
-            created_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            updated_at INTEGER DEFAULT (strftime('%s', 'now') * 1000)
-        );
-        CREATE TABLE IF NOT EXISTS knowledge_files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, chatbot_id TEXT NOT NULL,
-            filename TEXT NOT NULL, content TEXT, file_size INTEGER,
-            uploaded_at INTEGER DEFAULT (strftime('%s', 'now') * 1000),
-            FOREIGN KEY (chatbot_id) REFERENCES chatbots(id)
-        );
-        CREATE INDEX IF NOT EXISTS idx_conversations_chatbot ON chatbot_conversations(chatbot_id);
-        CREATE INDEX IF NOT EXISTS idx_messages_conversation ON chatbot_messages(conversation_id);
-        CREATE INDEX IF NOT EXISTS idx_licenses_user ON licenses(user_id);
-    """)
-    return db
+    """Pooled chatbots.db connection (schema migrated once per process)."""
+    return _chatbots_db.connect()
 
 @app.route("/api/chatbots")
 def api_chatbots():
@@ -7310,42 +7851,9 @@ def api_conversations():
         return jsonify({"conversations": [], "total": 0})
 
     db = _get_db()
-    where = []
-    params = []
-    if chatbot_id:
-        where.append("c.chatbot_id=?")
-        params.append(chatbot_id)
-    if start_date:
-        where.append("c.started_at>=?")
-        params.append(start_date)
-    if end_date:
-        where.append("c.started_at<=?")
-        params.append(end_date)
-
-    where_sql = (" AND " + " AND ".join(where)) if where else ""
-
-    total = db.execute(
-        f"SELECT COUNT(*) FROM chatbot_conversations c WHERE 1=1{where_sql}", params
-    ).fetchone()[0]
-
-    rows = db.execute(
-        f"""SELECT c.*, b.name as chatbot_name
-            FROM chatbot_conversations c
-            LEFT JOIN chatbots b ON b.id = c.chatbot_id
-            WHERE 1=1{where_sql}
-            ORDER BY c.started_at DESC LIMIT ? OFFSET ?""",
-        params + [limit, offset],
-    ).fetchall()
-
+    rows, total = list_conversations(db, chatbot_id, search, start_date, end_date, limit, offset)
     convs = []
-    for r in rows:
-        d = dict(r)
-        # Get first message
-        msg = db.execute(
-            "SELECT content FROM chatbot_messages WHERE conversation_id=? AND role='user' ORDER BY timestamp ASC LIMIT 1",
-            (d["id"],),
-        ).fetchone()
-        d["first_message"] = msg[0] if msg else None
+    for d in rows:
         d["duration_seconds"] = (
             (d["ended_at"] - d["started_at"]) // 1000 if d.get("ended_at") and d.get("started_at") else None
         )
@@ -7389,10 +7897,11 @@ def api_chatbot_knowledge_upload(bot_id):
     f = request.files["file"]
     content = f.read().decode("utf-8", errors="replace")
     db = _get_db()
-    db.execute(
+    file_id = db.execute(
         "INSERT INTO knowledge_files (chatbot_id, filename, content, file_size) VALUES (?,?,?,?)",
         (bot_id, f.filename, content, len(content)),
-    )
+    ).lastrowid
+    index_knowledge_file(db, file_id, bot_id, content)
     db.commit()
     db.close()
     return jsonify({"ok": True})
@@ -7440,9 +7949,66 @@ def api_system_keys():
 # API: Widget Chat
 # ---------------------------------------------------------------------------
 
+_WIDGET_CHAT_CFG = {"maxTokens": 1024, "timeout": 30, "provider": None, **_CFG.get("widgetChat", {})}
+_chat_providers = ChatProviders(timeout=_WIDGET_CHAT_CFG["timeout"])
+_WIDGET_CACHE_CFG = {"enabled": True, "maxEntries": 200, "ttlSeconds": 7 * 86400, "contextMessages": 4,
+                     "nearDuplicate": False, "similarity": 0.85, **_WIDGET_CHAT_CFG.get("cache", {})}
+_answer_cache = AnswerCache(
+    _chatbots_db,
+    max_entries=_WIDGET_CACHE_CFG["maxEntries"],
+    ttl=_WIDGET_CACHE_CFG["ttlSeconds"],
+    context_messages=_WIDGET_CACHE_CFG["contextMessages"],
+    near_duplicate=bool(_WIDGET_CACHE_CFG["nearDuplicate"]),
+    similarity=_WIDGET_CACHE_CFG["similarity"],
+)
+# Per (chatbot, client) rate_per_minute / rate_per_hour, plus a per-IP bucket
+# at ``perIpMultiplier`` times those limits. "sqlite" shares the buckets
+# between worker processes; "memory" is per process. Behind a reverse proxy
+# set ``server.trustedProxies`` so the IP is the visitor's, not the proxy's.
+_WIDGET_RATE_CFG = {"backend": "memory", "maxKeys": 50000, "perIpMultiplier": 10,
+                    "path": str(_DASHBOARD_DIR / "data" / "rate_limits.db"),
+                    **_WIDGET_CHAT_CFG.get("rateLimit", {})}
+_rate_limiter = RateLimiter(
+    SQLiteBackend(_WIDGET_RATE_CFG["path"]) if _WIDGET_RATE_CFG["backend"] == "sqlite"
+    else MemoryBackend(max_keys=int(_WIDGET_RATE_CFG["maxKeys"])),
+    ip_multiplier=_WIDGET_RATE_CFG["perIpMultiplier"],
+)
+
+_WIDGET_ANTHROPIC_MODELS = {
+    "claude-sonnet": "claude-sonnet-4-20250514",
+    "claude-opus": "claude-opus-4-20250514",
+    "claude-haiku": "claude-haiku-4-20250514",
+}
+
+
+def _widget_chat_route(model_id):
+    """(provider, provider model, auth profile) for a chatbot's model_id.
+    ``widgetChat.provider = "mock"`` (or model_id "mock") answers offline."""
+    if _WIDGET_CHAT_CFG.get("provider") == "mock" or model_id == "mock":
+        return "mock", "mock", None
+    if model_id.startswith("gpt"):
+        return "openai", {"gpt-4o": "gpt-4o", "gpt-4": "gpt-4"}.get(model_id, "gpt-4o"), "openai:manual"
+    # Anthropic (default for claude-*)
+    return "anthropic", _WIDGET_ANTHROPIC_MODELS.get(model_id, "claude-sonnet-4-20250514"), "anthropic:manual"
+
+
 @app.route("/api/widget/chat", methods=["POST"])
 def api_widget_chat():
-    """Handle chat messages from the embeddable widget."""
+    """Handle chat messages from the embeddable widget.
+
+    With ``"stream": true`` (or ``Accept: text/event-stream``) the reply is
+    relayed as SSE while the provider generates it: ``{"delta": "..."}``
+    events, then ``{"done": true, "reply": "...", "ttftMs": n}`` or
+    ``{"error": "..."}``. Otherwise the whole reply comes back as JSON.
+    On a fixed-size thread pool, completions share the server's long-request
+    slots with ``/api/events``; when none is free the widget gets a 503 with
+    ``retryAfter``.
+
+    Replies are served from the bot's answer cache when the same question
+    was already answered in the same context (``"cached": true``). Clients
+    over the bot's ``rate_per_minute`` / ``rate_per_hour`` get a 429 with
+    ``Retry-After``.
+    """
     data = request.get_json() or {}
     bot_id = data.get("botId")
     messages = data.get("messages", [])
@@ -7456,16 +8022,16 @@ def api_widget_chat():
         return jsonify({"error": "chatbot not found"}), 404
 
     bot = dict(bot)
-    system_prompt = bot.get("system_prompt", "")
+    client = data.get("sessionId") or request.remote_addr
+    allowed, retry_after = _rate_limiter.check(bot_id, client, bot.get("rate_per_minute"), bot.get("rate_per_hour"),
+                                               ip=request.remote_addr)
+    if not allowed:
+        resp = jsonify({"error": "rate limit exceeded", "retryAfter": retry_after})
+        resp.headers["Retry-After"] = str(retry_after)
+        return resp, 429
 
-    # Load API keys
-    try:
-        import json as _json
-        auth_path = os.path.expanduser("~/.openclaw/agents/main/agent/auth-profiles.json")
-        with open(auth_path) as f:
-            auth = _json.load(f)
-    except Exception as e:
-        return jsonify({"error": f"Auth config not found: {e}"}), 500
+    system_prompt = bot.get("system_prompt", "")
+    provider, model, profile = _widget_chat_route(bot.get("model_id") or "claude-sonnet")
 
     # Build messages
     api_messages = []
@@ -7474,54 +8040,78 @@ def api_widget_chat():
         if role in ("user", "assistant"):
             api_messages.append({"role": role, "content": m.get("content", "")})
 
-    model_id = bot.get("model_id", "claude-sonnet")
-
-    try:
-        import urllib.request
-
-        # Route to appropriate provider
-        if model_id.startswith("gpt"):
-            # OpenAI
-            api_key = auth["profiles"]["openai:manual"]["token"]
-            oai_model = {"gpt-4o": "gpt-4o", "gpt-4": "gpt-4"}.get(model_id, "gpt-4o")
-            oai_messages = [{"role": "system", "content": system_prompt}] + api_messages
-            req_body = _json.dumps({"model": oai_model, "max_tokens": 1024, "messages": oai_messages}).encode()
-            req = urllib.request.Request(
-                "https://api.openai.com/v1/chat/completions",
-                data=req_body,
-                headers={"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"},
-            )
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                result = _json.loads(resp.read())
-            reply = result["choices"][0]["message"]["content"]
-        else:
-            # Anthropic (default for claude-*)
-            api_key = auth["profiles"]["anthropic:manual"]["token"]
-            ant_model = {
-                "claude-sonnet": "claude-sonnet-4-20250514",
-                "claude-opus": "claude-opus-4-20250514",
-                "claude-haiku": "claude-haiku-4-20250514",
-            }.get(model_id, "claude-sonnet-4-20250514")
-            req_body = _json.dumps({
-                "model": ant_model, "max_tokens": 1024,
-                "system": system_prompt, "messages": api_messages,
-            }).encode()
-            req = urllib.request.Request(
-                "https://api.anthropic.com/v1/messages",
-                data=req_body,
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01",
-                },
-            )
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                result = _json.loads(resp.read())
-            reply = result.get("content", [{}])[0].get("text", "Sorry, I couldn't generate a response.")
+    wants_stream = bool(data.get("stream")) or "text/event-stream" in request.headers.get("Accept", "")
+    cache = _answer_cache if _WIDGET_CACHE_CFG.get("enabled") else None
+    cached = cache.get(bot, api_messages) if cache else None
+    if cached is not None:
+        if not wants_stream:
+            return jsonify({"reply": cached, "cached": True})
+        events = (f"data: {json.dumps({'delta': cached})}\n\n"
+                  f"data: {json.dumps({'done': True, 'reply': cached, 'ttftMs': 0, 'cached': True})}\n\n")
+        return Response(events, mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-        return jsonify({"reply": reply})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    # Load API keys
+    api_key = None
+    if profile:
+        try:
+            auth_path = os.path.expanduser("~/.openclaw/agents/main/agent/auth-profiles.json")
+            with open(auth_path) as f:
+                auth = json.load(f)
+        except Exception as e:
+            return jsonify({"error": f"Auth config not found: {e}"}), 500
+        api_key = ((auth.get("profiles") or {}).get(profile) or {}).get("token")
+        if not api_key:
+            return jsonify({"error": f"no API key for {profile}"}), 500
+
+    call = (provider, model, system_prompt, api_messages, int(_WIDGET_CHAT_CFG["maxTokens"]), api_key)
+    # A completion holds this thread until the provider finishes, so it
+    # needs a slot from the same budget as the SSE streams.
+    if not _acquire_stream_slot("widget"):
+        return jsonify({"error": "assistant busy", "retryAfter": 2}), 503
+    if not wants_stream:
+        try:
+            reply = _chat_providers.complete(*call)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        finally:
+            _release_stream_slot("widget")
+        if cache and reply:
+            cache.put(bot, api_messages, reply)
+        return jsonify({"reply": reply or "Sorry, I couldn't generate a response."})
+
+    def stream():
+        started = time.monotonic()
+        ttft = None
+        parts = []
+        try:
+            for delta in _chat_providers.stream(*call):
+                if ttft is None:
+                    ttft = round((time.monotonic() - started) * 1000, 1)
+                parts.append(delta)
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            if cache and parts:
+                cache.put(bot, api_messages, "".join(parts))
+            reply = "".join(parts) or "Sorry, I couldn't generate a response."
+            yield f"data: {json.dumps({'done': True, 'reply': reply, 'ttftMs': ttft})}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+
+    resp = Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # The server closes the response even if the stream never started
+    resp.call_on_close(lambda: _release_stream_slot("widget"))
+    return resp
+
+
+@app.route("/api/widget/chat/stats")
+def api_widget_chat_stats():
+    """Time to first token, total time and connection reuse per provider,
+    plus answer cache hit rates and rate limiter counters."""
+    stats = _chat_providers.stats()
+    stats["answerCache"] = _answer_cache.stats(request.args.get("botId"))
+    stats["rateLimit"] = _rate_limiter.stats()
+    return jsonify(stats)
 
 
 @app.route("/widget.js")
@@ -8546,6 +9136,7 @@ try:
         "RCT_MINT": _RCT_MINT,
         "RES_MINT": _RES_MINT,
         "RCT_DECIMALS": _RCT_DECIMALS,
+        "note_tokens_minted": _note_tokens_minted,
     }
     register_bounty_routes(app, _bounty_ctx)
     print("[OK] Bounty board routes loaded")
@@ -8561,15 +9152,202 @@ except Exception as _profile_err:
     print(f"[WARN] Profile routes not loaded: {_profile_err}")
 
 
+# ── Serving modes ──
+# "dev" is the Werkzeug server with template auto-reload. "production" hands
+# the app to a real WSGI server; waitress (threads, cross-platform) or
+# gunicorn (workers x threads, POSIX). Both are optional dependencies.
+_SERVER_DEFAULTS = {
+    "mode": "dev",
+    "host": "0.0.0.0",
+    "port": 19100,
+    "wsgiServer": "waitress",
+    "workers": 1,
+    "threads": 8,
+    "timeout": 120,
+    # Reverse proxies in front of the app; their X-Forwarded-For entries
+    # give request.remote_addr (rate limits key on it). 0 = direct clients.
+    "trustedProxies": 0,
+}
+_WSGI_SERVERS = ("waitress", "gunicorn", "werkzeug")
+_SERVER_OVERRIDES = {}  # command-line overrides, so request handlers see the served config
+_BACKGROUND_STARTED_PID = None
+_BACKGROUND_LOCK = threading.Lock()
+_BACKGROUND_LOCK_FILE = str(_DASHBOARD_DIR / "data" / "background.lock")
+_BACKGROUND_LOCK_FD = None
+_BACKGROUND_RETRY_SECONDS = 15
+_BACKGROUND_ROLE = None  # "leader" or "follower" once start_background_services ran
+
+
+def _server_config(overrides=None):
+    out = dict(_SERVER_DEFAULTS)
+    raw = _CFG.get("server") if isinstance(_CFG.get("server"), dict) else {}
+    for src in (raw, overrides or {}):
+        for key, value in src.items():
+            if key in out and value is not None:
+                out[key] = value
+    if os.environ.get("DASHBOARD_MODE"):
+        out["mode"] = os.environ["DASHBOARD_MODE"]
+    out["mode"] = "production" if str(out["mode"]).lower() in ("prod", "production") else "dev"
+    if out["wsgiServer"] not in _WSGI_SERVERS:
+        out["wsgiServer"] = _SERVER_DEFAULTS["wsgiServer"]
+    for key in ("port", "workers", "threads", "timeout"):
+        out[key] = max(1, _ts_int(out[key], _SERVER_DEFAULTS[key]))
+    return out
+
+
+def _acquire_background_lock():
+    """Host-wide leadership of the background services (one per install)."""
+    global _BACKGROUND_LOCK_FD
+    fd = _try_host_lock(_BACKGROUND_LOCK_FILE)
+    if fd is None:
+        return False
+    _BACKGROUND_LOCK_FD = fd  # held for the lifetime of the process
+    return True
+
+
+def _start_leader_services():
+    global _BACKGROUND_ROLE
+    _BACKGROUND_ROLE = "leader"
+    gw.start()
+    start_auto_update_checker()
+    start_fs_watcher()
+    start_event_sources()
+    start_docs_index_builder()
+    start_docs_vector_worker()
+    start_pda_warmup()
+    start_leaderboard_builder()
+
+
+def _follow_background_leader():
+    """Follower loop: take over if the leader process exits."""
+    while True:
+        time.sleep(_BACKGROUND_RETRY_SECONDS)
+        if _acquire_background_lock():
+            print(f"[OK] Worker {os.getpid()} took over background services")
+            _start_leader_services()
+            return
+
+
+def start_background_services():
+    """Start the background services once per host, not once per worker.
+
+    Every WSGI worker calls this (repeated calls in one process are no-ops).
+    The first process to take the host-wide background lock is the leader:
+    it owns the gateway connection, the update checker, the fs watcher, the
+    R-Memory/Shield event sources, the shared docs index and embeddings,
+    the PDA warmup and the leaderboard builder. The other workers follow:
+    they mirror the leader's events through the event relay (gateway state
+    included), send gateway requests over short-lived connections, read the
+    persisted indexes, embeddings and leaderboard, and retry the lock so one
+    of them takes over if the leader exits.
+    """
+    global _BACKGROUND_STARTED_PID, _BACKGROUND_ROLE
+    with _BACKGROUND_LOCK:
+        if _BACKGROUND_STARTED_PID == os.getpid():
+            return
+        _BACKGROUND_STARTED_PID = os.getpid()
+    try:
+        _event_relay.start()
+    except Exception as e:
+        print(f"[WARN] Event relay unavailable; events stay in this process: {e}")
+    if _acquire_background_lock():
+        _start_leader_services()
+        return
+    _BACKGROUND_ROLE = "follower"
+    print(f"   Worker {os.getpid()} follows the background leader")
+    gw.follow(_event_relay.latest)
+    start_docs_index_builder(shared=False)
+    start_docs_vector_worker(leader=False)
+    start_pda_warmup(warm=False)
+    _load_leaderboard_snapshots()
+    threading.Thread(target=_follow_background_leader, daemon=True, name="background-follower").start()
+
+
+def create_app(production=None):
+    """App factory for WSGI servers (e.g. ``gunicorn 'server_v2:create_app()'``)."""
+    if production is None:
+        production = _server_config()["mode"] == "production"
+    if production:
+        app.config["TEMPLATES_AUTO_RELOAD"] = False
+        app.jinja_env.auto_reload = False
+    proxies = _ts_int(_server_config(_SERVER_OVERRIDES)["trustedProxies"], 0)
+    if proxies > 0 and not isinstance(app.wsgi_app, ProxyFix):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies)
+    start_background_services()
+    return app
+
+
+def _serve_waitress(cfg):
+    global _WSGI_POOL_THREADS
+    from waitress import serve
+    _WSGI_POOL_THREADS = cfg["threads"]
+    serve(app, host=cfg["host"], port=cfg["port"], threads=cfg["threads"],
+          channel_timeout=cfg["timeout"], ident="ResonantOS")
+
+
+def _serve_gunicorn(cfg):
+    from gunicorn.app.base import BaseApplication
+
+    class _DashboardApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{cfg['host']}:{cfg['port']}")
+            self.cfg.set("workers", cfg["workers"])
+            self.cfg.set("threads", cfg["threads"])
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", cfg["timeout"])
+            # Background threads are started in each worker after fork.
+            self.cfg.set("preload_app", False)
+
+        def load(self):
+            global _WSGI_POOL_THREADS
+            _WSGI_POOL_THREADS = cfg["threads"]
+            return create_app(production=True)
+
+    _DashboardApplication().run()
+
+
 def main():
     """Start the dashboard server."""
+    import argparse
+    parser = argparse.ArgumentParser(description="ResonantOS Dashboard v2")
+    parser.add_argument("--production", action="store_true", help="Serve with a production WSGI server")
+    parser.add_argument("--server", choices=_WSGI_SERVERS, help="WSGI server for production mode")
+    parser.add_argument("--host", help="Host to bind to")
+    parser.add_argument("--port", type=int, help="Port to run on")
+    parser.add_argument("--workers", type=int, help="Worker processes (gunicorn)")
+    parser.add_argument("--threads", type=int, help="Threads per worker")
+    args = parser.parse_args()
+
+    _SERVER_OVERRIDES.update({
+        "mode": "production" if args.production else None,
+        "wsgiServer": args.server,
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "threads": args.threads,
+    })
+    cfg = _server_config(_SERVER_OVERRIDES)
+    production = cfg["mode"] == "production"
+    if production and cfg["wsgiServer"] == "gunicorn" and fcntl is None:
+        print("   ! gunicorn is not available on this platform, using waitress")
+        cfg["wsgiServer"] = "waitress"
+
     print(f"\n⚡ ResonantOS Dashboard v2")
     print(f"   Gateway: {GW_WS_URL}")
     print(f"   SSoT root: {SSOT_ROOT}")
     print(f"   Auth token: ***{GW_TOKEN[-6:]}" if GW_TOKEN else "   Auth token: (none)")
+    if production:
+        print(f"   Mode: production ({cfg['wsgiServer']}, workers={cfg['workers']}, threads={cfg['threads']})")
+    else:
+        print("   Mode: dev")
 
-    gw.start()
-    start_auto_update_checker()
+    if production and cfg["wsgiServer"] == "gunicorn":
+        # Workers call create_app() themselves after fork.
+        print(f"\n   Dashboard: http://localhost:{cfg['port']}\n")
+        _serve_gunicorn(cfg)
+        return
+
+    create_app(production=production)
 
     # Wait briefly for connection
     time.sleep(1)
@@ -8578,8 +9356,11 @@ def main():
     else:
         print(f"   ✗ Gateway not connected yet ({gw.error or 'connecting...'})")
 
-    print(f"\n   Dashboard: http://localhost:19100\n")
-    app.run(host="0.0.0.0", port=19100, debug=False)
+    print(f"\n   Dashboard: http://localhost:{cfg['port']}\n")
+    if production and cfg["wsgiServer"] == "waitress":
+        _serve_waitress(cfg)
+    else:
+        app.run(host=cfg["host"], port=cfg["port"], debug=False, threaded=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+"""
+Session Store — cached, indexed view of OpenClaw gateway sessions.
+
+Each agent's sessions live in ``<agents_dir>/<agentId>/sessions/sessions.json``
+(a dict keyed by session key, or a list in older gateways). The parsed file is
+kept per agent and indexed by session key; a read only costs a ``stat`` until
+the file's (mtime, size) moves.
+
+Agents without a local file (remote gateway) are served from the gateway's
+``sessions.list`` via a caller-supplied ``fetch``; those results are kept for
+``remote_ttl`` seconds and dropped early when a gateway session event arrives
+(``note_gateway_event``).
+"""
+import json
+import re
+import threading
+import time
+from pathlib import Path
+
+
+_AGENT_ID = re.compile(r"[\w.-]+")
+
+
+def valid_agent_id(agent_id):
+    """An agent id that names one directory under ``agents_dir`` (no
+    separators, not ``.`` or ``..``)."""
+    return bool(agent_id and _AGENT_ID.fullmatch(agent_id) and agent_id not in (".", ".."))
+
+
+def agent_of(key):
+    """``agent:<id>:<name>`` → ``<id>`` (None for other key shapes)."""
+    parts = (key or "").split(":")
+    return parts[1] if len(parts) >= 3 and parts[0] == "agent" else None
+
+
+def _index(data, agent_id):
+    """{key: session} from either sessions.json layout."""
+    if isinstance(data, dict):
+        items = data.items()
+    elif isinstance(data, list):
+        items = ((s.get("key"), s) for s in data if isinstance(s, dict))
+    else:
+        items = ()
+    out = {}
+    for key, entry in items:
+        if key and isinstance(entry, dict):
+            out[key] = {**entry, "key": key, "agentId": entry.get("agentId") or agent_of(key) or agent_id}
+    return out
+
+
+class SessionStore:
+    """Per-agent session snapshots: file-backed (mtime checked) or gateway-backed (TTL)."""
+
+    def __init__(self, agents_dir, remote_ttl=30.0):
+        self.agents_dir = Path(agents_dir)
+        self.remote_ttl = remote_ttl
+        self._lock = threading.Lock()
+        self._files = {}  # agent_id -> ((mtime_ns, size), {key: session})
+        self._remote = {}  # agent_id -> (fetched_at, {key: session})
+        self.parses = 0
+        self.fetches = 0
+
+    def path_for(self, agent_id):
+        if not valid_agent_id(agent_id):
+            raise ValueError(f"invalid agent id: {agent_id!r}")
+        return self.agents_dir / agent_id / "sessions" / "sessions.json"
+
+    def _from_file(self, agent_id):
+        path = self.path_for(agent_id)
+        try:
+            st = path.stat()
+        except OSError:
+            with self._lock:
+                self._files.pop(agent_id, None)
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._files.get(agent_id)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        try:
+            by_key = _index(json.loads(path.read_text()), agent_id)
+        except (OSError, ValueError):
+            return cached[1] if cached else None  # mid-write; keep the last good snapshot
+        with self._lock:
+            self._files[agent_id] = (stamp, by_key)
+            self.parses += 1
+        return by_key
+
+    def _from_gateway(self, agent_id, fetch):
+        with self._lock:
+            cached = self._remote.get(agent_id)
+        if cached and time.monotonic() - cached[0] < self.remote_ttl:
+            return cached[1]
+        if fetch is None:
+            return cached[1] if cached else None
+        sessions = fetch(agent_id)
+        if sessions is None:
+            return cached[1] if cached else None
+        by_key = _index(sessions, agent_id)
+        with self._lock:
+            self._remote[agent_id] = (time.monotonic(), by_key)
+            self.fetches += 1
+        return by_key
+
+    def _sessions(self, agent_id, fetch):
+        if not valid_agent_id(agent_id):
+            return {}, None
+        by_key = self._from_file(agent_id)
+        if by_key is not None:
+            return by_key, "file"
+        by_key = self._from_gateway(agent_id, fetch)
+        return (by_key, "gateway") if by_key is not None else ({}, None)
+
+    def sessions(self, agent_id, fetch=None):
+        """``(sessions, source)`` for an agent; source is "file", "gateway" or None."""
+        by_key, source = self._sessions(agent_id, fetch)
+        return list(by_key.values()), source
+
+    def get(self, key, fetch=None):
+        """One session by key (``agent:main:main``), or None."""
+        agent_id = agent_of(key)
+        if agent_id is None:
+            return None
+        return self._sessions(agent_id, fetch)[0].get(key)
+
+    def invalidate(self, agent_id=None):
+        """Forget gateway-backed snapshots (file snapshots check their own mtime)."""
+        with self._lock:
+            if agent_id is None:
+                self._remote.clear()
+            else:
+                self._remote.pop(agent_id, None)
+
+    def note_gateway_event(self, topic, payload):
+        """Event-bus listener: a ``gateway.session*`` event refreshes that agent."""
+        if not topic.split(".", 1)[-1].startswith("session"):
+            return
+        payload = payload if isinstance(payload, dict) else {}
+        self.invalidate(payload.get("agentId") or agent_of(payload.get("sessionKey") or payload.get("key")))
+
+    def stats(self):
+        with self._lock:
+            return {"fileAgents": len(self._files), "gatewayAgents": len(self._remote),
+                    "sessions": sum(len(v[1]) for v in self._files.values()) + sum(len(v[1]) for v in self._remote.values()),
+                    "parses": self.parses, "fetches": self.fetches}
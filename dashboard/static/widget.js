@@ -101,6 +101,9 @@
       color: ${config.textColor};
       border-bottom-left-radius: 4px;
     }
+    .ros-msg.ros-partial {
+      opacity: 0.6;
+    }
     .ros-msg.greeting {
       align-self: flex-start;
       background: ${config.theme === 'dark' ? '#27272a' : '#f4f4f5'};
@@ -291,25 +294,113 @@
     msgArea.appendChild(typing);
     msgArea.scrollTop = msgArea.scrollHeight;
 
-    fetch(config.apiUrl + '/api/widget/chat', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ botId: config.botId, messages: messages })
-    })
-    .then(function(r) { return r.json(); })
-    .then(function(data) {
+    function finish(reply, bubble) {
       typing.remove();
-      if (data.reply) {
-        addMessage('assistant', data.reply);
+      if (bubble) {
+        bubble.textContent = reply;
+        messages.push({ role: 'assistant', content: reply });
       } else {
-        addMessage('assistant', 'Sorry, something went wrong.');
+        addMessage('assistant', reply);
       }
       isLoading = false;
-    })
-    .catch(function() {
+    }
+
+    // Errors are shown but never enter `messages`, so a failed or partial
+    // reply is not sent back as assistant history on the next turn.
+    function fail(reason) {
       typing.remove();
-      addMessage('assistant', 'Connection error. Please try again.');
+      var div = document.createElement('div');
+      div.className = 'ros-msg assistant';
+      div.textContent = reason;
+      msgArea.appendChild(div);
+      msgArea.scrollTop = msgArea.scrollHeight;
       isLoading = false;
+    }
+
+    // The reply streams in as Server-Sent Events; JSON replies (errors,
+    // older servers) are handled too.
+    fetch(config.apiUrl + '/api/widget/chat', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+      body: JSON.stringify({ botId: config.botId, messages: messages, stream: true })
+    })
+    .then(function(r) {
+      if (r.status === 429 || r.status === 503) {
+        // Retry-After isn't a CORS-exposed header, so use the JSON body
+        return r.json().catch(function() { return {}; }).then(function(data) {
+          fail((r.status === 429 ? 'You are sending messages too quickly.' : 'The assistant is busy.') +
+            ' Please try again in ' + (data.retryAfter || 'a few') + ' seconds.');
+        });
+      }
+      var type = r.headers.get('Content-Type') || '';
+      if (!r.body || type.indexOf('text/event-stream') === -1) {
+        return r.json().then(function(data) {
+          if (data.reply) finish(data.reply);
+          else fail('Sorry, something went wrong.');
+        });
+      }
+      var reader = r.body.getReader();
+      var decoder = new TextDecoder();
+      var buffer = '';
+      var text = '';
+      var bubble = null;
+      var failed = false;
+      var complete = false;
+
+      function handle(evt) {
+        if (failed) return;
+        if (evt.error) {
+          // The provider failed mid-reply: keep the partial text visible
+          // but don't treat it as a complete answer.
+          failed = true;
+          if (bubble) bubble.className = 'ros-msg assistant ros-partial';
+          fail('Sorry, the reply was interrupted. Please try again.');
+        } else if (evt.delta) {
+          if (!bubble) {
+            typing.remove();
+            bubble = document.createElement('div');
+            bubble.className = 'ros-msg assistant';
+            msgArea.appendChild(bubble);
+          }
+          text += evt.delta;
+          bubble.textContent = text;
+          msgArea.scrollTop = msgArea.scrollHeight;
+        } else if (evt.done) {
+          complete = true;
+          text = evt.reply || text;
+        }
+      }
+
+      function pump() {
+        return reader.read().then(function(chunk) {
+          if (chunk.done) {
+            if (failed) return;
+            if (complete && text) {
+              finish(text, bubble);
+            } else {
+              // Stream cut before the final event: same as a provider error
+              if (bubble) bubble.className = 'ros-msg assistant ros-partial';
+              fail(text ? 'Sorry, the reply was interrupted. Please try again.' : 'Sorry, something went wrong.');
+            }
+            return;
+          }
+          buffer += decoder.decode(chunk.value, { stream: true });
+          var events = buffer.split('\n\n');
+          buffer = events.pop();
+          events.forEach(function(block) {
+            block.split('\n').forEach(function(line) {
+              if (line.indexOf('data:') === 0) {
+                try { handle(JSON.parse(line.slice(5))); } catch (e) { /* partial or foreign line */ }
+              }
+            });
+          });
+          return pump();
+        });
+      }
+      return pump();
+    })
+    .catch(function() {
+      fail('Connection error. Please try again.');
     });
   }
 
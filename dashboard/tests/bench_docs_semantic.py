@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy per-request semantic docs scorer vs DocsTermIndex.
+
+Generates a synthetic markdown corpus (default 5,000 documents), then for a
+set of queries compares the old scorer (read + score every file) against the
+precomputed term/trigram index, checking that both return the same scores.
+
+    python3 tests/bench_docs_semantic.py [--docs 5000] [--words 300] [--legacy-queries 3]
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docs_index import DocsRoot
+from docs_terms import DocsTermIndex, MIN_SCORE, legacy_relevance
+
+VOCAB = [
+    "memory", "compaction", "shield", "gateway", "resonant", "symbiotic", "wallet",
+    "protocol", "logician", "awareness", "dashboard", "identity", "bounty", "tribe",
+    "governance", "token", "session", "agent", "narrative", "keyword", "layer",
+    "architecture", "delegation", "watchdog", "heartbeat", "sovereign", "ledger",
+]
+QUERIES = ["memory compaction", "shield gateway", "symbiotc wallet", "the sovereign ledger",
+           "layer", "r-memory", "protocol"]
+
+
+def _word(rng):
+    if rng.random() < 0.6:
+        return rng.choice(VOCAB)
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+
+
+def make_corpus(root, n_docs, n_words, seed=7):
+    rng = random.Random(seed)
+    for i in range(n_docs):
+        folder = root / f"L{i % 5}" / f"group-{i % 40}"
+        folder.mkdir(parents=True, exist_ok=True)
+        lines = [f"# {_word(rng).title()} {_word(rng)} {i}", ""]
+        words = [_word(rng) for _ in range(n_words)]
+        for j in range(0, len(words), 12):
+            lines.append(" ".join(words[j:j + 12]) + ".")
+        if i % 97 == 0:
+            lines.append("See r-memory and the sovereign ledger.")
+        (folder / f"{_word(rng)}-{i}.md").write_text("\n".join(lines))
+
+
+def legacy_search(root, q):
+    results = []
+    for fp in root.rglob("*.md"):
+        content = fp.read_text(errors="replace")
+        rel = f"bench/{fp.relative_to(root)}"
+        score = legacy_relevance(q, content, rel)
+        if score >= MIN_SCORE:
+            results.append((rel, score))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--legacy-queries", type=int, default=3,
+                        help="How many queries to also run through the (slow) legacy scorer")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="docs-bench-"))
+    try:
+        t0 = time.perf_counter()
+        make_corpus(tmp, args.docs, args.words)
+        print(f"corpus: {args.docs} docs x {args.words} words in {time.perf_counter() - t0:.1f}s")
+
+        idx = DocsTermIndex([DocsRoot(tmp, "bench")])
+        t0 = time.perf_counter()
+        idx.sync()
+        print(f"index build: {time.perf_counter() - t0:.2f}s  {idx.stats()}")
+
+        print(f"\n{'query':<24}{'legacy s':>10}{'index ms':>10}{'hits':>7}  agree")
+        for n, q in enumerate(QUERIES):
+            t0 = time.perf_counter()
+            new = idx.search(q)
+            new_ms = (time.perf_counter() - t0) * 1000
+            if n < args.legacy_queries:
+                t0 = time.perf_counter()
+                old = legacy_search(tmp, q)
+                old_s = f"{time.perf_counter() - t0:.2f}"
+                new_scores = {d.path: s for s, d in new}
+                agree = len(old) == len(new) and all(
+                    abs(new_scores.get(p, -1) - s) < 1e-9 for p, s in old)
+                agree = "yes" if agree else "NO"
+            else:
+                old_s, agree = "-", "-"
+            print(f"{q:<24}{old_s:>10}{new_ms:>10.1f}{len(new):>7}  {agree}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
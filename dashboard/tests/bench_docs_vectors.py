@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: top-k query latency of DocsVectorIndex.
+
+Fills the index row store with N random unit vectors (default 100,000 chunks,
+768 dims like nomic-embed-text) and times cosine top-k queries. Target:
+under 50 ms per query at 100k chunks.
+
+    python3 tests/bench_docs_vectors.py [--chunks 100000] [--dim 768] [--queries 50]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from docs_vectors import DocsVectorIndex
+
+
+class _RandomEmbedder:
+    def __init__(self, dim, seed=3):
+        self.dim = dim
+        self.name = f"random-{dim}"
+        self._rng = np.random.default_rng(seed)
+
+    def embed(self, texts):
+        return self._rng.standard_normal((len(texts), self.dim)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    embedder = _RandomEmbedder(args.dim)
+    with tempfile.TemporaryDirectory() as tmp:
+        idx = DocsVectorIndex(Path(tmp) / "vectors.db", [], embedder)
+        per_file = 20
+        t0 = time.perf_counter()
+        vecs = embedder.embed([""] * args.chunks)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        for f in range(0, args.chunks, per_file):
+            n = min(per_file, args.chunks - f)
+            chunks = [(1 + 10 * i, f"chunk {f + i}") for i in range(n)]
+            idx._put_path(f"bench/doc-{f // per_file}.md", Path(f"doc-{f // per_file}.md"),
+                          type("St", (), {"st_mtime": 0.0, "st_size": 0})(), "bench",
+                          chunks, [str(f + i) for i in range(n)], vecs[f:f + n])
+        print(f"loaded {args.chunks} x {args.dim} in {time.perf_counter() - t0:.1f}s")
+
+        for per_doc in (False, True):
+            times = []
+            for _ in range(args.queries):
+                t0 = time.perf_counter()
+                idx.search("query", k=args.k, per_doc=per_doc)
+                times.append((time.perf_counter() - t0) * 1000)
+            times.sort()
+            print(f"per_doc={per_doc!s:<5}  median {statistics.median(times):6.1f} ms"
+                  f"  p95 {times[int(len(times) * 0.95) - 1]:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: incremental r-memory.log parsing against a full re-parse.
+
+Writes a synthetic log (default 500 MB of mixed init/compaction/FIFO/debug
+lines), then times:
+  * cold catch-up of RMemoryLogTail over the whole file
+  * a no-change refresh and a refresh after appending --append lines
+  * a restart that resumes from the checkpoint
+  * the legacy full parse (read + regex every line) on the first --legacy-mb
+    of the log, extrapolated to the full size
+
+    python3 tests/bench_rmemory_log.py [--size-mb 500] [--append 1000] [--legacy-mb 50]
+"""
+
+import argparse
+import json
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rmemory_log import RMemoryLogTail, parse_line
+
+_LINES = [
+    '[{ts}] [INFO] R-Memory init {{"cachedBlocks": {n}}}',
+    '[{ts}] [INFO] Session abc{n} started {{"sessionId": "abc{n}"}}',
+    '[{ts}] [INFO] === COMPACTION === {{"tokens": {n}}}',
+    '[{ts}] [INFO] Swap plan {{"blocks": {n}, "tokens": 42000}}',
+    '[{ts}] [INFO] Block compressed {{"raw": 4000, "compressed": 900, "hash": "h{n}"}}',
+    '[{ts}] [INFO] === DONE === {{"cacheHits": 3, "cacheMisses": 1, "historyBlocks": 12, "contentTokens": 18000}}',
+    '[{ts}] [INFO] FIFO evicted {{"block": {n}, "tokens": 900}}',
+    '[{ts}] [DEBUG] provider response received in {n} ms for turn {n} (no payload)',
+    '[{ts}] [DEBUG] provider response received in {n} ms for turn {n} (no payload)',
+    '[{ts}] [DEBUG] token estimate updated {{"estimate": {n}}}',
+]
+
+
+def _write_lines(fh, start, count):
+    written = 0
+    for n in range(start, start + count):
+        line = _LINES[n % len(_LINES)].format(ts=f"2026-01-01T00:00:{n % 60:02d}.000Z", n=n) + "\n"
+        written += fh.write(line)
+    return written
+
+
+def _legacy_parse(text):
+    line_re = re.compile(r'^\[(\d{4}-\d{2}-\d{2}T[\d:.]+Z)\]\s+\[(\w+)\]\s+(.*)', re.MULTILINE)
+    events = []
+    for m in line_re.finditer(text):
+        body = m.group(3)
+        evt = {"ts": m.group(1), "level": m.group(2), "raw": body}
+        json_match = re.search(r'\{.*\}', body)
+        if json_match:
+            try:
+                evt.update(json.loads(json_match.group()))
+            except Exception:
+                pass
+        events.append(evt)
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--append", type=int, default=1000)
+    parser.add_argument("--legacy-mb", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log, ckpt = Path(tmp) / "r-memory.log", Path(tmp) / "ckpt.json"
+        t0 = time.perf_counter()
+        size, n = 0, 0
+        with open(log, "w") as fh:
+            while size < args.size_mb << 20:
+                size += _write_lines(fh, n, 10_000)
+                n += 10_000
+        print(f"wrote {size / 2**20:.0f} MB ({n:,} lines) in {time.perf_counter() - t0:.1f}s")
+
+        tail = RMemoryLogTail(log, checkpoint_path=ckpt)
+        t0 = time.perf_counter()
+        tail.refresh()
+        cold = time.perf_counter() - t0
+        events = tail.snapshot()["events"]
+        print(f"cold catch-up        {cold:8.2f} s   ({events:,} events, {size / 2**20 / cold:.0f} MB/s)")
+
+        t0 = time.perf_counter()
+        tail.refresh()
+        print(f"no-change refresh    {(time.perf_counter() - t0) * 1000:8.3f} ms")
+
+        with open(log, "a") as fh:
+            _write_lines(fh, n, args.append)
+        before = tail.snapshot()["events"]
+        t0 = time.perf_counter()
+        tail.refresh()
+        new = tail.snapshot()["events"] - before
+        print(f"append refresh       {(time.perf_counter() - t0) * 1000:8.3f} ms   ({new} new events)")
+
+        t0 = time.perf_counter()
+        resumed = RMemoryLogTail(log, checkpoint_path=ckpt)
+        resumed.refresh()
+        print(f"restart + resume     {(time.perf_counter() - t0) * 1000:8.3f} ms   "
+              f"(compactions {resumed.snapshot()['compactionCount']:,})")
+
+        legacy_bytes = min(size, args.legacy_mb << 20)
+        with open(log, "rb") as fh:
+            text = fh.read(legacy_bytes).decode("utf-8", errors="ignore")
+        t0 = time.perf_counter()
+        _legacy_parse(text)
+        legacy = time.perf_counter() - t0
+        print(f"legacy full parse    {legacy * size / legacy_bytes:8.2f} s   per call "
+              f"(measured {legacy:.2f}s on {legacy_bytes / 2**20:.0f} MB)")
+        assert parse_line(text.split("\n", 1)[0])["event"] == "init"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the widget answer cache (dashboard/answer_cache.py)
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from answer_cache import AnswerCache, normalize
+from chatbots_db import ChatbotsDB
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _store(tmp_path):
+    store = ChatbotsDB(tmp_path / "chatbots.db")
+    db = store.connect()
+    db.execute("INSERT INTO chatbots (id, name, system_prompt, model_id) VALUES ('b1', 'Bot', 'Be brief.', 'mock')")
+    db.commit()
+    db.close()
+    return store
+
+
+def _bot(store, bot_id="b1"):
+    db = store.connect()
+    try:
+        return dict(db.execute("SELECT * FROM chatbots WHERE id = ?", (bot_id,)).fetchone())
+    finally:
+        db.close()
+
+
+def _ask(text, *history):
+    return list(history) + [{"role": "user", "content": text}]
+
+
+def test_normalized_question_hits_and_counts(tmp_path):
+    store = _store(tmp_path)
+    cache = AnswerCache(store)
+    bot = _bot(store)
+    assert normalize("  Opening   HOURS?! ") == "opening hours"
+    assert cache.get(bot, _ask("Opening hours?")) is None
+    assert cache.put(bot, _ask("Opening hours?"), "9 to 5")
+    assert cache.get(bot, _ask("opening hours")) == "9 to 5"
+    # Same words after a different exchange are a different context
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    assert cache.get(bot, _ask("opening hours", *history)) is None
+    stats = cache.stats("b1")
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["entries"] == 1
+    assert stats["hitRate"] == 33.3
+
+
+def test_prompt_and_knowledge_changes_invalidate(tmp_path):
+    store = _store(tmp_path)
+    cache = AnswerCache(store)
+    cache.put(_bot(store), _ask("price?"), "$10")
+    db = store.connect()
+    db.execute("UPDATE chatbots SET name = 'Renamed' WHERE id = 'b1'")
+    db.commit()
+    db.close()
+    assert cache.get(_bot(store), _ask("price?")) == "$10"
+
+    db = store.connect()
+    db.execute("UPDATE chatbots SET system_prompt = 'Be verbose.' WHERE id = 'b1'")
+    db.commit()
+    db.close()
+    assert cache.get(_bot(store), _ask("price?")) is None
+
+    cache.put(_bot(store), _ask("price?"), "$10")
+    version = _bot(store)["knowledge_version"]
+    db = store.connect()
+    db.execute("INSERT INTO knowledge_files (chatbot_id, filename, content) VALUES ('b1', 'p.txt', 'price is $12')")
+    db.commit()
+    db.close()
+    bot = _bot(store)
+    assert bot["knowledge_version"] == version + 1
+    assert cache.stats("b1")["entries"] == 0
+    assert cache.get(bot, _ask("price?")) is None
+
+
+def test_lru_bound_and_ttl(tmp_path):
+    store = _store(tmp_path)
+    clock = Clock()
+    cache = AnswerCache(store, max_entries=2, ttl=60, clock=clock)
+    bot = _bot(store)
+    for q in ("a", "b"):
+        clock.now += 1
+        cache.put(bot, _ask(q), q.upper())
+    clock.now += 1
+    assert cache.get(bot, _ask("a")) == "A"  # "b" is now least recently used
+    clock.now += 1
+    cache.put(bot, _ask("c"), "C")
+    assert cache.get(bot, _ask("b")) is None
+    assert cache.get(bot, _ask("a")) == "A" and cache.get(bot, _ask("c")) == "C"
+
+    clock.now += 61
+    assert cache.get(bot, _ask("c")) is None
+
+
+def test_near_duplicate_mode(tmp_path):
+    store = _store(tmp_path)
+    bot = _bot(store)
+    strict = AnswerCache(store)
+    near = AnswerCache(store, near_duplicate=True, similarity=0.7)
+    strict.put(bot, _ask("what are your opening hours today"), "9 to 5")
+    assert strict.get(bot, _ask("what are your opening hours")) is None
+    assert near.get(bot, _ask("what are your opening hours")) == "9 to 5"
+    assert near.get(bot, _ask("do you ship abroad")) is None
+    assert near.stats("b1")["nearHits"] == 1
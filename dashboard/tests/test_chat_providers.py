@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Unit tests for streaming chat providers (dashboard/chat_providers.py)
+
+A local HTTP/1.1 server speaks the Anthropic streaming format so the SSE
+parsing and keep-alive pooling run against real sockets.
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chat_providers import AnthropicProvider, ChatProviders, KeepAliveClient, MockProvider, ProviderError
+
+
+class _AnthropicStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    words = ["Hello", " there", ", friend"]
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.headers.get("x-api-key") != "k":
+            payload = b'{"error": "bad key"}'
+            self.send_response(401)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        assert body["stream"] is True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._chunk('event: message_start\ndata: {"type": "message_start"}\n\n')
+        for word in self.words:
+            self._chunk("event: content_block_delta\ndata: "
+                        + json.dumps({"type": "content_block_delta", "delta": {"type": "text_delta", "text": word}})
+                        + "\n\n")
+        self._chunk('event: message_stop\ndata: {"type": "message_stop"}\n\n')
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def stub():
+    _AnthropicStub.connections = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AnthropicStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_deltas_stream_over_one_kept_alive_connection(stub):
+    provider = AnthropicProvider(client=KeepAliveClient(stub))
+    msgs = [{"role": "user", "content": "hi"}]
+    for _ in range(3):
+        assert list(provider.stream("m", "sys", msgs, api_key="k")) == ["Hello", " there", ", friend"]
+    assert _AnthropicStub.connections == 1
+    assert provider.client.stats() == {"idle": 1, "opened": 1, "reused": 2}
+
+
+def test_http_errors_raise_and_abandoned_streams_are_not_reused(stub):
+    provider = AnthropicProvider(client=KeepAliveClient(stub))
+    with pytest.raises(ProviderError, match="401"):
+        list(provider.stream("m", "sys", [{"role": "user", "content": "hi"}], api_key="wrong"))
+    gen = provider.stream("m", "sys", [{"role": "user", "content": "hi"}], api_key="k")
+    assert next(gen) == "Hello"
+    gen.close()  # visitor went away mid-reply
+    assert provider.client.stats()["idle"] == 0
+    assert "".join(provider.stream("m", "sys", [], api_key="k")) == "Hello there, friend"
+    # The fully read 401 response was reused; the abandoned stream's socket was not
+    assert provider.client.stats() == {"idle": 1, "opened": 2, "reused": 1}
+
+
+def test_chat_providers_time_first_token():
+    providers = ChatProviders(overrides={"mock": MockProvider(delay=0.0, first_token_delay=0.03)})
+    assert providers.complete("mock", "mock", "", [{"role": "user", "content": "ping"}]) == "You said: ping"
+    with pytest.raises(ProviderError):
+        providers.complete("nope", "m", "", [])
+    stats = providers.stats()["mock"]
+    assert stats["requests"] == 1 and stats["errors"] == 0
+    assert 25 <= stats["ttftMs"]["p50"] <= stats["totalMs"]["p50"]
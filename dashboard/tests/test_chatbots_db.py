@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pooled chatbots.db storage (dashboard/chatbots_db.py)
+"""
+
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chatbots_db import (MIGRATIONS, QUESTION_DAYS, ChatbotsDB, chunk_text, compact_daily_questions,
+                         compact_daily_stats, daily_stats, fts_query, index_knowledge_file, list_conversations,
+                         popular_questions, search_knowledge)
+
+
+def test_migrates_once_and_reuses_connections(tmp_path):
+    calls = []
+    migrations = MIGRATIONS + [lambda conn: calls.append(1)]
+    store = ChatbotsDB(tmp_path / "chatbots.db", migrations=migrations)
+    for _ in range(20):
+        db = store.connect()
+        db.execute("SELECT count(*) FROM chatbots").fetchone()
+        db.close()
+    assert calls == [1] and store.opened == 1
+    db = store.connect()
+    assert db.execute("PRAGMA user_version").fetchone()[0] == len(migrations)
+    assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    db.close()
+
+    again = ChatbotsDB(tmp_path / "chatbots.db", migrations=migrations)
+    again.connect().close()
+    assert calls == [1]  # user_version already current
+
+
+def test_pre_versioned_file_gains_missing_columns(tmp_path):
+    path = tmp_path / "chatbots.db"
+    legacy = sqlite3.connect(str(path))
+    legacy.execute("CREATE TABLE chatbots (id TEXT PRIMARY KEY, name TEXT NOT NULL, model_id TEXT)")
+    legacy.execute("INSERT INTO chatbots (id, name) VALUES ('b1', 'Old bot')")
+    legacy.commit()
+    legacy.close()
+
+    db = ChatbotsDB(path).connect()
+    row = db.execute("SELECT name, icon, icon_type, api_type FROM chatbots WHERE id = 'b1'").fetchone()
+    assert dict(row) == {"name": "Old bot", "icon": "💬", "icon_type": "emoji", "api_type": "internal"}
+    db.close()
+
+
+def test_close_discards_uncommitted_work(tmp_path):
+    store = ChatbotsDB(tmp_path / "chatbots.db")
+    db = store.connect()
+    db.execute("INSERT INTO chatbots (id, name) VALUES ('x', 'never committed')")
+    db.close()
+    db = store.connect()
+    assert db.execute("SELECT count(*) FROM chatbots").fetchone()[0] == 0
+    db.close()
+
+
+def test_readers_do_not_wait_for_an_open_write(tmp_path):
+    store = ChatbotsDB(tmp_path / "chatbots.db")
+    writer = store.connect()
+    writer.execute("INSERT INTO chatbots (id, name) VALUES ('a', 'A')")
+    writer.commit()
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO chatbots (id, name) VALUES ('b', 'B')")
+
+    seen = []
+
+    def read():
+        db = store.connect()
+        seen.append(db.execute("SELECT count(*) FROM chatbots").fetchone()[0])
+        db.close()
+
+    t = threading.Thread(target=read)
+    t.start()
+    t.join(timeout=2)
+    assert seen == [1]
+    writer.commit()
+    writer.close()
+
+
+def _conversation(db, bot, session, started, messages):
+    db.execute("INSERT INTO chatbot_conversations (chatbot_id, session_id, started_at) VALUES (?, ?, ?)",
+               (bot, session, started))
+    conv_id = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+    for i, (role, content) in enumerate(messages):
+        db.execute("INSERT INTO chatbot_messages (conversation_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                   (conv_id, role, content, started + i))
+    return conv_id
+
+
+def test_conversation_summary_is_maintained_on_write(tmp_path):
+    store = ChatbotsDB(tmp_path / "chatbots.db")
+    db = store.connect()
+    conv = _conversation(db, "b", "s", 1000, [("assistant", "Hello"), ("user", "first question"),
+                                                 ("assistant", "answer"), ("user", "second")])
+    row = db.execute("SELECT * FROM chatbot_conversations WHERE id = ?", (conv,)).fetchone()
+    assert (row["message_count"], row["user_message_count"], row["last_message_at"]) == (4, 2, 1003)
+    assert row["first_user_message"] == "first question"
+    db.execute("DELETE FROM chatbot_messages WHERE content = 'first question'")
+    row = db.execute("SELECT * FROM chatbot_conversations WHERE id = ?", (conv,)).fetchone()
+    assert (row["message_count"], row["first_user_message"]) == (3, "second")
+    db.commit()
+    db.close()
+
+
+def _rollup(db):
+    return [tuple(r) for r in db.execute("SELECT * FROM chatbot_daily_stats ORDER BY chatbot_id, day")]
+
+
+def test_daily_stats_track_writes_and_match_compaction(tmp_path):
+    db = ChatbotsDB(tmp_path / "chatbots.db").connect()
+    day_ms = 86_400_000
+    t0 = 1_700_000_000_000
+    a = _conversation(db, "b1", "s1", t0, [("user", "hi"), ("assistant", "hello"), ("user", "bye")])
+    _conversation(db, "b1", "s2", t0 + 60_000, [("user", "price?"), ("assistant", "$10")])
+    c = _conversation(db, "b1", "s3", t0 + 2 * day_ms, [("user", "hours?")])
+    _conversation(db, "b2", "s4", t0, [("user", "yo")])
+    db.execute("UPDATE chatbot_conversations SET satisfaction_rating = 5 WHERE id = ?", (a,))
+    db.execute("UPDATE chatbot_conversations SET satisfaction_rating = 3 WHERE id = ?", (a,))
+    db.execute("UPDATE chatbot_conversations SET satisfaction_rating = 4 WHERE id = ?", (c,))
+    db.execute("DELETE FROM chatbot_messages WHERE content = 'bye'")
+
+    days = daily_stats(db, chatbot_id="b1")
+    assert [(d["conversations"], d["messages"], d["user_messages"], d["assistant_messages"]) for d in days] == \
+        [(2, 4, 2, 2), (1, 1, 1, 0)]
+    assert [(d["rated"], d["rating_sum"], d["rating3"], d["rating4"], d["rating5"]) for d in days] == \
+        [(1, 3, 1, 0, 0), (1, 4, 0, 1, 0)]
+    assert daily_stats(db, since_day=days[1]["day"])[0]["conversations"] == 1
+    assert sum(d["conversations"] for d in daily_stats(db)) == 4
+
+    db.execute("DELETE FROM chatbot_messages WHERE conversation_id = ?", (c,))
+    db.execute("DELETE FROM chatbot_conversations WHERE id = ?", (c,))
+    incremental = _rollup(db)
+    compact_daily_stats(db)
+    assert _rollup(db) == incremental and len(incremental) == 2
+    db.close()
+
+
+def _questions(db):
+    return [tuple(r) for r in db.execute(
+        "SELECT chatbot_id, day, question, count FROM chatbot_daily_questions ORDER BY chatbot_id, day, question")]
+
+
+def test_popular_questions_are_counted_per_day_within_the_window(tmp_path):
+    db = ChatbotsDB(tmp_path / "chatbots.db").connect()
+    day_ms = 86_400_000
+    now = int(time.time() * 1000)
+    a = _conversation(db, "b1", "s1", now, [("user", "price?"), ("assistant", "$10"), ("user", "hours?")])
+    _conversation(db, "b1", "s2", now - day_ms, [("user", "price?")])
+    _conversation(db, "b2", "s3", now, [("user", "price?")])
+    _conversation(db, "b1", "s4", now - (QUESTION_DAYS + 5) * day_ms, [("user", "ancient")])
+    assert popular_questions(db) == [{"question": "price?", "count": 3}, {"question": "hours?", "count": 1}]
+    assert popular_questions(db, chatbot_id="b2") == [{"question": "price?", "count": 1}]
+    assert all(q != "ancient" for _, _, q, _ in _questions(db))
+
+    db.execute("DELETE FROM chatbot_messages WHERE content = 'hours?'")
+    gone = _conversation(db, "b1", "s5", now, [("user", "gone")])
+    db.execute("DELETE FROM chatbot_conversations WHERE id = ?", (gone,))
+    db.execute("UPDATE chatbot_conversations SET chatbot_id = 'b3' WHERE id = ?", (a,))
+    incremental = _questions(db)
+    compact_daily_questions(db)
+    assert _questions(db) == incremental and len(incremental) == 3
+    db.close()
+
+
+def test_summary_and_search_index_are_backfilled(tmp_path):
+    path = tmp_path / "chatbots.db"
+    old = ChatbotsDB(path, migrations=MIGRATIONS[:1]).connect()
+    _conversation(old, "b", "s", 1000, [("user", "where is my parcel"), ("assistant", "on its way")])
+    old.commit()
+    old.close()
+
+    db = ChatbotsDB(path).connect()
+    rows, total = list_conversations(db, search="parcel")
+    assert total == 1 and rows[0]["first_message"] == "where is my parcel"
+    assert rows[0]["message_count"] == 2
+    db.close()
+
+
+def test_list_conversations_filters_pages_and_counts_in_one_pass(tmp_path):
+    db = ChatbotsDB(tmp_path / "chatbots.db").connect()
+    db.execute("INSERT INTO chatbots (id, name) VALUES ('b1', 'Support')")
+    for i in range(5):
+        _conversation(db, "b1", f"s{i}", 1000 * (i + 1), [("user", f"refund order {i}" if i % 2 else f"hello {i}")])
+    _conversation(db, "b2", "x", 9000, [("user", "refund please")])
+    db.commit()
+
+    rows, total = list_conversations(db, chatbot_id="b1", limit=2)
+    assert total == 5 and [r["session_id"] for r in rows] == ["s4", "s3"]
+    assert rows[0]["chatbot_name"] == "Support"
+    rows, total = list_conversations(db, chatbot_id="b1", search="refu")
+    assert total == 2 and {r["session_id"] for r in rows} == {"s1", "s3"}
+    rows, total = list_conversations(db, search="refund", start_date=2500, limit=1, offset=5)
+    assert rows == [] and total == 2
+    assert list_conversations(db, search="o'brien \"quoted\"")[1] == 0  # no FTS syntax errors
+    db.close()
+
+
+def test_fts_query_quotes_words():
+    assert fts_query("refund order") == '"refund" "order"*'
+    assert fts_query("  ") is None
+
+
+def _knowledge(db, bot, filename, content):
+    file_id = db.execute("INSERT INTO knowledge_files (chatbot_id, filename, content) VALUES (?, ?, ?)",
+                         (bot, filename, content)).lastrowid
+    index_knowledge_file(db, file_id, bot, content)
+    return file_id
+
+
+def test_knowledge_chunks_are_ranked_per_bot(tmp_path):
+    db = ChatbotsDB(tmp_path / "chatbots.db").connect()
+    filler = "lorem ipsum dolor sit amet " * 40
+    faq = _knowledge(db, "b1", "faq.md", filler + " refunds are issued within 14 days of a refund request " + filler)
+    _knowledge(db, "b1", "about.md", filler + " we ship worldwide, refunds on request " + filler)
+    _knowledge(db, "b1-x", "other.md", "refund refund refund")
+    db.commit()
+    assert db.execute("SELECT count(*) FROM knowledge_chunks WHERE file_id = ?", (faq,)).fetchone()[0] > 3
+
+    hits = search_knowledge(db, "b1", "How do refund requests work?", limit=3)
+    assert hits and {h["filename"] for h in hits} <= {"faq.md", "about.md"}
+    assert hits[0]["filename"] == "faq.md" and any("refund" in h["content"] for h in hits)
+    assert hits == sorted(hits, key=lambda h: -h["score"])
+    assert search_knowledge(db, "b1", "?!") == []
+
+    db.execute("DELETE FROM knowledge_files WHERE id = ?", (faq,))
+    assert db.execute("SELECT count(*) FROM knowledge_chunks WHERE file_id = ?", (faq,)).fetchone()[0] == 0
+    assert {h["filename"] for h in search_knowledge(db, "b1", "refunds")} == {"about.md"}
+    db.close()
+
+
+def test_existing_knowledge_files_are_chunked_by_migration(tmp_path):
+    path = tmp_path / "chatbots.db"
+    old = ChatbotsDB(path, migrations=MIGRATIONS[:2]).connect()
+    old.execute("INSERT INTO knowledge_files (chatbot_id, filename, content) VALUES ('b', 'a.txt', 'opening hours 9 to 5')")
+    old.commit()
+    old.close()
+    db = ChatbotsDB(path).connect()
+    assert [h["filename"] for h in search_knowledge(db, "b", "hours")] == ["a.txt"]
+    db.close()
+
+
+def test_chunk_text_overlaps():
+    assert chunk_text("abcdefghij", chunk_size=4, overlap=1) == ["abcd", "defg", "ghij", "j"]
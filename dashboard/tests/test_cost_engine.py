@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the columnar cost engine (dashboard/cost_engine.py)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+np = pytest.importorskip("numpy")
+
+from cost_engine import UsageMatrix, check_scenario, compare, model_key, price, rate_matrix
+from usage_rollup import UsageRollup
+
+BASE = {
+    "a/big": {"inputPer1M": 10.0, "outputPer1M": 50.0, "cacheReadPer1M": 1.0, "cacheWritePer1M": 12.5},
+    "a/small": {"inputPer1M": 1.0, "outputPer1M": 5.0, "cacheReadPer1M": 0.1, "cacheWritePer1M": 1.25},
+}
+FALLBACK = {"inputPer1M": 2.0, "outputPer1M": 4.0, "cacheReadPer1M": 0.0, "cacheWritePer1M": 0.0}
+
+ROWS = [
+    ("2026-03-01", "a", "big", 3, 1_000_000, 100_000, 0, 0),
+    ("2026-03-01", "a", "small", 1, 2_000_000, 0, 500_000, 0),
+    ("2026-03-02", "a", "big", 2, 0, 0, 0, 80_000),
+    ("2026-03-02", "", "mystery", 1, 1_000_000, 1_000_000, 0, 0),
+]
+
+
+def test_baseline_matches_row_by_row_pricing():
+    usage = UsageMatrix.from_rows(ROWS)
+    assert usage.days == ["2026-03-01", "2026-03-02"] and "" in usage.models
+    costs = price(usage, rate_matrix(usage.models, BASE, FALLBACK)[None])[0]  # (day, category)
+    expected = {}
+    for day, prov, model, _n, *tokens in ROWS:
+        rates = BASE.get(model_key(prov, model), FALLBACK)
+        per_row = [t * rates[f] / 1e6 for t, f in zip(tokens, ("inputPer1M", "outputPer1M", "cacheReadPer1M", "cacheWritePer1M"))]
+        expected[day] = [a + b for a, b in zip(expected.get(day, [0.0] * 4), per_row)]
+    assert costs == pytest.approx(np.array([expected["2026-03-01"], expected["2026-03-02"]]))
+
+
+def test_scenarios_priced_together():
+    usage = UsageMatrix.from_rows(ROWS)
+    results = compare(usage, BASE, FALLBACK, [
+        {"name": "all small", "priceAllAs": "a/small"},
+        {"name": "cheap big input", "models": {"a/big": {"inputPer1M": 5.0}}},
+    ])
+    baseline, all_small, cheap = results
+    assert baseline["name"] == "baseline" and baseline["delta"] == 0
+    assert baseline["totalCost"] == pytest.approx(10 + 5 + 2 + 0.05 + 1.0 + 2 + 4)
+    assert cheap["delta"] == pytest.approx(-5.0)
+    assert cheap["byModel"]["a/small"] == baseline["byModel"]["a/small"]
+    assert all_small["inputCost"] == pytest.approx(4.0)  # 4M input tokens at $1
+    assert all_small["byModel"]["fallback"] == pytest.approx(1.0 + 5.0)
+    assert all_small["deltaPct"] < 0
+
+
+def test_unknown_price_all_as_model_is_rejected():
+    with pytest.raises(ValueError):
+        compare(UsageMatrix.from_rows(ROWS), BASE, FALLBACK, [{"priceAllAs": "nope/model"}])
+
+
+@pytest.mark.parametrize("scenario", [
+    [],
+    {"priceAllAs": ["a/big"]},
+    {"priceAllAs": 3},
+    {"models": [1]},
+    {"models": {"a/big": 1}},
+])
+def test_malformed_scenarios_raise_value_error(scenario):
+    with pytest.raises(ValueError):
+        check_scenario(BASE, scenario)
+    with pytest.raises(ValueError):
+        compare(UsageMatrix.from_rows(ROWS), BASE, FALLBACK, [scenario])
+
+
+def test_engine_agrees_with_rollup_sql_pricing(tmp_path):
+    rng = np.random.default_rng(7)
+    src = tmp_path / "usage.jsonl"
+    models = [("a", "big"), ("a", "small"), ("b", "other"), ("", "")]
+    with open(src, "w") as f:
+        for _ in range(500):
+            prov, model = models[rng.integers(len(models))]
+            tokens = rng.integers(0, 50_000, size=4)
+            f.write('{"ts": "2026-03-%02dT10:00:00Z", "provider": "%s", "model": "%s", '
+                    '"input": %d, "output": %d, "cacheRead": %d, "cacheWrite": %d}\n'
+                    % (rng.integers(1, 29), prov, model, *tokens))
+    rollup = UsageRollup(src, tmp_path / "rollup.db")
+    rollup.refresh()
+    usage = UsageMatrix.from_rows(rollup.rows("2026-03-01"))
+    costs = price(usage, rate_matrix(usage.models, BASE, FALLBACK)[None])[0]
+    sql = rollup.daily("2026-03-01", BASE, FALLBACK)
+    assert [d["date"] for d in sql] == usage.days
+    assert costs.sum(axis=1).tolist() == pytest.approx([d["totalCost"] for d in sql])
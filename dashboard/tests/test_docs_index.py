@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the docs search index (dashboard/docs_index.py)
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docs_index import DocsIndex, DocsRoot
+
+
+def _make_index(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / "sub").mkdir(parents=True)
+    (docs / "a.md").write_text("# Alpha\nhello World\nfoo\nbar hello\n")
+    (docs / "sub" / "b.md").write_text("nothing\nHELLO there\n")
+    ws = tmp_path / "ws"
+    ws.mkdir()
+    (ws / "SOUL.md").write_text("hello")
+    (ws / "notes.md").write_text("he\nhello\n")
+    roots = [
+        DocsRoot(docs, "resonantos-augmentor/docs"),
+        DocsRoot(ws, "", recursive=False, exclude={"SOUL.md"}),
+    ]
+    idx = DocsIndex(tmp_path / "index.db", roots)
+    idx.sync()
+    return idx, docs, ws
+
+
+def test_search_payload_matches_line_scan(tmp_path):
+    idx, _, _ = _make_index(tmp_path)
+    results = idx.search("hello")
+    assert [r["path"] for r in results] == [
+        "resonantos-augmentor/docs/a.md",
+        "resonantos-augmentor/docs/sub/b.md",
+        "notes.md",
+    ]
+    first = results[0]
+    assert first["title"] == "Alpha"
+    assert first["matchCount"] == 2
+    assert first["matches"][0] == {"line": 2, "text": "hello World", "snippet": "# Alpha\nhello World\nfoo"}
+
+
+def test_short_query_and_excluded_files(tmp_path):
+    idx, _, _ = _make_index(tmp_path)
+    paths = {r["path"] for r in idx.search("he")}
+    assert "notes.md" in paths
+    assert "SOUL.md" not in paths
+
+
+def test_incremental_update_and_sync(tmp_path):
+    idx, docs, ws = _make_index(tmp_path)
+    (docs / "a.md").write_text("changed\n")
+    assert idx.update_file(docs / "a.md")
+    (ws / "notes.md").unlink()
+    stats = idx.sync()
+    assert stats["removed"] == 1
+    assert [r["path"] for r in idx.search("hello")] == ["resonantos-augmentor/docs/sub/b.md"]
+
+
+def test_index_persists_across_restart(tmp_path):
+    idx, _, _ = _make_index(tmp_path)
+    reopened = DocsIndex(idx.db_path, idx.roots)
+    assert reopened.ready
+    stats = reopened.sync()
+    assert stats["added"] == stats["updated"] == 0
+    assert len(reopened.search("hello")) == 3
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the semantic docs term index (dashboard/docs_terms.py)
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docs_index import DocsRoot
+from docs_terms import DocsTermIndex, MIN_SCORE, legacy_relevance
+
+DOCS = {
+    "L1/memory.md": "# R-Memory\nCompaction keeps memory small.\nThe memmory typo is fuzzy.\n",
+    "L1/shield.md": "# Shield\nShield blocks risky tools; the gateway asks it first.\n",
+    "L2/compaction-notes.md": "notes about compacton and aa aaaa aaaaa\n",
+    "L2/empty.md": "",
+}
+QUERIES = ["memory compaction", "shield gateway", "r-memory", "compaction", "aa", "memory typo is"]
+
+
+def _index(tmp_path):
+    for rel, text in DOCS.items():
+        fp = tmp_path / rel
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fp.write_text(text)
+    idx = DocsTermIndex([DocsRoot(tmp_path, "ssot")])
+    idx.sync()
+    return idx
+
+
+def test_scores_match_legacy_scorer(tmp_path):
+    idx = _index(tmp_path)
+    for q in QUERIES:
+        expected = {}
+        for rel, text in DOCS.items():
+            score = legacy_relevance(q, text, f"ssot/{rel}")
+            if score >= MIN_SCORE:
+                expected[f"ssot/{rel}"] = score
+        got = {doc.path: score for score, doc in idx.search(q)}
+        assert got.keys() == expected.keys(), q
+        for path, score in expected.items():
+            assert abs(got[path] - score) < 1e-9, (q, path)
+
+
+def test_updates_and_removals(tmp_path):
+    idx = _index(tmp_path)
+    (tmp_path / "L1" / "shield.md").write_text("nothing relevant here\n")
+    idx.update_file(tmp_path / "L1" / "shield.md")
+    assert [d.path for _, d in idx.search("gateway")] == []
+    (tmp_path / "L1" / "memory.md").unlink()
+    idx.update_file(tmp_path / "L1" / "memory.md")
+    assert "ssot/L1/memory.md" not in {d.path for _, d in idx.search("memory")}
+    assert "memmory" not in idx._vocab.postings
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the docs vector index (dashboard/docs_vectors.py)
+"""
+
+import sys
+import urllib.error
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("numpy")
+
+from docs_index import DocsRoot
+from docs_vectors import DocsVectorIndex, EmbedderError, HashingEmbedder, chunk_markdown
+
+
+class _CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=128)
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += len(texts)
+        return super().embed(texts)
+
+
+class _FlakyEmbedder(HashingEmbedder):
+    """Fails like an unreachable Ollama server while ``down`` is set."""
+
+    def __init__(self):
+        super().__init__(dim=128)
+        self.down = True
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        if self.down:
+            raise urllib.error.URLError("connection refused")
+        return super().embed(texts)
+
+
+def _corpus(tmp_path):
+    docs = tmp_path / "ssot"
+    docs.mkdir()
+    (docs / "memory.md").write_text("# Memory\nCompaction compresses history blocks.\n\n## Cache\nBlock cache hits.\n")
+    (docs / "wallet.md").write_text("# Wallet\nSymbiotic wallet pairs a human key and an AI key.\n")
+    return docs
+
+
+def test_hashing_embedder_is_deterministic():
+    a = HashingEmbedder(64).embed(["resonant memory"])
+    b = HashingEmbedder(64).embed(["resonant memory"])
+    assert (a == b).all()
+
+
+def test_chunks_split_on_headings():
+    chunks = chunk_markdown("# A\none\n## B\ntwo\n")
+    assert chunks == [(1, "# A\none"), (3, "## B\ntwo")]
+
+
+def test_search_ranks_relevant_chunk_first(tmp_path):
+    docs = _corpus(tmp_path)
+    idx = DocsVectorIndex(tmp_path / "v.db", [DocsRoot(docs, "ssot")], HashingEmbedder())
+    idx.sync()
+    score, chunk = idx.search("symbiotic wallet key")[0]
+    assert chunk.path == "ssot/wallet.md"
+    assert chunk.title == "Wallet"
+    assert 0 < score <= 1.0001
+
+
+def test_only_changed_chunks_are_reembedded(tmp_path):
+    docs = _corpus(tmp_path)
+    embedder = _CountingEmbedder()
+    idx = DocsVectorIndex(tmp_path / "v.db", [DocsRoot(docs, "ssot")], embedder)
+    idx.sync()
+    assert embedder.calls == 3
+
+    (docs / "memory.md").write_text("# Memory\nCompaction compresses history blocks.\n\n## Cache\nBlock cache misses.\n")
+    idx.update_file(docs / "memory.md")
+    assert embedder.calls == 4
+
+    # A restart reuses every cached vector
+    restarted = DocsVectorIndex(tmp_path / "v.db", [DocsRoot(docs, "ssot")], embedder)
+    restarted.sync()
+    assert embedder.calls == 4
+    assert restarted.stats()["chunks"] == 3
+
+
+def test_deleted_files_leave_the_index(tmp_path):
+    docs = _corpus(tmp_path)
+    idx = DocsVectorIndex(tmp_path / "v.db", [DocsRoot(docs, "ssot")], HashingEmbedder())
+    idx.sync()
+    (docs / "wallet.md").unlink()
+    idx.update_file(docs / "wallet.md")
+    assert all(c.path != "ssot/wallet.md" for _, c in idx.search("symbiotic wallet"))
+
+
+def test_embedder_failure_is_reported_not_skipped(tmp_path):
+    docs = _corpus(tmp_path)
+    embedder = _FlakyEmbedder()
+    idx = DocsVectorIndex(tmp_path / "v.db", [DocsRoot(docs, "ssot")], embedder)
+    with pytest.raises(EmbedderError):
+        idx.sync()
+    stats = idx.stats()
+    assert not stats["ready"]
+    assert "connection refused" in stats["error"]
+    assert embedder.calls == 1  # the sync stops at the first failure
+
+    embedder.down = False
+    idx.sync()
+    assert idx.ready and idx.error is None
+    assert idx.stats()["files"] == 2
+
+
+def test_query_embed_failure_clears_ready_until_resync(tmp_path):
+    docs = _corpus(tmp_path)
+    embedder = _FlakyEmbedder()
+    embedder.down = False
+    idx = DocsVectorIndex(tmp_path / "v.db", [DocsRoot(docs, "ssot")], embedder)
+    idx.sync()
+    embedder.down = True
+    with pytest.raises(EmbedderError):
+        idx.search("wallet")
+    assert not idx.ready
+    # Nothing changed on disk, but the resync still probes the embedder
+    with pytest.raises(EmbedderError):
+        idx.sync()
+    embedder.down = False
+    idx.sync()
+    assert idx.ready
+
+
+def test_follower_sync_uses_only_cached_vectors(tmp_path):
+    docs = _corpus(tmp_path)
+    leader_embedder, follower_embedder = _CountingEmbedder(), _CountingEmbedder()
+    follower = DocsVectorIndex(tmp_path / "v.db", [DocsRoot(docs, "ssot")], follower_embedder)
+    follower.sync(embed_missing=False)
+    assert follower.stats()["files"] == 0  # nothing embedded yet; retried later
+
+    DocsVectorIndex(tmp_path / "v.db", [DocsRoot(docs, "ssot")], leader_embedder).sync()
+    follower.sync(embed_missing=False)
+    assert follower.stats()["files"] == 2 and follower_embedder.calls == 0
+    assert follower.search("symbiotic wallet")[0][1].path == "ssot/wallet.md"
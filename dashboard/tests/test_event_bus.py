@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the dashboard event bus (dashboard/event_bus.py)
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from event_bus import EventBus, EventRelay, format_sse, topic_matches
+
+
+def test_topic_prefix_filtering():
+    assert topic_matches("gateway.tick", ["gateway"])
+    assert topic_matches("gateway.tick", None)
+    assert not topic_matches("gatewayx.tick", ["gateway"])
+    assert not topic_matches("gateway.tick", ["gateway.health", "shield"])
+
+    bus = EventBus()
+    sub = bus.subscribe(["gateway.health", "shield"])
+    for topic in ("gateway.tick", "gateway.health", "shield.alert", "rmemory.log"):
+        bus.publish(topic, {"t": topic})
+    assert [e["topic"] for e in sub.get(0)] == ["gateway.health", "shield.alert"]
+
+
+def test_full_queue_drops_oldest():
+    bus = EventBus(max_queue=3)
+    sub = bus.subscribe()
+    for i in range(5):
+        bus.publish("x", i)
+    assert [e["data"] for e in sub.get(0)] == [2, 3, 4]
+    assert sub.dropped == 2 and bus.stats()["dropped"] == 2
+
+
+def test_get_blocks_until_publish_and_close_unsubscribes():
+    bus = EventBus()
+    sub = bus.subscribe()
+    threading.Timer(0.02, bus.publish, args=("gateway.status", {"connected": True})).start()
+    assert sub.get(timeout=2)[0]["data"] == {"connected": True}
+    assert sub.get(timeout=0.01) == []
+    sub.close()
+    assert bus.subscribers() == 0
+    bus.publish("x")
+    assert sub.get(0) == []
+
+
+def test_resume_after_last_event_id():
+    bus = EventBus(replay=10)
+    first = bus.publish("a", 1)
+    bus.publish("b", 2)
+    bus.publish("a", 3)
+    sub = bus.subscribe(["a"], last_event_id=first["id"])
+    assert [e["data"] for e in sub.get(0)] == [3]
+
+
+def test_sse_framing():
+    event = EventBus().publish("shield.alert", {"severity": "HIGH"})
+    frame = format_sse(event)
+    assert frame.startswith(f"id: {event['id']}\ndata: ") and frame.endswith("\n\n")
+    body = json.loads(frame.split("data: ", 1)[1])
+    assert body["topic"] == "shield.alert" and body["data"] == {"severity": "HIGH"}
+
+
+def test_relay_mirrors_buses_sharing_a_log(tmp_path):
+    leader, follower = EventBus(), EventBus()
+    relays = [EventRelay(bus, tmp_path / "events.db", poll=60) for bus in (leader, follower)]
+    for relay in relays:
+        relay.start()
+    sub = follower.subscribe(["gateway"])
+    leader.publish("gateway.health", {"ok": True})
+    assert relays[1].pump() == 1
+    assert [(e["topic"], e["data"]) for e in sub.get(0)] == [("gateway.health", {"ok": True})]
+    # Relayed events are not appended again, and a process skips its own
+    assert relays[0].pump() == 1 and leader.stats()["published"] == 1
+    assert relays[1].stats()["appended"] == 0
+    assert relays[1].latest("gateway.health") == {"ok": True}
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Unit tests for streamed exports (dashboard/export_stream.py)
+"""
+
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from export_stream import csv_chunks, gzip_chunks, iter_batches, json_object_chunks, jsonl_chunks
+
+
+def _db(n):
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE m (id INTEGER PRIMARY KEY, role TEXT, content TEXT)")
+    conn.executemany("INSERT INTO m (role, content) VALUES (?, ?)",
+                     [("user" if i % 2 else "assistant", f'line {i}, "quoted"\nnext') for i in range(n)])
+    return conn
+
+
+def test_batches_are_bounded_and_cover_every_row():
+    batches = list(iter_batches(_db(1234), "SELECT * FROM m WHERE id > ? ORDER BY id", (4,), chunk_rows=500))
+    assert [len(b) for b in batches] == [500, 500, 230]
+    assert batches[0][0]["id"] == 5 and batches[-1][-1]["id"] == 1234
+
+
+def test_csv_and_jsonl_round_trip():
+    db = _db(7)
+    chunks = list(csv_chunks(["ID", "Role", "Content"], iter_batches(db, "SELECT * FROM m", chunk_rows=3)))
+    assert len(chunks) == 4  # header + three batches
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == ["ID", "Role", "Content"] and len(rows) == 8
+    assert rows[3] == ["3", "assistant", 'line 2, "quoted"\nnext']
+
+    lines = b"".join(jsonl_chunks(iter_batches(db, "SELECT * FROM m", chunk_rows=3))).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == list(range(1, 8))
+
+
+def test_json_object_streams_a_valid_document():
+    db = _db(5)
+    body = b"".join(json_object_chunks({"id": 9, "messages": 5, "name": "x"}, "messages",
+                                       iter_batches(db, "SELECT * FROM m", chunk_rows=2)))
+    doc = json.loads(body)
+    assert doc["id"] == 9 and doc["name"] == "x" and [m["id"] for m in doc["messages"]] == [1, 2, 3, 4, 5]
+    empty = json.loads(b"".join(json_object_chunks({"id": 1}, "messages", [])))
+    assert empty == {"id": 1, "messages": []}
+
+
+def test_gzip_stream_decompresses_to_the_original():
+    chunks = [f"row {i}\n".encode() * 50 for i in range(200)]
+    compressed = list(gzip_chunks(iter(chunks)))
+    assert gzip.decompress(b"".join(compressed)) == b"".join(chunks)
+    assert sum(map(len, compressed)) < sum(map(len, chunks)) / 10
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the dashboard filesystem watcher (dashboard/fs_watcher.py)
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fs_watcher import FsWatcher, WatchedDir, WatchedView
+
+
+def _listing_view(root, **kw):
+    return WatchedView("listing", [WatchedDir(root)], lambda: sorted(p.name for p in root.rglob("*.md")), **kw)
+
+
+def test_events_invalidate_covering_views_only(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    watcher = FsWatcher()
+    va = watcher.add_view(WatchedView("a", [WatchedDir(tmp_path / "a")], lambda: "a"))
+    vb = watcher.add_view(WatchedView("b", [WatchedDir(tmp_path / "b")], lambda: "b"))
+    va.get(True), vb.get(True)
+    seen = []
+    watcher.add_listener([WatchedDir(tmp_path / "a")], lambda p, d: seen.append(p))
+
+    watcher.dispatch(str(tmp_path / "a" / "x.md"), False)
+    va.get(True), vb.get(True)
+    assert (va.builds, vb.builds) == (2, 1)
+    assert seen == [str(tmp_path / "a" / "x.md")]
+
+    # Skipped directories never invalidate
+    watcher.dispatch(str(tmp_path / "a" / "node_modules" / "y.md"), False)
+    va.get(True)
+    assert va.builds == 2
+
+
+def test_fallback_rescans_only_when_fingerprint_changes(tmp_path):
+    (tmp_path / "one.md").write_text("1")
+    view = _listing_view(tmp_path, fallback_ttl=0)
+    assert view.get(False) == ["one.md"]
+    assert view.get(False) == ["one.md"]
+    assert view.builds == 1
+
+    (tmp_path / "two.md").write_text("2")
+    assert view.get(False) == ["one.md", "two.md"]
+    assert view.builds == 2
+
+
+def test_non_recursive_dir_ignores_subfolders(tmp_path):
+    d = WatchedDir(tmp_path, recursive=False)
+    assert d.covers(tmp_path / "top.md")
+    assert not d.covers(tmp_path / "memory" / "deep.md")
+    assert not d.covers(tmp_path.parent / "elsewhere.md")
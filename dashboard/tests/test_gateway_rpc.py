@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit tests for gateway request multiplexing (dashboard/gateway_rpc.py)
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gateway_rpc import GatewayBusy, GatewayError, GatewayTimeout, RequestTable
+
+
+def _reaper(table):
+    threading.Thread(target=table.run_reaper, daemon=True).start()
+
+
+def test_ids_are_unique_across_threads():
+    table = RequestTable(max_in_flight=10_000)
+    ids = []
+    lock = threading.Lock()
+
+    def opener():
+        for _ in range(500):
+            mid, _ = table.open()
+            with lock:
+                ids.append(mid)
+
+    threads = [threading.Thread(target=opener) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(ids)) == len(ids) == 4000
+
+
+def test_responses_resolve_out_of_order():
+    table = RequestTable()
+    (a, fa), (b, fb) = table.open(), table.open()
+    assert table.resolve(b, {"id": b, "ok": True})
+    assert table.resolve(a, {"id": a, "ok": True})
+    assert fa.result(0)["id"] == a and fb.result(0)["id"] == b
+    assert not table.resolve(a, {"id": a})  # late duplicate
+    stats = table.stats()
+    assert stats["completed"] == 2 and stats["inFlight"] == 0
+    assert stats["latencyMs"]["samples"] == 2
+
+
+def test_deadline_times_out_and_releases_slot():
+    table = RequestTable(max_in_flight=1)
+    _reaper(table)
+    mid, fut = table.open(timeout=0.05)
+    with pytest.raises(GatewayTimeout):
+        fut.result(timeout=2)
+    assert not table.resolve(mid, {"ok": True})
+    table.open(timeout=0.05)  # the slot is free again
+    assert table.stats()["timeouts"] == 1
+
+
+def test_backpressure_rejects_when_full():
+    table = RequestTable(max_in_flight=2)
+    (a, _), _ = table.open(), table.open()
+    t0 = time.monotonic()
+    with pytest.raises(GatewayBusy):
+        table.open(timeout=0.05)
+    assert time.monotonic() - t0 >= 0.05
+    t0 = time.monotonic()
+    with pytest.raises(GatewayBusy):
+        table.open(timeout=5, wait=0)
+    assert time.monotonic() - t0 < 0.05  # wait=0 never blocks
+    table.resolve(a, {"ok": True})
+    table.open(timeout=0.05)
+    assert table.stats()["rejected"] == 2
+
+
+def test_cancel_and_fail_all_release_entries():
+    table = RequestTable()
+    mid, fut = table.open()
+    assert fut.cancel()
+    assert not table.resolve(mid, {"ok": True})
+    table.open(), table.open()
+    assert table.fail_all(GatewayError("disconnected")) == 2
+    stats = table.stats()
+    assert (stats["cancelled"], stats["errors"], stats["inFlight"]) == (1, 2, 0)
+
+
+def test_future_is_awaitable():
+    table = RequestTable()
+
+    async def main():
+        mid, fut = table.open()
+        asyncio.get_running_loop().call_later(0.01, table.resolve, mid, {"ok": True, "payload": 7})
+        return await asyncio.wrap_future(fut)
+
+    assert asyncio.run(main())["payload"] == 7
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Unit tests for memoized PDA/ATA derivation (solana-toolkit/pda_cache.py)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "solana-toolkit"))
+
+pytest.importorskip("solders")
+from solders.pubkey import Pubkey
+
+from pda_cache import PdaCache, get_associated_token_address, pubkey_bytes
+
+PROGRAM = "HMthR7AStR3YKJ4m8GMveWx5dqY3D2g2cfnji7VdcVoG"
+HUMANS = [str(Pubkey.new_unique()) for _ in range(20)]
+TOKEN_2022 = "TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb"
+
+
+def _seeds(human):
+    return [b"symbiotic", pubkey_bytes(human), bytes([0])]
+
+
+def test_matches_solders():
+    cache = PdaCache()
+    for human in HUMANS[:5]:
+        expected, bump = Pubkey.find_program_address(_seeds(human), Pubkey.from_string(PROGRAM))
+        assert cache.find_program_address(_seeds(human), PROGRAM) == (str(expected), bump)
+
+
+def test_memoizes_and_dedupes_bulk_requests():
+    cache = PdaCache()
+    requests = [(_seeds(h), PROGRAM) for h in HUMANS] + [(_seeds(HUMANS[0]), PROGRAM)]
+    first = cache.find_many(requests)
+    assert first[0] == first[-1]
+    assert cache.stats()["derived"] == len(HUMANS)
+    assert cache.find_many(requests) == first
+    assert cache.stats()["derived"] == len(HUMANS)
+    assert cache.stats()["hits"] == len(requests)
+
+
+def test_persists_across_instances(tmp_path):
+    db = tmp_path / "pda.db"
+    first = PdaCache(db).find_many([(_seeds(h), PROGRAM) for h in HUMANS])
+    fresh = PdaCache(db)
+    assert fresh.find_many([(_seeds(h), PROGRAM) for h in HUMANS]) == first
+    stats = fresh.stats()
+    assert stats["derived"] == 0 and stats["stored"] == len(HUMANS) and stats["persisted"] == len(HUMANS)
+
+
+def test_associated_token_address_matches_spl():
+    spl = pytest.importorskip("spl.token.instructions")
+    owner, mint = Pubkey.new_unique(), Pubkey.new_unique()
+    program = Pubkey.from_string(TOKEN_2022)
+    assert get_associated_token_address(owner, mint, program) == spl.get_associated_token_address(owner, mint, program)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the chatbot rate limiter (dashboard/rate_limit.py)
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rate_limit import MemoryBackend, RateLimiter, SQLiteBackend
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _burst(limiter, n, bot="b1", client="1.2.3.4", per_minute=3, per_hour=100):
+    return [limiter.check(bot, client, per_minute, per_hour) for _ in range(n)]
+
+
+def test_minute_bucket_refills_continuously():
+    clock = Clock()
+    limiter = RateLimiter(clock=clock)
+    results = _burst(limiter, 4)
+    assert [ok for ok, _ in results] == [True, True, True, False]
+    assert results[-1][1] == 20  # one token every 60 / 3 seconds
+    clock.now += 20
+    assert limiter.check("b1", "1.2.3.4", 3, 100) == (True, 0)
+    # Other clients and other bots have their own buckets
+    assert limiter.check("b1", "5.6.7.8", 3, 100)[0]
+    assert limiter.check("b2", "1.2.3.4", 3, 100)[0]
+    assert limiter.stats()["limited"] == 1
+
+
+def test_hour_window_slides_and_zero_is_unlimited():
+    clock = Clock()
+    limiter = RateLimiter(clock=clock)
+    allowed = 0
+    for _ in range(30):
+        clock.now += 30  # within the per-minute limit of 10
+        allowed += limiter.check("b1", "s", 10, 12)[0]
+    assert allowed == 14  # 12 up front, then one per 300s (3600 / 12) over 15 minutes
+    ok, retry_after = limiter.check("b1", "s", 10, 12)
+    assert not ok and 0 < retry_after <= 300
+    assert all(ok for ok, _ in _burst(limiter, 50, per_minute=0, per_hour=0))
+
+
+def test_memory_backend_evicts_lru_and_idle_keys():
+    backend = MemoryBackend(max_keys=3, idle_seconds=100)
+    for i in range(5):
+        backend.take(f"k{i}", 10, 100, 1000.0 + i)
+    assert backend.stats()["keys"] == 3 and "k0" not in backend._buckets
+    backend.take("k2", 10, 100, 1050.0)
+    backend.take("k9", 10, 100, 1149.0)  # k3 and k4 have been idle for over 100s
+    assert list(backend._buckets) == ["k2", "k9"]
+
+
+def test_sqlite_backend_is_shared_between_limiters(tmp_path):
+    clock = Clock()
+    path = tmp_path / "rate_limits.db"
+    first = RateLimiter(SQLiteBackend(path), clock=clock)
+    second = RateLimiter(SQLiteBackend(path), clock=clock)
+    assert first.check("b1", "s", 2, 100)[0] and second.check("b1", "s", 2, 100)[0]
+    ok, retry_after = first.check("b1", "s", 2, 100)
+    assert not ok and retry_after == 30
+    assert second.stats()["keys"] == 1
+
+
+def test_fresh_session_ids_share_the_ip_bucket():
+    clock = Clock()
+    limiter = RateLimiter(clock=clock, ip_multiplier=1)
+    results = [limiter.check("b1", f"session-{i}", 3, 100, ip="1.2.3.4") for i in range(4)]
+    assert [ok for ok, _ in results] == [True, True, True, False]
+    assert limiter.check("b1", "session-x", 3, 100, ip="5.6.7.8")[0]
+    # The multiplier leaves room for several visitors behind one address
+    shared = RateLimiter(clock=clock, ip_multiplier=2)
+    assert sum(shared.check("b1", f"s{i}", 3, 100, ip="1.2.3.4")[0] for i in range(8)) == 6
+    assert RateLimiter(clock=clock).ip_multiplier == 10
+
+
+def test_refused_checks_debit_neither_bucket(tmp_path):
+    for backend in (MemoryBackend(), SQLiteBackend(tmp_path / "rate_limits.db")):
+        limiter = RateLimiter(backend, clock=Clock(), ip_multiplier=1)
+        assert all(limiter.check("b1", f"s{i}", 3, 100, ip="1.2.3.4")[0] for i in range(3))
+        # Refused by the exhausted IP bucket: the session keeps its tokens
+        assert not any(limiter.check("b1", "a", 3, 100, ip="1.2.3.4")[0] for _ in range(3))
+        assert all(limiter.check("b1", "a", 3, 100, ip="5.6.7.8")[0] for _ in range(3))
+        # Refused by the session bucket: the other address keeps its tokens
+        assert not limiter.check("b1", "a", 3, 100, ip="9.9.9.9")[0]
+        assert all(limiter.check("b1", f"t{i}", 3, 100, ip="9.9.9.9")[0] for i in range(3))
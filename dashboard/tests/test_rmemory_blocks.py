@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the R-Memory block index (dashboard/rmemory_blocks.py)
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rmemory_blocks import RMemoryBlockIndex
+
+
+def _history(d, sid, blocks, mtime=None):
+    fp = d / f"history-{sid}.json"
+    fp.write_text(json.dumps(blocks))
+    if mtime is not None:
+        os.utime(fp, (mtime, mtime))
+    return fp
+
+
+def test_aggregates_merge_history_and_cache(tmp_path):
+    _history(tmp_path, "aa", [{"hash": "x", "tokensRaw": 100, "tokensCompressed": 20},
+                              {"hash": "y", "tokensRaw": 40, "tokensCompressed": 30}], mtime=1000)
+    _history(tmp_path, "bb", [{"hash": "z", "tokensRaw": 300, "tokensCompressed": 50}], mtime=2000)
+    (tmp_path / "block-cache.json").write_text(json.dumps({
+        "x": {"tokensRaw": 999, "tokensCompressed": 1},  # covered by a history block
+        "w": {"tokensRaw": 80, "tokensCompressed": 90},
+        "empty": {"tokensRaw": 0, "tokensCompressed": 0},
+    }))
+    idx = RMemoryBlockIndex(tmp_path, tmp_path / "idx.db")
+    assert idx.sync() == 3
+    assert idx.current_session() == "bb"
+    totals = idx.aggregates("aa")
+    assert totals["all"] == {"blocks": 4, "raw": 520, "compressed": 190}
+    assert totals["meaningful"] == {"blocks": 2, "raw": 400, "compressed": 70}
+    assert totals["session"] == {"blocks": 2, "raw": 140, "compressed": 50, "saved": 90}
+    assert idx.aggregates(None)["session"]["blocks"] == 0
+
+
+def test_only_changed_files_are_reparsed(tmp_path):
+    _history(tmp_path, "aa", [{"tokensRaw": 10, "tokensCompressed": 5}])
+    fp = _history(tmp_path, "bb", [{"tokensRaw": 10, "tokensCompressed": 5}])
+    idx = RMemoryBlockIndex(tmp_path, tmp_path / "idx.db")
+    idx.sync()
+    assert idx.sync() == 0 and idx.parses == 2
+
+    _history(tmp_path, "bb", [{"tokensRaw": 10, "tokensCompressed": 5}] * 3)
+    assert idx.sync() == 1 and idx.parses == 3
+    assert idx.aggregates()["all"]["blocks"] == 4
+
+    fp.unlink()
+    assert idx.sync() == 1
+    assert idx.aggregates()["all"]["blocks"] == 1
+
+
+def test_index_survives_restart(tmp_path):
+    _history(tmp_path, "aa", [{"tokensRaw": 10, "tokensCompressed": 5}])
+    RMemoryBlockIndex(tmp_path, tmp_path / "idx.db").sync()
+    again = RMemoryBlockIndex(tmp_path, tmp_path / "idx.db")
+    assert again.sync() == 0 and again.parses == 0
+    assert again.aggregates("aa")["session"]["raw"] == 10
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the incremental r-memory.log parser (dashboard/rmemory_log.py)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rmemory_log import RMemoryLogTail, parse_line
+
+INIT = '[2026-01-01T00:00:00.000Z] [INFO] R-Memory init {"cachedBlocks": 3}\n'
+DONE = '[2026-01-01T00:01:00.000Z] [INFO] === DONE === {"cacheHits": 2, "cacheMisses": 1, "historyBlocks": 4}\n'
+FIFO = '[2026-01-01T00:02:00.000Z] [INFO] FIFO evicted {"block": 1}\n'
+INFO = '[2026-01-01T00:03:00.000Z] [DEBUG] something else {"x": 1}\n'
+
+
+def _append(path, *lines):
+    with open(path, "a") as f:
+        f.write("".join(lines))
+
+
+def test_parse_line_matches_legacy_shapes():
+    evt = parse_line(DONE.strip())
+    assert evt["event"] == "compaction_done" and evt["cacheHits"] == 2 and evt["ts"].startswith("2026")
+    assert parse_line(INFO.strip()) == {"ts": "2026-01-01T00:03:00.000Z", "level": "DEBUG",
+                                        "raw": 'something else {"x": 1}', "event": "info"}
+    assert parse_line("not a log line") is None
+
+
+def test_only_appended_bytes_are_parsed(tmp_path):
+    log = tmp_path / "r-memory.log"
+    _append(log, INIT, DONE)
+    tail = RMemoryLogTail(log)
+    assert len(tail.refresh()) == 2
+    read = tail.bytes_read
+    assert tail.refresh() == []
+    _append(log, FIFO, DONE[:20])  # second line still being written
+    assert [e["event"] for e in tail.refresh()] == ["fifo_evicted"]
+    _append(log, DONE[20:])
+    assert [e["event"] for e in tail.refresh()] == ["compaction_done"]
+    assert tail.bytes_read - read < 2 * len(DONE) + len(FIFO)
+    snap = tail.snapshot()
+    assert (snap["compactionCount"], snap["cacheHits"], snap["cacheMisses"], snap["fifoCount"]) == (2, 4, 2, 1)
+    assert snap["lastInit"]["cachedBlocks"] == 3
+    assert [e["event"] for e in snap["recent"]] == ["init", "compaction_done", "fifo_evicted", "compaction_done"]
+
+
+def test_rename_rotation_drains_old_file(tmp_path):
+    log = tmp_path / "r-memory.log"
+    _append(log, INIT)
+    tail = RMemoryLogTail(log)
+    tail.refresh()
+    _append(log, DONE)  # written just before rotation
+    os.rename(log, tmp_path / "r-memory.log.1")
+    _append(log, FIFO)
+    assert [e["event"] for e in tail.refresh()] == ["compaction_done", "fifo_evicted"]
+    assert tail.stats()["rotations"] == 1
+
+
+def test_truncation_restarts_at_zero(tmp_path):
+    log = tmp_path / "r-memory.log"
+    _append(log, INIT, DONE, FIFO)
+    tail = RMemoryLogTail(log)
+    tail.refresh()
+    log.write_text(INFO)
+    assert [e["event"] for e in tail.refresh()] == ["info"]
+    assert tail.snapshot()["compactionCount"] == 1  # aggregates span rotations
+
+
+def test_checkpoint_resumes_without_rereading(tmp_path):
+    log, ckpt = tmp_path / "r-memory.log", tmp_path / "ckpt.json"
+    _append(log, INIT, DONE)
+    first = RMemoryLogTail(log, checkpoint_path=ckpt)
+    first.refresh()
+    _append(log, FIFO)
+
+    second = RMemoryLogTail(log, checkpoint_path=ckpt)
+    assert [e["event"] for e in second.refresh()] == ["fifo_evicted"]
+    assert second.bytes_read == len(FIFO)
+    assert second.snapshot()["compactionCount"] == 1
+
+    log.unlink()
+    _append(log, INFO)  # replaced while we were down: new inode, start over
+    third = RMemoryLogTail(log, checkpoint_path=ckpt)
+    assert [e["event"] for e in third.refresh()] == ["info"]
+
+
+def test_listener_sees_new_events(tmp_path):
+    log = tmp_path / "r-memory.log"
+    _append(log, INIT)
+    tail = RMemoryLogTail(log)
+    tail.refresh()
+    seen = []
+    tail.listener = seen.append
+    _append(log, FIFO)
+    tail.refresh()
+    assert [[e["event"] for e in batch] for batch in seen] == [["fifo_evicted"]]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the gateway session snapshot cache (dashboard/session_store.py)
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from event_bus import EventBus
+from session_store import SessionStore, agent_of, valid_agent_id
+
+
+def _write(agents_dir, agent_id, data):
+    path = agents_dir / agent_id / "sessions" / "sessions.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data))
+    return path
+
+
+def test_file_is_parsed_once_until_it_changes(tmp_path):
+    path = _write(tmp_path, "main", {"agent:main:main": {"totalTokens": 10}, "agent:main:cron": {}})
+    store = SessionStore(tmp_path)
+    for _ in range(5):
+        assert store.get("agent:main:main")["totalTokens"] == 10
+    sessions, source = store.sessions("main")
+    assert source == "file" and {s["key"] for s in sessions} == {"agent:main:main", "agent:main:cron"}
+    assert store.parses == 1
+
+    path.write_text(json.dumps({"agent:main:main": {"totalTokens": 2000}}))
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+    assert store.get("agent:main:main")["totalTokens"] == 2000
+    assert store.parses == 2
+
+
+def test_list_layout_and_agent_ids(tmp_path):
+    _write(tmp_path, "coder", [{"key": "agent:coder:main", "model": "m"}, {"no": "key"}])
+    store = SessionStore(tmp_path)
+    assert store.get("agent:coder:main") == {"key": "agent:coder:main", "model": "m", "agentId": "coder"}
+    assert agent_of("telegram:123") is None
+    assert store.get("telegram:123") is None
+
+
+def test_gateway_fallback_is_cached_and_invalidated_by_events(tmp_path):
+    calls = []
+
+    def fetch(agent_id):
+        calls.append(agent_id)
+        return [{"key": f"agent:{agent_id}:main", "n": len(calls)}]
+
+    store = SessionStore(tmp_path, remote_ttl=60)
+    bus = EventBus()
+    bus.add_listener(["gateway"], store.note_gateway_event)
+    assert store.get("agent:ops:main", fetch)["n"] == 1
+    assert store.sessions("ops", fetch)[1] == "gateway"
+    assert calls == ["ops"]
+
+    bus.publish("gateway.tick", {"ts": 1})
+    assert store.get("agent:ops:main", fetch)["n"] == 1
+    bus.publish("gateway.sessions.changed", {"sessionKey": "agent:ops:main"})
+    assert store.get("agent:ops:main", fetch)["n"] == 2
+
+
+def test_missing_everything(tmp_path):
+    store = SessionStore(tmp_path)
+    assert store.sessions("ghost", lambda a: None) == ([], None)
+
+
+def test_agent_ids_cannot_leave_the_agents_dir(tmp_path):
+    agents = tmp_path / "agents"
+    _write(agents, "main", {"agent:main:main": {"n": 1}})
+    _write(tmp_path, ".", {"agent:x:main": {"n": 2}})  # one level above agents_dir
+    store = SessionStore(agents)
+    fetched = []
+    for bad in ("..", ".", "a/b", "", "main\n"):
+        assert store.sessions(bad, fetched.append) == ([], None)
+        with pytest.raises(ValueError):
+            store.path_for(bad)
+    assert store.get("agent:..:main") is None and not fetched
+    assert valid_agent_id("ops-2.bot_x") and store.sessions("main")[1] == "file"
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared Solana JSON-RPC client (solana-toolkit/solana_rpc.py)
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "solana-toolkit"))
+
+from solana_rpc import FOREVER, RpcCache, RpcClient, RpcError
+
+
+class _FakeRpc(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        srv.requests += 1
+        srv.peers.add(self.client_address)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status = srv.statuses.pop(0) if srv.statuses else 200
+        if status != 200:
+            payload = {"error": "busy"}
+        elif isinstance(body, list) and srv.reject_batches:
+            payload = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch disabled"}}
+        elif isinstance(body, list):
+            payload = [self._answer(item) for item in reversed(body)]  # order is not guaranteed
+        else:
+            payload = self._answer(body)
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _answer(self, req):
+        if req["method"] == "fail":
+            return {"jsonrpc": "2.0", "id": req["id"], "error": {"code": -32000, "message": "nope"}}
+        return {"jsonrpc": "2.0", "id": req["id"], "result": {"method": req["method"], "params": req["params"]}}
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _FakeRpc)
+    srv.requests = 0
+    srv.peers = set()
+    srv.statuses = []
+    srv.reject_batches = False
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _client(srv, **opts):
+    return RpcClient(f"http://127.0.0.1:{srv.server_address[1]}/", backoff=0.01, **opts)
+
+
+WALLET = "W" * 32
+OTHER = "X" * 32
+
+
+def test_calls_reuse_one_keepalive_connection(server):
+    rpc = _client(server)
+    for i in range(5):
+        assert rpc.call("getBalance", [str(i)])["result"]["params"] == [str(i)]
+    assert server.requests == 5
+    assert len(server.peers) == 1
+    assert rpc.stats()["connections"] == 1
+
+
+def test_batch_is_one_request_in_call_order(server):
+    rpc = _client(server)
+    out = rpc.batch([("getBalance", ["a"]), ("fail", []), ("getSlot", None)])
+    assert server.requests == 1
+    assert [r.get("result", {}).get("method") for r in out] == ["getBalance", None, "getSlot"]
+    assert out[1]["error"]["message"] == "nope"
+    methods = rpc.stats()["methods"]
+    assert methods["getBalance"]["calls"] == 1
+    assert methods["fail"]["errors"] == 1
+
+
+def test_batch_splits_at_max_batch(server):
+    rpc = _client(server, max_batch=2)
+    out = rpc.batch([("getBalance", [i]) for i in range(5)])
+    assert [r["result"]["params"] for r in out] == [[i] for i in range(5)]
+    assert server.requests == 3
+
+
+def test_batch_falls_back_when_rejected(server):
+    server.reject_batches = True
+    rpc = _client(server)
+    out = rpc.batch([("getBalance", ["a"]), ("getBalance", ["b"])])
+    assert [r["result"]["params"] for r in out] == [["a"], ["b"]]
+    assert rpc.stats()["unbatched"] == 1
+
+
+def test_retries_with_backoff_then_succeeds(server):
+    server.statuses = [503, 429]
+    rpc = _client(server, retries=2)
+    assert rpc.call("getSlot")["result"]["method"] == "getSlot"
+    assert rpc.stats()["retries"] == 2
+
+
+def test_gives_up_after_retries(server):
+    server.statuses = [503, 503, 503]
+    rpc = _client(server, retries=1)
+    with pytest.raises(RpcError) as exc:
+        rpc.call("getSlot")
+    assert exc.value.status == 503
+    assert rpc.stats()["methods"]["getSlot"]["errors"] == 1
+
+
+def test_unreachable_endpoint_raises_rpc_error():
+    rpc = RpcClient("http://127.0.0.1:9/", retries=0, timeout=1)
+    with pytest.raises(RpcError):
+        rpc.call("getSlot")
+
+
+def test_cache_serves_repeat_reads_and_batches_only_misses(server):
+    cache = RpcCache()
+    rpc = _client(server, cache=cache)
+    rpc.call("getBalance", [WALLET])
+    rpc.call("getBalance", [WALLET])
+    assert server.requests == 1
+    out = rpc.batch([("getBalance", [WALLET]), ("getBalance", [OTHER]), ("getSlot", [])])
+    assert server.requests == 2
+    assert [r["result"]["params"] for r in out] == [[WALLET], [OTHER], []]
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["entries"] == 2  # getSlot has no TTL policy
+
+
+def test_cache_ttl_override_and_errors(server):
+    cache = RpcCache(ttls={"getBalance": 0.05})
+    rpc = _client(server, cache=cache)
+    rpc.call("getBalance", [WALLET])
+    rpc.call("getBalance", [WALLET], ttl=0)  # bypass
+    assert server.requests == 2
+    time.sleep(0.06)
+    rpc.call("getBalance", [WALLET])
+    assert server.requests == 3
+    rpc.call("fail", [WALLET], ttl=FOREVER)
+    rpc.call("fail", [WALLET], ttl=FOREVER)
+    assert server.requests == 5  # error envelopes are never cached
+
+
+def test_invalidate_drops_entries_mentioning_address(server):
+    cache = RpcCache()
+    rpc = _client(server, cache=cache)
+    rpc.call("getTokenAccountsByOwner", [WALLET, {"mint": OTHER}, {"encoding": "jsonParsed"}])
+    rpc.call("getBalance", [OTHER])
+    rpc.call("getBalance", [WALLET])
+    assert cache.invalidate(OTHER) == 2
+    assert cache.stats()["entries"] == 1
+    rpc.call("getBalance", [OTHER])
+    assert server.requests == 4
+
+
+def test_cache_is_bounded_lru():
+    cache = RpcCache(max_entries=2)
+    for addr in ("A" * 32, "B" * 32):
+        cache.put("u", "getBalance", [addr], {"result": addr})
+    assert cache.get("u", "getBalance", ["A" * 32])  # A is now most recent
+    cache.put("u", "getBalance", ["C" * 32], {"result": "C"})
+    assert cache.get("u", "getBalance", ["B" * 32]) is None
+    assert cache.get("u", "getBalance", ["A" * 32])["result"] == "A" * 32
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_ignores_results_from_older_slots():
+    cache = RpcCache()
+    cache.put("u", "getBalance", [WALLET], {"result": {"context": {"slot": 100}, "value": 5}})
+    cache.invalidate(WALLET)
+    cache.put("u", "getBalance", [WALLET], {"result": {"context": {"slot": 99}, "value": 4}})
+    assert cache.get("u", "getBalance", [WALLET]) is None
+    assert cache.stats()["staleSlots"] == 1
+    cache.put("u", "getBalance", [WALLET], {"result": {"context": {"slot": 101}, "value": 6}})
+    assert cache.get("u", "getBalance", [WALLET])["result"]["value"] == 6
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the usage.jsonl daily rollup (dashboard/usage_rollup.py)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from usage_rollup import UsageRollup, utc_day
+
+RATES = {"anthropic/opus": {"inputPer1M": 10.0, "outputPer1M": 50.0, "cacheReadPer1M": 1.0, "cacheWritePer1M": 12.0}}
+FALLBACK = {"inputPer1M": 1.0, "outputPer1M": 2.0, "cacheReadPer1M": 0.0, "cacheWritePer1M": 0.0}
+
+
+def _append(path, *rows):
+    with open(path, "a") as f:
+        for row in rows:
+            f.write((row if isinstance(row, str) else json.dumps(row)) + "\n")
+
+
+def _row(ts, provider="anthropic", model="opus", **tokens):
+    return {"ts": ts, "provider": provider, "model": model, **tokens}
+
+
+def test_utc_day_fast_path_and_offsets():
+    assert utc_day("2026-03-01T23:30:00.000Z") == "2026-03-01"
+    assert utc_day("2026-03-01T23:30:00") == "2026-03-01"
+    assert utc_day("2026-03-01T23:30:00-05:00") == "2026-03-02"
+    assert utc_day(1772409600000) == utc_day(1772409600) == "2026-03-02"
+    assert utc_day("yesterday") is None and utc_day(None) is None
+
+
+def test_rollup_prices_per_model_at_query_time(tmp_path):
+    src = tmp_path / "usage.jsonl"
+    _append(src,
+            _row("2026-03-01T10:00:00Z", input=1_000_000, output=100_000),
+            _row("2026-03-01T11:00:00Z", input=1_000_000),
+            _row("2026-03-01T12:00:00Z", provider="local", model="x", input=1_000_000),
+            _row("2026-03-02T00:00:00Z", cacheRead=2_000_000),
+            _row("2026-03-02T01:00:00Z"),  # no tokens
+            "{not json")
+    rollup = UsageRollup(src, tmp_path / "rollup.db")
+    assert rollup.refresh() == 6
+    days = rollup.daily("2026-01-01", RATES, FALLBACK)
+    assert [d["date"] for d in days] == ["2026-03-01", "2026-03-02"]
+    first = days[0]
+    assert (first["entries"], first["input"], first["output"]) == (3, 3_000_000, 100_000)
+    assert first["inputCost"] == pytest.approx(10.0 + 10.0 + 1.0)
+    assert first["outputCost"] == pytest.approx(5.0)
+    assert days[1]["cacheReadCost"] == pytest.approx(2.0)
+    assert rollup.stats()["invalidLines"] == 1 and rollup.stats()["rows"] == 3
+
+    cheaper = {"anthropic/opus": {**RATES["anthropic/opus"], "inputPer1M": 5.0}}
+    assert rollup.daily("2026-03-01", cheaper, FALLBACK)[0]["inputCost"] == pytest.approx(11.0)
+    assert rollup.daily("2026-03-02", RATES, FALLBACK)[0]["date"] == "2026-03-02"
+
+
+def test_only_appended_lines_are_ingested(tmp_path):
+    src = tmp_path / "usage.jsonl"
+    _append(src, _row("2026-03-01T10:00:00Z", input=10))
+    rollup = UsageRollup(src, tmp_path / "rollup.db")
+    rollup.refresh()
+    assert rollup.refresh() == 0
+    with open(src, "a") as f:
+        f.write(json.dumps(_row("2026-03-01T11:00:00Z", input=5)))  # no newline yet
+    assert rollup.refresh() == 0
+    with open(src, "a") as f:
+        f.write("\n")
+    assert rollup.refresh() == 1
+    assert rollup.daily("2026-03-01", RATES, FALLBACK)[0]["input"] == 15
+
+    again = UsageRollup(src, tmp_path / "rollup.db")  # checkpoint persists
+    assert again.refresh() == 0
+
+
+def test_truncated_source_is_rebuilt(tmp_path):
+    src = tmp_path / "usage.jsonl"
+    _append(src, _row("2026-03-01T10:00:00Z", input=10), _row("2026-03-01T11:00:00Z", input=10))
+    rollup = UsageRollup(src, tmp_path / "rollup.db")
+    rollup.refresh()
+    src.write_text(json.dumps(_row("2026-03-05T10:00:00Z", input=7)) + "\n")
+    rollup.refresh()
+    assert [(d["date"], d["input"]) for d in rollup.daily("2026-01-01", RATES, FALLBACK)] == [("2026-03-05", 7)]
+
+
+def test_concurrent_rollups_on_one_db_count_each_line_once(tmp_path):
+    # Separate instances share nothing but the db, like gunicorn workers.
+    import threading
+    src = tmp_path / "usage.jsonl"
+    _append(src, *[_row("2026-03-01T10:00:00Z", input=1) for _ in range(20_000)])
+    rollups = [UsageRollup(src, tmp_path / "rollup.db") for _ in range(4)]
+    start = threading.Barrier(len(rollups))
+    read = []
+
+    def run(rollup):
+        start.wait()
+        read.append(rollup.refresh())
+
+    threads = [threading.Thread(target=run, args=(r,)) for r in rollups]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(read) == 20_000
+    day = rollups[0].daily("2026-01-01", RATES, FALLBACK)[0]
+    assert (day["entries"], day["input"]) == (20_000, 20_000)
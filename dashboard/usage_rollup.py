@@ -0,0 +1,271 @@
+"""
+Usage Rollup — per-day token aggregates of ``usage-tracker/usage.jsonl``.
+
+The tracker appends one JSON line per LLM call. ``UsageRollup.refresh``
+ingests only the bytes appended since its checkpoint (file identity + byte
+offset, read and written in the same ``BEGIN IMMEDIATE`` transaction as the
+aggregates, so a crash or a concurrent refresh from another process can
+neither lose nor double-count lines) and folds them into rows keyed by
+(UTC day, provider, model). If the file is replaced or truncated the rollup
+is rebuilt from scratch.
+
+Rows hold token counts only. Costs are computed at query time from the
+caller's current rates, so a pricing change re-prices history without
+touching the raw log, and ``daily`` returns one row per day.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+READ_CHUNK = 4 << 20
+TOKEN_FIELDS = ("input", "output", "cacheRead", "cacheWrite")
+
+_NUMERIC_RE = re.compile(r"^-?\d+(?:\.\d+)?$")
+_UTC_DAY_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:[T ][\d:.]*)?Z?$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_daily (
+    day TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    entries INTEGER NOT NULL,
+    input INTEGER NOT NULL,
+    output INTEGER NOT NULL,
+    cache_read INTEGER NOT NULL,
+    cache_write INTEGER NOT NULL,
+    PRIMARY KEY (day, provider, model)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    dev INTEGER,
+    ino INTEGER,
+    offset INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    invalid INTEGER NOT NULL
+);
+"""
+
+_UPSERT = """
+INSERT INTO usage_daily VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(day, provider, model) DO UPDATE SET
+    entries = entries + excluded.entries,
+    input = input + excluded.input,
+    output = output + excluded.output,
+    cache_read = cache_read + excluded.cache_read,
+    cache_write = cache_write + excluded.cache_write
+"""
+
+
+def parse_timestamp(value):
+    """Tracker ``ts`` (ISO string, epoch s/ms as number or string) → aware UTC datetime."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, (int, float)):
+        num = float(value)
+        # Accept both epoch seconds and epoch milliseconds.
+        seconds = num / 1000.0 if num > 10_000_000_000 else num
+        try:
+            dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
+        except Exception:
+            return None
+    elif isinstance(value, str):
+        raw = value.strip()
+        if not raw:
+            return None
+        if _NUMERIC_RE.match(raw):
+            try:
+                num = float(raw)
+                seconds = num / 1000.0 if num > 10_000_000_000 else num
+                dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
+            except Exception:
+                return None
+        else:
+            try:
+                dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+            except Exception:
+                return None
+    else:
+        return None
+
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def utc_day(value):
+    """``YYYY-MM-DD`` (UTC) of a tracker timestamp, or None. UTC/naive ISO
+    strings — the common case — are sliced instead of parsed."""
+    if isinstance(value, str):
+        m = _UTC_DAY_RE.match(value.strip())
+        if m:
+            return m.group(1)
+    dt = parse_timestamp(value)
+    return dt.date().isoformat() if dt else None
+
+
+def _tokens(v):
+    try:
+        return max(0, int(v))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+class UsageRollup:
+    """Incremental (day, provider, model) token rollup of one usage.jsonl."""
+
+    def __init__(self, source_path, db_path):
+        self.source_path = Path(source_path)
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _checkpoint(self, conn):
+        row = conn.execute("SELECT dev, ino, offset, lines, invalid FROM checkpoint WHERE id = 1").fetchone()
+        return row or (None, None, 0, 0, 0)
+
+    def refresh(self):
+        """Ingest lines appended since the checkpoint; returns lines read.
+
+        The checkpoint is read and advanced inside one ``BEGIN IMMEDIATE``
+        transaction together with the upserts, so refreshes in other
+        processes (e.g. several gunicorn workers) on the same db serialize
+        and never ingest the same bytes twice."""
+        with self._lock:
+            try:
+                st = os.stat(self.source_path)
+            except OSError:
+                return 0
+            conn = self._conn()
+            dev, ino, offset, _, _ = self._checkpoint(conn)
+            conn.commit()  # end the read so the next BEGIN starts fresh
+            if (dev, ino) == (st.st_dev, st.st_ino) and st.st_size == offset:
+                return 0  # nothing new; skip taking the write lock
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                read = self._ingest(conn, st)
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+            return read
+
+    def _ingest(self, conn, st):
+        """Fold appended lines into the rollup; runs inside the write transaction."""
+        dev, ino, offset, lines, invalid = self._checkpoint(conn)
+        if (dev, ino) != (st.st_dev, st.st_ino) or st.st_size < offset:
+            # Replaced or truncated: the rows no longer describe this file
+            conn.execute("DELETE FROM usage_daily")
+            offset, lines, invalid = 0, 0, 0
+        if st.st_size == offset:
+            return 0
+        buckets = {}
+        read = 0
+        with open(self.source_path, "rb") as f:
+            f.seek(offset)
+            carry = b""
+            while True:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    break
+                data = carry + chunk
+                end = data.rfind(b"\n")
+                if end < 0:
+                    carry = data
+                    continue
+                carry = data[end + 1:]
+                offset += end + 1
+                for raw in data[:end].split(b"\n"):
+                    raw = raw.strip()
+                    if not raw:
+                        continue
+                    read += 1
+                    try:
+                        payload = json.loads(raw)
+                    except ValueError:
+                        invalid += 1
+                        continue
+                    if not isinstance(payload, dict):
+                        continue
+                    day = utc_day(payload.get("ts"))
+                    if day is None:
+                        continue
+                    tokens = [_tokens(payload.get(k)) for k in TOKEN_FIELDS]
+                    if sum(tokens) <= 0:
+                        continue
+                    key = (day, str(payload.get("provider") or "").strip(), str(payload.get("model") or "").strip())
+                    bucket = buckets.get(key)
+                    if bucket is None:
+                        buckets[key] = [1] + tokens
+                    else:
+                        bucket[0] += 1
+                        for i, n in enumerate(tokens, 1):
+                            bucket[i] += n
+        conn.executemany(_UPSERT, [(*key, *vals) for key, vals in buckets.items()])
+        conn.execute("INSERT OR REPLACE INTO checkpoint VALUES (1, ?, ?, ?, ?, ?)",
+                     (st.st_dev, st.st_ino, offset, lines + read, invalid))
+        return read
+
+    def rows(self, since_day):
+        """Unpriced ``(day, provider, model, entries, input, output, cache_read,
+        cache_write)`` rows from ``since_day`` on, for columnar cost work."""
+        return self._conn().execute(
+            "SELECT * FROM usage_daily WHERE day >= ? ORDER BY day", (since_day,)).fetchall()
+
+    def daily(self, since_day, rates, fallback_rates):
+        """Per-day rows from ``since_day`` on, priced with ``rates`` ("provider/model"
+        -> {inputPer1M, ...}); models without rates use ``fallback_rates``."""
+        keys = [k for k, r in rates.items() if isinstance(r, dict)]
+        values = ",".join("(?, ?, ?, ?, ?)" for _ in keys) or "(NULL, 0, 0, 0, 0)"
+        params = []
+        for k in keys:
+            params += [k] + [_rate(rates[k], f) for f in ("inputPer1M", "outputPer1M", "cacheReadPer1M", "cacheWritePer1M")]
+        fb = [_rate(fallback_rates, f) for f in ("inputPer1M", "outputPer1M", "cacheReadPer1M", "cacheWritePer1M")]
+        sql = f"""
+            WITH rates(key, ip, op, cr, cw) AS (VALUES {values})
+            SELECT day, sum(entries), sum(input), sum(output), sum(cache_read), sum(cache_write),
+                   total(input * coalesce(r.ip, ?)), total(output * coalesce(r.op, ?)),
+                   total(cache_read * coalesce(r.cr, ?)), total(cache_write * coalesce(r.cw, ?))
+            FROM usage_daily u
+            LEFT JOIN rates r ON u.provider != '' AND u.model != '' AND r.key = u.provider || '/' || u.model
+            WHERE day >= ?
+            GROUP BY day ORDER BY day
+        """
+        out = []
+        for day, entries, i, o, crt, cwt, ic, oc, crc, cwc in self._conn().execute(sql, params + fb + [since_day]):
+            costs = [ic / 1_000_000, oc / 1_000_000, crc / 1_000_000, cwc / 1_000_000]
+            out.append({"date": day, "entries": entries, "input": i, "output": o, "cacheRead": crt, "cacheWrite": cwt,
+                        "totalTokens": i + o + crt + cwt, "inputCost": costs[0], "outputCost": costs[1],
+                        "cacheReadCost": costs[2], "cacheWriteCost": costs[3], "totalCost": sum(costs)})
+        return out
+
+    def stats(self):
+        conn = self._conn()
+        _, _, offset, lines, invalid = self._checkpoint(conn)
+        rows = conn.execute("SELECT count(*) FROM usage_daily").fetchone()[0]
+        return {"offset": offset, "lines": lines, "invalidLines": invalid, "rows": rows}
+
+
+def _rate(rates, field):
+    try:
+        return float(rates.get(field) or 0.0)
+    except (TypeError, ValueError, AttributeError):
+        return 0.0
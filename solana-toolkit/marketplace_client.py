@@ -15,6 +15,9 @@ import base58
 from pathlib import Path
 from hashlib import sha256
 
+import pda_cache
+from solana_rpc import get_client
+
 MARKETPLACE_PROGRAM_ID = "5wpGj4EG6J5uEqozLqUyHzEQbU26yjaL5aUE5FwBiYe5"
 TOKEN_2022_PROGRAM_ID = "TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb"
 SPL_TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
@@ -43,27 +46,13 @@ def _run_cmd(args: list, timeout: int = 30) -> str:
 
 
 def _find_pda(seeds: list[bytes], program_id: str) -> tuple[str, int]:
-    """Find PDA using solana CLI. Returns (address, bump)."""
-    # Use Python to derive PDA
-    from solders.pubkey import Pubkey
-    program_pk = Pubkey.from_string(program_id)
-    pda, bump = Pubkey.find_program_address(seeds, program_pk)
-    return str(pda), bump
+    """Find PDA (memoized). Returns (address, bump)."""
+    return pda_cache.find_program_address(seeds, program_id)
 
 
 def _get_ata(wallet: str, mint: str, token_program: str = TOKEN_2022_PROGRAM_ID) -> str:
     """Get associated token address."""
-    from solders.pubkey import Pubkey
-    wallet_pk = Pubkey.from_string(wallet)
-    mint_pk = Pubkey.from_string(mint)
-    token_prog_pk = Pubkey.from_string(token_program)
-    ata_prog_pk = Pubkey.from_string(ASSOCIATED_TOKEN_PROGRAM_ID)
-    
-    ata, _ = Pubkey.find_program_address(
-        [bytes(wallet_pk), bytes(token_prog_pk), bytes(mint_pk)],
-        ata_prog_pk,
-    )
-    return str(ata)
+    return pda_cache.associated_token_address(wallet, mint, token_program)
 
 
 def get_escrow_authority(nft_mint: str) -> tuple[str, int]:
@@ -82,26 +71,16 @@ def get_listing_address(nft_mint: str) -> tuple[str, int]:
 
 def get_all_listings(rpc: str = DEVNET_RPC) -> list[dict]:
     """Fetch all active listings from chain using getProgramAccounts."""
-    import requests
-    
     # Filter by Listing account discriminator
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "getProgramAccounts",
-        "params": [
-            MARKETPLACE_PROGRAM_ID,
-            {
-                "encoding": "base64",
-                "filters": [
-                    {"memcmp": {"offset": 0, "bytes": base58.b58encode(LISTING_DISC).decode()}},
-                ],
-            },
-        ],
-    }
-    
-    resp = requests.post(rpc, json=payload, timeout=15)
-    data = resp.json()
+    data = get_client(rpc).call("getProgramAccounts", [
+        MARKETPLACE_PROGRAM_ID,
+        {
+            "encoding": "base64",
+            "filters": [
+                {"memcmp": {"offset": 0, "bytes": base58.b58encode(LISTING_DISC).decode()}},
+            ],
+        },
+    ])
     
     if "error" in data:
         raise RuntimeError(f"RPC error: {data['error']}")
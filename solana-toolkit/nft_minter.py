@@ -1,7 +1,6 @@
 """Soulbound NFT minting using Token-2022 NonTransferable extension."""
 
 import json
-import urllib.request
 from pathlib import Path
 from typing import Optional, Dict, Any
 
@@ -11,6 +10,7 @@ from token2022_utils import (
     initialize_metadata,
     load_keypair_from_path,
 )
+from solana_rpc import FOREVER, get_client
 from wallet import SolanaWallet
 
 # Token-2022 program
@@ -216,19 +216,10 @@ class NFTMinter:
         return endpoint_uri or "https://api.devnet.solana.com"
 
     def _rpc_call(self, method: str, params: Optional[list] = None) -> Dict[str, Any]:
-        body = json.dumps({
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": method,
-            "params": params or [],
-        }).encode()
-        req = urllib.request.Request(
-            self._rpc_url(),
-            data=body,
-            headers={"Content-Type": "application/json"},
-        )
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            return json.loads(resp.read())
+        return get_client(self._rpc_url()).call(method, params)
+
+    def _rpc_batch(self, calls: list, ttl: Optional[float] = None) -> list:
+        return get_client(self._rpc_url()).batch(calls, ttl=ttl)
 
     @staticmethod
     def _normalize_nft_type(nft_type: str) -> str:
@@ -331,6 +322,7 @@ class NFTMinter:
         ])
 
         accounts = result.get("result", {}).get("value", [])
+        mints = []
         for account in accounts:
             parsed = account.get("account", {}).get("data", {}).get("parsed", {}).get("info", {})
             mint = parsed.get("mint")
@@ -342,15 +334,24 @@ class NFTMinter:
             except Exception:
                 amount = 0
 
-            if not mint or amount <= 0 or decimals != 0:
-                continue
+            if mint and amount > 0 and decimals == 0:
+                mints.append(mint)
+
+        # Metadata for every mint the registry can't settle, in one batch request
+        unknown = [m for m in mints if self._normalize_nft_type(registry.get(m, "")) != target_type]
+        try:
+            infos = dict(zip(unknown, self._rpc_batch(
+                [("getAccountInfo", [m, {"encoding": "jsonParsed"}]) for m in unknown], ttl=FOREVER)))
+        except Exception:
+            infos = {}
 
+        for mint in mints:
             reg_type = self._normalize_nft_type(registry.get(mint, ""))
             if reg_type and reg_type == target_type:
                 return {"has_nft": True, "mint": mint, "matched_by": "registry"}
 
             try:
-                mint_info = self._rpc_call("getAccountInfo", [mint, {"encoding": "jsonParsed"}])
+                mint_info = infos[mint]
                 onchain_name = self._extract_onchain_name(mint_info)
                 onchain_type = self._name_to_nft_type(onchain_name or "")
                 if onchain_type == target_type:
@@ -0,0 +1,180 @@
+"""Memoized program-derived address (PDA) and associated token account derivation.
+
+``Pubkey.find_program_address`` searches bump seeds 255 → 0 and hashes each
+candidate with SHA-256 until one lands off the ed25519 curve. A derivation
+never changes, so results are kept in memory and, when a database path is
+configured, in SQLite keyed by (program, seeds), which makes them survive
+restarts and be shared between worker processes.
+
+Addresses go in and come out as base58 strings (``solders`` Pubkeys are
+accepted too), so the cache is equally usable from the dashboard and from
+the toolkit clients.
+
+Usage:
+    import pda_cache
+    pda_cache.configure("data/pda_cache.db")        # optional persistence
+    pda, bump = pda_cache.find_program_address([b"symbiotic", owner_bytes, b"\\x00"], program_id)
+    pda_cache.find_many([(seeds, program_id), ...])  # bulk, one DB transaction
+    ata = pda_cache.associated_token_address(owner, mint, token_program)
+
+``get_associated_token_address`` is a drop-in for the spl-token helper of the
+same name, returning a solders Pubkey.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+ASSOCIATED_TOKEN_PROGRAM_ID = "ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL"
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdas (
+    program TEXT NOT NULL,
+    seeds BLOB NOT NULL,
+    address TEXT NOT NULL,
+    bump INTEGER NOT NULL,
+    PRIMARY KEY (program, seeds)
+) WITHOUT ROWID;
+"""
+
+Seeds = Sequence[bytes]
+
+
+def pubkey_bytes(address: Any) -> bytes:
+    """32 raw bytes of a base58 address or solders Pubkey."""
+    if isinstance(address, (bytes, bytearray)):
+        return bytes(address)
+    from solders.pubkey import Pubkey
+    if isinstance(address, str):
+        address = Pubkey.from_string(address)
+    return bytes(address)
+
+
+def _seed_key(seeds: Seeds) -> bytes:
+    # Length-prefixed so [b"ab", b"c"] and [b"a", b"bc"] differ
+    return b"".join(len(s).to_bytes(1, "little") + bytes(s) for s in seeds)
+
+
+def _derive(seeds: Seeds, program_id: str) -> Tuple[str, int]:
+    from solders.pubkey import Pubkey
+    pda, bump = Pubkey.find_program_address([bytes(s) for s in seeds], Pubkey.from_string(program_id))
+    return str(pda), bump
+
+
+class PdaCache:
+    """Thread-safe derivation cache with optional SQLite persistence."""
+
+    def __init__(self, db_path: Optional[str] = None, max_memory: int = 100_000):
+        self.db_path = Path(db_path) if db_path else None
+        self.max_memory = max_memory
+        self._memory: Dict[Tuple[str, bytes], Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"hits": 0, "stored": 0, "derived": 0}
+        if self.db_path is not None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: Tuple[str, bytes], value: Tuple[str, int]) -> None:
+        with self._lock:
+            if len(self._memory) >= self.max_memory:
+                self._memory.clear()
+            self._memory[key] = value
+
+    def find_many(self, requests: Iterable[Tuple[Seeds, Any]]) -> List[Tuple[str, int]]:
+        """(address, bump) for each ``(seeds, program_id)``, in order."""
+        requests = [([bytes(s) for s in seeds], str(program)) for seeds, program in requests]
+        keys = [(program, _seed_key(seeds)) for seeds, program in requests]
+        with self._lock:
+            out: List[Optional[Tuple[str, int]]] = [self._memory.get(key) for key in keys]
+            missing = [i for i, hit in enumerate(out) if hit is None]
+            self._counters["hits"] += len(keys) - len(missing)
+        if not missing:
+            return out
+
+        if self.db_path is not None:
+            conn = self._conn()
+            still = []
+            for i in missing:
+                row = conn.execute("SELECT address, bump FROM pdas WHERE program = ? AND seeds = ?", keys[i]).fetchone()
+                if row is None:
+                    still.append(i)
+                else:
+                    out[i] = (row[0], row[1])
+                    self._remember(keys[i], out[i])
+            with self._lock:
+                self._counters["stored"] += len(missing) - len(still)
+            missing = still
+
+        derived = {}
+        for i in missing:
+            if keys[i] not in derived:  # the same derivation may be asked for twice
+                derived[keys[i]] = _derive(*requests[i])
+                self._remember(keys[i], derived[keys[i]])
+            out[i] = derived[keys[i]]
+        with self._lock:
+            self._counters["derived"] += len(derived)
+        if derived and self.db_path is not None:
+            conn = self._conn()
+            conn.executemany("INSERT OR IGNORE INTO pdas(program, seeds, address, bump) VALUES (?, ?, ?, ?)",
+                             [(program, seed_key, address, bump)
+                              for (program, seed_key), (address, bump) in derived.items()])
+            conn.commit()
+        return out
+
+    def find_program_address(self, seeds: Seeds, program_id: Any) -> Tuple[str, int]:
+        return self.find_many([(seeds, program_id)])[0]
+
+    def associated_token_address(self, owner: Any, mint: Any, token_program: Any = TOKEN_PROGRAM_ID) -> str:
+        seeds = [pubkey_bytes(owner), pubkey_bytes(token_program), pubkey_bytes(mint)]
+        return self.find_program_address(seeds, ASSOCIATED_TOKEN_PROGRAM_ID)[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = {**self._counters, "memory": len(self._memory)}
+        if self.db_path is not None:
+            out["persisted"] = self._conn().execute("SELECT count(*) FROM pdas").fetchone()[0]
+        return out
+
+
+_default = PdaCache()
+
+
+def configure(db_path: Optional[str] = None, max_memory: int = 100_000) -> PdaCache:
+    """Replace the shared cache, e.g. to persist it at ``db_path``."""
+    global _default
+    _default = PdaCache(db_path, max_memory)
+    return _default
+
+
+def find_program_address(seeds: Seeds, program_id: Any) -> Tuple[str, int]:
+    return _default.find_program_address(seeds, program_id)
+
+
+def find_many(requests: Iterable[Tuple[Seeds, Any]]) -> List[Tuple[str, int]]:
+    return _default.find_many(requests)
+
+
+def associated_token_address(owner: Any, mint: Any, token_program: Any = TOKEN_PROGRAM_ID) -> str:
+    return _default.associated_token_address(owner, mint, token_program)
+
+
+def get_associated_token_address(owner: Any, mint: Any, token_program_id: Any = TOKEN_PROGRAM_ID):
+    """Drop-in for ``spl.token.instructions.get_associated_token_address`` (returns a Pubkey)."""
+    from solders.pubkey import Pubkey
+    return Pubkey.from_string(associated_token_address(owner, mint, token_program_id))
+
+
+def stats() -> Dict[str, Any]:
+    return _default.stats()
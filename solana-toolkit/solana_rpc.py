@@ -0,0 +1,519 @@
+"""Shared Solana JSON-RPC client with keep-alive pooling and batching.
+
+One ``RpcClient`` per endpoint URL keeps a small pool of persistent
+HTTP(S) connections, so repeated calls skip the TCP/TLS handshake. Independent
+queries can be sent as a single JSON-RPC 2.0 batch array with ``batch()``.
+Transport failures, timeouts, HTTP 429 and 5xx responses are retried with
+exponential backoff (honouring ``Retry-After``), and every method keeps call,
+error and latency counters.
+
+Responses are the raw JSON-RPC envelopes (``{"result": ...}`` or
+``{"error": ...}``), the same shape the ad-hoc ``urlopen`` helpers returned.
+
+Read-only results can be kept in an ``RpcCache``: a bounded LRU with a TTL
+per method (``FOREVER`` for data that never changes, such as a mint's
+metadata name or a token account's owner). Entries are indexed by every
+address in their params so a write can drop them with ``invalidate()``, and
+the cache is slot-aware: once a response from slot N has been seen for an
+address, a lagging node's answer from an older slot is not cached over it.
+Cached envelopes are shared between callers and must be treated as read-only.
+
+Usage:
+    from solana_rpc import get_client
+    rpc = get_client("https://api.devnet.solana.com")
+    rpc.call("getBalance", [address])
+    rpc.batch([("getBalance", [a]), ("getBalance", [b])])
+"""
+
+import http.client
+import json
+import math
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_OPTIONS = {
+    "timeout": 10.0,     # seconds per HTTP request
+    "retries": 2,        # extra attempts after the first one
+    "backoff": 0.25,     # first retry delay, doubled each attempt
+    "max_backoff": 4.0,
+    "pool_size": 4,      # idle keep-alive connections kept per endpoint
+    "max_batch": 100,    # calls per HTTP request; larger batches are split
+}
+
+FOREVER = math.inf
+
+# Seconds a successful read-only result stays fresh; other methods are never cached
+DEFAULT_CACHE_TTLS = {
+    "getBalance": 10,
+    "getTokenAccountsByOwner": 15,
+    "getTokenAccountBalance": 10,
+    "getTokenLargestAccounts": 30,
+    "getTokenSupply": 30,
+    "getAccountInfo": 10,
+    "getMultipleAccounts": 10,
+    "getProgramAccounts": 30,
+}
+
+_PUBKEY_RE = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{32,44}$")
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_TRANSPORT_ERRORS = (http.client.HTTPException, ConnectionError, socket.timeout, OSError)
+
+
+class RpcError(Exception):
+    """Transport-level failure after all retries (not a JSON-RPC error object)."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def _ms_since(t0: float) -> float:
+    return (time.perf_counter() - t0) * 1000
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status: int, retry_after: Optional[float]):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _MethodStats:
+    __slots__ = ("calls", "errors", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avgMs": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "maxMs": round(self.max_ms, 2),
+        }
+
+
+def _addresses(value: Any) -> List[str]:
+    """Every base58 pubkey in a params structure (accounts, mints, program ids)."""
+    if isinstance(value, str):
+        return [value] if _PUBKEY_RE.match(value) else []
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return []
+    return [a for v in value for a in _addresses(v)]
+
+
+def _context_slot(envelope: Dict[str, Any]) -> Optional[int]:
+    result = envelope.get("result")
+    if isinstance(result, dict):
+        slot = (result.get("context") or {}).get("slot")
+        if isinstance(slot, int):
+            return slot
+    return None
+
+
+class _CacheEntry:
+    __slots__ = ("expires", "slot", "envelope", "addresses")
+
+    def __init__(self, expires: float, slot: Optional[int], envelope: Dict[str, Any], addresses: List[str]):
+        self.expires = expires
+        self.slot = slot
+        self.envelope = envelope
+        self.addresses = addresses
+
+
+class RpcCache:
+    """Bounded LRU of read-only RPC results with per-method TTLs."""
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, max_entries: int = 4096):
+        self.ttls = {**DEFAULT_CACHE_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._by_address: Dict[str, set] = {}
+        self._slot_floor: "OrderedDict[tuple, int]" = OrderedDict()  # (url, account) -> newest slot seen
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                          "invalidations": 0, "staleSlots": 0}
+        self._method_hits: Dict[str, List[int]] = {}  # method -> [hits, misses]
+
+    @staticmethod
+    def key(url: str, method: str, params: Optional[list]) -> tuple:
+        return url, method, json.dumps(params or [], sort_keys=True, separators=(",", ":"))
+
+    def ttl_for(self, method: str, ttl: Optional[float] = None) -> float:
+        return self.ttls.get(method, 0) if ttl is None else ttl
+
+    def _drop(self, key: tuple) -> Optional[_CacheEntry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for addr in entry.addresses:
+                keys = self._by_address.get(addr)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_address[addr]
+        return entry
+
+    def get(self, url: str, method: str, params: Optional[list]) -> Optional[Dict[str, Any]]:
+        key = self.key(url, method, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._drop(key)
+                entry = None
+            counts = self._method_hits.setdefault(method, [0, 0])
+            if entry is None:
+                self._counters["misses"] += 1
+                counts[1] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            counts[0] += 1
+            return entry.envelope
+
+    def put(self, url: str, method: str, params: Optional[list], envelope: Dict[str, Any],
+            ttl: Optional[float] = None) -> None:
+        ttl = self.ttl_for(method, ttl)
+        if ttl <= 0 or not isinstance(envelope, dict) or "error" in envelope:
+            return
+        key = self.key(url, method, params)
+        addresses = sorted(set(_addresses(params)))
+        # The account a query is about is its first param (owner, mint, account)
+        primary = (url, params[0]) if params and isinstance(params[0], str) else None
+        slot = _context_slot(envelope)
+        with self._lock:
+            if slot is not None and primary is not None:
+                if slot < self._slot_floor.get(primary, -1):
+                    # A lagging node answered from before what we already served.
+                    self._counters["staleSlots"] += 1
+                    return
+                self._slot_floor[primary] = slot
+                self._slot_floor.move_to_end(primary)
+                while len(self._slot_floor) > self.max_entries:
+                    self._slot_floor.popitem(last=False)
+            self._drop(key)
+            self._entries[key] = _CacheEntry(time.monotonic() + ttl, slot, envelope, addresses)
+            for a in addresses:
+                self._by_address.setdefault(a, set()).add(key)
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def invalidate(self, *addresses: str) -> int:
+        """Drop every entry whose params mention one of ``addresses``."""
+        removed = 0
+        with self._lock:
+            for addr in addresses:
+                for key in list(self._by_address.get(addr, ())):
+                    if self._drop(key) is not None:
+                        removed += 1
+            self._counters["invalidations"] += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_address.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hitRate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                "methods": {m: {"hits": h, "misses": ms} for m, (h, ms) in sorted(self._method_hits.items())},
+            }
+
+
+class RpcClient:
+    """Thread-safe JSON-RPC client for a single endpoint."""
+
+    def __init__(self, url: str, cache: Optional[RpcCache] = None, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise TypeError(f"unknown RpcClient options: {sorted(unknown)}")
+        self.url = url
+        self.cache = cache
+        self.options = {**DEFAULT_OPTIONS, **options}
+        parts = urlsplit(url)
+        self._https = parts.scheme == "https"
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._methods: Dict[str, _MethodStats] = {}
+        self._counters = {"requests": 0, "batches": 0, "retries": 0, "failures": 0,
+                          "unbatched": 0, "connections": 0, "reused": 0}
+
+    # -- connections -------------------------------------------------------
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self._counters["connections"] += 1
+        cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return cls(self._host, self._port, timeout=self.options["timeout"])
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.options["pool_size"]:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    # -- transport ---------------------------------------------------------
+
+    def _send(self, conn: http.client.HTTPConnection, body: bytes) -> Any:
+        try:
+            conn.request("POST", self._path, body=body, headers={
+                "Content-Type": "application/json",
+                "Connection": "keep-alive",
+            })
+            resp = conn.getresponse()
+            data = resp.read()
+        except _TRANSPORT_ERRORS:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(conn)
+        if resp.status in _RETRY_STATUS:
+            retry_after = resp.getheader("Retry-After")
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            raise _RetryableStatus(resp.status, retry_after)
+        if resp.status >= 400:
+            raise RpcError(f"HTTP {resp.status} from {self.url}: {data[:200]!r}", status=resp.status)
+        return json.loads(data)
+
+    def _post_once(self, body: bytes) -> Any:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self._counters["reused"] += 1
+        if conn is None:
+            return self._send(self._connect(), body)
+        try:
+            return self._send(conn, body)
+        except _TRANSPORT_ERRORS:
+            # The server may have dropped an idle keep-alive socket; retrying
+            # once on a fresh connection is not a real failure.
+            return self._send(self._connect(), body)
+
+    def _post(self, payload: Any) -> Any:
+        """POST ``payload`` with retries; returns the decoded JSON body."""
+        body = json.dumps(payload).encode()
+        retries = self.options["retries"]
+        delay = self.options["backoff"]
+        for attempt in range(retries + 1):
+            with self._lock:
+                self._counters["requests"] += 1
+            try:
+                return self._post_once(body)
+            except _RetryableStatus as e:
+                err, status, wait = e, e.status, e.retry_after
+            except (json.JSONDecodeError, *_TRANSPORT_ERRORS) as e:
+                err, status, wait = e, None, None
+            if attempt == retries:
+                with self._lock:
+                    self._counters["failures"] += 1
+                raise RpcError(f"{self.url}: {err}", status=status) from err
+            with self._lock:
+                self._counters["retries"] += 1
+            time.sleep(min(wait if wait is not None else delay, self.options["max_backoff"]))
+            delay *= 2
+
+    # -- stats -------------------------------------------------------------
+
+    def _record(self, methods: Iterable[str], elapsed_ms: float, failed: Sequence[bool]) -> None:
+        with self._lock:
+            for method, bad in zip(methods, failed):
+                st = self._methods.get(method)
+                if st is None:
+                    st = self._methods[method] = _MethodStats()
+                st.calls += 1
+                st.errors += bad
+                st.total_ms += elapsed_ms
+                st.max_ms = max(st.max_ms, elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "url": self.url,
+                **self._counters,
+                "idle": len(self._idle),
+                "methods": {m: s.as_dict() for m, s in sorted(self._methods.items())},
+            }
+
+    # -- JSON-RPC ----------------------------------------------------------
+
+    def _ids(self, n: int) -> range:
+        with self._lock:
+            start = self._next_id
+            self._next_id += n
+        return range(start, start + n)
+
+    def _cached(self, method: str, params: Optional[list], ttl: Optional[float]) -> Optional[Dict[str, Any]]:
+        if self.cache is None or self.cache.ttl_for(method, ttl) <= 0:
+            return None
+        return self.cache.get(self.url, method, params)
+
+    def _store(self, method: str, params: Optional[list], envelope: Dict[str, Any], ttl: Optional[float]) -> None:
+        if self.cache is not None:
+            self.cache.put(self.url, method, params, envelope, ttl)
+
+    def call(self, method: str, params: Optional[list] = None, ttl: Optional[float] = None) -> Dict[str, Any]:
+        """Single request; returns the JSON-RPC envelope.
+
+        Args:
+            method: JSON-RPC method name.
+            params: Positional params.
+            ttl: Cache lifetime override in seconds (``FOREVER`` for immutable
+                data, 0 to bypass); defaults to the cache's per-method policy.
+
+        Raises:
+            RpcError: If the endpoint could not be reached after all retries.
+        """
+        cached = self._cached(method, params, ttl)
+        if cached is not None:
+            return cached
+        data = self._call(method, params)
+        self._store(method, params, data, ttl)
+        return data
+
+    def _call(self, method: str, params: Optional[list]) -> Dict[str, Any]:
+        (req_id,) = self._ids(1)
+        payload = {"jsonrpc": "2.0", "id": req_id, "method": method, "params": params or []}
+        t0 = time.perf_counter()
+        try:
+            data = self._post(payload)
+        except RpcError:
+            self._record([method], _ms_since(t0), [True])
+            raise
+        self._record([method], _ms_since(t0), [not isinstance(data, dict) or "error" in data])
+        return data
+
+    def batch(self, calls: Sequence[Tuple[str, Optional[list]]], ttl: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Send independent calls as JSON-RPC batch arrays.
+
+        Cached results are answered locally; only the misses go on the wire.
+
+        Args:
+            calls: ``(method, params)`` pairs.
+            ttl: Cache lifetime override applied to every call, as in ``call()``.
+
+        Returns:
+            One envelope per call, in the order given. A call the server
+            answered with an error keeps its ``{"error": ...}`` envelope.
+
+        Raises:
+            RpcError: If the endpoint could not be reached after all retries.
+        """
+        calls = list(calls)
+        out: List[Optional[Dict[str, Any]]] = [self._cached(m, p, ttl) for m, p in calls]
+        misses = [i for i, hit in enumerate(out) if hit is None]
+        step = max(1, self.options["max_batch"])
+        for n in range(0, len(misses), step):
+            chunk = misses[n:n + step]
+            for i, envelope in zip(chunk, self._batch_chunk([calls[i] for i in chunk])):
+                self._store(*calls[i], envelope, ttl)
+                out[i] = envelope
+        return out
+
+    def _batch_chunk(self, calls: List[Tuple[str, Optional[list]]]) -> List[Dict[str, Any]]:
+        if len(calls) == 1:
+            return [self._call(*calls[0])]
+        ids = self._ids(len(calls))
+        payload = [{"jsonrpc": "2.0", "id": req_id, "method": m, "params": p or []}
+                   for req_id, (m, p) in zip(ids, calls)]
+        methods = [m for m, _ in calls]
+        with self._lock:
+            self._counters["batches"] += 1
+        t0 = time.perf_counter()
+        try:
+            data = self._post(payload)
+        except RpcError:
+            self._record(methods, _ms_since(t0), [True] * len(calls))
+            raise
+        elapsed = _ms_since(t0)
+        if not isinstance(data, list):
+            # Some providers reject batches with a single error object; fall
+            # back to one request per call rather than failing them all.
+            with self._lock:
+                self._counters["unbatched"] += 1
+            return [self._call(m, p) for m, p in calls]
+        by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+        results = []
+        for req_id in ids:
+            item = by_id.get(req_id)
+            if item is None:
+                item = {"jsonrpc": "2.0", "id": req_id,
+                        "error": {"code": -32603, "message": "missing from batch response"}}
+            results.append(item)
+        self._record(methods, elapsed, ["error" in r for r in results])
+        return results
+
+
+_clients: Dict[str, RpcClient] = {}
+_clients_lock = threading.Lock()
+_default_options: Dict[str, Any] = {}
+cache = RpcCache()
+
+
+def configure(**options) -> None:
+    """Set default options for clients created by ``get_client`` from now on."""
+    unknown = set(options) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise TypeError(f"unknown RpcClient options: {sorted(unknown)}")
+    _default_options.update(options)
+
+
+def configure_cache(ttls: Optional[Dict[str, float]] = None, max_entries: Optional[int] = None) -> None:
+    """Override per-method TTLs (seconds, 0 disables) and the LRU bound of the shared cache."""
+    with cache._lock:
+        cache.ttls.update(ttls or {})
+        if max_entries is not None:
+            cache.max_entries = max_entries
+
+
+def get_client(url: str) -> RpcClient:
+    """Shared client (connection pool + result cache) for ``url``."""
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = RpcClient(url, cache=cache, **_default_options)
+        return client
+
+
+def invalidate(*addresses: str) -> int:
+    """Drop cached results that mention any of ``addresses`` (after a write)."""
+    return cache.invalidate(*(a for a in addresses if a))
+
+
+def all_stats() -> List[Dict[str, Any]]:
+    with _clients_lock:
+        clients = list(_clients.values())
+    return [c.stats() for c in clients]
@@ -22,6 +22,9 @@ from solders.message import Message
 from solders.system_program import ID as SYSTEM_PROGRAM_ID
 import time
 
+import pda_cache
+from pda_cache import get_associated_token_address
+
 
 # Anchor discriminators: sha256("global:<instruction_name>")[:8]
 def _discriminator(name: str) -> bytes:
@@ -82,23 +85,23 @@ class SymbioticClient:
             (pda_pubkey, bump)
         """
         seeds = [b"symbiotic", bytes(human), bytes([pair_nonce])]
-        return Pubkey.find_program_address(seeds, self.program_id)
+        return self._find_pda(seeds)
 
     def find_mint_config_pda(self) -> tuple[Pubkey, int]:
         """Derive the mint config PDA."""
-        return Pubkey.find_program_address([b"mint_config"], self.program_id)
+        return self._find_pda([b"mint_config"])
 
     def find_mint_authority_pda(self) -> tuple[Pubkey, int]:
         """Derive the mint authority PDA."""
-        return Pubkey.find_program_address([b"mint_authority"], self.program_id)
+        return self._find_pda([b"mint_authority"])
+
+    def _find_pda(self, seeds: list) -> tuple[Pubkey, int]:
+        address, bump = pda_cache.find_program_address(seeds, self.program_id)
+        return Pubkey.from_string(address), bump
 
     def _get_ata(self, owner: Pubkey, mint: Pubkey, token_program_id: Pubkey) -> Pubkey:
         """Derive associated token account for an owner/mint/program tuple."""
-        ata, _ = Pubkey.find_program_address(
-            [bytes(owner), bytes(token_program_id), bytes(mint)],
-            ASSOCIATED_TOKEN_PROGRAM_ID,
-        )
-        return ata
+        return get_associated_token_address(owner, mint, token_program_id)
 
     def _send_tx(self, ixs: list[Instruction], signers: list[Keypair]) -> str:
         """Build, sign, send transaction. Returns signature."""
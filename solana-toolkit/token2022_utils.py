@@ -20,11 +20,12 @@ from spl.token.instructions import (
     InitializeMintParams,
     MintToParams,
     create_idempotent_associated_token_account,
-    get_associated_token_address,
     initialize_mint,
     mint_to,
 )
 
+from pda_cache import get_associated_token_address
+
 
 DEVNET_RPC_URL = "https://api.devnet.solana.com"
 _METADATA_INIT_DISCRIMINATOR = hashlib.sha256(
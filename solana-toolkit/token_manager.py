@@ -17,9 +17,10 @@ from spl.token.constants import TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID, ASSOCIA
 from spl.token.instructions import (
     initialize_mint, InitializeMintParams,
     mint_to, MintToParams,
-    get_associated_token_address,
 )
 
+from pda_cache import get_associated_token_address
+
 from token2022_utils import create_token2022_mint
 from wallet import SolanaWallet
 